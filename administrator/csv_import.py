@@ -0,0 +1,241 @@
+import codecs, csv, io, logging
+from contextlib import contextmanager
+from datetime import date, datetime
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+ENCODING_PROBE_BYTES = 64 * 1024
+# utf-8-sig also reads plain UTF-8; cp1252 is what Excel on Windows saves, latin-1 decodes anything
+CSV_ENCODINGS = ('utf-8-sig', 'cp1252', 'latin-1')
+CSV_IMPORT_BATCH_SIZE = 500
+# uploads bigger than this are imported by a Celery worker while the page polls for progress
+BACKGROUND_IMPORT_BYTES = 1024 * 1024
+MAX_ERROR_DETAILS = 100
+DATE_FORMATS = ("%Y-%m-%d", "%d/%m/%Y", "%m/%d/%Y")
+
+
+def detect_encoding(prefix):
+    """First encoding that decodes the prefix; a multi-byte character cut at the end doesn't count against it."""
+    for encoding in CSV_ENCODINGS:
+        try:
+            codecs.getincrementaldecoder(encoding)().decode(prefix, final=False)
+            return encoding
+        except UnicodeDecodeError:
+            continue
+    return CSV_ENCODINGS[-1]
+
+
+@contextmanager
+def csv_rows(binary_file):
+    """
+    DictReader decoding binary_file on the fly, with the encoding guessed from the first
+    ENCODING_PROBE_BYTES, so an upload is never read or decoded in full. Header names are
+    stripped once. binary_file is left open for the caller.
+    """
+    prefix = binary_file.read(ENCODING_PROBE_BYTES)
+    binary_file.seek(0)
+    text = io.TextIOWrapper(binary_file, encoding=detect_encoding(prefix), errors='replace', newline='')
+    try:
+        reader = csv.DictReader(text)
+        if reader.fieldnames:
+            reader.fieldnames = [name.strip() for name in reader.fieldnames]
+        yield reader
+    finally:
+        text.detach()
+
+
+class RowError(Exception):
+    pass
+
+
+class HarvestCSVImporter:
+    """
+    One-pass import of verified harvest records from a CSV reader.
+
+    Each row is validated and converted as it is read, and valid records are written every
+    CSV_IMPORT_BATCH_SIZE rows together with their AdminUserManagement logs and rollup refresh,
+    so memory stays flat however long the file is. `progress` (if given) is called with the
+    running summary every CSV_IMPORT_BATCH_SIZE rows.
+
+    Every chunk is committed in its own short transaction, so a long import holds no locks
+    between chunks and a bad row only costs that row: it is reported in error_details (rows for
+    a municipality other than a municipal admin's own included) and the rest of the file is
+    still imported.
+    """
+
+    def __init__(self, admin_info, progress=None):
+        self.admin_info = admin_info
+        self.municipality = admin_info.municipality_incharge
+        self.is_overall_admin = self.municipality.municipality_id == 14
+        self.progress = progress
+        self.has_municipality_column = False
+        self.summary = {
+            'rows': 0,
+            'created': 0,
+            'errors': 0,
+            'error_details': [],
+            'pairs': [],
+        }
+
+    def header_errors(self, fieldnames):
+        """Messages explaining why the header row can't be imported (empty when it can)."""
+        if not fieldnames:
+            return ["The CSV file is empty. Please check the template format."]
+        self.has_municipality_column = 'municipality' in fieldnames
+        if self.is_overall_admin and not self.has_municipality_column:
+            return ["Overall administrators must include the 'municipality' column in the CSV file. Please add municipality information to your CSV and try again."]
+
+        required_headers = ['harvest_date', 'commodity', 'total_weight_kg']
+        if self.has_municipality_column:
+            required_headers.insert(2, 'municipality')
+        missing_headers = [h for h in required_headers if h not in fieldnames]
+        if missing_headers:
+            return [f"CSV file is missing required headers: {', '.join(missing_headers)}. Please check the template format."]
+        return []
+
+    def load_lookups(self):
+        from base.reference_data import reference_data
+
+        self.ref = reference_data.get()
+
+    def add_error(self, message, counted=True):
+        if counted:
+            self.summary['errors'] += 1
+        if len(self.summary['error_details']) < MAX_ERROR_DETAILS:
+            self.summary['error_details'].append(message)
+
+    def parse_row(self, row_num, row):
+        """
+        VerifiedHarvestRecord (unsaved) for a row, or RowError with the message shown to the admin.
+        """
+        from dashboard.models import VerifiedHarvestRecord
+
+        row = {k.strip(): (v or '').strip() for k, v in row.items() if k is not None}
+
+        municipality_name = row.get('municipality', '')
+        # Handle special case for Balanga/Balanga City
+        if municipality_name.lower() == 'balanga':
+            municipality_name = 'Balanga City'
+        if municipality_name and not self.is_overall_admin and municipality_name.lower() != self.municipality.municipality.lower():
+            raise RowError(f"Row {row_num}: Municipality '{municipality_name}' is not your assigned municipality ({self.municipality.municipality})")
+
+        if not row.get("harvest_date"):
+            raise RowError(f"Row {row_num}: Harvest date is required")
+        if not row.get("commodity"):
+            raise RowError(f"Row {row_num}: Commodity is required")
+        if self.has_municipality_column and not row.get("municipality"):
+            raise RowError(f"Row {row_num}: Municipality is required when municipality column is present")
+        if not row.get("total_weight_kg"):
+            raise RowError(f"Row {row_num}: Total weight is required")
+
+        harvest_date = None
+        for date_format in DATE_FORMATS:
+            try:
+                harvest_date = datetime.strptime(row["harvest_date"], date_format).date()
+                break
+            except ValueError:
+                continue
+        if harvest_date is None:
+            raise RowError(f"Row {row_num}: Invalid harvest date format. Use YYYY-MM-DD or DD/MM/YYYY format")
+        if harvest_date > date.today():
+            raise RowError(f"Row {row_num}: Harvest date ({harvest_date}) cannot be in the future")
+
+        try:
+            total_weight_kg = float(row["total_weight_kg"])
+            if total_weight_kg <= 0:
+                raise ValueError("Weight must be positive")
+        except (ValueError, TypeError):
+            raise RowError(f"Row {row_num}: Invalid total weight - must be a positive number")
+
+        commodity_name = row['commodity']
+        commodity_obj = self.ref.commodities_by_name.get(commodity_name.lower())
+        if not commodity_obj:
+            raise RowError(f"Row {row_num}: Commodity '{commodity_name}' does not exist in database")
+
+        if self.has_municipality_column:
+            municipality = self.ref.municipalities_by_name.get(municipality_name.lower())
+            if not municipality:
+                raise RowError(f"Row {row_num}: Municipality '{municipality_name}' does not exist in database")
+        else:
+            municipality = self.municipality
+
+        barangay_name = row.get("barangay", "")
+        barangay = None
+        if barangay_name:
+            barangay = self.ref.barangays_by_municipality.get(municipality.municipality_id, {}).get(barangay_name.lower())
+            if not barangay:
+                self.add_error(f"Row {row_num}: Barangay '{barangay_name}' not found in '{municipality.municipality}'. Record will be created without barangay", counted=False)
+
+        return VerifiedHarvestRecord(
+            harvest_date=harvest_date,
+            commodity_id=commodity_obj,
+            total_weight_kg=total_weight_kg,
+            municipality=municipality,
+            barangay=barangay,
+            remarks=row.get("remarks", ""),
+            date_verified=timezone.now(),
+            verified_by=self.admin_info,
+            prev_record=None,
+        )
+
+    def flush(self, records):
+        from base.models import AdminUserManagement
+        from dashboard.models import VerifiedHarvestRecord
+        from dashboard.utils import harvest_rollup_cell, refresh_harvest_rollup
+
+        with transaction.atomic():
+            created_records = VerifiedHarvestRecord.objects.bulk_create(records)
+            refresh_harvest_rollup({harvest_rollup_cell(record) for record in created_records})
+            AdminUserManagement.objects.bulk_create([
+                AdminUserManagement(
+                    admin_id=self.admin_info,
+                    action=f"Created Verified Harvest Record ID {record.id} via CSV upload - {record.commodity_id.name} ({record.total_weight_kg}kg) from {record.municipality.municipality}",
+                    content_type=self.content_type,
+                    object_id=record.id,
+                )
+                for record in created_records
+            ])
+        self.summary['created'] += len(created_records)
+        records.clear()
+        logger.info(f"Processed batch: {self.summary['created']} records created so far")
+
+    def run(self, reader):
+        """Imports every row of reader and returns the summary."""
+        from dashboard.models import VerifiedHarvestRecord
+        from .dashboard_stats import invalidate_dashboard_stats
+
+        self.load_lookups()
+        self.content_type = ContentType.objects.get_for_model(VerifiedHarvestRecord)
+        pairs = set()
+        records = []
+
+        for row_num, row in enumerate(reader, start=2):
+            self.summary['rows'] += 1
+            if self.progress and self.summary['rows'] % CSV_IMPORT_BATCH_SIZE == 0:
+                self.progress(self.summary)
+            try:
+                record = self.parse_row(row_num, row)
+            except RowError as e:
+                self.add_error(str(e))
+                continue
+            except Exception as e:
+                self.add_error(f"Row {row_num}: Unexpected error - {str(e)}")
+                continue
+
+            records.append(record)
+            pairs.add((record.commodity_id.commodity_id, record.municipality.municipality_id))
+            if len(records) >= CSV_IMPORT_BATCH_SIZE:
+                self.flush(records)
+
+        if records:
+            self.flush(records)
+
+        self.summary['pairs'] = [{'commodity_id': c, 'municipality_id': m} for c, m in sorted(pairs)]
+        logger.info(f"CSV processing completed: {self.summary['created']} records created, {self.summary['errors']} errors")
+        if self.summary['created']:
+            # bulk_create skips the post_save signals that normally refresh the dashboard counters
+            invalidate_dashboard_stats()
+        return self.summary
@@ -0,0 +1,138 @@
+from django.core.cache import cache
+from django.db.models import Count, IntegerField, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+STATS_CACHE_PREFIX = 'admin_dashboard_stats'
+ADMIN_REPORTS_VERSION = 'admin_reports'
+STATS_CACHE_TIMEOUT = 60
+
+COUNTER_KEYS = (
+    'total_accounts', 'verified_accounts', 'pending_accounts',
+    'total_plant_records', 'total_harvest_records',
+    'pending_plant_records', 'pending_harvest_records',
+    'verified_plant_records', 'verified_harvest_records',
+)
+
+
+def stats_version():
+    """
+    Token bumped by invalidate_dashboard_stats. It lives in the database, so a write in any
+    process (e.g. a CSV import in the Celery worker) and a restart are both seen by every process.
+    """
+    from base.data_versions import data_version
+
+    return data_version(STATS_CACHE_PREFIX)
+
+
+def invalidate_dashboard_stats():
+    """Called after writes that change a counter (creates, deletes, status changes); every cached scope is recomputed on the next request."""
+    from base.data_versions import bump_data_version
+
+    bump_data_version(STATS_CACHE_PREFIX)
+
+
+def report_version():
+    """Versions the stored admin PDF reports: the counters' version plus one for edits that leave the counters alone."""
+    from base.data_versions import data_version
+
+    return f"{stats_version()}:{data_version(ADMIN_REPORTS_VERSION)}"
+
+
+def invalidate_admin_reports():
+    """Called after edits that only change what the admin PDF reports list (names, remarks, farm lands)."""
+    from base.data_versions import bump_data_version
+
+    bump_data_version(ADMIN_REPORTS_VERSION)
+
+
+def _per_municipality(queryset, municipality_field, **counters):
+    """{municipality_id: {counter: n}} from one GROUP BY query with conditional counts."""
+    rows = queryset.values(municipality_field).annotate(**counters).order_by()
+    return {row.pop(municipality_field): row for row in rows}
+
+
+def _top_commodities(municipality_id=None, limit=5):
+    """Plant and harvest record counts per commodity as independent subqueries, so the two joins don't multiply rows."""
+    from base.models import CommodityType, initHarvestRecord, initPlantRecord
+
+    def count_of(model):
+        qs = model.objects.filter(commodity_id=OuterRef('pk'))
+        if municipality_id is not None:
+            qs = qs.filter(transaction__effective_municipality=municipality_id)
+        counts = qs.order_by().values('commodity_id').annotate(c=Count('*')).values('c')
+        return Coalesce(Subquery(counts, output_field=IntegerField()), Value(0))
+
+    return list(CommodityType.objects.annotate(
+        plant_count=count_of(initPlantRecord),
+        harvest_count=count_of(initHarvestRecord),
+    ).order_by('-plant_count', 'pk')[:limit])
+
+
+def compute_dashboard_stats(municipality_id=None):
+    """
+    Counters of the admin landing page for one municipality, or for every municipality when
+    municipality_id is None. Each table is read once, grouped by municipality.
+    """
+    from base.models import AccountsInformation, MunicipalityName, initHarvestRecord, initPlantRecord
+    from dashboard.models import VerifiedHarvestRecord, VerifiedPlantRecord
+
+    farmers = AccountsInformation.objects.filter(account_type_id=1)
+    plant_records = initPlantRecord.objects.all()
+    harvest_records = initHarvestRecord.objects.all()
+    verified_plants = VerifiedPlantRecord.objects.all()
+    verified_harvests = VerifiedHarvestRecord.objects.all()
+    if municipality_id is not None:
+        farmers = farmers.filter(userinfo_id__municipality_id=municipality_id)
+        plant_records = plant_records.filter(transaction__effective_municipality=municipality_id)
+        harvest_records = harvest_records.filter(transaction__effective_municipality=municipality_id)
+        verified_plants = verified_plants.filter(municipality=municipality_id)
+        verified_harvests = verified_harvests.filter(municipality=municipality_id)
+
+    accounts = _per_municipality(
+        farmers, 'userinfo_id__municipality_id',
+        total_accounts=Count('pk'),
+        verified_accounts=Count('pk', filter=Q(acc_status_id=2)),
+        pending_accounts=Count('pk', filter=Q(acc_status_id=3)),
+    )
+    plants = _per_municipality(
+        plant_records, 'transaction__effective_municipality',
+        total_plant_records=Count('pk'),
+        pending_plant_records=Count('pk', filter=Q(record_status=3)),
+    )
+    harvests = _per_municipality(
+        harvest_records, 'transaction__effective_municipality',
+        total_harvest_records=Count('pk'),
+        pending_harvest_records=Count('pk', filter=Q(record_status=3)),
+    )
+    verified_plant_counts = _per_municipality(verified_plants, 'municipality', verified_plant_records=Count('pk'))
+    verified_harvest_counts = _per_municipality(verified_harvests, 'municipality', verified_harvest_records=Count('pk'))
+
+    stats = dict.fromkeys(COUNTER_KEYS, 0)
+    for grouped in (accounts, plants, harvests, verified_plant_counts, verified_harvest_counts):
+        for counters in grouped.values():
+            for key, value in counters.items():
+                stats[key] += value
+
+    if municipality_id is None:
+        municipalities = MunicipalityName.objects.exclude(pk=14).order_by('pk').values_list('pk', 'municipality')
+    else:
+        municipalities = MunicipalityName.objects.filter(pk=municipality_id).values_list('pk', 'municipality')
+    stats['municipalities_data'] = [
+        {'municipality_id': pk, 'municipality': name, 'farmer_count': accounts.get(pk, {}).get('total_accounts', 0)}
+        for pk, name in municipalities
+    ]
+    stats['top_commodities'] = _top_commodities(municipality_id)
+    return stats
+
+
+def get_dashboard_stats(municipality_id=None):
+    """compute_dashboard_stats cached per (scope, minute) until the next invalidate_dashboard_stats."""
+    scope = 'all' if municipality_id is None else municipality_id
+    minute = timezone.now().strftime('%Y%m%d%H%M')
+    key = f"{STATS_CACHE_PREFIX}:{stats_version()}:{scope}:{minute}"
+    stats = cache.get(key)
+    if stats is None:
+        stats = compute_dashboard_stats(municipality_id)
+        cache.set(key, stats, STATS_CACHE_TIMEOUT)
+    return stats
@@ -0,0 +1,369 @@
+import csv
+from django.db.models import Count, FloatField, IntegerField, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce, TruncMonth
+from django.http import StreamingHttpResponse
+from base.reference_data import reference_data
+
+EXPORT_CHUNK_SIZE = 2000
+
+TRANSACTION_LOCATION_FIELDS = (
+    'transaction__location_type', 'transaction__farm_land', 'transaction__farm_land__farmland_name',
+    'transaction__farm_land__estimated_area', 'transaction__farm_land__municipality__municipality',
+    'transaction__farm_land__barangay__barangay', 'transaction__manual_municipality__municipality',
+    'transaction__manual_barangay__barangay',
+)
+
+
+class Echo:
+    """Pseudo-buffer for csv.writer: write() hands the formatted line back instead of storing it."""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(filename, rows):
+    """
+    StreamingHttpResponse writing `rows` (header included) as they are produced, so the
+    download starts right away and a full-province export never sits in memory.
+    """
+    writer = csv.writer(Echo())
+    response = StreamingHttpResponse((writer.writerow(row) for row in rows), content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="{filename}.csv"'
+    return response
+
+
+def iter_values(queryset, *fields):
+    """Flat dict rows of the given fields, fetched EXPORT_CHUNK_SIZE at a time."""
+    return queryset.values(*fields).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+
+def _name(lastname, firstname):
+    return f"{lastname}, {firstname}"
+
+
+def _datetime(value, fallback):
+    return value.strftime('%Y-%m-%d %H:%M') if value else fallback
+
+
+def location_display(row):
+    """RecordTransaction.get_location_display() for a values() row with TRANSACTION_LOCATION_FIELDS."""
+    if row['transaction__location_type'] == 'farm_land' and row['transaction__farm_land']:
+        return f"{row['transaction__farm_land__farmland_name']} - {row['transaction__farm_land__municipality__municipality']}, {row['transaction__farm_land__barangay__barangay']}"
+    elif row['transaction__manual_barangay__barangay'] and row['transaction__manual_municipality__municipality']:
+        return f"{row['transaction__manual_barangay__barangay']}, {row['transaction__manual_municipality__municipality']}"
+    elif row['transaction__manual_municipality__municipality']:
+        return f"{row['transaction__manual_municipality__municipality']}"
+    return "No location set"
+
+
+def farm_land_area(row):
+    if row['transaction__location_type'] == 'farm_land' and row['transaction__farm_land']:
+        return row['transaction__farm_land__estimated_area'] or 0
+    return 0
+
+
+RECORD_FIELDS = TRANSACTION_LOCATION_FIELDS + (
+    'transaction__transaction_date', 'transaction__account_id__userinfo_id__lastname',
+    'transaction__account_id__userinfo_id__firstname', 'commodity_id__name', 'record_status__acc_status',
+    'verified_by', 'verified_by__userinfo_id__lastname', 'verified_by__userinfo_id__firstname', 'date_verified',
+)
+
+
+def _record_columns(row):
+    return (
+        row['transaction__transaction_date'].strftime('%Y-%m-%d %H:%M'),
+        _name(row['transaction__account_id__userinfo_id__lastname'], row['transaction__account_id__userinfo_id__firstname']),
+        row['commodity_id__name'],
+    )
+
+
+def _record_status_columns(row):
+    return [
+        location_display(row),
+        row['record_status__acc_status'] or 'N/A',
+        _name(row['verified_by__userinfo_id__lastname'], row['verified_by__userinfo_id__firstname']) if row['verified_by'] else 'Not Verified',
+        _datetime(row['date_verified'], 'Not Verified'),
+    ]
+
+
+def harvest_record_rows(records):
+    from .views import convert_to_kg
+
+    yield [
+        'Date Created', 'Farmer Name', 'Commodity', 'Harvest Date',
+        'Total Weight (kg)', 'Estimated Hectare', 'Location', 'Status', 'Verified By', 'Date Verified'
+    ]
+    for row in iter_values(records, *RECORD_FIELDS, 'harvest_date', 'total_weight', 'unit__unit_abrv'):
+        yield [
+            *_record_columns(row),
+            row['harvest_date'].strftime('%Y-%m-%d'),
+            f"{convert_to_kg(row['total_weight'], row['unit__unit_abrv']):.2f}",
+            f"{farm_land_area(row):.2f}",
+            *_record_status_columns(row),
+        ]
+
+
+def plant_record_rows(records):
+    yield [
+        'Date Created', 'Farmer Name', 'Commodity', 'Plant Date',
+        'Min Expected (kg)', 'Max Expected (kg)', 'Estimated Hectare', 'Location', 'Status', 'Verified By', 'Date Verified'
+    ]
+    for row in iter_values(records, *RECORD_FIELDS, 'plant_date', 'min_expected_harvest', 'max_expected_harvest'):
+        yield [
+            *_record_columns(row),
+            row['plant_date'].strftime('%Y-%m-%d'),
+            row['min_expected_harvest'],
+            row['max_expected_harvest'],
+            f"{farm_land_area(row):.2f}",
+            *_record_status_columns(row),
+        ]
+
+
+def _record_summary(records, extra_fields, add):
+    """Groups records by commodity and location; `add(group, row)` folds one row into its group."""
+    summary_data = {}
+    fields = TRANSACTION_LOCATION_FIELDS + ('commodity_id__name', 'record_status__acc_status') + extra_fields
+    for row in iter_values(records, *fields):
+        commodity = row['commodity_id__name']
+        location = location_display(row)
+        group = summary_data.get((commodity, location))
+        if group is None:
+            group = summary_data[(commodity, location)] = {
+                'commodity': commodity, 'location': location, 'total_records': 0, 'total_hectare': 0,
+                'verified_count': 0, 'pending_count': 0,
+            }
+        group['total_records'] += 1
+        group['total_hectare'] += farm_land_area(row)
+        if row['record_status__acc_status'] == 'Verified':
+            group['verified_count'] += 1
+        else:
+            group['pending_count'] += 1
+        add(group, row)
+    return summary_data.values()
+
+
+def harvest_summary_rows(records):
+    from .views import convert_to_kg
+
+    def add(group, row):
+        group['total_weight'] = group.get('total_weight', 0) + convert_to_kg(row['total_weight'], row['unit__unit_abrv'])
+
+    summary = _record_summary(records, ('total_weight', 'unit__unit_abrv'), add)
+    yield [
+        'Commodity', 'Location', 'Total Records', 'Total Weight (kg)', 'Total Estimated Hectare',
+        'Verified Records', 'Pending Records'
+    ]
+    for data in summary:
+        yield [
+            data['commodity'], data['location'], data['total_records'],
+            f"{data['total_weight']:.2f}", f"{data['total_hectare']:.2f}",
+            data['verified_count'], data['pending_count'],
+        ]
+
+
+def plant_summary_rows(records):
+    def add(group, row):
+        group['total_expected_min'] = group.get('total_expected_min', 0) + float(row['min_expected_harvest'])
+        group['total_expected_max'] = group.get('total_expected_max', 0) + float(row['max_expected_harvest'])
+
+    summary = _record_summary(records, ('min_expected_harvest', 'max_expected_harvest'), add)
+    yield [
+        'Commodity', 'Location', 'Total Records', 'Total Min Expected (kg)', 'Total Max Expected (kg)', 'Total Estimated Hectare',
+        'Verified Records', 'Pending Records'
+    ]
+    for data in summary:
+        yield [
+            data['commodity'], data['location'], data['total_records'],
+            f"{data['total_expected_min']:.2f}", f"{data['total_expected_max']:.2f}", f"{data['total_hectare']:.2f}",
+            data['verified_count'], data['pending_count'],
+        ]
+
+
+def account_rows(accounts, assigned_municipality=None):
+    """
+    Account export rows. The record count and farmland area (scoped to assigned_municipality
+    for municipal agriculturists) are correlated subqueries instead of two queries per account.
+    """
+    from base.models import FarmLand, RecordTransaction
+
+    transactions = RecordTransaction.objects.filter(account_id=OuterRef('pk'))
+    farmlands = FarmLand.objects.filter(userinfo_id=OuterRef('userinfo_id'))
+    if assigned_municipality:
+        transactions = transactions.filter(effective_municipality=assigned_municipality)
+        farmlands = farmlands.filter(municipality=assigned_municipality)
+    accounts = accounts.annotate(
+        export_records_count=Coalesce(Subquery(
+            transactions.order_by().values('account_id').annotate(n=Count('pk')).values('n'), output_field=IntegerField()
+        ), 0),
+        export_farmland_area=Coalesce(Subquery(
+            farmlands.order_by().values('userinfo_id').annotate(area=Sum('estimated_area')).values('area'), output_field=FloatField()
+        ), 0.0),
+    )
+
+    yield [
+        'Account ID', 'Full Name', 'Email', 'Contact Number', 'Municipality', 'Barangay',
+        'Account Type', 'Status', 'Registration Date', 'Verified Date', 'Verified By',
+        'Records in Assigned Municipality', 'Farmland Area in Municipality (ha)'
+    ]
+    for row in iter_values(
+        accounts, 'account_id', 'userinfo_id__lastname', 'userinfo_id__firstname', 'userinfo_id__middlename',
+        'userinfo_id__user_email', 'userinfo_id__contact_number', 'userinfo_id__municipality_id__municipality',
+        'userinfo_id__barangay_id__barangay', 'account_type_id__account_type', 'acc_status_id__acc_status',
+        'account_register_date', 'account_verified_date', 'account_verified_by',
+        'account_verified_by__userinfo_id__lastname', 'account_verified_by__userinfo_id__firstname',
+        'export_records_count', 'export_farmland_area',
+    ):
+        yield [
+            row['account_id'],
+            f"{row['userinfo_id__lastname']}, {row['userinfo_id__firstname']} {row['userinfo_id__middlename']}".strip(),
+            row['userinfo_id__user_email'],
+            str(row['userinfo_id__contact_number']) if row['userinfo_id__contact_number'] else "Not provided",
+            row['userinfo_id__municipality_id__municipality'],
+            row['userinfo_id__barangay_id__barangay'],
+            row['account_type_id__account_type'],
+            row['acc_status_id__acc_status'],
+            _datetime(row['account_register_date'], 'N/A'),
+            _datetime(row['account_verified_date'], 'Not Verified'),
+            _name(row['account_verified_by__userinfo_id__lastname'], row['account_verified_by__userinfo_id__firstname']) if row['account_verified_by'] else 'Not Verified',
+            row['export_records_count'],
+            f"{row['export_farmland_area']:.2f}",
+        ]
+
+
+def account_summary_rows(accounts):
+    summary_data = {}
+    for row in iter_values(accounts, 'userinfo_id__municipality_id__municipality', 'acc_status_id__acc_status', 'account_type_id__account_type'):
+        municipality = row['userinfo_id__municipality_id__municipality']
+        account_type = row['account_type_id__account_type']
+        group = summary_data.get((municipality, account_type))
+        if group is None:
+            group = summary_data[(municipality, account_type)] = {
+                'municipality': municipality, 'account_type': account_type, 'total_accounts': 0,
+                'verified_count': 0, 'pending_count': 0, 'rejected_count': 0, 'other_count': 0,
+            }
+        group['total_accounts'] += 1
+        status = row['acc_status_id__acc_status']
+        if status == 'Verified':
+            group['verified_count'] += 1
+        elif status == 'Pending':
+            group['pending_count'] += 1
+        elif status == 'Rejected':
+            group['rejected_count'] += 1
+        else:
+            group['other_count'] += 1
+
+    yield ['Municipality', 'Account Type', 'Total Accounts', 'Verified', 'Pending', 'Rejected', 'Other']
+    for data in summary_data.values():
+        yield [
+            data['municipality'], data['account_type'], data['total_accounts'],
+            data['verified_count'], data['pending_count'], data['rejected_count'], data['other_count'],
+        ]
+
+
+def verified_harvest_rows(records):
+    yield [
+        'Record ID', 'Commodity', 'Harvest Date', 'Total Weight (kg)',
+        'Municipality', 'Barangay', 'Date Verified', 'Verified By', 'Remarks'
+    ]
+    for row in iter_values(
+        records, 'id', 'commodity_id__name', 'harvest_date', 'total_weight_kg', 'municipality__municipality',
+        'barangay__barangay', 'date_verified', 'verified_by', 'verified_by__userinfo_id__lastname',
+        'verified_by__userinfo_id__firstname', 'remarks',
+    ):
+        yield [
+            row['id'],
+            row['commodity_id__name'],
+            row['harvest_date'].strftime('%Y-%m-%d'),
+            row['total_weight_kg'],
+            row['municipality__municipality'] or 'N/A',
+            row['barangay__barangay'] or 'N/A',
+            row['date_verified'].strftime('%Y-%m-%d %H:%M'),
+            _name(row['verified_by__userinfo_id__lastname'], row['verified_by__userinfo_id__firstname']) if row['verified_by'] else 'N/A',
+            row['remarks'] or 'No remarks',
+        ]
+
+
+def verified_harvest_summary_rows(records):
+    """Monthly totals per commodity and municipality, summed by the database."""
+    grouped = records.order_by().annotate(export_month=TruncMonth('harvest_date')).values(
+        'export_month', 'commodity_id__name', 'municipality__municipality',
+    ).annotate(total_weight=Sum('total_weight_kg'))
+    sorted_data = sorted(
+        (
+            (row['export_month'].strftime('%Y-%m-01'), row['commodity_id__name'], row['municipality__municipality'] or 'Unknown', row['total_weight'])
+            for row in grouped
+        ),
+        key=lambda x: (x[0], x[1], x[2]),
+    )
+
+    yield ['harvest_date', 'commodity', 'municipality', 'total_weight_kg']
+    for harvest_date, commodity, municipality, total_weight in sorted_data:
+        yield [harvest_date, commodity, municipality, f"{float(total_weight):.2f}"]
+
+
+def commodity_rows(commodities):
+    ref = reference_data.get()
+    yield ['name', 'average_weight_per_unit_kg', 'seasonal_months', 'years_to_mature', 'years_to_bearfruit']
+    for commodity in commodities.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        yield [
+            commodity.name,
+            commodity.average_weight_per_unit_kg,
+            ";".join(ref.seasonal_month_names(commodity.pk)),
+            commodity.years_to_mature or '',
+            commodity.years_to_bearfruit or '',
+        ]
+
+
+def commodity_summary_rows(commodities):
+    seasonal_summary = {}
+    maturity_summary = {}
+    ref = reference_data.get()
+    for commodity in commodities.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        seasons = ref.seasonal_month_names(commodity.pk)
+        season_key = ", ".join(seasons) if seasons else "No seasons specified"
+        season = seasonal_summary.setdefault(season_key, {'count': 0, 'avg_weight': 0, 'commodities': []})
+        season['count'] += 1
+        season['avg_weight'] += float(commodity.average_weight_per_unit_kg)
+        season['commodities'].append(commodity.name)
+
+        maturity = commodity.years_to_mature or 0
+        maturity_key = f"{maturity} years" if maturity > 0 else "Not specified"
+        maturity_group = maturity_summary.setdefault(maturity_key, {'count': 0, 'commodities': []})
+        maturity_group['count'] += 1
+        maturity_group['commodities'].append(commodity.name)
+
+    def first_five(names):
+        listed = ", ".join(names[:5])
+        if len(names) > 5:
+            listed += f" and {len(names) - 5} more"
+        return listed
+
+    yield ['Seasonal Summary']
+    yield ['Seasonal Period', 'Number of Commodities', 'Average Weight (kg)', 'Commodities']
+    for season, data in seasonal_summary.items():
+        avg_weight = data['avg_weight'] / data['count'] if data['count'] > 0 else 0
+        yield [season, data['count'], f"{avg_weight:.2f}", first_five(data['commodities'])]
+    yield []
+    yield ['Maturity Summary']
+    yield ['Years to Mature', 'Number of Commodities', 'Commodities']
+    for maturity, data in maturity_summary.items():
+        yield [maturity, data['count'], first_five(data['commodities'])]
+
+
+def forecast_batch_rows(batch, results):
+    """Rows of one ForecastBatch; the batch columns are the same on every row, so they're formatted once."""
+    generated_at = batch.generated_at.strftime('%Y-%m-%d %H:%M')
+    yield ['Commodity', 'Municipality', 'Month & Year', 'Forecasted Amount (kg)', 'Forecasted Count (units)', 'Batch ID', 'Generated At']
+    for row in iter_values(
+        results, 'commodity__name', 'municipality__municipality', 'forecast_month__name', 'forecast_year',
+        'forecasted_amount_kg', 'forecasted_count_units',
+    ):
+        yield [
+            row['commodity__name'],
+            row['municipality__municipality'],
+            f"{row['forecast_month__name']} {row['forecast_year']}",
+            round(row['forecasted_amount_kg'], 2) or 0,
+            row['forecasted_count_units'],
+            batch.batch_id,
+            generated_at,
+        ]
@@ -0,0 +1,378 @@
+import gzip, hashlib, joblib, logging, math
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from io import BytesIO
+import pandas as pd
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+OVERALL_MUNICIPALITY_ID = 14  # pk of "Overall" in MunicipalityName
+
+PROPHET_PARAMS = {
+    'yearly_seasonality': True,
+    'changepoint_prior_scale': 0.05,
+    'seasonality_prior_scale': 1,
+    'daily_seasonality': False,
+    'weekly_seasonality': False,
+}
+
+
+def get_training_workers(workers=None):
+    """Number of worker processes to use for training, from the argument or FORECAST_TRAINING_WORKERS."""
+    if workers is None:
+        workers = getattr(settings, 'FORECAST_TRAINING_WORKERS', 1)
+    try:
+        workers = int(workers)
+    except (TypeError, ValueError):
+        workers = 1
+    return max(1, workers)
+
+
+def model_bucket_path(commodity_id, municipality_id):
+    return f"prophet_models/prophet_{commodity_id}_{municipality_id}.json.gz"
+
+
+def legacy_model_bucket_path(commodity_id, municipality_id):
+    """Where models were stored as full joblib pickles, before convert_prophet_models."""
+    return f"prophet_models/prophet_{commodity_id}_{municipality_id}.joblib"
+
+
+def build_monthly_frame(records_df):
+    """
+    Turns raw (harvest_date, total_weight_kg) rows into the monthly ds/y frame
+    that Prophet is trained on (same bucketing as the dashboard forecast view).
+    """
+    df = records_df.rename(columns={'harvest_date': 'ds', 'total_weight_kg': 'y'})
+    df['ds'] = pd.to_datetime(df['ds'])
+    df['ds'] = df['ds'].dt.to_period('M').dt.to_timestamp()
+    df = df.groupby('ds', as_index=False)['y'].sum()
+    return df
+
+
+
+def load_monthly_records(commodity_ids, municipality_ids):
+    """
+    Monthly harvest totals of the given commodities and municipalities from the rollup table,
+    one row per month dated the 1st, with the columns build_training_jobs expects.
+    """
+    from dashboard.models import MonthlyHarvestRollup
+
+    columns = ['harvest_date', 'total_weight_kg', 'commodity_id', 'municipality_id']
+    rows = MonthlyHarvestRollup.objects.filter(
+        commodity_id__in=list(commodity_ids), municipality_id__in=list(municipality_ids)
+    ).values_list('year', 'month', 'total_weight_kg', 'commodity_id', 'municipality_id').order_by('year', 'month')
+    return pd.DataFrame(
+        [(datetime(year, month, 1).date(), weight, commodity_id, municipality_id) for year, month, weight, commodity_id, municipality_id in rows],
+        columns=columns,
+    )
+
+def get_forecast_range(today=None):
+    """Monthly dates from the start of the previous year to the end of next year."""
+    current_year = (today or datetime.today()).year
+    forecast_start_date = datetime(current_year - 1, 1, 1)
+    forecast_end_date = datetime(current_year + 1, 12, 31)
+    return pd.date_range(start=forecast_start_date, end=forecast_end_date, freq='MS')
+
+
+def get_horizon_years(max_years_to_mature=None):
+    """Years of long-term predictions to keep: FORECAST_HORIZON_YEARS, or the longest maturity if that is longer."""
+    years = getattr(settings, 'FORECAST_HORIZON_YEARS', 5)
+    if max_years_to_mature is not None:
+        years = max(years, math.ceil(float(max_years_to_mature)))
+    return years
+
+
+def get_horizon_range(years, today=None):
+    """
+    Monthly dates for the long-term table. Recommendations can start from any month of the
+    forecast range (up to the end of next year) and add the maturity on top, so the range
+    runs from the start of the forecast range to `years` after the end of next year.
+    """
+    current_year = (today or datetime.today()).year
+    horizon_start_date = datetime(current_year - 1, 1, 1)
+    horizon_end_date = datetime(current_year + 1 + years, 12, 31)
+    return pd.date_range(start=horizon_start_date, end=horizon_end_date, freq='MS')
+
+
+def build_training_jobs(all_records_df, commodity_ids, municipality_ids, include_overall=True, eligible_series=None):
+    """
+    Splits the harvest records into one job per (commodity, municipality) series,
+    plus one "Overall" job per commodity. Series with less than two months of data are skipped:
+    pass eligible_series (from dashboard.utils.get_eligible_series) to decide that from the
+    rollup stats, otherwise the months are counted here.
+
+    Returns a list of dicts with 'commodity_id', 'municipality_id' and the monthly 'frame'.
+    """
+    from dashboard.utils import MIN_SERIES_MONTHS
+
+    jobs = []
+    if all_records_df.empty:
+        return jobs
+
+    def add_job(comm_id, muni_id, df):
+        if eligible_series is not None and (comm_id, muni_id) not in eligible_series:
+            return
+        frame = build_monthly_frame(df[['harvest_date', 'total_weight_kg']])
+        if len(frame) < MIN_SERIES_MONTHS:
+            return
+        jobs.append({'commodity_id': comm_id, 'municipality_id': muni_id, 'frame': frame})
+
+    # one pass over the records instead of filtering the frame once per series
+    series_records = dict(list(all_records_df.groupby(['commodity_id', 'municipality_id'])))
+    commodity_records = dict(list(all_records_df.groupby('commodity_id')))
+
+    for muni_id in municipality_ids:
+        for comm_id in commodity_ids:
+            if (comm_id, muni_id) in series_records:
+                add_job(comm_id, muni_id, series_records[(comm_id, muni_id)])
+
+    if include_overall:
+        for comm_id in commodity_ids:
+            if comm_id in commodity_records:
+                add_job(comm_id, OVERALL_MUNICIPALITY_ID, commodity_records[comm_id])
+
+    return jobs
+
+def series_fingerprint(frame, future_dates):
+    """
+    Content fingerprint of a monthly training frame: row count, date range and a hash of the
+    monthly sums. The forecast range and Prophet settings are part of the hash so a new
+    forecast year or a parameter change still triggers a refit.
+    """
+    monthly_sums = ",".join(f"{ds:%Y-%m}={float(y):.2f}" for ds, y in zip(frame['ds'], frame['y']))
+    payload = "|".join([
+        monthly_sums,
+        f"{future_dates[0]:%Y-%m}:{future_dates[-1]:%Y-%m}",
+        repr(sorted(PROPHET_PARAMS.items())),
+    ])
+    return {
+        'row_count': len(frame),
+        'first_month': frame['ds'].min().date(),
+        'last_month': frame['ds'].max().date(),
+        'data_hash': hashlib.sha256(payload.encode('utf-8')).hexdigest(),
+    }
+
+
+def series_filter(keys):
+    """Q matching rows of any of the given (commodity_id, municipality_id) series."""
+    from django.db.models import Q
+
+    key_filter = Q(pk__in=[])
+    for commodity_id, municipality_id in keys:
+        key_filter |= Q(commodity_id=commodity_id, municipality_id=municipality_id)
+    return key_filter
+
+
+def get_stored_fingerprints(keys):
+    """Stored data hashes keyed by (commodity_id, municipality_id), for the given keys only."""
+    from dashboard.models import ForecastSeriesFingerprint
+
+    if not keys:
+        return {}
+    return {
+        (fp['commodity_id'], fp['municipality_id']): fp['data_hash']
+        for fp in ForecastSeriesFingerprint.objects.filter(series_filter(keys)).values('commodity_id', 'municipality_id', 'data_hash')
+    }
+
+
+def split_unchanged_jobs(jobs, future_dates):
+    """
+    Attaches a fingerprint to every job and separates the ones whose stored fingerprint
+    matches. Returns (changed_jobs, unchanged_jobs).
+    """
+    for job in jobs:
+        job['fingerprint'] = series_fingerprint(job['frame'], future_dates)
+    stored = get_stored_fingerprints([(job['commodity_id'], job['municipality_id']) for job in jobs])
+
+    changed, unchanged = [], []
+    for job in jobs:
+        key = (job['commodity_id'], job['municipality_id'])
+        if stored.get(key) == job['fingerprint']['data_hash']:
+            unchanged.append(job)
+        else:
+            changed.append(job)
+    return changed, unchanged
+
+
+def save_fingerprints(jobs, batch):
+    """Upserts the fingerprint of every trained job."""
+    from dashboard.models import ForecastSeriesFingerprint
+    from django.utils import timezone
+
+    now = timezone.now()
+    fingerprints = [
+        ForecastSeriesFingerprint(
+            commodity_id=job['commodity_id'],
+            municipality_id=job['municipality_id'],
+            batch=batch,
+            trained_at=now,
+            **job['fingerprint'],
+        )
+        for job in jobs if 'fingerprint' in job
+    ]
+    if fingerprints:
+        ForecastSeriesFingerprint.objects.bulk_create(
+            fingerprints,
+            update_conflicts=True,
+            unique_fields=['commodity', 'municipality'],
+            update_fields=['row_count', 'first_month', 'last_month', 'data_hash', 'batch', 'trained_at'],
+        )
+
+
+def serialize_model(m):
+    """
+    Gzipped Prophet JSON (model_to_json): fitted params, changepoints, seasonalities and
+    scaling, which is all predict() needs. The Stan fit state kept by a pickle is dropped.
+    """
+    from prophet.serialize import model_to_json
+    return gzip.compress(model_to_json(m).encode('utf-8'))
+
+
+def deserialize_model(data, path=''):
+    """Inverse of serialize_model. Models stored under a legacy .joblib path are unpickled."""
+    if path.endswith('.joblib'):
+        return joblib.load(BytesIO(data))
+    from prophet.serialize import model_from_json
+    return model_from_json(gzip.decompress(data).decode('utf-8'))
+
+
+def fit_and_forecast_series(job, future_dates, horizon_dates=None):
+    """
+    Fits one Prophet model and predicts the given future dates (and the long-term
+    horizon dates, if any, in the same predict call).
+    Runs inside a worker process so it must not touch the database or storage.
+    """
+    from prophet import Prophet
+
+    m = Prophet(**PROPHET_PARAMS)
+    m.fit(job['frame'][['ds', 'y']])
+
+    prediction_dates = future_dates if horizon_dates is None else future_dates.union(horizon_dates)
+    predicted = m.predict(pd.DataFrame({'ds': prediction_dates}))[['ds', 'yhat']]
+    forecast = predicted[predicted['ds'].isin(future_dates)].reset_index(drop=True)
+    return {
+        'commodity_id': job['commodity_id'],
+        'municipality_id': job['municipality_id'],
+        'model_bytes': serialize_model(m),
+        'forecast': forecast,
+        'horizon': None if horizon_dates is None else predicted[predicted['ds'].isin(horizon_dates)].reset_index(drop=True),
+        'training_rows': len(job['frame']),
+    }
+
+
+def run_training_jobs(jobs, future_dates, workers=None, progress_callback=None, horizon_dates=None):
+    """
+    Trains every job, in a process pool when more than one worker is configured.
+    Results come back in job order, so the rows written afterwards match the serial path.
+
+    progress_callback(done, total, result) is called as each series finishes.
+    """
+    workers = min(get_training_workers(workers), max(len(jobs), 1))
+    total = len(jobs)
+
+    if workers <= 1 or total <= 1:
+        results = []
+        for done, job in enumerate(jobs, start=1):
+            result = fit_and_forecast_series(job, future_dates, horizon_dates)
+            if progress_callback:
+                progress_callback(done, total, result)
+            results.append(result)
+        return results
+
+    results = [None] * total
+    executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+    try:
+        # The worker processes are started by the first submit
+        futures = {executor.submit(fit_and_forecast_series, job, future_dates, horizon_dates): i for i, job in enumerate(jobs)}
+    except AssertionError as e:
+        # Daemonic Celery prefork children are not allowed to start a pool; train serially instead
+        executor.shutdown(cancel_futures=True)
+        logger.warning(f"Could not start training pool ({e}), training serially.")
+        return run_training_jobs(jobs, future_dates, workers=1, progress_callback=progress_callback, horizon_dates=horizon_dates)
+    with executor:
+        done = 0
+        for future in as_completed(futures):
+            result = future.result()
+            results[futures[future]] = result
+            done += 1
+            if progress_callback:
+                progress_callback(done, total, result)
+    return results
+
+
+FORECAST_BULK_BATCH_SIZE = 500
+
+
+def get_month_map():
+    """Month objects keyed by month number, loaded with a single query."""
+    from base.models import Month
+    return {month.number: month for month in Month.objects.all()}
+
+
+def forecast_to_results(forecast, commodity, municipality, batch, month_map, notes):
+    """
+    Turns a Prophet forecast frame into unsaved ForecastResult objects.
+    Amounts are rounded to 2 decimals and negative predictions are stored as 0.
+    """
+    from dashboard.models import ForecastResult
+
+    amounts = forecast['yhat'].round(2)
+    amounts = amounts.where(amounts > 0, 0.0)
+    month_numbers = forecast['ds'].dt.month
+    years = forecast['ds'].dt.year
+
+    return [
+        ForecastResult(
+            batch=batch,
+            commodity=commodity,
+            forecast_month=month_map[month_number],
+            forecast_year=int(year),
+            municipality=municipality,
+            forecasted_amount_kg=float(amount),
+            notes=notes,
+        )
+        for month_number, year, amount in zip(month_numbers, years, amounts)
+    ]
+
+
+def save_forecast_results(results, batch_size=FORECAST_BULK_BATCH_SIZE):
+    """
+    Writes ForecastResult objects in chunked INSERTs as the current forecasts of their
+    combinations. Returns the number of rows written.
+    """
+    from dashboard.utils import save_current_forecasts
+
+    return save_current_forecasts(results, batch_size=batch_size)
+
+
+def horizon_to_rows(horizon, commodity_id, municipality_id, batch):
+    """Turns the long-term predictions of one series into unsaved LongTermForecast objects (negatives stored as 0)."""
+    from dashboard.models import LongTermForecast
+
+    amounts = horizon['yhat'].round(2)
+    amounts = amounts.where(amounts > 0, 0.0)
+    return [
+        LongTermForecast(
+            commodity_id=commodity_id,
+            municipality_id=municipality_id,
+            forecast_year=int(ds.year),
+            forecast_month=int(ds.month),
+            forecasted_amount_kg=float(amount),
+            batch=batch,
+        )
+        for ds, amount in zip(horizon['ds'], amounts)
+    ]
+
+
+def save_long_term_forecasts(results, batch, batch_size=FORECAST_BULK_BATCH_SIZE):
+    """Writes the long-term predictions of every trained series. Returns the number of rows written."""
+    from dashboard.models import LongTermForecast
+
+    rows = []
+    for result in results:
+        if result.get('horizon') is not None:
+            rows.extend(horizon_to_rows(result['horizon'], result['commodity_id'], result['municipality_id'], batch))
+    LongTermForecast.objects.bulk_create(rows, batch_size=batch_size)
+    return len(rows)
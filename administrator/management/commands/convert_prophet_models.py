@@ -0,0 +1,61 @@
+import re
+from django.core.management.base import BaseCommand
+from django.core.files.storage import default_storage
+from administrator.forecasting import deserialize_model, model_bucket_path, serialize_model
+from administrator.model_registry import model_registry
+
+LEGACY_MODEL_NAME = re.compile(r'^prophet_(\d+)_(\d+)\.joblib$')
+
+class Command(BaseCommand):
+    help = 'Convert joblib-pickled Prophet models in prophet_models/ to the compact gzipped JSON format'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--delete-legacy', action='store_true', help='Delete each .joblib file after it is converted')
+        parser.add_argument('--dry-run', action='store_true', help='Only list the models that would be converted')
+
+    def handle(self, *args, **options):
+        try:
+            _, filenames = default_storage.listdir('prophet_models')
+        except FileNotFoundError:
+            self.stdout.write("No prophet_models/ directory found")
+            return
+
+        converted = skipped = 0
+        legacy_bytes = compact_bytes = 0
+        for filename in sorted(filenames):
+            match = LEGACY_MODEL_NAME.match(filename)
+            if not match:
+                continue
+            legacy_path = f"prophet_models/{filename}"
+            compact_path = model_bucket_path(*match.groups())
+
+            if default_storage.exists(compact_path):
+                # A newer model was already trained in the compact format
+                self.stdout.write(f"Skipping {legacy_path}: {compact_path} already exists")
+                skipped += 1
+            elif options['dry_run']:
+                self.stdout.write(f"Would convert {legacy_path} -> {compact_path}")
+                continue
+            else:
+                try:
+                    with default_storage.open(legacy_path, 'rb') as f:
+                        data = f.read()
+                    compact = serialize_model(deserialize_model(data, legacy_path))
+                except Exception as e:
+                    self.stdout.write(self.style.ERROR(f"Could not convert {legacy_path}: {e}"))
+                    continue
+
+                model_registry.save(compact_path, compact)
+                legacy_bytes += len(data)
+                compact_bytes += len(compact)
+                converted += 1
+                self.stdout.write(f"Converted {legacy_path}: {len(data)} -> {len(compact)} bytes")
+
+            if options['delete_legacy'] and not options['dry_run']:
+                default_storage.delete(legacy_path)
+                model_registry.invalidate(legacy_path)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Converted {converted} models ({legacy_bytes} -> {compact_bytes} bytes), skipped {skipped}"
+        ))
+        # run: python manage.py convert_prophet_models [--delete-legacy]
@@ -9,6 +9,9 @@ from dateutil.relativedelta import relativedelta
 from datetime import datetime
 from django.db import transaction
 from io import BytesIO
+from administrator.forecasting import model_bucket_path, serialize_model
+from administrator.model_registry import model_registry
+from dashboard.utils import make_batch_current
 
 class Command(BaseCommand):
     help = 'Generate forecasts using the same logic as dashboard real-time forecasting'
@@ -66,13 +69,7 @@ class Command(BaseCommand):
                         models_trained += 1
                         
                         # Save model
-                        model_filename = f"prophet_{comm.commodity_id}_{muni.municipality_id}.joblib"
-                        bucket_path = f"prophet_models/{model_filename}"
-                        
-                        buffer = BytesIO()
-                        joblib.dump(m, buffer)
-                        buffer.seek(0)
-                        default_storage.save(bucket_path, buffer)
+                        model_registry.save(model_bucket_path(comm.commodity_id, muni.municipality_id), serialize_model(m))
                         
                         # Generate forecasts
                         future = m.make_future_dataframe(periods=12, freq='MS')
@@ -145,14 +142,7 @@ class Command(BaseCommand):
                     models_trained += 1
                     
                     # Save Overall model
-                    model_filename = f"prophet_{comm.commodity_id}_14.joblib"
-                    bucket_path = f"prophet_models/{model_filename}"
-                    
-                    from io import BytesIO
-                    buffer = BytesIO()
-                    joblib.dump(m, buffer)
-                    buffer.seek(0)
-                    default_storage.save(bucket_path, buffer)
+                    model_registry.save(model_bucket_path(comm.commodity_id, 14), serialize_model(m))
                     
                     # Generate forecasts
                     future = m.make_future_dataframe(periods=12, freq='MS')
@@ -188,6 +178,9 @@ class Command(BaseCommand):
                 except Exception as e:
                     self.stdout.write(f"  ✗ Error: {e}")
                     continue
+            
+            # The new forecasts replace older ones on the dashboards
+            make_batch_current(batch)
         
         self.stdout.write(f"\nForecast generation complete!")
         self.stdout.write(f"Models trained: {models_trained}")
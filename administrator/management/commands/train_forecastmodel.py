@@ -8,6 +8,8 @@ import joblib
 from django.conf import settings
 from django.core.files.storage import default_storage
 from io import BytesIO
+from administrator.forecasting import model_bucket_path, serialize_model
+from administrator.model_registry import model_registry
 
 class Command(BaseCommand):
     help = 'Train Prophet models for each municipality and commodity combination'
@@ -55,19 +57,8 @@ class Command(BaseCommand):
                 )
                 m.fit(df[['ds', 'y']])
 
-                # Save model
-                model_filename = f"prophet_{comm.commodity_id}_{muni.municipality_id}.joblib"
-                
-                bucket_path = f"prophet_models/{model_filename}"
-
-                # in-memory bufferfor holding the model file
-                buffer = BytesIO()
-                joblib.dump(m, buffer)
-
-                # Rewind the buffer to the beginning before saving
-                buffer.seek(0)
-                #  directly saving to DigitalOcean Spaces
-                default_storage.save(bucket_path, buffer)
+                # Save model directly to DigitalOcean Spaces
+                model_registry.save(model_bucket_path(comm.commodity_id, muni.municipality_id), serialize_model(m))
                 
                 self.stdout.write(f"Trained and saved model for {muni} - {comm}")
             
@@ -109,20 +100,8 @@ class Command(BaseCommand):
             )
             m.fit(df[['ds', 'y']])
 
-            # Save "Overall" model with special naming convention
-            model_filename = f"prophet_{comm.commodity_id}_14.joblib"  # Use 14 for "Overall"
-            
-            bucket_path = f"prophet_models/{model_filename}"
-
-            # in-memory bufferfor holding the model file
-            buffer = BytesIO()
-            joblib.dump(m, buffer)
-
-            # Rewind the buffer to the beginning before saving
-            buffer.seek(0)
-
-            #  directly saving to DigitalOcean Spaces
-            default_storage.save(bucket_path, buffer)
+            # Save "Overall" model with special naming convention (14 for "Overall")
+            model_registry.save(model_bucket_path(comm.commodity_id, 14), serialize_model(m))
             
             self.stdout.write(f"Trained and saved Overall model for {comm}")
 
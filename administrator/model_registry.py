@@ -0,0 +1,141 @@
+import logging, os, threading, time, uuid
+from collections import OrderedDict
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from .forecasting import deserialize_model, legacy_model_bucket_path, model_bucket_path
+
+logger = logging.getLogger(__name__)
+
+# Seconds a missing model is remembered; short, so a model written by another process shows up quickly.
+MISSING_MODEL_REVALIDATE_SECONDS = 30
+
+
+class ModelRegistry:
+    """
+    Process-local LRU cache of Prophet models stored in default_storage.
+
+    Entries are keyed by bucket path and remember the storage version (mtime) they were
+    loaded from. Within PROPHET_MODEL_CACHE_REVALIDATE_SECONDS a cached model is returned
+    without touching storage at all; after that one metadata call checks whether the file
+    changed before reusing it. Missing models are remembered for at most
+    MISSING_MODEL_REVALIDATE_SECONDS, so views don't call default_storage.exists on every
+    request but a newly trained model is picked up soon. Every load is logged with the
+    registry's hit/miss counters.
+    """
+
+    def __init__(self, maxsize=None, revalidate_seconds=None):
+        self._maxsize = maxsize
+        self._revalidate_seconds = revalidate_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def maxsize(self):
+        if self._maxsize is None:
+            return getattr(settings, 'PROPHET_MODEL_CACHE_SIZE', 32)
+        return self._maxsize
+
+    @property
+    def revalidate_seconds(self):
+        if self._revalidate_seconds is None:
+            return getattr(settings, 'PROPHET_MODEL_CACHE_REVALIDATE_SECONDS', 300)
+        return self._revalidate_seconds
+
+    def get(self, path):
+        """Returns the model stored at path, or None if there is no such model."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry and now - entry['checked_at'] < self._trusted_seconds(entry):
+                self._entries.move_to_end(path)
+                self.hits += 1
+                return entry['model']
+
+        version = self._storage_version(path)
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry and entry['version'] == version:
+                entry['checked_at'] = now
+                self._entries.move_to_end(path)
+                self.hits += 1
+                return entry['model']
+            self.misses += 1
+
+        model = self._load(path) if version is not None else None
+        with self._lock:
+            self._entries[path] = {'model': model, 'version': version, 'checked_at': now}
+            self._entries.move_to_end(path)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        if model is not None:
+            stats = self.stats()
+            logger.info(f"Loaded Prophet model {path} (registry hits={stats['hits']} misses={stats['misses']} size={stats['size']}/{stats['maxsize']})")
+        return model
+
+    def get_series_model(self, commodity_id, municipality_id):
+        """
+        Model of one (commodity, municipality) series. Falls back to the legacy joblib file
+        for series that haven't been retrained or converted yet.
+        """
+        m = self.get(model_bucket_path(commodity_id, municipality_id))
+        if m is None:
+            m = self.get(legacy_model_bucket_path(commodity_id, municipality_id))
+        return m
+
+    def invalidate(self, path=None):
+        """Drops one cached model, or all of them when no path is given."""
+        with self._lock:
+            if path is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(path, None)
+
+    def save(self, path, model_bytes):
+        """
+        Writes a model to storage under exactly this path (replacing the old file instead of
+        letting the storage pick a new name) and drops any cached copy of it. Readers in other
+        processes see either the old or the new model, never a missing or half-written file.
+        """
+        try:
+            target = default_storage.path(path)
+        except NotImplementedError:
+            target = None
+        if target is not None:
+            # Local storage: write next to the target, then rename over it in one step
+            tmp_name = default_storage.save(f"{path}.{uuid.uuid4().hex}.tmp", ContentFile(model_bytes))
+            os.replace(default_storage.path(tmp_name), target)
+        elif default_storage.get_available_name(path) == path:
+            # Object storage that overwrites in place (e.g. S3 with file_overwrite): one atomic PUT
+            default_storage.save(path, ContentFile(model_bytes))
+        else:
+            default_storage.delete(path)
+            default_storage.save(path, ContentFile(model_bytes))
+        self.invalidate(path)
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self._entries), 'maxsize': self.maxsize}
+
+    def _trusted_seconds(self, entry):
+        if entry['model'] is None:
+            return min(self.revalidate_seconds, MISSING_MODEL_REVALIDATE_SECONDS)
+        return self.revalidate_seconds
+
+    def _storage_version(self, path):
+        """mtime of the stored file (the ETag's Last-Modified on object storage), None if it doesn't exist."""
+        try:
+            if not default_storage.exists(path):
+                return None
+            return default_storage.get_modified_time(path).isoformat()
+        except NotImplementedError:
+            return 'unversioned'
+
+    def _load(self, path):
+        with default_storage.open(path, 'rb') as f:
+            return deserialize_model(f.read(), path)
+
+
+model_registry = ModelRegistry()
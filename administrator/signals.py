@@ -0,0 +1,49 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from base.models import AccountsInformation, CommodityType, FarmLand, UserInformation, initHarvestRecord, initPlantRecord
+from dashboard.models import VerifiedHarvestRecord, VerifiedPlantRecord
+from dashboard.utils import record_refresh_is_batched
+from .dashboard_stats import invalidate_admin_reports, invalidate_dashboard_stats
+
+# Fields the admin dashboard counters group or filter by; other edits only change the admin PDF reports
+STATS_FIELDS = {
+    AccountsInformation: ('account_type_id', 'acc_status_id', 'userinfo_id'),
+    UserInformation: ('municipality_id',),
+    FarmLand: (),
+    CommodityType: ('name',),
+    initPlantRecord: ('record_status', 'transaction', 'commodity_id'),
+    initHarvestRecord: ('record_status', 'transaction', 'commodity_id'),
+    VerifiedPlantRecord: ('municipality', 'commodity_id'),
+    VerifiedHarvestRecord: ('municipality', 'commodity_id'),
+}
+
+
+def remember_stats_change(sender, instance, update_fields=None, **kwargs):
+    """Whether this save changes a counted field (always, for a new row)."""
+    fields = STATS_FIELDS[sender]
+    instance._changes_dashboard_stats = instance._state.adding
+    if instance._state.adding or not fields or record_refresh_is_batched():
+        return
+    if update_fields is not None and not set(update_fields) & set(fields):
+        return
+    attnames = [sender._meta.get_field(name).attname for name in fields]
+    previous = sender.objects.filter(pk=instance.pk).values(*attnames).first()
+    instance._changes_dashboard_stats = previous is None or any(previous[name] != getattr(instance, name) for name in attnames)
+
+
+def refresh_dashboard_stats(sender, instance, **kwargs):
+    """
+    Registrations, record submissions, status changes and deletes change the admin dashboard
+    counters (and with them the admin PDF reports); any other edit only changes the reports.
+    """
+    if record_refresh_is_batched():
+        return
+    if getattr(instance, '_changes_dashboard_stats', True):
+        invalidate_dashboard_stats()
+    else:
+        invalidate_admin_reports()
+
+
+for model in STATS_FIELDS:
+    pre_save.connect(remember_stats_change, sender=model, dispatch_uid=f"dashboard_stats_pre_save_{model.__name__}")
+    post_save.connect(refresh_dashboard_stats, sender=model, dispatch_uid=f"dashboard_stats_save_{model.__name__}")
+    post_delete.connect(refresh_dashboard_stats, sender=model, dispatch_uid=f"dashboard_stats_delete_{model.__name__}")
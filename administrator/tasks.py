@@ -5,17 +5,50 @@ import os, joblib
 import pandas as pd
 from datetime import datetime
 from dateutil.relativedelta import relativedelta
-from base.models import CommodityType, MunicipalityName, Month
-from dashboard.models import ForecastBatch, ForecastResult, VerifiedHarvestRecord
-from prophet import Prophet
+from base.models import CommodityType, MunicipalityName
+from dashboard.models import ForecastBatch, ForecastResult, ForecastSeriesFingerprint, LongTermForecast
 from django.core.files.storage import default_storage
 from io import BytesIO
+from .forecasting import (
+    OVERALL_MUNICIPALITY_ID, build_training_jobs, forecast_to_results, get_forecast_range, get_horizon_range,
+    get_horizon_years, get_month_map, get_training_workers, load_monthly_records, model_bucket_path, run_training_jobs, save_fingerprints,
+    save_forecast_results, save_long_term_forecasts, series_filter, series_fingerprint, split_unchanged_jobs,
+)
+from .model_registry import model_registry
+from dashboard.utils import get_eligible_series
+from django.db.models import Max
 
-@shared_task
-def retrain_and_generate_forecasts_task():
+def make_progress_reporter(task, batch, commodities_by_id, municipalities_by_id):
+    """Builds the per-series progress callback used by the training engine."""
+    def report_progress(done, total, result):
+        comm = commodities_by_id[result['commodity_id']]
+        muni = municipalities_by_id[result['municipality_id']]
+        print(f"[{done}/{total}] Trained {comm.name} - {muni.municipality} on {result['training_rows']} monthly records")
+        if not task.request.id:
+            return
+        try:
+            task.update_state(state='PROGRESS', meta={
+                'done': done,
+                'total': total,
+                'commodity_id': result['commodity_id'],
+                'municipality_id': result['municipality_id'],
+                'batch_id': batch.batch_id,
+            })
+        except Exception as e:
+            # Progress is informational only, a result backend hiccup shouldn't abort training
+            print(f"Could not report training progress: {e}")
+    return report_progress
+
+
+@shared_task(bind=True)
+def retrain_and_generate_forecasts_task(self, workers=None):
     """
-    Asynchronously trains Prophet models in memory and generates forecasts,
+    Asynchronously trains Prophet models and generates forecasts,
     saving the results to the database.
+
+    Every (commodity, municipality) series and every "Overall" series is independent,
+    so they are fitted in a process pool of `workers` processes
+    (defaults to settings.FORECAST_TRAINING_WORKERS). Progress is reported per series.
     """ 
     try:
         print(f"DEBUG: AWS_STORAGE_BUCKET_NAME is {os.environ.get('AWS_STORAGE_BUCKET_NAME')}")
@@ -25,229 +58,70 @@ def retrain_and_generate_forecasts_task():
         batch = ForecastBatch.objects.create(notes="Bulk generated forecast - All commodities and municipalities.")
         
         # Define municipalities and commodities first
-        municipalities = MunicipalityName.objects.exclude(pk=14)
+        municipalities = MunicipalityName.objects.exclude(pk=OVERALL_MUNICIPALITY_ID)
         commodities = CommodityType.objects.exclude(pk=1)
-        months = Month.objects.all().order_by('number')
-        
-        # Clear any existing forecast records that might conflict
-        print(f"Clearing any existing forecast records to prevent duplicates...")
-        
-        # Delete existing forecast records for commodities and municipalities we're about to generate
-        existing_results = ForecastResult.objects.filter(
-            commodity__in=commodities,
-            municipality__in=list(municipalities) + [MunicipalityName.objects.get(pk=14)]  # Include "Overall"
-        )
-        deleted_count = existing_results.count()
-        existing_results.delete()
-        print(f"Deleted {deleted_count} existing forecast records.")
+        overall_muni = MunicipalityName.objects.get(pk=OVERALL_MUNICIPALITY_ID)
         
         print("Starting model training and forecast generation...")
         
-        results_created = 0
-         
         # We need to get all historical data once, for both individual and overall models
-        all_records_qs = VerifiedHarvestRecord.objects.filter(
-            commodity_id__in=commodities,
-            municipality__in=municipalities
-        ).values('harvest_date', 'total_weight_kg', 'commodity_id', 'municipality_id').order_by('harvest_date')
-        
-        all_records_df = pd.DataFrame(list(all_records_qs))
-        
-        # Directory to save models (optional but good practice to keep them)
-        # model_dir = os.path.join(settings.BASE_DIR, 'prophet_models')
-        # os.makedirs(model_dir, exist_ok=True)
+        # (monthly totals from the harvest rollup, not the raw records)
+        all_records_df = load_monthly_records(
+            commodities.values_list('pk', flat=True), municipalities.values_list('pk', flat=True)
+        )
         
-        with transaction.atomic():
-            # Process each individual municipality and commodity
-            for muni in municipalities:
-                for comm in commodities:
-                    # Filter the main DataFrame for the specific combination
-                    df = all_records_df[
-                        (all_records_df['municipality_id'] == muni.pk) & 
-                        (all_records_df['commodity_id'] == comm.pk)
-                    ].copy()
-                    
-                    if len(df) < 2:
-                        print(f"Skipping {comm.name} - {muni.municipality}: not enough data.")
-                        continue
-                    
-                    # Use EXACT Dashboard approach - match forecast view logic
-                    df = df.rename(columns={'harvest_date': 'ds', 'total_weight_kg': 'y'})
-                    df['ds'] = pd.to_datetime(df['ds'])
-                    df['ds'] = df['ds'].dt.to_period('M').dt.to_timestamp()
-                    df = df.groupby('ds', as_index=False)['y'].sum()
-                    
-                    # NO FILTERING of historical data - use ALL available VerifiedHarvestRecord data for training
-                    print(f"Using ALL historical data for training: {len(df)} records, date range: {df['ds'].min()} to {df['ds'].max()}")
-                    
-                    if len(df) < 2:
-                        print(f"Skipping {comm.name} - {muni.municipality}: insufficient data after grouping and filtering.")
-                        continue
-                        
-                    # Train model
-                    m = Prophet(yearly_seasonality=True, changepoint_prior_scale=0.05, seasonality_prior_scale=1, daily_seasonality=False, weekly_seasonality=False)
-                    m.fit(df[['ds', 'y']])
-                    
-                    # Save the trained model to disk
-                    model_filename = f"prophet_{comm.commodity_id}_{muni.municipality_id}.joblib"
-                    
-                    bucket_path = f"prophet_models/{model_filename}"
-
-                    # Create an in-memory buffer to hold the model file
-                    buffer = BytesIO()
-                    joblib.dump(m, buffer)
+        commodities_by_id = {c.pk: c for c in commodities}
+        municipalities_by_id = {m.pk: m for m in municipalities}
+        municipalities_by_id[overall_muni.pk] = overall_muni
 
-                    # Rewind the buffer to the beginning before saving
-                    buffer.seek(0)
+        eligible_series = get_eligible_series(list(commodities_by_id))
+        jobs = build_training_jobs(all_records_df, list(commodities_by_id), [m.pk for m in municipalities], eligible_series=eligible_series)
+        future_months = get_forecast_range()
+        # Long-term predictions for recommendations, far enough ahead for the slowest-maturing fruit
+        horizon_months = get_horizon_range(get_horizon_years(commodities.aggregate(longest=Max('years_to_mature'))['longest']))
+        for job in jobs:
+            job['fingerprint'] = series_fingerprint(job['frame'], future_months.union(horizon_months))
+        workers = get_training_workers(workers)
+        print(f"Training {len(jobs)} series with {workers} worker(s)...")
 
-                    # Save the model directly to DigitalOcean Spaces
-                    default_storage.save(bucket_path, buffer)
-                    
-                    # Generate forecast using dynamic approach from start of previous year to end of next year
-                    current_year = datetime.today().year
-                    forecast_start_date = datetime(current_year - 1, 1, 1)  # Start of previous year
-                    forecast_end_date = datetime(current_year + 1, 12, 31)  # End of next year
-                    
-                    # Create future DataFrame with dynamic range
-                    future_months = pd.date_range(start=forecast_start_date, end=forecast_end_date, freq='MS')
-                    future = pd.DataFrame({'ds': future_months})
-                    
-                    if len(future) == 0:
-                        print(f"Error: Future dataframe is empty for {comm.name} - {muni.municipality} - cannot generate forecast")
-                        continue
-                    
-                    forecast = m.predict(future)
-                    
-                    # Use the entire forecast range (both historical fill-in and future predictions)
-                    print(f"Debug for {comm.name} - {muni.municipality}: Generated {len(forecast)} total forecasts")
-                    print(f"  Forecast range: {forecast['ds'].min()} to {forecast['ds'].max()}")
-                    
-                    # Round the forecasts and process all periods
-                    rounded_forecasts = forecast['yhat'].round(2)
-                    
-                    for idx, row in forecast.iterrows():
-                        forecast_date = row['ds']
-                        # Use the pre-rounded value from the series (exact dashboard approach)
-                        forecasted_amount = max(0, rounded_forecasts.loc[idx])  # Ensure non-negative values
-                        month_obj = months.get(number=forecast_date.month)
-                        year = forecast_date.year
-                        
-                        print(f"  Saving forecast: {comm.name} - {muni.municipality} - {month_obj.name} {year}: {forecasted_amount} kg")
-                        
-                        # Use get_or_create to avoid duplicates, but since we cleared existing records, this should create new ones
-                        forecast_obj, created = ForecastResult.objects.get_or_create(
-                            commodity=comm,
-                            forecast_month=month_obj,
-                            forecast_year=year,
-                            municipality=muni,
-                            defaults={
-                                'batch': batch,
-                                'forecasted_amount_kg': forecasted_amount, 
-                                'notes': f"Generated from Prophet model"
-                            }
-                        )
-                        if created:
-                            results_created += 1
-                        else:
-                            # Update existing record if somehow one exists
-                            forecast_obj.batch = batch
-                            forecast_obj.forecasted_amount_kg = forecasted_amount
-                            forecast_obj.notes = f"Generated from Prophet model"
-                            forecast_obj.save()
-
-            # Process "Overall" models for each commodity
-            for comm in commodities:
-                # Filter the main DataFrame for the specific commodity across all municipalities
-                df = all_records_df[all_records_df['commodity_id'] == comm.pk].copy()
-                
-                if len(df) < 2:
-                    print(f"Skipping Overall {comm.name}: not enough data.")
-                    continue
-                
-                # Use EXACT Dashboard approach - match forecast view logic
-                df = df.rename(columns={'harvest_date': 'ds', 'total_weight_kg': 'y'})
-                df['ds'] = pd.to_datetime(df['ds'])
-                df['ds'] = df['ds'].dt.to_period('M').dt.to_timestamp()
-                df = df.groupby('ds', as_index=False)['y'].sum()
-
-                # NO FILTERING of historical data - use ALL available VerifiedHarvestRecord data for training
-                print(f"Using ALL historical data for Overall {comm.name} training: {len(df)} records, date range: {df['ds'].min()} to {df['ds'].max()}")
+        report_progress = make_progress_reporter(self, batch, commodities_by_id, municipalities_by_id)
+        results = run_training_jobs(jobs, future_months, workers=workers, progress_callback=report_progress, horizon_dates=horizon_months)
+        
+        month_map = get_month_map()
+        forecast_results = []
+        for result in results:
+            comm = commodities_by_id[result['commodity_id']]
+            muni = municipalities_by_id[result['municipality_id']]
+            is_overall = muni.pk == OVERALL_MUNICIPALITY_ID
+            muni_label = "Overall" if is_overall else muni.municipality
+            notes = "Overall forecast generated by Prophet" if is_overall else "Generated from Prophet model"
 
-                if len(df) < 2:
-                    print(f"Skipping Overall {comm.name}: insufficient data after grouping and filtering.")
-                    continue
-                
-                # Train model
-                m = Prophet(yearly_seasonality=True, changepoint_prior_scale=0.05, seasonality_prior_scale=1, daily_seasonality=False, weekly_seasonality=False)
-                m.fit(df[['ds', 'y']])
-                
-                # Save "Overall" model with special naming convention
-                model_filename = f"prophet_{comm.commodity_id}_14.joblib" 
-                bucket_path = f"prophet_models/{model_filename}"
+            # Save the model directly to DigitalOcean Spaces (and drop the cached copy in this process)
+            model_registry.save(model_bucket_path(comm.commodity_id, muni.municipality_id), result['model_bytes'])
 
-                # Create an in-memory buffer to hold the model file
-                buffer = BytesIO()
-                joblib.dump(m, buffer)
+            forecast = result['forecast']
+            print(f"Debug for {comm.name} - {muni_label}: Generated {len(forecast)} total forecasts")
+            print(f"  Forecast range: {forecast['ds'].min()} to {forecast['ds'].max()}")
 
-                # Rewind the buffer to the beginning before saving
-                buffer.seek(0)
+            # Use the entire forecast range (both historical fill-in and future predictions)
+            forecast_results.extend(forecast_to_results(forecast, comm, muni, batch, month_map, notes))
 
-                # Save the model directly to DigitalOcean Spaces
-                default_storage.save(bucket_path, buffer)
+        with transaction.atomic():
+            # Clear any existing forecast records that might conflict, in the same transaction
+            # as the inserts so readers never see the combinations empty
+            deleted_count, _ = ForecastResult.objects.filter(
+                commodity__in=commodities,
+                municipality__in=list(municipalities) + [overall_muni]  # Include "Overall"
+            ).delete()
+            print(f"Deleted {deleted_count} existing forecast records.")
+            ForecastSeriesFingerprint.objects.filter(commodity__in=commodities).delete()
+            LongTermForecast.objects.filter(commodity__in=commodities).delete()
 
-                # Generate forecast using dynamic approach from start of previous year to end of next year
-                current_year = datetime.today().year
-                forecast_start_date = datetime(current_year - 1, 1, 1)  # Start of previous year
-                forecast_end_date = datetime(current_year + 1, 12, 31)  # End of next year
-                
-                # Create future DataFrame with dynamic range
-                future_months = pd.date_range(start=forecast_start_date, end=forecast_end_date, freq='MS')
-                future = pd.DataFrame({'ds': future_months})
-                
-                if len(future) == 0:
-                    print(f"Error: Future dataframe is empty for Overall {comm.name} - cannot generate forecast")
-                    continue
-                
-                forecast = m.predict(future)
-                
-                # Use the entire forecast range (both historical fill-in and future predictions)
-                print(f"Debug for Overall {comm.name}: Generated {len(forecast)} total forecasts")
-                print(f"  Forecast range: {forecast['ds'].min()} to {forecast['ds'].max()}")
-                
-                # Round the forecasts and process all periods
-                rounded_forecasts = forecast['yhat'].round(2)
-                
-                for idx, row in forecast.iterrows():
-                    forecast_date = row['ds']
-                    forecasted_amount = max(0, rounded_forecasts.loc[idx])  # Use series-level rounded value
-                    month_obj = months.get(number=forecast_date.month)
-                    year = forecast_date.year
-                    
-                    print(f"  Saving forecast: {comm.name} - Overall - {month_obj.name} {year}: {forecasted_amount} kg")
-                    
-                    overall_muni = MunicipalityName.objects.get(pk=14)
-                    # Use get_or_create to avoid duplicates, but since we cleared existing records, this should create new ones
-                    forecast_obj, created = ForecastResult.objects.get_or_create(
-                        commodity=comm,
-                        forecast_month=month_obj,
-                        forecast_year=year,
-                        municipality=overall_muni,
-                        defaults={
-                            'batch': batch,
-                            'forecasted_amount_kg': forecasted_amount, 
-                            'notes': f"Overall forecast generated by Prophet"
-                        }
-                    )
-                    if created:
-                        results_created += 1
-                    else:
-                        # Update existing record if somehow one exists
-                        forecast_obj.batch = batch
-                        forecast_obj.forecasted_amount_kg = forecasted_amount
-                        forecast_obj.notes = f"Overall forecast generated by Prophet"
-                        forecast_obj.save()
+            results_created = save_forecast_results(forecast_results)
+            long_term_created = save_long_term_forecasts(results, batch)
+            save_fingerprints(jobs, batch)
 
-        print(f"Successfully generated {results_created} forecast records in batch {batch.batch_id}.")
+        print(f"Successfully generated {results_created} forecast records and {long_term_created} long-term records in batch {batch.batch_id}.")
         return True
 
     except Exception as e:
@@ -257,247 +131,153 @@ def retrain_and_generate_forecasts_task():
         return False
 
 
-@shared_task
-def retrain_selective_models_task(commodity_municipality_pairs):
+@shared_task(bind=True)
+def retrain_selective_models_task(self, commodity_municipality_pairs, incremental=True, workers=None):
     """
-    Selectively retrains Prophet models for specific commodity-municipality combinations.
+    Selectively retrains Prophet models for specific commodity-municipality combinations,
+    plus the "Overall" model of every affected commodity.
     
     Args:
         commodity_municipality_pairs: List of dicts with keys 'commodity_id' and 'municipality_id'
         Example: [{'commodity_id': 2, 'municipality_id': 3}, {'commodity_id': 4, 'municipality_id': 5}]
+        incremental: Skip series whose monthly training data has the same fingerprint as when
+            their model was last fitted. Their models and forecasts are left as they are.
+        workers: Number of training processes (defaults to settings.FORECAST_TRAINING_WORKERS)
     """
     try:
         print(f"DEBUG: Starting selective retraining for {len(commodity_municipality_pairs)} combinations")
         
-        # Create a ForecastBatch for tracking this selective update
-        batch = ForecastBatch.objects.create(
-            notes=f"Selective retraining for {len(commodity_municipality_pairs)} commodity-municipality combinations"
-        )
+        requested_pairs = {
+            (pair['commodity_id'], pair['municipality_id'])
+            for pair in commodity_municipality_pairs
+            if pair['municipality_id'] != OVERALL_MUNICIPALITY_ID
+        }
+        unique_commodity_ids = sorted({pair['commodity_id'] for pair in commodity_municipality_pairs})
         
-        # Get unique commodities and municipalities from the pairs
-        unique_commodity_ids = list(set([pair['commodity_id'] for pair in commodity_municipality_pairs]))
-        unique_municipality_ids = list(set([pair['municipality_id'] for pair in commodity_municipality_pairs]))
+        commodities_by_id = {c.pk: c for c in CommodityType.objects.filter(commodity_id__in=unique_commodity_ids)}
+        municipalities_by_id = {m.pk: m for m in MunicipalityName.objects.all()}
         
-        # Always include Overall (pk=14) for affected commodities
-        if 14 not in unique_municipality_ids:
-            unique_municipality_ids.append(14)
-            
-        commodities = CommodityType.objects.filter(commodity_id__in=unique_commodity_ids)
-        municipalities = MunicipalityName.objects.filter(municipality_id__in=unique_municipality_ids)
-        months = Month.objects.all().order_by('number')
+        print(f"Processing commodities: {[c.name for c in commodities_by_id.values()]}")
         
-        print(f"Processing commodities: {[c.name for c in commodities]}")
-        print(f"Processing municipalities: {[m.municipality for m in municipalities]}")
+        # Always include Overall (pk=14) for affected commodities
+        target_keys = requested_pairs | {(commodity_id, OVERALL_MUNICIPALITY_ID) for commodity_id in commodities_by_id}
         
-        # Only delete forecast records for the specific combinations we're retraining
-        for commodity in commodities:
-            for municipality in municipalities:
-                existing_results = ForecastResult.objects.filter(
-                    commodity=commodity,
-                    municipality=municipality
-                )
-                deleted_count = existing_results.count()
-                existing_results.delete()
-                if deleted_count > 0:
-                    print(f"Deleted {deleted_count} existing forecast records for {commodity.name} - {municipality.municipality}")
+        # Overall models are trained on every municipality's data, so fetch all of it for the affected commodities
+        all_records_df = load_monthly_records(
+            commodities_by_id, MunicipalityName.objects.exclude(pk=OVERALL_MUNICIPALITY_ID).values_list('pk', flat=True)
+        )
+        print(f"Found {len(all_records_df)} historical months for selective retraining")
         
-        # Get all historical data for affected commodities and municipalities
-        all_records_qs = VerifiedHarvestRecord.objects.filter(
-            commodity_id__in=commodities,
-            municipality__in=municipalities.exclude(pk=14)  # Exclude Overall from data fetch
-        ).values('harvest_date', 'total_weight_kg', 'commodity_id', 'municipality_id').order_by('harvest_date')
+        requested_municipality_ids = sorted({municipality_id for _, municipality_id in requested_pairs})
+        eligible_series = get_eligible_series(list(commodities_by_id))
+        jobs = [
+            job for job in build_training_jobs(all_records_df, list(commodities_by_id), requested_municipality_ids, eligible_series=eligible_series)
+            if (job['commodity_id'], job['municipality_id']) in target_keys
+        ]
+        future_months = get_forecast_range()
+        longest_maturity = CommodityType.objects.exclude(pk=1).aggregate(longest=Max('years_to_mature'))['longest']
+        horizon_months = get_horizon_range(get_horizon_years(longest_maturity))
+        prediction_months = future_months.union(horizon_months)
         
-        all_records_list = list(all_records_qs)
-        print(f"Found {len(all_records_list)} historical records for selective retraining")
+        if incremental:
+            jobs, unchanged_jobs = split_unchanged_jobs(jobs, prediction_months)
+            for job in unchanged_jobs:
+                comm = commodities_by_id[job['commodity_id']]
+                muni = municipalities_by_id[job['municipality_id']]
+                print(f"Skipping {comm.name} - {muni.municipality}: training data unchanged")
+        else:
+            unchanged_jobs = []
+            for job in jobs:
+                job['fingerprint'] = series_fingerprint(job['frame'], prediction_months)
         
-        if not all_records_list:
-            print("No historical records found for selective retraining")
+        # Series to retrain, plus series that lost their data but still have forecasts to clear;
+        # keys with neither (no eligible data and nothing saved) need no batch
+        forecast_keys = set(ForecastResult.objects.filter(series_filter(target_keys)).values_list('commodity_id', 'municipality_id').distinct())
+        stale_keys = ({(job['commodity_id'], job['municipality_id']) for job in jobs} | forecast_keys) - {
+            (job['commodity_id'], job['municipality_id']) for job in unchanged_jobs
+        }
+        if not stale_keys:
+            print("All selected series are unchanged or have no data, nothing to retrain.")
             return True
-            
-        all_records_df = pd.DataFrame(all_records_list)
         
-        results_created = 0
+        # Create a ForecastBatch for tracking this selective update
+        batch = ForecastBatch.objects.create(
+            notes=f"Selective retraining for {len(commodity_municipality_pairs)} commodity-municipality combinations"
+        )
+        
+        workers = get_training_workers(workers)
+        print(f"Training {len(jobs)} series with {workers} worker(s), {len(unchanged_jobs)} unchanged...")
+        report_progress = make_progress_reporter(self, batch, commodities_by_id, municipalities_by_id)
+        results = run_training_jobs(jobs, future_months, workers=workers, progress_callback=report_progress, horizon_dates=horizon_months)
+        
+        month_map = get_month_map()
+        forecast_results = []
+        for result in results:
+            comm = commodities_by_id[result['commodity_id']]
+            muni = municipalities_by_id[result['municipality_id']]
+            if muni.pk == OVERALL_MUNICIPALITY_ID:
+                notes = f"Overall selective forecast for {comm.name}"
+            else:
+                notes = f"Selective forecast for {muni.municipality} - {comm.name}"
+            
+            model_registry.save(model_bucket_path(comm.commodity_id, muni.municipality_id), result['model_bytes'])
+            forecast_results.extend(forecast_to_results(result['forecast'], comm, muni, batch, month_map, notes))
         
         with transaction.atomic():
-            # Process each individual municipality and commodity combination
-            for commodity in commodities:
-                for municipality in municipalities.exclude(pk=14):  # Skip Overall sa loop
-                    # Check if this specific combination was in the original request
-                    combination_requested = any(
-                        pair['commodity_id'] == commodity.commodity_id and 
-                        pair['municipality_id'] == municipality.municipality_id 
-                        for pair in commodity_municipality_pairs
-                    )
-                    
-                    if not combination_requested:
-                        print(f"Skipping {commodity.name} - {municipality.municipality} (not in request)")
-                        continue
-                    
-                    # Filter data for specific combination
-                    if 'municipality_id' not in all_records_df.columns or 'commodity_id' not in all_records_df.columns:
-                        print(f"Missing required columns in dataframe: {all_records_df.columns.tolist()}")
-                        continue
-                        
-                    df = all_records_df[
-                        (all_records_df['municipality_id'] == municipality.municipality_id) & 
-                        (all_records_df['commodity_id'] == commodity.commodity_id)
-                    ].copy()
-                    
-                    if len(df) < 2:
-                        print(f"Not enough data for {municipality.municipality} - {commodity.name}")
-                        continue
-                    
-                    # Data processing (same as original task)
-                    df = df.rename(columns={'harvest_date': 'ds', 'total_weight_kg': 'y'})
-                    df['ds'] = pd.to_datetime(df['ds'])
-                    df['ds'] = df['ds'].dt.to_period('M').dt.to_timestamp()
-                    df = df.groupby('ds', as_index=False)['y'].sum()
-                    
-                    print(f"Training model for {municipality.municipality} - {commodity.name}: {len(df)} records")
-                    
-                    if len(df) < 2:
-                        print(f"Insufficient data after grouping for {municipality.municipality} - {commodity.name}")
-                        continue
-                    
-                    # Train Prophet model
-                    m = Prophet(
-                        yearly_seasonality=True,
-                        changepoint_prior_scale=0.05,
-                        seasonality_prior_scale=1,
-                        daily_seasonality=False,
-                        weekly_seasonality=False
-                    )
-                    m.fit(df[['ds', 'y']])
-                    
-                    # Save model
-                    model_filename = f"prophet_{commodity.commodity_id}_{municipality.municipality_id}.joblib"
-                    bucket_path = f"prophet_models/{model_filename}"
-                    
-                    buffer = BytesIO()
-                    joblib.dump(m, buffer)
-                    buffer.seek(0)
-                    default_storage.save(bucket_path, buffer)
-                    
-                    # Generate forecasts
-                    current_year = datetime.today().year
-                    forecast_start_date = datetime(current_year - 1, 1, 1)
-                    forecast_end_date = datetime(current_year + 1, 12, 31)
-                    
-                    future_months = pd.date_range(start=forecast_start_date, end=forecast_end_date, freq='MS')
-                    future = pd.DataFrame({'ds': future_months})
-                    
-                    if len(future) == 0:
-                        print(f"No future dates to forecast for {municipality.municipality} - {commodity.name}")
-                        continue
-                    
-                    forecast = m.predict(future)
-                    rounded_forecasts = forecast['yhat'].round(2)
-                    
-                    # Save forecast results
-                    for idx, row in forecast.iterrows():
-                        forecast_date = row['ds']
-                        forecasted_amount = max(0, rounded_forecasts.loc[idx])
-                        month_obj = months.get(number=forecast_date.month)
-                        year = forecast_date.year
-                        
-                        forecast_obj, created = ForecastResult.objects.get_or_create(
-                            commodity=commodity,
-                            forecast_month=month_obj,
-                            forecast_year=year,
-                            municipality=municipality,
-                            defaults={
-                                'batch': batch,
-                                'forecasted_amount_kg': forecasted_amount,
-                                'notes': f"Selective forecast for {municipality.municipality} - {commodity.name}"
-                            }
-                        )
-                        if created:
-                            results_created += 1
-                
-                # Process Overall model for this commodity (if commodity was affected)
-                if any(pair['commodity_id'] == commodity.commodity_id for pair in commodity_municipality_pairs):
-                    print(f"Training Overall model for {commodity.name}")
-                    
-                    # Get all data for this commodity across all municipalities (excluding pk=14)
-                    if 'commodity_id' not in all_records_df.columns:
-                        print(f"Missing commodity_id column in dataframe: {all_records_df.columns.tolist()}")
-                        continue
-                        
-                    df = all_records_df[all_records_df['commodity_id'] == commodity.commodity_id].copy()
-                    
-                    if len(df) < 2:
-                        print(f"Not enough overall data for {commodity.name}")
-                        continue
-                    
-                    # Data processing
-                    df = df.rename(columns={'harvest_date': 'ds', 'total_weight_kg': 'y'})
-                    df['ds'] = pd.to_datetime(df['ds'])
-                    df['ds'] = df['ds'].dt.to_period('M').dt.to_timestamp()
-                    df = df.groupby('ds', as_index=False)['y'].sum()
-                    
-                    print(f"Training Overall {commodity.name}: {len(df)} records")
-                    
-                    if len(df) < 2:
-                        print(f"Insufficient overall data after grouping for {commodity.name}")
-                        continue
-                    
-                    # Train model
-                    m = Prophet(
-                        yearly_seasonality=True,
-                        changepoint_prior_scale=0.05,
-                        seasonality_prior_scale=1,
-                        daily_seasonality=False,
-                        weekly_seasonality=False
-                    )
-                    m.fit(df[['ds', 'y']])
-                    
-                    # Save Overall model
-                    model_filename = f"prophet_{commodity.commodity_id}_14.joblib"
-                    bucket_path = f"prophet_models/{model_filename}"
-                    
-                    buffer = BytesIO()
-                    joblib.dump(m, buffer)
-                    buffer.seek(0)
-                    default_storage.save(bucket_path, buffer)
-                    
-                    # Generate forecasts for Overall
-                    current_year = datetime.today().year
-                    forecast_start_date = datetime(current_year - 1, 1, 1)
-                    forecast_end_date = datetime(current_year + 1, 12, 31)
-                    
-                    future_months = pd.date_range(start=forecast_start_date, end=forecast_end_date, freq='MS')
-                    future = pd.DataFrame({'ds': future_months})
-                    
-                    if len(future) > 0:
-                        forecast = m.predict(future)
-                        rounded_forecasts = forecast['yhat'].round(2)
-                        
-                        overall_muni = MunicipalityName.objects.get(pk=14)
-                        
-                        # Save forecast results for Overall
-                        for idx, row in forecast.iterrows():
-                            forecast_date = row['ds']
-                            forecasted_amount = max(0, rounded_forecasts.loc[idx])
-                            month_obj = months.get(number=forecast_date.month)
-                            year = forecast_date.year
-                            
-                            forecast_obj, created = ForecastResult.objects.get_or_create(
-                                commodity=commodity,
-                                forecast_month=month_obj,
-                                forecast_year=year,
-                                municipality=overall_muni,
-                                defaults={
-                                    'batch': batch,
-                                    'forecasted_amount_kg': forecasted_amount,
-                                    'notes': f"Overall selective forecast for {commodity.name}"
-                                }
-                            )
-                            if created:
-                                results_created += 1
+            # Only delete forecast records for the specific combinations we're retraining
+            deleted_count, _ = ForecastResult.objects.filter(series_filter(stale_keys)).delete()
+            if deleted_count > 0:
+                print(f"Deleted {deleted_count} existing forecast records for the selected combinations")
+            ForecastSeriesFingerprint.objects.filter(series_filter(stale_keys)).delete()
+            LongTermForecast.objects.filter(series_filter(stale_keys)).delete()
+            
+            results_created = save_forecast_results(forecast_results)
+            save_long_term_forecasts(results, batch)
+            save_fingerprints(jobs, batch)
         
         print(f"Selective retraining completed! Generated {results_created} forecast records in batch {batch.batch_id}.")
         return True
         
     except Exception as e:
         print(f"An error occurred during selective retraining: {e}")
-        return False
\ No newline at end of file
+        return False
+
+
+@shared_task(bind=True)
+def import_harvest_csv_task(self, path, admin_id):
+    """
+    Imports a verified harvest CSV that was too large to import during the upload request.
+    The file is streamed from default_storage (and deleted afterwards); progress is reported
+    as PROGRESS states that admin_csv_import_status polls, and the returned summary is the
+    same one the synchronous import shows.
+    """
+    from base.models import AdminInformation
+    from .csv_import import HarvestCSVImporter, csv_rows
+
+    admin_info = AdminInformation.objects.select_related('municipality_incharge').get(pk=admin_id)
+    total_bytes = default_storage.size(path)
+    try:
+        with default_storage.open(path, 'rb') as csv_file:
+            def report_progress(summary):
+                if not self.request.id:
+                    return
+                try:
+                    self.update_state(state='PROGRESS', meta=dict(
+                        summary, admin_id=admin_id, bytes_read=csv_file.tell(), total_bytes=total_bytes,
+                    ))
+                except Exception as e:
+                    print(f"Could not report CSV import progress: {e}")
+
+            with csv_rows(csv_file) as reader:
+                importer = HarvestCSVImporter(admin_info, progress=report_progress)
+                header_errors = importer.header_errors(reader.fieldnames)
+                summary = importer.summary if header_errors else importer.run(reader)
+    finally:
+        default_storage.delete(path)
+
+    if summary['created']:
+        if summary['pairs']:
+            retrain_selective_models_task.delay(summary['pairs'])
+        else:
+            retrain_and_generate_forecasts_task.delay()
+    return dict(summary, admin_id=admin_id, header_errors=header_errors)
@@ -1,3 +1,688 @@
+import joblib, json, os, tempfile
+from io import BytesIO
+from datetime import date
+from unittest import mock
+from django.core.files.storage import FileSystemStorage
 from django.test import TestCase
+import pandas as pd
+from base.models import CommodityType, MunicipalityName, Month
+from dashboard.models import ForecastBatch, ForecastResult, LongTermForecast
+from .forecasting import (
+    OVERALL_MUNICIPALITY_ID, build_training_jobs, forecast_to_results, get_forecast_range, get_month_map,
+    deserialize_model, fit_and_forecast_series, get_horizon_range, get_horizon_years, get_training_workers, run_training_jobs, save_fingerprints,
+    save_forecast_results, save_long_term_forecasts, serialize_model, split_unchanged_jobs,
+)
+from .model_registry import ModelRegistry
 
-# Create your tests here.
+
+class TrainingJobsTest(TestCase):
+
+    def setUp(self):
+        """Two months of data for commodity 2 in municipality 1, a single month in municipality 3"""
+        self.records_df = pd.DataFrame([
+            {'harvest_date': date(2024, 1, 5), 'total_weight_kg': 10, 'commodity_id': 2, 'municipality_id': 1},
+            {'harvest_date': date(2024, 1, 20), 'total_weight_kg': 5, 'commodity_id': 2, 'municipality_id': 1},
+            {'harvest_date': date(2024, 2, 3), 'total_weight_kg': 7, 'commodity_id': 2, 'municipality_id': 1},
+            {'harvest_date': date(2024, 3, 3), 'total_weight_kg': 4, 'commodity_id': 2, 'municipality_id': 3},
+        ])
+
+    def test_jobs_are_built_per_series_and_overall(self):
+        """Series with at least two months get a job, plus one Overall job per commodity"""
+        jobs = build_training_jobs(self.records_df, [2], [1, 3])
+        keys = [(job['commodity_id'], job['municipality_id']) for job in jobs]
+
+        self.assertEqual(keys, [(2, 1), (2, OVERALL_MUNICIPALITY_ID)])
+        self.assertEqual(list(jobs[0]['frame']['y']), [15, 7])
+        self.assertEqual(list(jobs[1]['frame']['y']), [15, 7, 4])
+
+    def test_eligible_series_decide_which_jobs_are_built(self):
+        jobs = build_training_jobs(self.records_df, [2], [1, 3], eligible_series={(2, 3), (2, OVERALL_MUNICIPALITY_ID)})
+        keys = [(job['commodity_id'], job['municipality_id']) for job in jobs]
+
+        # (2, 3) is listed but has a single month, (2, 1) has data but isn't listed
+        self.assertEqual(keys, [(2, OVERALL_MUNICIPALITY_ID)])
+
+    def test_no_records_means_no_jobs(self):
+        self.assertEqual(build_training_jobs(pd.DataFrame(), [2], [1]), [])
+
+    def test_pool_that_cannot_start_falls_back_to_serial_training(self):
+        from . import forecasting
+
+        jobs = [{'commodity_id': 2, 'municipality_id': 1}, {'commodity_id': 2, 'municipality_id': OVERALL_MUNICIPALITY_ID}]
+        executor = mock.Mock(**{'submit.side_effect': AssertionError("daemonic processes are not allowed to have children")})
+        with mock.patch.object(forecasting, 'ProcessPoolExecutor', return_value=executor), \
+                mock.patch.object(forecasting, 'fit_and_forecast_series', side_effect=lambda job, *args: job) as fit, \
+                self.assertLogs('administrator.forecasting', 'WARNING'):
+            self.assertEqual(run_training_jobs(jobs, None, workers=2), jobs)
+        self.assertEqual(fit.call_count, 2)
+        executor.shutdown.assert_called_once()
+
+    def test_errors_inside_a_series_fit_are_not_retried_serially(self):
+        from concurrent.futures import Future
+        from . import forecasting
+
+        def submit(fn, job, *args):
+            future = Future()
+            if job['municipality_id'] == 1:
+                future.set_exception(AssertionError("bad frame"))
+            else:
+                future.set_result(job)
+            return future
+
+        jobs = [{'commodity_id': 2, 'municipality_id': 1}, {'commodity_id': 2, 'municipality_id': OVERALL_MUNICIPALITY_ID}]
+        executor = mock.MagicMock(**{'submit.side_effect': submit})
+        with mock.patch.object(forecasting, 'ProcessPoolExecutor', return_value=executor), \
+                mock.patch.object(forecasting, 'fit_and_forecast_series') as fit:
+            with self.assertRaisesMessage(AssertionError, "bad frame"):
+                run_training_jobs(jobs, None, workers=2)
+        fit.assert_not_called()
+
+    def test_worker_count_is_at_least_one(self):
+        self.assertEqual(get_training_workers(0), 1)
+        self.assertEqual(get_training_workers("3"), 3)
+
+
+class ForecastPersistenceTest(TestCase):
+
+    def setUp(self):
+        for number in range(1, 13):
+            Month.objects.create(name=date(2024, number, 1).strftime('%B'), number=number)
+        self.commodity = CommodityType.objects.create(name="Mango", average_weight_per_unit_kg=0.25)
+        self.municipality = MunicipalityName.objects.create(municipality="Balanga")
+        self.batch = ForecastBatch.objects.create(notes="test")
+
+    def test_forecast_frame_is_written_in_bounded_queries(self):
+        """36 months of forecasts are saved with one Month query, one UPDATE and one INSERT (plus the savepoint)"""
+        forecast = pd.DataFrame({
+            'ds': pd.date_range('2024-01-01', periods=36, freq='MS'),
+            'yhat': [-5.0] + [123.456] * 35,
+        })
+        with self.assertNumQueries(5):
+            month_map = get_month_map()
+            results = forecast_to_results(forecast, self.commodity, self.municipality, self.batch, month_map, "test")
+            saved = save_forecast_results(results)
+
+        self.assertEqual(saved, 36)
+        rows = ForecastResult.objects.filter(batch=self.batch).order_by('forecast_year', 'forecast_month__number')
+        self.assertEqual(rows[0].forecasted_amount_kg, 0)
+        self.assertEqual(rows[1].forecasted_amount_kg, 123.46)
+        self.assertEqual(rows[35].forecast_year, 2026)
+        self.assertEqual(rows[35].forecast_month.number, 12)
+
+    def test_long_term_forecasts_are_saved_per_month(self):
+        horizon = pd.DataFrame({'ds': pd.date_range('2024-01-01', periods=3, freq='MS'), 'yhat': [5.555, -1.0, 2.0]})
+        result = {'commodity_id': self.commodity.pk, 'municipality_id': self.municipality.pk, 'horizon': horizon}
+        self.assertEqual(save_long_term_forecasts([result], self.batch), 3)
+
+        row = LongTermForecast.objects.get(commodity=self.commodity, municipality=self.municipality, forecast_year=2024, forecast_month=2)
+        self.assertEqual(row.forecasted_amount_kg, 0)
+
+    def test_admin_forecast_skips_unknown_months(self):
+        from types import SimpleNamespace
+        from django.contrib.messages.storage.fallback import FallbackStorage
+        from django.contrib.sessions.middleware import SessionMiddleware
+        from django.test import RequestFactory
+        from base.models import AuthUser
+        from .views import save_admin_forecast
+
+        request = RequestFactory().post('/administrator/save-admin-forecast/', {
+            'forecast_type': 'by_month', 'commodity_id': self.commodity.pk, 'municipality_id': self.municipality.pk,
+            'months[]': ['1', '13'], 'years[]': ['2025', '2025'], 'values[]': ['10', '20'],
+        })
+        SessionMiddleware(lambda request: None).process_request(request)
+        request._messages = FallbackStorage(request)
+        request.user = AuthUser.objects.create(email="admin@example.com")
+        request.principal = SimpleNamespace(is_admin=True, user_info=None, admin_id=None)
+        self.assertEqual(save_admin_forecast(request).status_code, 302)
+        self.assertEqual(list(ForecastResult.objects.exclude(batch=self.batch).values_list('forecast_month__number', flat=True)), [1])
+
+    def test_horizon_covers_longest_maturity(self):
+        self.assertEqual(get_horizon_years(None), 5)
+        self.assertEqual(get_horizon_years(7.5), 8)
+        horizon = get_horizon_range(5, date(2025, 6, 1))
+        self.assertEqual((horizon[0].year, horizon[-1].year, horizon[-1].month), (2024, 2031, 12))
+
+
+class SeriesFingerprintTest(TestCase):
+
+    def setUp(self):
+        self.commodity = CommodityType.objects.create(name="Mango", average_weight_per_unit_kg=0.25)
+        self.municipality = MunicipalityName.objects.create(municipality="Balanga")
+        self.future_dates = get_forecast_range(date(2025, 6, 1))
+
+    def build_jobs(self, weights):
+        records_df = pd.DataFrame([
+            {'harvest_date': date(2024, month, 1), 'total_weight_kg': weight,
+             'commodity_id': self.commodity.pk, 'municipality_id': self.municipality.pk}
+            for month, weight in enumerate(weights, start=1)
+        ])
+        return build_training_jobs(records_df, [self.commodity.pk], [self.municipality.pk], include_overall=False)
+
+    def test_unchanged_series_is_skipped(self):
+        """A series is only refit when its monthly sums change"""
+        changed, unchanged = split_unchanged_jobs(self.build_jobs([10, 20, 30]), self.future_dates)
+        self.assertEqual((len(changed), len(unchanged)), (1, 0))
+        save_fingerprints(changed, None)
+
+        changed, unchanged = split_unchanged_jobs(self.build_jobs([10, 20, 30]), self.future_dates)
+        self.assertEqual((len(changed), len(unchanged)), (0, 1))
+
+        changed, unchanged = split_unchanged_jobs(self.build_jobs([10, 20, 31]), self.future_dates)
+        self.assertEqual((len(changed), len(unchanged)), (1, 0))
+
+    def test_new_forecast_year_changes_fingerprint(self):
+        save_fingerprints(split_unchanged_jobs(self.build_jobs([10, 20, 30]), self.future_dates)[0], None)
+
+        changed, unchanged = split_unchanged_jobs(self.build_jobs([10, 20, 30]), get_forecast_range(date(2026, 1, 1)))
+        self.assertEqual((len(changed), len(unchanged)), (1, 0))
+
+
+class ModelSerializationTest(TestCase):
+
+    def test_compact_model_predicts_like_the_original(self):
+        """The gzipped JSON model is smaller than a pickle and gives the same predictions"""
+        frame = pd.DataFrame({
+            'ds': pd.date_range('2022-01-01', periods=24, freq='MS'),
+            'y': [float(10 + (i % 12) * 3) for i in range(24)],
+        })
+        future_dates = get_forecast_range(date(2024, 6, 1))
+        result = fit_and_forecast_series({'commodity_id': 2, 'municipality_id': 1, 'frame': frame}, future_dates)
+
+        self.assertIsNone(result['horizon'])
+
+        m = deserialize_model(result['model_bytes'])
+        predicted = m.predict(pd.DataFrame({'ds': future_dates}))['yhat'].round(4).tolist()
+        self.assertEqual(predicted, result['forecast']['yhat'].round(4).tolist())
+        pickled = BytesIO()
+        joblib.dump(m, pickled)
+        self.assertLess(len(result['model_bytes']), len(pickled.getvalue()))
+
+
+class SelectiveRetrainTest(TestCase):
+
+    def setUp(self):
+        from base.models import VerifiedHarvestRecord
+        for number in range(1, 13):
+            Month.objects.create(name=date(2024, number, 1).strftime('%B'), number=number)
+        CommodityType.objects.create(commodity_id=1, name="Other", average_weight_per_unit_kg=1)
+        self.mango = CommodityType.objects.create(commodity_id=2, name="Mango", average_weight_per_unit_kg=1)
+        self.muni = MunicipalityName.objects.create(municipality_id=1, municipality="A")
+        MunicipalityName.objects.create(municipality_id=OVERALL_MUNICIPALITY_ID, municipality="Overall")
+        for year in (2023, 2024):
+            for month in range(1, 13):
+                VerifiedHarvestRecord.objects.create(harvest_date=date(year, month, 3), commodity_id=self.mango, total_weight_kg=10 + month, municipality=self.muni)
+        self.pairs = [{'commodity_id': self.mango.pk, 'municipality_id': self.muni.pk}]
+
+    def retrain(self, pairs):
+        from .tasks import retrain_selective_models_task
+
+        with mock.patch('administrator.tasks.model_registry.save') as save:
+            self.assertTrue(retrain_selective_models_task(pairs, workers=1))
+        return save.call_count
+
+    def test_unchanged_series_are_skipped_and_changed_ones_retrained(self):
+        from base.models import VerifiedHarvestRecord
+
+        # the municipality's series and its commodity's Overall series
+        self.assertEqual(self.retrain(self.pairs), 2)
+        self.assertEqual(ForecastBatch.objects.count(), 1)
+        forecasts = ForecastResult.objects.count()
+        self.assertGreater(forecasts, 0)
+
+        self.assertEqual(self.retrain(self.pairs), 0)
+        self.assertEqual(ForecastBatch.objects.count(), 1)
+
+        VerifiedHarvestRecord.objects.create(harvest_date=date(2024, 5, 9), commodity_id=self.mango, total_weight_kg=99, municipality=self.muni)
+        self.assertEqual(self.retrain(self.pairs), 2)
+        self.assertEqual(ForecastBatch.objects.count(), 2)
+        self.assertEqual(ForecastResult.objects.count(), forecasts)
+        self.assertFalse(ForecastResult.objects.exclude(batch=ForecastBatch.objects.latest('generated_at')).exists())
+
+    def test_series_without_data_or_forecasts_create_no_batch(self):
+        sparse = MunicipalityName.objects.create(municipality_id=2, municipality="B")
+        self.assertEqual(self.retrain(self.pairs), 2)
+        self.assertEqual(self.retrain([{'commodity_id': self.mango.pk, 'municipality_id': sparse.pk}]), 0)
+        self.assertEqual(ForecastBatch.objects.count(), 1)
+
+
+class ModelRegistryTest(TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        patcher = mock.patch('administrator.model_registry.default_storage', FileSystemStorage(location=self.tmpdir.name))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.path = "prophet_models/prophet_2_1.joblib"
+
+    def pickle(self, obj):
+        buffer = BytesIO()
+        joblib.dump(obj, buffer)
+        return buffer.getvalue()
+
+    def test_model_is_loaded_once_and_missing_models_are_cached(self):
+        registry = ModelRegistry(maxsize=2, revalidate_seconds=300)
+        self.assertIsNone(registry.get(self.path))
+        registry.save(self.path, self.pickle({'version': 1}))
+
+        self.assertEqual(registry.get(self.path), {'version': 1})
+        self.assertEqual(registry.get(self.path), {'version': 1})
+        self.assertEqual(registry.stats()['hits'], 1)
+        self.assertEqual(registry.stats()['misses'], 2)
+
+    def test_changed_file_is_reloaded_after_revalidation(self):
+        registry = ModelRegistry(maxsize=2, revalidate_seconds=0)
+        registry.save(self.path, self.pickle({'version': 1}))
+        self.assertEqual(registry.get(self.path), {'version': 1})
+
+        # Written by another process (e.g. the Celery worker), so this registry is not invalidated
+        full_path = os.path.join(self.tmpdir.name, self.path)
+        with open(full_path, 'wb') as f:
+            f.write(self.pickle({'version': 2}))
+        os.utime(full_path, (0, 0))
+
+        self.assertEqual(registry.get(self.path), {'version': 2})
+        self.assertEqual(os.listdir(os.path.dirname(full_path)), ['prophet_2_1.joblib'])
+
+    def test_save_replaces_the_file_in_one_step(self):
+        registry = ModelRegistry(maxsize=2, revalidate_seconds=0)
+        registry.save(self.path, self.pickle({'version': 1}))
+        with mock.patch('administrator.model_registry.default_storage.delete') as delete:
+            registry.save(self.path, self.pickle({'version': 2}))
+        delete.assert_not_called()
+        self.assertEqual(registry.get(self.path), {'version': 2})
+        full_path = os.path.join(self.tmpdir.name, self.path)
+        self.assertEqual(os.listdir(os.path.dirname(full_path)), ['prophet_2_1.joblib'])
+
+    def test_missing_model_is_only_remembered_briefly(self):
+        from .model_registry import MISSING_MODEL_REVALIDATE_SECONDS
+
+        registry = ModelRegistry(maxsize=2, revalidate_seconds=300)
+        with mock.patch('administrator.model_registry.time.monotonic', return_value=1000):
+            self.assertIsNone(registry.get(self.path))
+        # Written by another process, so this registry is not invalidated
+        ModelRegistry().save(self.path, self.pickle({'version': 1}))
+        with mock.patch('administrator.model_registry.time.monotonic', return_value=1001):
+            self.assertIsNone(registry.get(self.path))
+        with mock.patch('administrator.model_registry.time.monotonic', return_value=1000 + MISSING_MODEL_REVALIDATE_SECONDS):
+            self.assertEqual(registry.get(self.path), {'version': 1})
+
+    def test_least_recently_used_model_is_evicted(self):
+        registry = ModelRegistry(maxsize=1, revalidate_seconds=300)
+        registry.get("prophet_models/a.joblib")
+        registry.get("prophet_models/b.joblib")
+        self.assertEqual(registry.stats()['size'], 1)
+
+
+class DashboardStatsTest(TestCase):
+
+    def setUp(self):
+        from django.core.cache import cache
+        from django.utils import timezone
+        from base.models import AccountsInformation, AccountStatus, AccountType, AuthUser, BarangayName, RecordTransaction, UnitMeasurement, UserInformation, initHarvestRecord, initPlantRecord
+        cache.clear()
+        pending = AccountStatus.objects.create(acc_stat_id=3, acc_status="Pending")
+        verified = AccountStatus.objects.create(acc_stat_id=2, acc_status="Verified")
+        farmer = AccountType.objects.create(account_type_id=1, account_type="Farmer")
+        self.muni_a = MunicipalityName.objects.create(municipality_id=1, municipality="A")
+        self.muni_b = MunicipalityName.objects.create(municipality_id=2, municipality="B")
+        mango = CommodityType.objects.create(commodity_id=2, name="Mango", average_weight_per_unit_kg=0.3)
+        unit = UnitMeasurement.objects.create(unit_abrv="kg", unit_full="kilogram")
+
+        for i, (muni, status) in enumerate([(self.muni_a, verified), (self.muni_a, pending), (self.muni_b, pending)]):
+            brgy = BarangayName.objects.create(barangay=f"Brgy {i}", municipality_id=muni)
+            user_info = UserInformation.objects.create(
+                auth_user=AuthUser.objects.create(email=f"farmer{i}@example.com"),
+                lastname="Test", firstname="User", sex="Male", contact_number="1234567890",
+                user_email=f"farmer{i}@example.com", birthdate="1990-01-01",
+                emergency_contact_person="Emergency Contact", emergency_contact_number="0987654321",
+                address_details="Test Address", barangay_id=brgy, municipality_id=muni,
+                religion="Catholic", civil_status="Single",
+            )
+            account = AccountsInformation.objects.create(
+                account_register_date=timezone.now(), account_type_id=farmer, acc_status_id=status, userinfo_id=user_info,
+            )
+            trans = RecordTransaction.objects.create(account_id=account, manual_municipality=muni, manual_barangay=brgy)
+            initPlantRecord.objects.create(
+                transaction=trans, plant_date=date(2024, 1, 1), commodity_id=mango, record_status=status,
+                min_expected_harvest=1, max_expected_harvest=2,
+            )
+            for _ in range(2):
+                initHarvestRecord.objects.create(
+                    transaction=trans, harvest_date=date(2024, 6, 1), commodity_id=mango, record_status=status,
+                    total_weight=10, unit=unit,
+                )
+
+    def test_counters_are_grouped_and_scoped(self):
+        from .dashboard_stats import compute_dashboard_stats
+
+        with self.assertNumQueries(7):
+            stats = compute_dashboard_stats()
+        self.assertEqual((stats['total_accounts'], stats['verified_accounts'], stats['pending_accounts']), (3, 1, 2))
+        self.assertEqual((stats['total_plant_records'], stats['pending_plant_records']), (3, 2))
+        self.assertEqual((stats['total_harvest_records'], stats['pending_harvest_records']), (6, 4))
+        self.assertEqual([m['farmer_count'] for m in stats['municipalities_data']], [2, 1])
+        # counting both record tables in one join used to report 3 x 6 plants
+        mango = stats['top_commodities'][0]
+        self.assertEqual((mango.plant_count, mango.harvest_count), (3, 6))
+
+        stats = compute_dashboard_stats(self.muni_b.pk)
+        self.assertEqual((stats['total_accounts'], stats['total_plant_records'], stats['total_harvest_records']), (1, 1, 2))
+        self.assertEqual(stats['municipalities_data'], [{'municipality_id': 2, 'municipality': "B", 'farmer_count': 1}])
+
+    def test_cached_until_a_write(self):
+        from base.models import AccountsInformation
+        from .dashboard_stats import get_dashboard_stats
+
+        self.assertEqual(get_dashboard_stats()['total_accounts'], 3)
+        # only the version lookup, which every process shares
+        with self.assertNumQueries(1):
+            get_dashboard_stats()
+
+        AccountsInformation.objects.filter(acc_status_id=3).first().delete()
+        self.assertEqual(get_dashboard_stats()['total_accounts'], 2)
+
+
+    def test_only_counted_changes_invalidate_the_stats(self):
+        from base.models import AccountStatus, AccountsInformation, UserInformation, initHarvestRecord
+        from .dashboard_stats import report_version, stats_version
+
+        stats, report = stats_version(), report_version()
+        record = initHarvestRecord.objects.filter(record_status=2).first()
+        record.remarks = "checked"
+        record.save()
+        user_info = UserInformation.objects.first()
+        user_info.firstname = "Renamed"
+        user_info.save()
+        # an update_fields save of uncounted fields skips the previous-values lookup: the UPDATE and the reports bump
+        account = AccountsInformation.objects.first()
+        with self.assertNumQueries(2):
+            account.save(update_fields=['account_verified_date'])
+        self.assertEqual(stats_version(), stats)
+        self.assertNotEqual(report_version(), report)
+
+        record.record_status = AccountStatus.objects.get(pk=3)
+        record.save()
+        self.assertNotEqual(stats_version(), stats)
+
+
+class VerificationRecordsMixin:
+    """Six pending harvest records on one transaction and six pending plant records, all in municipality A."""
+
+    def setUp(self):
+        from django.utils import timezone
+        from base.models import AccountsInformation, AccountStatus, AccountType, AdminInformation, AuthUser, BarangayName, RecordTransaction, UnitMeasurement, UserInformation, initHarvestRecord, initPlantRecord
+        self.pending = AccountStatus.objects.create(acc_stat_id=3, acc_status="Pending")
+        self.verified = AccountStatus.objects.create(acc_stat_id=2, acc_status="Verified")
+        self.rejected = AccountStatus.objects.create(acc_stat_id=4, acc_status="Rejected")
+        farmer = AccountType.objects.create(account_type_id=1, account_type="Farmer")
+        self.muni = MunicipalityName.objects.create(municipality_id=1, municipality="A")
+        brgy = BarangayName.objects.create(barangay="Brgy", municipality_id=self.muni)
+        CommodityType.objects.create(commodity_id=1, name="Other", average_weight_per_unit_kg=1)
+        self.mango = CommodityType.objects.create(commodity_id=2, name="Mango", average_weight_per_unit_kg=0.3)
+        ton = UnitMeasurement.objects.create(unit_abrv="ton", unit_full="tonne")
+        user_info = UserInformation.objects.create(
+            auth_user=AuthUser.objects.create(email="farmer@example.com"),
+            lastname="Test", firstname="User", sex="Male", contact_number="1234567890",
+            user_email="farmer@example.com", birthdate="1990-01-01",
+            emergency_contact_person="Emergency Contact", emergency_contact_number="0987654321",
+            address_details="Test Address", barangay_id=brgy, municipality_id=self.muni,
+            religion="Catholic", civil_status="Single",
+        )
+        account = AccountsInformation.objects.create(
+            account_register_date=timezone.now(), account_type_id=farmer, acc_status_id=self.verified, userinfo_id=user_info,
+        )
+        self.admin_info = AdminInformation.objects.create(userinfo_id=user_info, municipality_incharge=self.muni)
+        trans = RecordTransaction.objects.create(account_id=account, manual_municipality=self.muni, manual_barangay=brgy)
+        for month in range(1, 7):
+            initHarvestRecord.objects.create(
+                transaction=trans, harvest_date=date(2024, month, 1), commodity_id=self.mango, record_status=self.pending,
+                total_weight=1, unit=ton,
+            )
+            initPlantRecord.objects.create(
+                transaction=RecordTransaction.objects.create(account_id=account, manual_municipality=self.muni, manual_barangay=brgy),
+                plant_date=date(2024, month, 1), commodity_id=self.mango, record_status=self.pending,
+                min_expected_harvest=10, max_expected_harvest=20,
+            )
+
+
+class BulkVerificationTest(VerificationRecordsMixin, TestCase):
+
+    def verify_harvest(self, status, count=None):
+        from base.models import initHarvestRecord
+        from .verification import verify_harvest_records
+        records = initHarvestRecord.objects.order_by('harvest_id')
+        return verify_harvest_records(records.filter(pk__in=list(records.values_list('pk', flat=True)[:count])), status, self.admin_info)
+
+    def test_query_count_does_not_grow_with_the_selection(self):
+        from django.contrib.contenttypes.models import ContentType
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from base.models import initHarvestRecord
+
+        with CaptureQueriesContext(connection) as two:
+            self.verify_harvest(self.verified, count=2)
+        initHarvestRecord.objects.update(record_status=self.pending)
+        ContentType.objects.clear_cache()
+        with CaptureQueriesContext(connection) as six:
+            summary = self.verify_harvest(self.verified, count=6)
+        self.assertEqual(len(two.captured_queries), len(six.captured_queries))
+        # the two already verified keep their verified copy
+        self.assertEqual(summary, {'updated': 6, 'created': 4, 'deleted': 0})
+
+    def test_rejection_query_count_does_not_grow_with_the_selection(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from base.models import initHarvestRecord
+
+        self.verify_harvest(self.verified)
+        with CaptureQueriesContext(connection) as two:
+            self.assertEqual(self.verify_harvest(self.rejected, count=2)['deleted'], 2)
+        initHarvestRecord.objects.update(record_status=self.pending)
+        self.verify_harvest(self.verified)
+        with CaptureQueriesContext(connection) as six:
+            self.assertEqual(self.verify_harvest(self.rejected, count=6)['deleted'], 6)
+        self.assertEqual(len(two.captured_queries), len(six.captured_queries))
+
+    def test_verify_then_reject_harvest_records(self):
+        from base.models import AdminUserManagement, initHarvestRecord
+        from dashboard.models import MonthlyHarvestRollup, VerifiedHarvestRecord
+
+        self.verify_harvest(self.verified)
+        self.assertEqual(initHarvestRecord.objects.filter(record_status=self.verified, verified_by=self.admin_info).count(), 6)
+        verified = VerifiedHarvestRecord.objects.order_by('harvest_date')
+        self.assertEqual([float(v.total_weight_kg) for v in verified], [1000.0] * 6)
+        self.assertEqual(verified[0].municipality, self.muni)
+        self.assertEqual(MonthlyHarvestRollup.objects.filter(municipality=self.muni).count(), 6)
+        self.assertEqual(AdminUserManagement.objects.filter(action__startswith="Created Verified Harvest").count(), 6)
+
+        self.assertEqual(self.verify_harvest(self.rejected, count=3), {'updated': 3, 'created': 0, 'deleted': 3})
+        self.assertEqual(VerifiedHarvestRecord.objects.count(), 3)
+        self.assertEqual(MonthlyHarvestRollup.objects.count(), 3)
+        self.assertEqual(AdminUserManagement.objects.filter(action__startswith="Deleted Verified Harvest").count(), 3)
+
+    def test_verify_plant_records(self):
+        from base.models import initPlantRecord
+        from dashboard.models import VerifiedPlantRecord
+        from .verification import verify_plant_records
+
+        summary = verify_plant_records(initPlantRecord.objects.all(), self.verified, self.admin_info)
+        self.assertEqual(summary, {'updated': 6, 'created': 6, 'deleted': 0})
+        self.assertEqual({v.estimated_weight_kg for v in VerifiedPlantRecord.objects.all()}, {15})
+
+
+class HarvestCSVImportTest(TestCase):
+
+    def setUp(self):
+        from base.models import AdminInformation, AuthUser, BarangayName, UserInformation
+        self.muni = MunicipalityName.objects.create(municipality_id=1, municipality="Balanga City")
+        self.other_muni = MunicipalityName.objects.create(municipality_id=2, municipality="Hermosa")
+        self.overall = MunicipalityName.objects.create(municipality_id=14, municipality="Overall")
+        brgy = BarangayName.objects.create(barangay="San Jose", municipality_id=self.muni)
+        CommodityType.objects.create(commodity_id=1, name="Other", average_weight_per_unit_kg=1)
+        self.mango = CommodityType.objects.create(commodity_id=2, name="Mango", average_weight_per_unit_kg=0.3)
+        self.user_info = UserInformation.objects.create(
+            auth_user=AuthUser.objects.create(email="admin@example.com"),
+            lastname="Test", firstname="Admin", sex="Male", contact_number="1234567890",
+            user_email="admin@example.com", birthdate="1990-01-01",
+            emergency_contact_person="Emergency Contact", emergency_contact_number="0987654321",
+            address_details="Test Address", barangay_id=brgy, municipality_id=self.muni,
+            religion="Catholic", civil_status="Single",
+        )
+        self.admin_info = AdminInformation.objects.create(userinfo_id=self.user_info, municipality_incharge=self.muni)
+
+    def run_import(self, content, admin_info=None, encoding='utf-8'):
+        from .csv_import import HarvestCSVImporter, csv_rows
+        importer = HarvestCSVImporter(admin_info or self.admin_info)
+        with csv_rows(BytesIO(content.encode(encoding))) as reader:
+            self.assertEqual(importer.header_errors(reader.fieldnames), [])
+            return importer.run(reader)
+
+    def test_encoding_is_detected_from_the_prefix(self):
+        from .csv_import import detect_encoding
+        self.assertEqual(detect_encoding('﻿harvest_date,señor'.encode('utf-8-sig')), 'utf-8-sig')
+        # a multi-byte character cut off by the probe doesn't disqualify UTF-8
+        self.assertEqual(detect_encoding('niño'.encode('utf-8')[:-1]), 'utf-8-sig')
+        self.assertEqual(detect_encoding('“niño”'.encode('cp1252')), 'cp1252')
+
+    def test_rows_are_validated_and_imported_in_one_pass(self):
+        from base.models import AdminUserManagement
+        from dashboard.models import MonthlyHarvestRollup, VerifiedHarvestRecord
+        from . import csv_import
+
+        rows = ["2024-01-0%d,Mango,San Jose,10,Batch %d" % (i % 9 + 1, i) for i in range(7)]
+        rows += ["2024-13-01,Mango,,10,", "2024-01-01,Durian,,10,", "2024-01-01,Mango,Nowhere,5,"]
+        content = " harvest_date ,commodity,barangay,total_weight_kg,remarks\n" + "\n".join(rows) + "\n"
+        with mock.patch.object(csv_import, 'CSV_IMPORT_BATCH_SIZE', 3):
+            summary = self.run_import(content, encoding='cp1252')
+
+        self.assertEqual((summary['rows'], summary['created'], summary['errors']), (10, 8, 2))
+        self.assertEqual(summary['pairs'], [{'commodity_id': 2, 'municipality_id': 1}])
+        self.assertIn("Row 10: Commodity 'Durian' does not exist in database", summary['error_details'])
+        self.assertEqual(VerifiedHarvestRecord.objects.filter(municipality=self.muni, barangay__isnull=False).count(), 7)
+        self.assertEqual(AdminUserManagement.objects.filter(action__contains="via CSV upload").count(), 8)
+        self.assertEqual(MonthlyHarvestRollup.objects.get(month=1, municipality=self.muni).record_count, 8)
+
+    def test_other_municipality_rows_are_reported_and_skipped(self):
+        from dashboard.models import MonthlyHarvestRollup, VerifiedHarvestRecord
+        from . import csv_import
+
+        content = "harvest_date,commodity,municipality,total_weight_kg\n"
+        content += "2024-01-01,Mango,Balanga,10\n" * 4 + "2024-01-01,Mango,Hermosa,10\n" + "2024-01-01,Mango,Balanga,10\n"
+        with mock.patch.object(csv_import, 'CSV_IMPORT_BATCH_SIZE', 2):
+            summary = self.run_import(content)
+
+        self.assertEqual((summary['created'], summary['errors']), (5, 1))
+        self.assertEqual(summary['error_details'], ["Row 6: Municipality 'Hermosa' is not your assigned municipality (Balanga City)"])
+        self.assertEqual(VerifiedHarvestRecord.objects.count(), 5)
+        self.assertEqual(MonthlyHarvestRollup.objects.get(municipality=self.muni).record_count, 5)
+
+    def test_overall_admin_needs_a_municipality_column(self):
+        from .csv_import import HarvestCSVImporter
+        self.admin_info.municipality_incharge = self.overall
+        importer = HarvestCSVImporter(self.admin_info)
+        self.assertIn("'municipality' column", importer.header_errors(['harvest_date', 'commodity', 'total_weight_kg'])[0])
+        self.assertEqual(importer.header_errors(['harvest_date', 'commodity', 'municipality', 'total_weight_kg']), [])
+
+
+class StreamingExportTest(VerificationRecordsMixin, TestCase):
+
+    def read_csv(self, response):
+        import csv
+        self.assertTrue(response.streaming)
+        return list(csv.reader(b"".join(response.streaming_content).decode().splitlines()))
+
+    def test_record_export_is_one_query_however_many_rows(self):
+        from base.models import initHarvestRecord
+        from .views import export_harvest_records_csv
+
+        response = export_harvest_records_csv(initHarvestRecord.objects.order_by('harvest_date'), 'harvest')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="harvest.csv"')
+        with self.assertNumQueries(1):
+            rows = self.read_csv(response)
+        self.assertEqual(len(rows), 7)
+        self.assertEqual(rows[1][1:9], ['Test, User', 'Mango', '2024-01-01', '1000.00', '0.00', 'Brgy, A', 'Pending', 'Not Verified'])
+
+    def test_summaries_group_the_streamed_rows(self):
+        from base.models import AccountsInformation, initPlantRecord
+        from dashboard.models import VerifiedHarvestRecord
+        from .views import export_accounts_csv, export_plant_records_summary_csv, export_verified_harvest_records_summary_csv
+
+        rows = self.read_csv(export_plant_records_summary_csv(initPlantRecord.objects.all(), 'plants'))
+        self.assertEqual(rows[1:], [['Mango', 'Brgy, A', '6', '60.00', '120.00', '0.00', '0', '6']])
+
+        for day, weight in ((1, 10), (20, 5)):
+            VerifiedHarvestRecord.objects.create(harvest_date=date(2024, 3, day), commodity_id=self.mango, total_weight_kg=weight, municipality=self.muni)
+        VerifiedHarvestRecord.objects.create(harvest_date=date(2024, 4, 1), commodity_id=self.mango, total_weight_kg=1)
+        rows = self.read_csv(export_verified_harvest_records_summary_csv(VerifiedHarvestRecord.objects.all(), 'verified'))
+        self.assertEqual(rows[1:], [['2024-03-01', 'Mango', 'A', '15.00'], ['2024-04-01', 'Mango', 'Unknown', '1.00']])
+
+        rows = self.read_csv(export_accounts_csv(AccountsInformation.objects.all(), 'accounts'))
+        # one harvest transaction plus six plant transactions
+        self.assertEqual(rows[1][-2:], ['7', '0.00'])
+
+
+class AdminPDFReportTest(VerificationRecordsMixin, TestCase):
+
+    def setUp(self):
+        from django.core.cache import cache
+        from django.contrib.sessions.middleware import SessionMiddleware
+        from django.test import RequestFactory
+        from django.urls import resolve
+        super().setUp()
+        cache.clear()
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        patcher = mock.patch('dashboard.reports.default_storage', FileSystemStorage(location=self.tmpdir.name))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch('dashboard.tasks.render_report_task.delay', side_effect=lambda *args: mock.Mock(id="task"))
+        self.delay = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.request = RequestFactory().get('/administrator/verify_records/harvest?export=records&format=pdf&commodity=2')
+        self.request.resolver_match = resolve('/administrator/verify_records/harvest')
+        SessionMiddleware(lambda request: None).process_request(self.request)
+        self.request.user = self.admin_info.userinfo_id.auth_user
+
+    def export(self):
+        from base.models import initHarvestRecord
+        from .views import export_harvest_records_csv
+
+        records = initHarvestRecord.objects.filter(commodity_id=self.mango).order_by('harvest_date')
+        return export_harvest_records_csv(records, 'harvest', 'pdf', self.request)
+
+    def test_worker_renders_the_same_records_and_later_exports_reuse_the_file(self):
+        from dashboard.reports import render_report
+
+        self.assertContains(self.export(), 'Preparing harvest.pdf')
+        kind, payload, key = self.delay.call_args.args
+        self.assertEqual(payload['generator'], 'generate_harvest_records_pdf')
+        # plain filter parameters only: the worker rebuilds the queryset from them
+        self.assertEqual((payload['page'], payload['params']), ('admin_verifyharvestrec', 'export=records&format=pdf&commodity=2'))
+        json.dumps(payload)
+        render_report(kind, payload, key)
+
+        response = self.export()
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertIn('harvest.pdf', response['Content-Disposition'])
+        self.assertTrue(b"".join(response.streaming_content).startswith(b'%PDF'))
+        self.assertEqual(self.delay.call_count, 1)
+
+    def test_record_changes_invalidate_stored_reports(self):
+        from base.models import initHarvestRecord
+
+        self.export()
+        first_key = self.delay.call_args.args[2]
+        # the data version is kept in the database, so a restart (an empty cache) keeps the key...
+        from django.core.cache import cache
+        cache.clear()
+        self.export()
+        self.assertEqual(self.delay.call_args.args[2], first_key)
+
+        # ...and a write from any process changes it
+        record = initHarvestRecord.objects.first()
+        record.remarks = "Edited"
+        record.save()
+        cache.clear()
+        self.export()
+        self.assertNotEqual(self.delay.call_args.args[2], first_key)
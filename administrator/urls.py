@@ -24,10 +24,14 @@ urlpatterns = [
     path('verify_records/plant', views.admin_verifyplantrec, name='admin_verifyplantrec'),
     path('verify_records/harvest', views.admin_verifyharvestrec, name='admin_verifyharvestrec'),
     path('verify_records/harvest/add', views.admin_add_verifyharvestrec, name='admin_add_verifyharvestrec'),
+    path('verify_records/harvest/import/<str:task_id>/', views.admin_csv_import_status, name='admin_csv_import_status'),
+    path('reports/<slug:kind>/<slug:key>/status/', views.admin_report_status, name='report_status'),
+    path('reports/<slug:kind>/<slug:key>/download/', views.admin_report_download, name='report_download'),
     path('harvest_verified/', views.admin_harvestverified, name='admin_harvestverified'),
     path('harvest_verified/<int:record_id>/view/', views.admin_harvestverified_view, name='admin_harvestverified_view'),
     path('harvest_verified/<int:record_id>/edit/', views.admin_harvestverified_edit, name='admin_harvestverified_edit'),
     path('admin-forecast/', views.admin_forecast, name='admin_forecast'),
+    path('admin-forecast/data/', views.admin_forecast_data, name='admin_forecast_data'),
     path('retrain-forecast-model/', views.retrain_forecast_model, name='retrain_forecast_model'),
     path('save-admin-forecast/', views.save_admin_forecast, name='save_admin_forecast'),
     path('admin-forecast/batch/<int:batch_id>/download_csv/', views.forecast_csv, name='forecast_csv'),
@@ -0,0 +1,160 @@
+import logging
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from base.models import AdminUserManagement, initHarvestRecord, initPlantRecord
+from dashboard.utils import batched_record_refresh
+
+logger = logging.getLogger(__name__)
+
+VERIFIED_STATUS_PK = 2
+REJECTED_STATUS_PK = 4
+
+
+def _apply_verification(records, new_status, admin_info, init_model, verified_model, label, build_verified, existing_fields=()):
+    """
+    Set-based status change shared by the harvest and plant verification pages.
+
+    One query loads the selected records, one loads the verified records already linked to them,
+    and status changes, verified records and AdminUserManagement logs are each written with a
+    single bulk statement, so approving hundreds of records costs the same as approving one.
+    Returns (summary, rows of the verified records deleted on rejection).
+    """
+    summary = {'updated': len(records), 'created': 0, 'deleted': 0}
+    if not records:
+        return summary, []
+
+    content_types = ContentType.objects.get_for_models(init_model, verified_model)
+    init_ct, verified_ct = content_types[init_model], content_types[verified_model]
+
+    existing = list(verified_model.objects.filter(
+        prev_record__in=[rec.pk for rec in records]
+    ).values('id', 'prev_record_id', *existing_fields))
+    linked_ids = {row['prev_record_id'] for row in existing}
+
+    logs = []
+    for rec in records:
+        old_status = rec.record_status.acc_status if rec.record_status else "None"
+        rec.record_status = new_status
+        if not rec.verified_by_id:
+            rec.verified_by = admin_info
+        logs.append(AdminUserManagement(
+            admin_id=admin_info,
+            action=f"{label} Record ID {rec.pk} changed status from '{old_status}' to '{new_status.acc_status}'",
+            content_type=init_ct,
+            object_id=rec.pk,
+        ))
+
+    deleted = []
+    with transaction.atomic():
+        init_model.objects.bulk_update(records, ['record_status', 'verified_by'], batch_size=500)
+
+        if new_status.pk == VERIFIED_STATUS_PK:
+            # Only records without a verified copy get one
+            created = verified_model.objects.bulk_create(
+                [build_verified(rec) for rec in records if rec.pk not in linked_ids], batch_size=500
+            )
+            for verified in created:
+                logs.append(AdminUserManagement(
+                    admin_id=admin_info,
+                    action=f"Created Verified {label} Record ID {verified.id} from {label} Record ID {verified.prev_record_id}",
+                    content_type=verified_ct,
+                    object_id=verified.id,
+                ))
+            summary['created'] = len(created)
+        elif new_status.pk == REJECTED_STATUS_PK and existing:
+            # one SELECT and one DELETE; the callers refresh the rollup and stats once for the whole batch
+            with batched_record_refresh():
+                verified_model.objects.filter(pk__in=[row['id'] for row in existing]).delete()
+            for row in existing:
+                logs.append(AdminUserManagement(
+                    admin_id=admin_info,
+                    action=f"Deleted Verified {label} Record ID {row['id']} due to {label} Record ID {row['prev_record_id']} being rejected",
+                    content_type=verified_ct,
+                    object_id=row['id'],
+                ))
+            deleted = existing
+            summary['deleted'] = len(existing)
+
+        AdminUserManagement.objects.bulk_create(logs, batch_size=500)
+
+    logger.info(f"{label} verification: {summary}")
+    return summary, deleted
+
+
+def verify_harvest_records(records, new_status, admin_info):
+    """
+    Moves the given initHarvestRecords to new_status. Verifying creates the missing
+    VerifiedHarvestRecords (weights converted to kg); rejecting deletes the linked ones.
+    Returns {'updated': n, 'created': n, 'deleted': n}.
+    """
+    from dashboard.models import VerifiedHarvestRecord
+    from dashboard.utils import refresh_harvest_rollup
+    from .dashboard_stats import invalidate_dashboard_stats
+    from .views import convert_to_kg
+
+    def build_verified(rec):
+        return VerifiedHarvestRecord(
+            harvest_date=rec.harvest_date,
+            commodity_id=rec.commodity_id,
+            total_weight_kg=convert_to_kg(rec.total_weight, rec.unit.unit_abrv),
+            remarks=rec.remarks,
+            municipality_id=rec.transaction.effective_municipality_id,
+            barangay_id=rec.transaction.effective_barangay_id,
+            verified_by=admin_info,
+            prev_record=rec,
+        )
+
+    records = list(records.select_related('unit', 'commodity_id', 'record_status', 'transaction'))
+    summary, deleted = _apply_verification(
+        records, new_status, admin_info, initHarvestRecord, VerifiedHarvestRecord, 'Harvest', build_verified,
+        existing_fields=('harvest_date', 'commodity_id', 'municipality_id'),
+    )
+
+    # bulk writes send no signals and the delete ran batched, so the rollup and dashboard counters are refreshed here
+    if summary['created'] or summary['deleted']:
+        cells = set()
+        if summary['created']:
+            cells.update(
+                (rec.harvest_date.year, rec.harvest_date.month, rec.commodity_id_id, rec.transaction.effective_municipality_id)
+                for rec in records
+            )
+        cells.update(
+            (row['harvest_date'].year, row['harvest_date'].month, row['commodity_id'], row['municipality_id'])
+            for row in deleted
+        )
+        refresh_harvest_rollup(cells)
+    if summary['updated']:
+        invalidate_dashboard_stats()
+    return summary
+
+
+def verify_plant_records(records, new_status, admin_info):
+    """
+    Moves the given initPlantRecords to new_status. Verifying creates the missing
+    VerifiedPlantRecords (estimated weight is the midpoint of the expected harvest);
+    rejecting deletes the linked ones. Returns {'updated': n, 'created': n, 'deleted': n}.
+    """
+    from dashboard.models import VerifiedPlantRecord
+    from .dashboard_stats import invalidate_dashboard_stats
+
+    def build_verified(rec):
+        return VerifiedPlantRecord(
+            plant_date=rec.plant_date,
+            commodity_id=rec.commodity_id,
+            min_expected_harvest=rec.min_expected_harvest,
+            max_expected_harvest=rec.max_expected_harvest,
+            estimated_weight_kg=(rec.min_expected_harvest + rec.max_expected_harvest) / 2,
+            remarks=rec.remarks,
+            municipality_id=rec.transaction.effective_municipality_id,
+            barangay_id=rec.transaction.effective_barangay_id,
+            verified_by=admin_info,
+            prev_record=rec,
+        )
+
+    records = list(records.select_related('commodity_id', 'record_status', 'transaction'))
+    summary, _ = _apply_verification(
+        records, new_status, admin_info, initPlantRecord, VerifiedPlantRecord, 'Plant', build_verified,
+    )
+    if summary['updated']:
+        invalidate_dashboard_stats()
+    return summary
@@ -3,8 +3,8 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
 from base.models import AuthUser, UserInformation, AdminInformation, AccountsInformation, AccountStatus, AccountType, MunicipalityName, BarangayName, CommodityType, Month, initHarvestRecord, initPlantRecord, FarmLand, RecordTransaction, UserLoginLog
 from django.contrib.auth.decorators import login_required
-from django.views.decorators.http import require_POST
-from django.http import HttpResponseForbidden, HttpResponse
+from django.views.decorators.http import condition, require_POST
+from django.http import HttpResponseForbidden, HttpResponse, JsonResponse
 from base.forms import EditUserInformation
 from django.utils import timezone
 from django.utils.timezone import now
@@ -33,7 +33,19 @@ from django.core.paginator import Paginator
 from collections import OrderedDict
 from pathlib import Path
 from django.core.management import call_command
-from .tasks import retrain_and_generate_forecasts_task, retrain_selective_models_task
+from .tasks import import_harvest_csv_task, retrain_and_generate_forecasts_task, retrain_selective_models_task
+from .model_registry import model_registry
+from .dashboard_stats import get_dashboard_stats, invalidate_dashboard_stats, report_version
+from base.principal import get_principal
+from base.reference_data import reference_data
+from .verification import verify_harvest_records, verify_plant_records
+from .csv_import import BACKGROUND_IMPORT_BYTES, HarvestCSVImporter, csv_rows
+from .exports import (
+    account_rows, account_summary_rows, commodity_rows, commodity_summary_rows, forecast_batch_rows, harvest_record_rows, harvest_summary_rows,
+    plant_record_rows, plant_summary_rows, stream_csv, verified_harvest_rows, verified_harvest_summary_rows,
+)
+from dashboard.chart_data import forecast_series_etag
+from dashboard.utils import get_eligible_series, get_monthly_harvest_frame, save_current_forecasts
 from django.core.files.storage import default_storage
 from django.contrib.contenttypes.models import ContentType
 from base.models import AdminUserManagement
@@ -84,16 +96,12 @@ def extract_commodity_municipality_pairs(selected_record_ids, record_type='harve
     if record_type == 'harvest':
         records = initHarvestRecord.objects.filter(
             harvest_id__in=selected_record_ids
-        ).select_related('commodity_id', 'transaction__manual_municipality', 'transaction__farm_land__municipality')
+        ).select_related('transaction')
         
         for record in records:
-            commodity_id = record.commodity_id.commodity_id
-            
-            if record.transaction.farm_land:
-                municipality_id = record.transaction.farm_land.municipality.municipality_id
-            elif record.transaction.manual_municipality:
-                municipality_id = record.transaction.manual_municipality.municipality_id
-            else:
+            commodity_id = record.commodity_id_id
+            municipality_id = record.transaction.effective_municipality_id
+            if municipality_id is None:
                 continue  
                 
             pair = {'commodity_id': commodity_id, 'municipality_id': municipality_id}
@@ -103,16 +111,12 @@ def extract_commodity_municipality_pairs(selected_record_ids, record_type='harve
     elif record_type == 'plant':
         records = initPlantRecord.objects.filter(
             plant_id__in=selected_record_ids
-        ).select_related('commodity_id', 'transaction__manual_municipality', 'transaction__farm_land__municipality')
+        ).select_related('transaction')
         
         for record in records:
-            commodity_id = record.commodity_id.commodity_id
-            
-            if record.transaction.farm_land:
-                municipality_id = record.transaction.farm_land.municipality.municipality_id
-            elif record.transaction.manual_municipality:
-                municipality_id = record.transaction.manual_municipality.municipality_id
-            else:
+            commodity_id = record.commodity_id_id
+            municipality_id = record.transaction.effective_municipality_id
+            if municipality_id is None:
                 continue  
                 
             pair = {'commodity_id': commodity_id, 'municipality_id': municipality_id}
@@ -124,16 +128,12 @@ def extract_commodity_municipality_pairs(selected_record_ids, record_type='harve
 def get_admin_context(request):
     """Helper function to get admin context data"""
     context = {}
-    if request.user.is_authenticated:
-        try:
-            user_info = UserInformation.objects.get(auth_user=request.user)
-            account_info = AccountsInformation.objects.get(userinfo_id=user_info)
-            context.update({
-                'user_firstname': user_info.firstname,
-                'user_role_id': account_info.account_type_id.account_type_id,
-            })
-        except (UserInformation.DoesNotExist, AccountsInformation.DoesNotExist):
-            pass
+    principal = get_principal(request)
+    if principal and principal.account_id is not None:
+        context.update({
+            'user_firstname': principal.firstname,
+            'user_role_id': principal.account_type_id,
+        })
     return context 
 
 def admin_login(request):
@@ -185,115 +185,39 @@ def admin_dashboard(request):
     context = get_admin_context(request)
 
     try:
-        user_info = UserInformation.objects.get(auth_user=user)
-        admin_info = AdminInformation.objects.get(userinfo_id=user_info)
-        account_info = AccountsInformation.objects.get(userinfo_id=user_info)
+        user_info = request.principal.user_info
+        admin_info = request.principal.admin_info
+        account_info = request.principal.account_info
         
         is_superuser = user.is_superuser
         is_pk14 = admin_info.municipality_incharge.pk == 14
         is_administrator = account_info.account_type_id.account_type.lower() == 'administrator'
         assigned_municipality = admin_info.municipality_incharge
         
-        if is_superuser or is_pk14:
-            # Superuser/Administrator (pk=14) sees all data
-            total_accounts = AccountsInformation.objects.filter(account_type_id=1).count()  # All farmers
-            verified_accounts = AccountsInformation.objects.filter(account_type_id=1, acc_status_id=2).count()
-            pending_accounts = AccountsInformation.objects.filter(account_type_id=1, acc_status_id=3).count()
-            total_plant_records = initPlantRecord.objects.count()
-            total_harvest_records = initHarvestRecord.objects.count()
-            pending_plant_records = initPlantRecord.objects.filter(record_status__acc_stat_id=3).count()
-            pending_harvest_records = initHarvestRecord.objects.filter(record_status__acc_stat_id=3).count()
-            verified_plant_records = VerifiedPlantRecord.objects.count()
-            verified_harvest_records = VerifiedHarvestRecord.objects.count()
-            recent_registrations = AccountsInformation.objects.filter(
-                account_type_id=1
-            ).order_by('-account_register_date')[:5]
-            municipalities_data = MunicipalityName.objects.exclude(pk=14).annotate(
-                farmer_count=Count('userinformation__accountsinformation', 
-                filter=Q(userinformation__accountsinformation__account_type_id=1))
-            )
-        else:
+        # Counters come from the cached stats service; only the short "recent" lists are live
+        stats = get_dashboard_stats(None if (is_superuser or is_pk14) else assigned_municipality.municipality_id)
+
+        recent_registrations = AccountsInformation.objects.filter(account_type_id=1).select_related(
+            'userinfo_id__municipality_id', 'acc_status_id'
+        ).order_by('-account_register_date')
+        if not (is_superuser or is_pk14):
             # Agriculturist sees only their municipality data
-            total_accounts = AccountsInformation.objects.filter(
-                account_type_id=1,
-                userinfo_id__municipality_id=assigned_municipality
-            ).count()
-            verified_accounts = AccountsInformation.objects.filter(
-                account_type_id=1,
-                acc_status_id=2,
-                userinfo_id__municipality_id=assigned_municipality
-            ).count()
-            pending_accounts = AccountsInformation.objects.filter(
-                account_type_id=1,
-                acc_status_id=3,
-                userinfo_id__municipality_id=assigned_municipality
-            ).count()
-            
-            # Plant and harvest records for their municipality
-            municipality_plant_records = initPlantRecord.objects.filter(
-                Q(transaction__farm_land__municipality=assigned_municipality) |
-                Q(transaction__manual_municipality=assigned_municipality)
-            )
-            municipality_harvest_records = initHarvestRecord.objects.filter(
-                Q(transaction__farm_land__municipality=assigned_municipality) |
-                Q(transaction__manual_municipality=assigned_municipality)
-            )
-            
-            total_plant_records = municipality_plant_records.count()
-            total_harvest_records = municipality_harvest_records.count()
-            pending_plant_records = municipality_plant_records.filter(record_status__acc_stat_id=3).count()
-            pending_harvest_records = municipality_harvest_records.filter(record_status__acc_stat_id=3).count()
-            
-            verified_plant_records = VerifiedPlantRecord.objects.filter(municipality=assigned_municipality).count()
-            verified_harvest_records = VerifiedHarvestRecord.objects.filter(municipality=assigned_municipality).count()
-            
-            recent_registrations = AccountsInformation.objects.filter(
-                account_type_id=1,
-                userinfo_id__municipality_id=assigned_municipality
-            ).order_by('-account_register_date')[:5]
-            
-            municipalities_data = [assigned_municipality]  # Only their municipality
+            recent_registrations = recent_registrations.filter(userinfo_id__municipality_id=assigned_municipality)
+        recent_registrations = recent_registrations[:5]
 
         # Recent activities (last 10 admin actions)
         recent_activities = AdminUserManagement.objects.filter(
             admin_id=admin_info
         ).order_by('-action_timestamp')[:10]
 
-        # Commodity statistics
-        if is_superuser or is_pk14:
-            top_commodities = CommodityType.objects.annotate(
-                plant_count=Count('initplantrecord'),
-                harvest_count=Count('initharvestrecord')
-            ).order_by('-plant_count')[:5]
-        else:
-            # For agriculturists, filter by their municipality
-            top_commodities = CommodityType.objects.annotate(
-                plant_count=Count('initplantrecord', 
-                    filter=Q(initplantrecord__transaction__farm_land__municipality=assigned_municipality) |
-                           Q(initplantrecord__transaction__manual_municipality=assigned_municipality)),
-                harvest_count=Count('initharvestrecord',
-                    filter=Q(initharvestrecord__transaction__farm_land__municipality=assigned_municipality) |
-                           Q(initharvestrecord__transaction__manual_municipality=assigned_municipality))
-            ).order_by('-plant_count')[:5]
-
         # Recent forecast batches
         recent_forecasts = ForecastBatch.objects.order_by('-generated_at')[:5]
 
         context.update({
-            'total_accounts': total_accounts,
-            'verified_accounts': verified_accounts,
-            'pending_accounts': pending_accounts,
-            'total_plant_records': total_plant_records,
-            'total_harvest_records': total_harvest_records,
-            'pending_plant_records': pending_plant_records,
-            'pending_harvest_records': pending_harvest_records,
-            'verified_plant_records': verified_plant_records,
-            'verified_harvest_records': verified_harvest_records,
+            **stats,
             'recent_registrations': recent_registrations,
             'recent_activities': recent_activities,
-            'top_commodities': top_commodities,
             'recent_forecasts': recent_forecasts,
-            'municipalities_data': municipalities_data,
             'is_administrator': is_administrator,
             'is_agriculturist': not (is_superuser or is_pk14),
             'assigned_municipality': assigned_municipality,
@@ -329,8 +253,8 @@ def update_account_status(request, account_id):
 
             # Link the admin who verified
             try:
-                user_info = UserInformation.objects.get(auth_user=request.user)
-                admin = AdminInformation.objects.get(userinfo_id=user_info)
+                user_info = request.principal.user_info
+                admin = request.principal.admin_info
                 if new_status_id == 2:  # Only set verified_by for verified status
                     account.account_verified_by = admin
                     
@@ -354,23 +278,16 @@ def update_account_status(request, account_id):
             
         return redirect('administrator:show_allaccounts')
 
-@admin_or_agriculturist_required    
-def verify_accounts(request):
-    # this is the view for the verify accounts page which is the farmers list
-    user = request.user
-    userinfo = UserInformation.objects.get(auth_user=user)
-    admin_info = AdminInformation.objects.get(userinfo_id=userinfo)
-    municipality_assigned = admin_info.municipality_incharge
-    is_superuser = user.is_superuser
-    is_pk14 = municipality_assigned.pk == 14
-
-    pending_accounts = AccountsInformation.objects.filter(acc_status_id=2).select_related('userinfo_id', 'account_type_id', 'acc_status_id')    
-    print(pending_accounts)
-    
+def verify_accounts_queryset(request):
+    """Farmer accounts listed (and exported) by verify_accounts: the admin's scope, filtered and sorted by request.GET."""
+    principal = get_principal(request)
+    municipality_assigned = principal.municipality
+    is_superuser = principal.is_superuser
+    is_pk14 = principal.is_pk14
     status_filter = request.GET.get('status')
     municipality_filter = request.GET.get('municipality')
-    sort_by = request.GET.get('sort', 'account_register_date') 
-    order = request.GET.get('order', 'desc') 
+    sort_by = request.GET.get('sort', 'account_register_date')
+    order = request.GET.get('order', 'desc')
 
     accounts_query = AccountsInformation.objects.filter(account_type_id=1).select_related('userinfo_id', 'account_type_id', 'acc_status_id')
 
@@ -382,8 +299,7 @@ def verify_accounts(request):
             # Administrator with municipality not pk=14: can only see farmers in their municipality
             accounts_query = accounts_query.filter(
                 Q(userinfo_id__municipality_id=municipality_assigned) |  # Farmer's municipality matches
-                Q(recordtransaction__farm_land__municipality=municipality_assigned) |  # Has farmland in municipality
-                Q(recordtransaction__manual_municipality=municipality_assigned)  # Has transactions in municipality
+                Q(recordtransaction__effective_municipality=municipality_assigned)  # Has transactions in municipality
             ).distinct()
 
     if status_filter:
@@ -404,7 +320,28 @@ def verify_accounts(request):
     if order == 'desc':
         sort_field = '-' + sort_field
 
-    all_accounts = accounts_query.order_by(sort_field)
+    return accounts_query.order_by(sort_field)
+
+
+@admin_or_agriculturist_required    
+def verify_accounts(request):
+    # this is the view for the verify accounts page which is the farmers list
+    user = request.user
+    userinfo = request.principal.user_info
+    admin_info = request.principal.admin_info
+    municipality_assigned = admin_info.municipality_incharge
+    is_superuser = user.is_superuser
+    is_pk14 = municipality_assigned.pk == 14
+
+    pending_accounts = AccountsInformation.objects.filter(acc_status_id=2).select_related('userinfo_id', 'account_type_id', 'acc_status_id')    
+    print(pending_accounts)
+    
+    status_filter = request.GET.get('status')
+    municipality_filter = request.GET.get('municipality')
+    sort_by = request.GET.get('sort', 'account_register_date') 
+    order = request.GET.get('order', 'desc') 
+
+    all_accounts = verify_accounts_queryset(request)
     
     # Pagination
     paginator = Paginator(all_accounts, 10)  # Show 10 accounts per page
@@ -414,7 +351,7 @@ def verify_accounts(request):
     if request.method == 'POST':
         selected_ids = [sid for sid in request.POST.getlist('selected_records') if sid]
         new_status_id = request.POST.get('new_status')
-        admin_info = AdminInformation.objects.filter(userinfo_id=request.user.userinformation).first()
+        admin_info = request.principal.admin_info if request.principal.admin_id else None
         if selected_ids and new_status_id and admin_info:
             for acc in all_accounts.filter(pk__in=selected_ids):
                 acc.acc_status_id_id = new_status_id
@@ -464,32 +401,17 @@ def verify_accounts(request):
 
     return render(request, 'admin_panel/verify_accounts.html', context)
 
-@admin_or_agriculturist_required
-def show_allaccounts(request):
-    user = request.user
-    user_info = user.userinformation
-    account_info = AccountsInformation.objects.get(userinfo_id=user_info)
-    
-    # Get admin information and determine access level
-    admin_info = AdminInformation.objects.get(userinfo_id=user_info)
-    municipality_assigned = admin_info.municipality_incharge
-    is_superuser = user.is_superuser
-    is_pk14 = municipality_assigned.pk == 14  # Overall in Bataan
-    user_role_id = account_info.account_type_id.pk
-    
-    if user_role_id != 2:  # Only administrators (pk=2) can access
-        if user_role_id == 3:  # Agriculturist trying to access
-            return render(request, 'admin_panel/access_denied.html', {
-                'error_message': 'Access denied. Agriculturists cannot view this page.'
-            })
-        else:
-            return render(request, 'admin_panel/access_denied.html', {
-                'error_message': 'Access denied. Only administrators can view this page.'
-            })
-        
+def show_allaccounts_queryset(request):
+    """Administrator and agriculturist accounts listed (and exported) by show_allaccounts, filtered and sorted by request.GET."""
+    principal = get_principal(request)
+    municipality_assigned = principal.municipality
+    is_superuser = principal.is_superuser
+    is_pk14 = principal.is_pk14
     status_filter = request.GET.get('status')
-    sort_by = request.GET.get('sort', 'account_register_date') 
-    order = request.GET.get('order', 'asc') 
+    account_type_filter = request.GET.get('acctype')
+    municipality_filter = request.GET.get('municipality')
+    sort_by = request.GET.get('sort', 'account_register_date')
+    order = request.GET.get('order', 'asc')
 
     accounts_query = AccountsInformation.objects.select_related(
         'userinfo_id', 'account_type_id', 'acc_status_id'
@@ -524,11 +446,9 @@ def show_allaccounts(request):
     if status_filter:
         accounts_query = accounts_query.filter(acc_status_id=status_filter)
 
-    account_type_filter = request.GET.get('acctype')
     if account_type_filter:
         accounts_query = accounts_query.filter(account_type_id=account_type_filter)
 
-    municipality_filter = request.GET.get('municipality')
     if municipality_filter:
         accounts_query = accounts_query.filter(userinfo_id__municipality_id__municipality=municipality_filter)
         
@@ -542,7 +462,39 @@ def show_allaccounts(request):
     if order == 'desc':
         sort_field = '-' + sort_field
 
-    all_accounts = accounts_query.order_by(sort_field)
+    return accounts_query.order_by(sort_field)
+
+
+@admin_or_agriculturist_required
+def show_allaccounts(request):
+    user = request.user
+    user_info = request.principal.user_info
+    account_info = request.principal.account_info
+    
+    # Get admin information and determine access level
+    admin_info = request.principal.admin_info
+    municipality_assigned = admin_info.municipality_incharge
+    is_superuser = user.is_superuser
+    is_pk14 = municipality_assigned.pk == 14  # Overall in Bataan
+    user_role_id = account_info.account_type_id.pk
+    
+    if user_role_id != 2:  # Only administrators (pk=2) can access
+        if user_role_id == 3:  # Agriculturist trying to access
+            return render(request, 'admin_panel/access_denied.html', {
+                'error_message': 'Access denied. Agriculturists cannot view this page.'
+            })
+        else:
+            return render(request, 'admin_panel/access_denied.html', {
+                'error_message': 'Access denied. Only administrators can view this page.'
+            })
+        
+    status_filter = request.GET.get('status')
+    sort_by = request.GET.get('sort', 'account_register_date') 
+    order = request.GET.get('order', 'asc') 
+
+    account_type_filter = request.GET.get('acctype')
+    municipality_filter = request.GET.get('municipality')
+    all_accounts = show_allaccounts_queryset(request)
     
     # Pagination
     paginator = Paginator(all_accounts, 10)
@@ -607,9 +559,9 @@ def show_allaccounts(request):
 @admin_or_agriculturist_required
 @require_POST
 def change_account_type(request, account_id):
-    user_info = request.user.userinformation
-    account_info = AccountsInformation.objects.get(userinfo_id=user_info)
-    admin_info = AdminInformation.objects.get(userinfo_id=user_info)
+    user_info = request.principal.user_info
+    account_info = request.principal.account_info
+    admin_info = request.principal.admin_info
 
     account = get_object_or_404(AccountsInformation, pk=account_id)
     new_type_id = request.POST.get('new_type')
@@ -645,8 +597,8 @@ def farmer_transaction_history(request, account_id):
     try:
         # Get current admin/agriculturist info for municipality filtering
         user = request.user
-        userinfo = UserInformation.objects.get(auth_user=user)
-        admin_info = AdminInformation.objects.get(userinfo_id=userinfo)
+        userinfo = request.principal.user_info
+        admin_info = request.principal.admin_info
         municipality_assigned = admin_info.municipality_incharge
         is_superuser = user.is_superuser
         is_pk14 = municipality_assigned.pk == 14  # Administrator
@@ -664,8 +616,7 @@ def farmer_transaction_history(request, account_id):
                 account_type_id=1
             ).filter(
                 Q(userinfo_id__municipality_id=municipality_assigned) | 
-                Q(recordtransaction__farm_land__municipality=municipality_assigned) | 
-                Q(recordtransaction__manual_municipality=municipality_assigned)  
+                Q(recordtransaction__effective_municipality=municipality_assigned)  
             ).distinct().exists()
             
             if not farmer_accessible:
@@ -679,10 +630,7 @@ def farmer_transaction_history(request, account_id):
         
         # Apply municipality filtering for agriculturists
         if not is_superuser and not is_pk14:
-            transactions_query = transactions_query.filter(
-                Q(farm_land__municipality=municipality_assigned) | 
-                Q(manual_municipality=municipality_assigned)  
-            )
+            transactions_query = transactions_query.filter(effective_municipality=municipality_assigned)
         
         transactions_queryset = transactions_query.order_by('-transaction_date')
         
@@ -734,8 +682,8 @@ def farmer_transaction_detail(request, transaction_id):
     try:
         # Get current admin/agriculturist info for municipality filtering
         user = request.user
-        userinfo = UserInformation.objects.get(auth_user=user)
-        admin_info = AdminInformation.objects.get(userinfo_id=userinfo)
+        userinfo = request.principal.user_info
+        admin_info = request.principal.admin_info
         municipality_assigned = admin_info.municipality_incharge
         is_superuser = user.is_superuser
         is_pk14 = municipality_assigned.pk == 14  # Administrator
@@ -792,7 +740,7 @@ def farmer_transaction_detail(request, transaction_id):
         login_history = []
         login_history_paginator = None
         login_history_page_obj = None
-        current_account = AccountsInformation.objects.get(userinfo_id=userinfo)
+        current_account = request.principal.account_info
         current_user_role = current_account.account_type_id.pk
         
         try:
@@ -852,9 +800,9 @@ def delete_transaction(request, transaction_id):
     try:
         # Get current admin info for access control
         user = request.user
-        userinfo = UserInformation.objects.get(auth_user=user)
-        admin_info = AdminInformation.objects.get(userinfo_id=userinfo)
-        current_account = AccountsInformation.objects.get(userinfo_id=userinfo)
+        userinfo = request.principal.user_info
+        admin_info = request.principal.admin_info
+        current_account = request.principal.account_info
         current_user_role = current_account.account_type_id.pk
         
         # Only administrators (2) can delete transactions
@@ -902,9 +850,9 @@ def flag_transaction(request, transaction_id):
         
         # Get current admin info
         user = request.user
-        userinfo = UserInformation.objects.get(auth_user=user)
-        admin_info = AdminInformation.objects.get(userinfo_id=userinfo)
-        current_account = AccountsInformation.objects.get(userinfo_id=userinfo)
+        userinfo = request.principal.user_info
+        admin_info = request.principal.admin_info
+        current_account = request.principal.account_info
         current_user_role = current_account.account_type_id.pk
         
         # Only administrators (2) can flag transactions
@@ -933,9 +881,9 @@ def assign_account(request):
     user = request.user
     
     # Get user role info for access control
-    user_info = user.userinformation
-    account_info = AccountsInformation.objects.get(userinfo_id=user_info)
-    admin_info = AdminInformation.objects.get(userinfo_id=user_info)
+    user_info = request.principal.user_info
+    account_info = request.principal.account_info
+    admin_info = request.principal.admin_info
     municipality_assigned = admin_info.municipality_incharge
     is_superuser = user.is_superuser
     is_pk14 = municipality_assigned.pk == 14  # Overall in Bataan
@@ -1155,6 +1103,67 @@ def assign_account(request):
     return render(request, 'admin_panel/assign_admin_agriculturist.html', context)
 
 
+def build_admin_forecast_series(commodity_id, municipality_id):
+    """
+    Historical values next to the trained model's backtest and 12-month prediction for one
+    series, as Chart.js arrays. None without historical data or a trained model.
+    """
+    # Monthly totals come from the harvest rollup ("Overall" sums every municipality)
+    df = get_monthly_harvest_frame(commodity_id, municipality_id)
+    print("Historical months for municipality:", municipality_id, len(df))
+        
+    if df.empty:
+        forecast_data = None
+    else:
+        # Prepare forecast data (from trained model)
+        # Load the model from the Spaces bucket in digiocean (cached per process)
+        m = model_registry.get_series_model(commodity_id, municipality_id)
+        if m is None:
+            forecast_data = None
+            print("No trained model found.")
+        else:
+            last_historical_date = df['ds'].max()
+            backtest_start_date = last_historical_date - pd.offsets.MonthBegin(12) if len(df) > 12 else df['ds'].min()
+            
+            future_end_date = last_historical_date + pd.offsets.MonthBegin(12)
+
+            future_months = pd.date_range(start=backtest_start_date, end=future_end_date, freq='MS')
+            future = pd.DataFrame({'ds': future_months})
+            forecast = m.predict(future)
+            
+            all_dates = pd.date_range(start=df['ds'].min(), end=future_end_date, freq='MS')
+            
+            hist_dict = dict(zip(df['ds'], df['y']))
+            forecast_dict = dict(zip(forecast['ds'], forecast['yhat']))
+            
+            # Build aligned arrays for Chart.js
+            all_labels = [d.strftime('%b %Y') for d in all_dates]
+            hist_values = [float(hist_dict.get(d, 0)) if d in hist_dict else None for d in all_dates]
+            forecast_values = [float(forecast_dict.get(d, 0)) if d in forecast_dict else None for d in all_dates]
+            
+            # Combined data for CSV/table (only future forecasts)
+            future_forecast = forecast[forecast['ds'] > last_historical_date]
+            combined_list = list(zip(
+                future_forecast['ds'].dt.strftime('%b %Y').tolist(),
+                future_forecast['yhat'].round(2).tolist(),
+                future_forecast['ds'].dt.month.tolist(),
+                future_forecast['ds'].dt.year.tolist()
+            ))
+
+            print("Historical data points:", sum(1 for v in hist_values if v is not None))
+            print("Forecast data points:", sum(1 for v in forecast_values if v is not None))
+            print("Overlapping timeline created with", len(all_labels), "labels")
+
+            forecast_data = {
+                'all_labels': all_labels,
+                'hist_values': hist_values,
+                'forecast_values': forecast_values,
+                'combined': combined_list,
+            }
+
+    return forecast_data
+
+
 @login_required
 @admin_or_agriculturist_required
 def admin_forecast(request):
@@ -1189,16 +1198,8 @@ def admin_forecast(request):
     
     
     # Only show municipalities with at least 2 months of data for the selected commodity
-    municipality_qs = VerifiedHarvestRecord.objects.filter(commodity_id=selected_commodity_id)
-    municipality_months = {}
-    for muni_id in all_municipalities.values_list('municipality_id', flat=True):
-        muni_records = municipality_qs.filter(municipality_id=muni_id)
-        months = muni_records.values_list('harvest_date', flat=True)
-        month_set = set((d.year, d.month) for d in months if d)
-        if len(month_set) >= 2:
-            municipality_months[muni_id] = True
-
-    municipalities = all_municipalities.filter(municipality_id__in=municipality_months.keys())
+    eligible_series = get_eligible_series([selected_commodity_id], include_overall=False)
+    municipalities = all_municipalities.filter(municipality_id__in=[muni_id for _, muni_id in eligible_series])
 
     now_dt = datetime.now()
     current_year = now_dt.year
@@ -1222,110 +1223,34 @@ def admin_forecast(request):
     
     # Get historical data
     print(type(selected_commodity_id), " : ", selected_commodity_id, type(selected_municipality_id), ':', selected_municipality_id)
+    forecast_data = build_admin_forecast_series(selected_commodity_id, selected_municipality_id)
+    if forecast_data:
+        forecast_data = dict(forecast_data, **{key: json.dumps(forecast_data[key]) for key in ('all_labels', 'hist_values', 'forecast_values')})
 
-    if selected_municipality_id == "14" or selected_municipality_id == 14:
-        # "Overall" selected: do not filter by municipality, sum all
-        qs = VerifiedHarvestRecord.objects.filter(
-            commodity_id=selected_commodity_id,
-        ).values('harvest_date', 'total_weight_kg').order_by('harvest_date')
-        print("Overall selected, not filtering by municipality.", qs)
-    else:
-        qs = VerifiedHarvestRecord.objects.filter(
-            commodity_id=selected_commodity_id,
-            municipality_id=selected_municipality_id
-        ).values('harvest_date', 'total_weight_kg').order_by('harvest_date')
-        print("Filtered by municipality:", selected_municipality_id, qs)
-        
-    if not qs.exists():
-        forecast_data = None
-    else:
-        # Prepare historical data
-        df = pd.DataFrame(list(qs))
-        df = df.rename(columns={'harvest_date': 'ds', 'total_weight_kg': 'y'})
-        df['ds'] = pd.to_datetime(df['ds'])
-        df['ds'] = df['ds'].dt.to_period('M').dt.to_timestamp()
-        df = df.groupby('ds', as_index=False)['y'].sum()
-
-        # Prepare forecast data (from trained model)
-        if selected_municipality_id == "14" or selected_municipality_id == 14:
-            model_filename = f"prophet_{selected_commodity_id}_14.joblib"
-        else:
-            model_filename = f"prophet_{selected_commodity_id}_{selected_municipality_id}.joblib"
-        
-        bucket_path = f"prophet_models/{model_filename}"
-
-        # Check if the model file exists in the Spaces bucket in digiocean
-        if not default_storage.exists(bucket_path):
-            forecast_data = None
-            print("No trained model found.")
-        else:
-            # Open the file from the bucket and load it with joblib
-            with default_storage.open(bucket_path, 'rb') as f:
-                m = joblib.load(f)
-            
-            last_historical_date = df['ds'].max()
-            backtest_start_date = last_historical_date - pd.offsets.MonthBegin(12) if len(df) > 12 else df['ds'].min()
-            
-            future_end_date = last_historical_date + pd.offsets.MonthBegin(12)
+    filter_month = request.GET.get('filter_month')
+    filter_year = request.GET.get('filter_year')
 
-            future_months = pd.date_range(start=backtest_start_date, end=future_end_date, freq='MS')
-            future = pd.DataFrame({'ds': future_months})
-            forecast = m.predict(future)
-            
-            all_dates = pd.date_range(start=df['ds'].min(), end=future_end_date, freq='MS')
-            
-            hist_dict = dict(zip(df['ds'], df['y']))
-            forecast_dict = dict(zip(forecast['ds'], forecast['yhat']))
-            
-            # Build aligned arrays for Chart.js
-            all_labels = [d.strftime('%b %Y') for d in all_dates]
-            hist_values = [float(hist_dict.get(d, 0)) if d in hist_dict else None for d in all_dates]
-            forecast_values = [float(forecast_dict.get(d, 0)) if d in forecast_dict else None for d in all_dates]
-            
-            # Combined data for CSV/table (only future forecasts)
-            future_forecast = forecast[forecast['ds'] > last_historical_date]
-            combined_list = list(zip(
-                future_forecast['ds'].dt.strftime('%b %Y').tolist(),
-                future_forecast['yhat'].round(2).tolist(),
-                future_forecast['ds'].dt.month.tolist(),
-                future_forecast['ds'].dt.year.tolist()
-            ))
+    now = datetime.now()
+    current_year = now.year
+    current_month = now.month
+    months =  Month.objects.order_by('number')
+    if filter_year and int(filter_year) == current_year:
+        months = months.filter(number__gt=now_dt.month)
 
-            print("Historical data points:", sum(1 for v in hist_values if v is not None))
-            print("Forecast data points:", sum(1 for v in forecast_values if v is not None))
-            print("Overlapping timeline created with", len(all_labels), "labels")
+    # Prepare available years for the dropdown
+    current_year = datetime.now().year
+    available_years = [current_year, current_year + 1]
+    if not available_years:
+        available_years = [timezone.now().year]
 
-            forecast_data = {
-                'all_labels': json.dumps(all_labels),
-                'hist_values': json.dumps(hist_values),
-                'forecast_values': json.dumps(forecast_values),
-                'combined': combined_list,
-            }
-    
-        filter_month = request.GET.get('filter_month')
-        filter_year = request.GET.get('filter_year')
-        
-        now = datetime.now()
-        current_year = now.year
-        current_month = now.month
-        months =  Month.objects.order_by('number')
-        if filter_year and int(filter_year) == current_year:
-            months = months.filter(number__gt=now_dt.month)
-
-        # Prepare available years for the dropdown
-        current_year = datetime.now().year
-        available_years = [current_year, current_year + 1]
-        if not available_years:
-            available_years = [timezone.now().year]
-            
-        forecast_value_for_selected_month = None
-        if forecast_data and filter_month and filter_year:
-            for label, value, month_number, year in forecast_data['combined']:
-                month_name, year_str = label.split()
-                if int(filter_year) == int(year_str) and int(filter_month) == datetime.strptime(month_name, "%B").month:
-                    forecast_value_for_selected_month = value
-                    break
-        # Prepare forecast summary per commodity for the selected month/year
+    forecast_value_for_selected_month = None
+    if forecast_data and filter_month and filter_year:
+        for label, value, month_number, year in forecast_data['combined']:
+            month_name, year_str = label.split()
+            if int(filter_year) == int(year_str) and int(filter_month) == datetime.strptime(month_name, "%B").month:
+                forecast_value_for_selected_month = value
+                break
+    # Prepare forecast summary per commodity for the selected month/year
    
     context = get_admin_context(request)
     context.update({
@@ -1347,6 +1272,21 @@ def admin_forecast(request):
     return render(request, 'admin_panel/admin_forecast.html', context)
 
 
+@login_required
+@admin_or_agriculturist_required
+@condition(etag_func=forecast_series_etag)
+def admin_forecast_data(request):
+    """admin_forecast's chart arrays for ?commodity_id=&municipality_id= as JSON."""
+    commodity_id = request.GET.get('commodity_id', '')
+    municipality_id = request.GET.get('municipality_id', '')
+    if not commodity_id.isdigit():
+        return JsonResponse({'error': 'commodity_id is required'}, status=400)
+    series = build_admin_forecast_series(int(commodity_id), int(municipality_id) if municipality_id.isdigit() else 14)
+    response = JsonResponse({'series': series})
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
 @login_required
 @admin_or_agriculturist_required
 @staff_member_required
@@ -1366,8 +1306,8 @@ def save_admin_forecast(request):
     if request.method == 'POST':
         forecast_type = request.POST.get('forecast_type', 'by_month')
         try:
-            userinfo = UserInformation.objects.get(auth_user=request.user)
-            admin_info = AdminInformation.objects.filter(userinfo_id=userinfo).first()
+            userinfo = request.principal.user_info
+            admin_info = request.principal.admin_info if request.principal.admin_id else None
         except (UserInformation.DoesNotExist, AdminInformation.DoesNotExist):
             admin_info = None
 
@@ -1382,31 +1322,35 @@ def save_admin_forecast(request):
             if not (months and years and values and commodity_id):
                 messages.error(request, "Missing forecast data. Please try again.")
                 return redirect('administrator:admin_forecast')
-            commodity = CommodityType.objects.get(pk=commodity_id)
-            municipality = MunicipalityName.objects.get(pk=municipality_id)
+            ref = reference_data.get()
+            commodity = ref.commodities.get(int(commodity_id))
+            municipality = ref.municipalities.get(int(municipality_id))
+            if commodity is None or municipality is None:
+                messages.error(request, "Invalid commodity or municipality selected.")
+                return redirect('administrator:admin_forecast')
             notes = f"Commodity Type: {commodity.name}; Municipality: {municipality.municipality}"
             batch = ForecastBatch.objects.create(
                 generated_by=admin_info,
                 notes=notes,
             )
+            forecast_results = []
             for month, year, value in zip(months, years, values):
                 if not month or not year or not value:
                     continue  # skip incomplete data
-                month_obj = Month.objects.get(number=int(month))
-                avg_weight_per_unit = float(commodity.average_weight_per_unit_kg)
-                forecasted_kg = float(value)
-                forecasted_count_units = forecasted_kg / avg_weight_per_unit if avg_weight_per_unit else None
-                ForecastResult.objects.create(
+                forecast_month = ref.months_by_number.get(int(month))
+                if forecast_month is None:
+                    continue  # skip months that aren't in the Month table
+                forecast_results.append(ForecastResult(
                     batch=batch,
                     commodity=commodity,
-                    forecast_month=month_obj,
+                    forecast_month=forecast_month,
                     forecast_year=int(year),
                     municipality_id=int(municipality_id),
-                    forecasted_amount_kg=forecasted_kg,
-                    forecasted_count_units=forecasted_count_units,
-                    source_data_last_updated=timezone.now(),
-                    seasonal_boost_applied=True,
-                )
+                    forecasted_amount_kg=float(value),
+                    notes=notes,
+                ))
+            # Saved forecasts become the current ones shown on the dashboards
+            save_current_forecasts(forecast_results)
         elif forecast_type == "by_commodity":
             municipality_id = request.POST.get('municipality_id')
             if not municipality_id or municipality_id == 'None':
@@ -1418,9 +1362,9 @@ def save_admin_forecast(request):
             if not (commodity_ids and values and filter_month and filter_year):
                 messages.error(request, "Missing forecast summary data. Please try again.")
                 return redirect('administrator:admin_forecast')
-            try:
-                month_obj = Month.objects.get(number=int(filter_month))
-            except Month.DoesNotExist:
+            ref = reference_data.get()
+            month_obj = ref.months_by_number.get(int(filter_month))
+            if month_obj is None:
                 messages.error(request, "Invalid month selected.")
                 return redirect('administrator:admin_forecast')
             notes = f"Month and Year: {month_obj.name} {filter_year}"
@@ -1428,27 +1372,23 @@ def save_admin_forecast(request):
                 generated_by=admin_info,
                 notes=notes,
             )
+            forecast_results = []
             for commodity_id, value in zip(commodity_ids, values):
                 if not commodity_id or not value:
                     continue
-                try:
-                    commodity = CommodityType.objects.get(pk=commodity_id)
-                except CommodityType.DoesNotExist:
+                commodity = ref.commodities.get(int(commodity_id))
+                if commodity is None:
                     continue
-                avg_weight_per_unit = float(commodity.average_weight_per_unit_kg)
-                forecasted_kg = float(value)
-                forecasted_count_units = forecasted_kg / avg_weight_per_unit if avg_weight_per_unit else None
-                ForecastResult.objects.create(
+                forecast_results.append(ForecastResult(
                     batch=batch,
                     commodity=commodity,
                     forecast_month=month_obj,
                     forecast_year=int(filter_year),
                     municipality_id=int(municipality_id),
-                    forecasted_amount_kg=forecasted_kg,
-                    forecasted_count_units=forecasted_count_units,
-                    source_data_last_updated=timezone.now(),
-                    seasonal_boost_applied=True,
-                )
+                    forecasted_amount_kg=float(value),
+                    notes=notes,
+                ))
+            save_current_forecasts(forecast_results)
         else:
             messages.error(request, "Unknown forecast type.")
             return redirect('administrator:admin_forecast')
@@ -1459,26 +1399,8 @@ def save_admin_forecast(request):
 
 def forecast_csv(request, batch_id):
     batch = get_object_or_404(ForecastBatch, pk=batch_id)
-    results = ForecastResult.objects.filter(batch=batch).select_related('commodity', 'municipality', 'forecast_month')
-    
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = f'attachment; filename="forecast_batch_{batch_id}.csv"'
-
-    writer = csv.writer(response)
-    writer.writerow(['Commodity', 'Municipality', 'Month & Year', 'Forecasted Amount (kg)', 'Forecasted Count (units)', 'Batch ID', 'Generated At'])
-
-    for result in results:
-        writer.writerow([
-            result.commodity.name,
-            result.municipality.municipality,
-            f"{result.forecast_month.name} {result.forecast_year}",
-            round(result.forecasted_amount_kg, 2) or 0,
-            result.forecasted_count_units,
-            result.batch.batch_id if result.batch else '',
-            result.batch.generated_at.strftime('%Y-%m-%d %H:%M') if result.batch else '',
-        ])
-
-    return response
+    results = ForecastResult.objects.filter(batch=batch)
+    return stream_csv(f"forecast_batch_{batch_id}", forecast_batch_rows(batch, results))
 
 
 
@@ -1502,6 +1424,12 @@ def admin_forecastbatchdetails(request, batch_id):
     context.update({'batch': batch, 'results': results})
     return render(request, 'admin_panel/admin_forecastbatchdetails.html', context)
 
+
+def admin_commodity_list_queryset(request):
+    """Commodities listed (and exported) by admin_commodity_list."""
+    return CommodityType.objects.exclude(pk=1).order_by('name')  # Exclude 'Not Listed' commodity and order alphabetically
+
+
 @login_required
 @admin_or_agriculturist_required
 def admin_commodity_list(request):
@@ -1512,12 +1440,10 @@ def admin_commodity_list(request):
         if selected_commodities and bulk_action:
             try:
                 if bulk_action == 'delete':
-                    deleted_count = 0
-                    for commodity_id in selected_commodities:
-                        commodity = CommodityType.objects.get(pk=commodity_id)
-                        if commodity.pk != 1:  # Don't delete 'Not Listed'
-                            commodity.delete()
-                            deleted_count += 1
+                    # Don't delete 'Not Listed'
+                    to_delete = CommodityType.objects.filter(pk__in=selected_commodities).exclude(pk=1)
+                    deleted_count = to_delete.count()
+                    to_delete.delete()
                     
                     if deleted_count > 0:
                         messages.success(request, f'Successfully deleted {deleted_count} commodit{"y" if deleted_count == 1 else "ies"}.')
@@ -1531,9 +1457,10 @@ def admin_commodity_list(request):
                     writer = csv.writer(response)
                     writer.writerow(['Name', 'Average Weight (kg)', 'Years to Mature', 'Years to Bear Fruit', 'Seasonal Months'])
                     
+                    ref = reference_data.get()
                     for commodity_id in selected_commodities:
-                        commodity = CommodityType.objects.get(pk=commodity_id)
-                        seasonal_months = ";".join([month.name for month in commodity.seasonal_months.all()])
+                        commodity = ref.commodities[int(commodity_id)]
+                        seasonal_months = ";".join(ref.seasonal_month_names(commodity_id))
                         writer.writerow([
                             commodity.name,
                             commodity.average_weight_per_unit_kg,
@@ -1552,7 +1479,7 @@ def admin_commodity_list(request):
             if not bulk_action:
                 messages.warning(request, 'Please select an action to perform.')
     
-    commodities = CommodityType.objects.exclude(pk=1).order_by('name')  # Exclude 'Not Listed' commodity and order alphabetically
+    commodities = admin_commodity_list_queryset(request)
     
     # Handle export requests
     export_type = request.GET.get('export')
@@ -1688,6 +1615,8 @@ def admin_commodity_add_edit(request, pk=None):
             
             # Process CSV rows
             row_count = 0
+            # each saved commodity invalidates the registry; the months stay the same for the whole file
+            months_by_name = reference_data.get().months_by_name
             for row_num, row in enumerate(reader, start=2):
                 try:
                     row = {k.strip(): v.strip() for k, v in row.items() if k and k.strip()}
@@ -1819,10 +1748,10 @@ def admin_commodity_add_edit(request, pk=None):
                             invalid_months = []
                             
                             for month_name in months:
-                                try:
-                                    month_obj = Month.objects.get(name__iexact=month_name)
+                                month_obj = months_by_name.get(month_name.lower())
+                                if month_obj:
                                     month_objs.append(month_obj)
-                                except Month.DoesNotExist:
+                                else:
                                     invalid_months.append(month_name)
                             
                             if invalid_months:
@@ -1907,12 +1836,41 @@ def admin_commodity_add_edit(request, pk=None):
     return render(request, 'admin_panel/commodity_add.html', context)
 
 
+def admin_verifyplantrec_queryset(request):
+    """Plant records listed (and exported) by admin_verifyplantrec: the admin's scope, filtered by request.GET."""
+    principal = get_principal(request)
+    municipality_assigned = principal.municipality
+    is_superuser = principal.is_superuser
+    is_pk14 = principal.is_pk14
+    filter_municipality = request.GET.get('municipality')
+    filter_commodity = request.GET.get('commodity')
+    filter_status = request.GET.get('status')
+
+    # Municipality filter logic - always use initPlantRecord for all users
+    records = initPlantRecord.objects.select_related(
+        'commodity_id', 'record_status', 'transaction', 
+        'transaction__account_id__userinfo_id', 'verified_by__userinfo_id'
+    ).order_by('-plant_id')
+
+    if filter_municipality:
+        records = records.filter(transaction__effective_municipality__pk=filter_municipality)
+    elif not (is_superuser or is_pk14):
+        # For non-superuser/non-pk14 users, ensure they only see their municipality records
+        records = records.filter(transaction__effective_municipality=municipality_assigned)
+    
+    if filter_commodity:
+        records = records.filter(commodity_id__pk=filter_commodity)
+    if filter_status:
+        records = records.filter(record_status__pk=filter_status)
+    return records
+
+
 @login_required
 @admin_or_agriculturist_required
 def admin_verifyplantrec(request):
     user = request.user
-    userinfo = UserInformation.objects.get(auth_user=user)
-    admin_info = AdminInformation.objects.get(userinfo_id=userinfo)
+    userinfo = request.principal.user_info
+    admin_info = request.principal.admin_info
     municipality_assigned = admin_info.municipality_incharge
     is_superuser = user.is_superuser
     is_pk14 = municipality_assigned.pk == 14
@@ -1921,39 +1879,11 @@ def admin_verifyplantrec(request):
     filter_commodity = request.GET.get('commodity')
     filter_status = request.GET.get('status')
 
-    # Municipality filter logic - always use initPlantRecord for all users
     if is_superuser or is_pk14:
         municipalities = MunicipalityName.objects.exclude(pk=14)
-        records = initPlantRecord.objects.select_related(
-            'commodity_id', 'record_status', 'transaction', 
-            'transaction__account_id__userinfo_id', 'verified_by__userinfo_id'
-        ).order_by('-plant_id')
     else:
         municipalities = MunicipalityName.objects.filter(pk=municipality_assigned.pk)
-        records = initPlantRecord.objects.select_related(
-            'commodity_id', 'record_status', 'transaction', 
-            'transaction__account_id__userinfo_id', 'verified_by__userinfo_id'
-        ).filter(
-            Q(transaction__farm_land__municipality=municipality_assigned) |
-            Q(transaction__manual_municipality=municipality_assigned)
-        ).order_by('-plant_id')
-
-    if filter_municipality:
-        records = records.filter(
-            Q(transaction__farm_land__municipality__pk=filter_municipality) |
-            Q(transaction__manual_municipality__pk=filter_municipality)
-        )
-    elif not (is_superuser or is_pk14):
-        # For non-superuser/non-pk14 users, ensure they only see their municipality records
-        records = records.filter(
-            Q(transaction__farm_land__municipality=municipality_assigned) |
-            Q(transaction__manual_municipality=municipality_assigned)
-        )
-    
-    if filter_commodity:
-        records = records.filter(commodity_id__pk=filter_commodity)
-    if filter_status:
-        records = records.filter(record_status__pk=filter_status)
+    records = admin_verifyplantrec_queryset(request)
 
     # Pagination
     paginator = Paginator(records, 10)  
@@ -1963,77 +1893,15 @@ def admin_verifyplantrec(request):
     if request.method == "POST":
         selected_ids = request.POST.getlist('selected_records')
         new_status_pk = int(request.POST.get('new_status'))
-        verified_status_pk = 2  # pk for "Verified"
         new_status = AccountStatus.objects.get(pk=new_status_pk)
         
         commodity_municipality_pairs = extract_commodity_municipality_pairs(selected_ids, 'plant')
         
-        all_records = records  # Use the already filtered queryset
-        
-        for rec in all_records.filter(pk__in=selected_ids):
-            # Store old status for logging
-            old_status = rec.record_status.acc_status if rec.record_status else "None"
-            
-            rec.record_status = new_status
-            if not rec.verified_by:
-                rec.verified_by = admin_info
-            rec.save()
-            
-            # Create AdminUserManagement log entry for status change
-            AdminUserManagement.objects.create(
-                admin_id=admin_info,
-                action=f"Plant Record ID {rec.plant_id} changed status from '{old_status}' to '{new_status.acc_status}'",
-                content_type=ContentType.objects.get_for_model(initPlantRecord),
-                object_id=rec.plant_id
-            )
-            
-            # Handle verified record creation and deletion based on status
-            if new_status_pk == verified_status_pk:
-                # Only create VerifiedPlantRecord if status is "Verified" and not already created
-                if not VerifiedPlantRecord.objects.filter(prev_record=rec).exists():
-                    # Get location
-                    if rec.transaction.farm_land:
-                        municipality = rec.transaction.farm_land.municipality
-                        barangay = rec.transaction.farm_land.barangay
-                    else:
-                        municipality = rec.transaction.manual_municipality
-                        barangay = rec.transaction.manual_barangay
-                    # Calculate average and estimated weight
-                    est_weight = (rec.min_expected_harvest + rec.max_expected_harvest) / 2
-                    verified_plant_record = VerifiedPlantRecord.objects.create(
-                        plant_date=rec.plant_date,
-                        commodity_id=rec.commodity_id,
-                        min_expected_harvest=rec.min_expected_harvest,
-                        max_expected_harvest=rec.max_expected_harvest,
-                        estimated_weight_kg=est_weight,
-                        remarks=rec.remarks,
-                        municipality=municipality,
-                        barangay=barangay,
-                        verified_by=admin_info,
-                        prev_record=rec,
-                    )
-                    
-                    AdminUserManagement.objects.create(
-                        admin_id=admin_info,
-                        action=f"Created Verified Plant Record ID {verified_plant_record.id} from Plant Record ID {rec.plant_id}",
-                        content_type=ContentType.objects.get_for_model(VerifiedPlantRecord),
-                        object_id=verified_plant_record.id
-                    )
-            elif new_status_pk == 4:  # Rejected status
-                # Delete any existing VerifiedPlantRecord for this init record
-                verified_records = VerifiedPlantRecord.objects.filter(prev_record=rec)
-                if verified_records.exists():
-                    for verified_record in verified_records:
-                        verified_record_id = verified_record.id
-                        verified_record.delete()
-                        
-                        # Log the deletion of verified plant record
-                        AdminUserManagement.objects.create(
-                            admin_id=admin_info,
-                            action=f"Deleted Verified Plant Record ID {verified_record_id} due to Plant Record ID {rec.plant_id} being rejected",
-                            content_type=ContentType.objects.get_for_model(VerifiedPlantRecord),
-                            object_id=verified_record_id
-                        )
+        try:
+            verify_plant_records(records.filter(pk__in=selected_ids), new_status, admin_info)
+        except Exception as e:
+            logger.error(f"Error during plant verification: {e}")
+            messages.error(request, f"An error occurred during verification: {e}")
                         
         if selected_ids and commodity_municipality_pairs:
             logger.info("Attempting to delay selective retraining Celery task for plant records...")
@@ -2041,10 +1909,11 @@ def admin_verifyplantrec(request):
             retrain_selective_models_task.delay(commodity_municipality_pairs)
             
             # Create user-friendly message about affected areas
-            affected_commodities = list(set([CommodityType.objects.get(commodity_id=pair['commodity_id']).name for pair in commodity_municipality_pairs]))
+            ref = reference_data.get()
+            affected_commodities = list(set([ref.commodity_name(pair['commodity_id']) for pair in commodity_municipality_pairs]))
             # Exclude "Overall" (pk=14) from municipality list in the message
             affected_municipalities = list(set([
-                MunicipalityName.objects.get(municipality_id=pair['municipality_id']).municipality 
+                ref.municipality_name(pair['municipality_id']) 
                 for pair in commodity_municipality_pairs 
                 if pair['municipality_id'] != 14
             ]))
@@ -2100,12 +1969,36 @@ def admin_verifyplantrec(request):
     return render(request, 'admin_panel/admin_verifyplantrec.html', context)
 
 
+def admin_verifyharvestrec_queryset(request):
+    """Harvest records listed (and exported) by admin_verifyharvestrec: the admin's scope, filtered by request.GET."""
+    principal = get_principal(request)
+    is_superuser = principal.is_superuser
+    is_pk14 = principal.is_pk14
+    selected_municipality = request.GET.get('municipality')
+    selected_commodity = request.GET.get('commodity')
+    selected_status = request.GET.get('status')
+
+    records = initHarvestRecord.objects.select_related(
+        'unit', 'commodity_id', 'record_status', 'transaction', 
+        'transaction__account_id__userinfo_id', 'verified_by__userinfo_id'
+    ).order_by('-harvest_id')
+    if selected_municipality:
+        records = records.filter(transaction__effective_municipality__pk=selected_municipality)
+    elif not (is_superuser or is_pk14):
+        records = records.filter(transaction__effective_municipality=principal.municipality)
+    if selected_commodity:
+        records = records.filter(commodity_id__pk=selected_commodity)
+    if selected_status:
+        records = records.filter(record_status__pk=selected_status)
+    return records
+
+
 @login_required
 @admin_or_agriculturist_required
 def admin_verifyharvestrec(request):
     user = request.user
-    userinfo = UserInformation.objects.get(auth_user=user)
-    admin_info = AdminInformation.objects.get(userinfo_id=userinfo)
+    userinfo = request.principal.user_info
+    admin_info = request.principal.admin_info
     is_superuser = user.is_superuser
     is_pk14 = admin_info.municipality_incharge.pk == 14
 
@@ -2122,24 +2015,7 @@ def admin_verifyharvestrec(request):
     commodities = CommodityType.objects.exclude(pk=1).order_by('name')
     status_choices = AccountStatus.objects.filter(acc_stat_id__in=[2, 3, 4, 7])  
 
-    records = initHarvestRecord.objects.select_related(
-        'unit', 'commodity_id', 'record_status', 'transaction', 
-        'transaction__account_id__userinfo_id', 'verified_by__userinfo_id'
-    ).order_by('-harvest_id')
-    if selected_municipality:
-        records = records.filter(
-            Q(transaction__farm_land__municipality__pk=selected_municipality) |
-            Q(transaction__manual_municipality__pk=selected_municipality)
-        )
-    elif not (is_superuser or is_pk14):
-        records = records.filter(
-            Q(transaction__farm_land__municipality=admin_info.municipality_incharge) |
-            Q(transaction__manual_municipality=admin_info.municipality_incharge)
-        )
-    if selected_commodity:
-        records = records.filter(commodity_id__pk=selected_commodity)
-    if selected_status:
-        records = records.filter(record_status__pk=selected_status)
+    records = admin_verifyharvestrec_queryset(request)
 
     # Pagination
     paginator = Paginator(records, 10) 
@@ -2154,86 +2030,19 @@ def admin_verifyharvestrec(request):
         selected_ids = request.POST.getlist('selected_records')
         print(f"DEBUG: Selected IDs: {selected_ids}")
         new_status_pk = int(request.POST.get('new_status'))
-        verified_status_pk = 2  # pk for "Verified"
         new_status = AccountStatus.objects.get(pk=new_status_pk)
         print(f"DEBUG: New status: {new_status.acc_status}")
         
-        all_records = initHarvestRecord.objects.select_related(
-            'unit', 'commodity_id', 'record_status', 'transaction', 
-            'transaction__account_id__userinfo_id', 'verified_by__userinfo_id'
-        )
-        if selected_municipality:
-            all_records = all_records.filter(
-                Q(transaction__farm_land__municipality__pk=selected_municipality) |
-                Q(transaction__manual_municipality__pk=selected_municipality)
-            )
-        elif not (is_superuser or is_pk14):
-            all_records = all_records.filter(
-                Q(transaction__farm_land__municipality=admin_info.municipality_incharge) |
-                Q(transaction__manual_municipality=admin_info.municipality_incharge)
-            )
-        if selected_commodity:
-            all_records = all_records.filter(commodity_id__pk=selected_commodity)
-        if selected_status:
-            all_records = all_records.filter(record_status__pk=selected_status)
-        
         commodity_municipality_pairs = extract_commodity_municipality_pairs(selected_ids, 'harvest')
         print(f"DEBUG: Extracted pairs: {commodity_municipality_pairs}")
         
         verified_records_created = 0
-        
-        for rec in all_records.filter(pk__in=selected_ids):
-            old_status = rec.record_status.acc_status if rec.record_status else "None"
-            
-            rec.record_status = new_status
-            if not rec.verified_by:
-                rec.verified_by = admin_info
-            rec.save()
-            
-            AdminUserManagement.objects.create(
-                admin_id=admin_info,
-                action=f"Harvest Record ID {rec.harvest_id} changed status from '{old_status}' to '{new_status.acc_status}'",
-                content_type=ContentType.objects.get_for_model(initHarvestRecord),
-                object_id=rec.harvest_id
-            )
-            
-            if new_status_pk == verified_status_pk and selected_ids:
-                # Only create VerifiedHarvestRecord if status is "Verified" and not already created
-                if not VerifiedHarvestRecord.objects.filter(prev_record=rec).exists():
-                    try : 
-                        if rec.transaction.farm_land:
-                            municipality = rec.transaction.farm_land.municipality
-                            barangay = rec.transaction.farm_land.barangay
-                        else:
-                            municipality = rec.transaction.manual_municipality
-                            barangay = rec.transaction.manual_barangay
-
-                        # Convert weights to kg before storing
-                        total_weight_kg = convert_to_kg(rec.total_weight, rec.unit.unit_abrv)
-
-                        verified_harvest_record = VerifiedHarvestRecord.objects.create(
-                            harvest_date=rec.harvest_date,
-                            commodity_id=rec.commodity_id,
-                            total_weight_kg=total_weight_kg,
-                            remarks=rec.remarks,
-                            municipality=municipality,
-                            barangay=barangay,
-                            verified_by=admin_info, 
-                            prev_record=rec,
-                        )
-                        verified_records_created += 1
-                        print(f"DEBUG: Created verified record {verified_records_created} for harvest ID {rec.harvest_id}")
-                        
-                        AdminUserManagement.objects.create(
-                            admin_id=admin_info,
-                            action=f"Created Verified Harvest Record ID {verified_harvest_record.id} from Harvest Record ID {rec.harvest_id}",
-                            content_type=ContentType.objects.get_for_model(VerifiedHarvestRecord),
-                            object_id=verified_harvest_record.id
-                        )
-                        
-                    except Exception as e:
-                        logger.error(f"Error during verification: {e}")
-                        messages.error(request, f"An error occurred during verification: {e}")
+        try:
+            summary = verify_harvest_records(records.filter(pk__in=selected_ids), new_status, admin_info)
+            verified_records_created = summary['created']
+        except Exception as e:
+            logger.error(f"Error during verification: {e}")
+            messages.error(request, f"An error occurred during verification: {e}")
                         
         if selected_ids and commodity_municipality_pairs:
             print(f"DEBUG: Triggering selective retraining for {len(commodity_municipality_pairs)} pairs")
@@ -2248,10 +2057,11 @@ def admin_verifyharvestrec(request):
             else:
                 print("DEBUG: Retraining already triggered for this request, skipping")
             
-            affected_commodities = list(set([CommodityType.objects.get(commodity_id=pair['commodity_id']).name for pair in commodity_municipality_pairs]))
+            ref = reference_data.get()
+            affected_commodities = list(set([ref.commodity_name(pair['commodity_id']) for pair in commodity_municipality_pairs]))
             # Exclude "Overall" (pk=14) from municipality list in the message
             affected_municipalities = list(set([
-                MunicipalityName.objects.get(municipality_id=pair['municipality_id']).municipality 
+                ref.municipality_name(pair['municipality_id']) 
                 for pair in commodity_municipality_pairs 
                 if pair['municipality_id'] != 14
             ]))
@@ -2274,22 +2084,6 @@ def admin_verifyharvestrec(request):
                 else:
                     messages.success(request, f"Records updated. Forecast models for {len(affected_commodities)} commodities and Overall are being updated in the background.")
                 
-        # Handle rejected records
-        rejected_records = all_records.filter(pk__in=selected_ids, record_status__pk=4)
-        for rec in rejected_records:
-            verified_records = VerifiedHarvestRecord.objects.filter(prev_record=rec)
-            if verified_records.exists():
-                for verified_record in verified_records:
-                    verified_record_id = verified_record.id
-                    verified_record.delete()
-                    
-                    AdminUserManagement.objects.create(
-                        admin_id=admin_info,
-                        action=f"Deleted Verified Harvest Record ID {verified_record_id} due to Harvest Record ID {rec.harvest_id} being rejected",
-                        content_type=ContentType.objects.get_for_model(VerifiedHarvestRecord),
-                        object_id=verified_record_id
-                    )
-
         return redirect('administrator:admin_verifyharvestrec')
     else:
         if request.method == 'POST':
@@ -2321,11 +2115,82 @@ def admin_verifyharvestrec(request):
     })
     return render(request, 'admin_panel/admin_verifyharvestrec.html', context)
 
+def report_csv_import(request, summary):
+    """Turns a HarvestCSVImporter summary into the messages shown on the upload page, and starts retraining."""
+    created_count = summary['created']
+    error_count = summary['errors']
+    error_details = summary['error_details']
+
+    if created_count > 0:
+        messages.success(request, f'Successfully created {created_count} harvest record{"s" if created_count > 1 else ""} from CSV upload.')
+        
+        csv_commodity_municipality_pairs = summary['pairs']
+        if csv_commodity_municipality_pairs:
+            try:
+                retrain_selective_models_task.delay(csv_commodity_municipality_pairs)
+                
+                ref = reference_data.get()
+                affected_commodities = sorted({ref.commodity_name(pair['commodity_id']) for pair in csv_commodity_municipality_pairs})
+                affected_municipalities = sorted({ref.municipality_name(pair['municipality_id']) for pair in csv_commodity_municipality_pairs})
+                
+                if len(affected_commodities) <= 3 and len(affected_municipalities) <= 3:
+                    commodities_str = ", ".join(affected_commodities)
+                    municipalities_str = ", ".join(affected_municipalities) 
+                    messages.info(request, f'Forecast models for {commodities_str} in {municipalities_str} and Overall are being updated in the background.')
+                else:
+                    messages.info(request, f'Forecast models for {len(affected_commodities)} commodities in {len(affected_municipalities)} municipalities and Overall are being updated in the background.')
+            except Exception as e:
+                messages.warning(request, f'Records created successfully, but selective forecast regeneration failed: {str(e)}. Full retraining initiated.')
+                retrain_and_generate_forecasts_task.delay()
+        else:
+            try:
+                retrain_and_generate_forecasts_task.delay()
+                messages.info(request, 'Model retraining and forecast generation has been initiated in the background.')
+            except Exception as e:
+                messages.warning(request, f'Records created successfully, but forecast regeneration failed: {str(e)}')
+    
+    if error_count > 0:
+        messages.error(request, f"Failed to process {error_count} row{'s' if error_count > 1 else ''} due to errors:")
+        for error_detail in error_details[:10]: 
+            messages.error(request, error_detail)
+        # error_details is capped by the importer, error_count is not
+        hidden_count = max(error_count, len(error_details)) - 10
+        if hidden_count > 0:
+            messages.error(request, f"... and {hidden_count} more errors.")
+            
+    if created_count == 0 and error_count == 0:
+        messages.warning(request, "No data was processed from the CSV file.")
+
+
+@login_required
+@admin_or_agriculturist_required
+def admin_csv_import_status(request, task_id):
+    """Progress of a background CSV import, polled by the upload page."""
+    from celery.result import AsyncResult
+
+    admin_info = request.principal.admin_info
+    result = AsyncResult(task_id)
+    info = result.info if isinstance(result.info, dict) else {}
+    # Unknown ids stay PENDING; only the admin who uploaded the file sees its rows
+    if info and info.get('admin_id') != admin_info.admin_id:
+        return JsonResponse({'error': 'Import not found'}, status=404)
+
+    data = {'state': result.state}
+    if result.state in ('PROGRESS', 'SUCCESS'):
+        data.update({key: info.get(key) for key in (
+            'rows', 'created', 'errors', 'bytes_read', 'total_bytes', 'header_errors',
+        )})
+        data['error_details'] = (info.get('error_details') or [])[:10]
+    elif result.state == 'FAILURE':
+        data['error'] = str(result.info)
+    return JsonResponse(data)
+
+
 @login_required
 @admin_or_agriculturist_required
 def admin_add_verifyharvestrec(request):
     municipalities = MunicipalityName.objects.all()
-    admin_info = AdminInformation.objects.get(userinfo_id=request.user.userinformation)
+    admin_info = request.principal.admin_info
     admin_municipality_id = admin_info.municipality_incharge.municipality_id
     context = get_admin_context(request)
     context.update({
@@ -2336,9 +2201,7 @@ def admin_add_verifyharvestrec(request):
 
     if request.method == "POST" and request.FILES.get("csv_file"):
         csv_file = request.FILES["csv_file"]
-        created_count = 0
-        error_count = 0
-        error_details = []
+        import_task_id = None
         
         # Check file size (limit to 50MB only)
         max_file_size = 50 * 1024 * 1024  # 50MB
@@ -2354,321 +2217,27 @@ def admin_add_verifyharvestrec(request):
             return render(request, 'admin_panel/verifyharvest_add.html', context)
         
         try:
-            file_content = csv_file.read()
-            decoded_file = None
-            
-            # List of encodings to try in order
-            encodings = ['utf-8-sig', 'utf-8', 'latin-1', 'cp1252', 'iso-8859-1']
-            
-            for encoding in encodings:
-                try:
-                    decoded_file = file_content.decode(encoding)
-                    break
-                except UnicodeDecodeError:
-                    continue
-            
-            if decoded_file is None:
-                raise UnicodeDecodeError("Unable to decode file with any supported encoding")
-                
-            reader = csv.DictReader(io.StringIO(decoded_file))
-            
-            # Determine required headers based on admin's municipality assignment
-            is_overall_admin = admin_municipality_id == 14
-            has_municipality_column = 'municipality' in reader.fieldnames
-            
-            if is_overall_admin:
-                # Overall admin must have municipality column
-                required_headers = ['harvest_date', 'commodity', 'municipality', 'total_weight_kg']
-                if not has_municipality_column:
-                    messages.error(request, "Overall administrators must include the 'municipality' column in the CSV file. Please add municipality information to your CSV and try again.")
-                    context = get_admin_context(request)
-                    context.update({
-                        'municipalities': municipalities, 
-                        'form': VerifiedHarvestRecordForm(user=request.user),
-                        'admin_municipality_id': admin_municipality_id,
-                        'is_overall_admin': True
-                    })
-                    return render(request, 'admin_panel/verifyharvest_add.html', context)
-            else:
-                # Non-overall admin - municipality column is optional
-                if has_municipality_column:
-                    required_headers = ['harvest_date', 'commodity', 'municipality', 'total_weight_kg']
-                else:
-                    required_headers = ['harvest_date', 'commodity', 'total_weight_kg']
-            
-            # Check if required headers exist
-            if not all(header in reader.fieldnames for header in required_headers):
-                missing_headers = [h for h in required_headers if h not in reader.fieldnames]
-                messages.error(request, f"CSV file is missing required headers: {', '.join(missing_headers)}. Please check the template format.")
+            importer = HarvestCSVImporter(admin_info)
+            run_in_background = csv_file.size > BACKGROUND_IMPORT_BYTES
+            summary = None
+            with csv_rows(csv_file) as reader:
+                header_errors = importer.header_errors(reader.fieldnames)
+                if not header_errors and not run_in_background:
+                    print(f"Processing CSV upload of {csv_file.size:,} bytes...")
+                    summary = importer.run(reader)
+
+            if header_errors:
+                for error in header_errors:
+                    messages.error(request, error)
+            elif run_in_background:
+                csv_file.seek(0)
+                path = default_storage.save(f"csv_imports/{get_random_string(16)}.csv", csv_file)
+                task = import_harvest_csv_task.delay(path, admin_info.admin_id)
+                import_task_id = task.id
+                messages.info(request, f"Your file ({csv_file.size / (1024*1024):.1f}MB) is being imported in the background. You can follow its progress below.")
             else:
-                row_count = sum(1 for _ in csv.DictReader(io.StringIO(decoded_file)))
-                max_rows = 10000  
-                
-                if row_count > max_rows:
-                    messages.error(request, f"CSV file contains {row_count:,} rows, which exceeds the maximum allowed limit of {max_rows:,} rows. Please split your file into smaller chunks and upload them separately.")
-                    context = get_admin_context(request)
-                    context.update({
-                        'municipalities': municipalities, 
-                        'form': VerifiedHarvestRecordForm(user=request.user),
-                        'admin_municipality_id': admin_municipality_id,
-                        'is_overall_admin': admin_municipality_id == 14
-                    })
-                    return render(request, 'admin_panel/verifyharvest_add.html', context)
-                
-                print(f"Processing CSV with {row_count:,} rows...")
-                
-                if not is_overall_admin and has_municipality_column:
-                    admin_municipality_name = admin_info.municipality_incharge.municipality
-                    invalid_municipalities = []
-                    
-                    # Check all rows for municipality validation before processing any
-                    temp_reader = csv.DictReader(io.StringIO(decoded_file))
-                    for row_num, row in enumerate(temp_reader, start=2):
-                        row = {k.strip(): v.strip() for k, v in row.items()}
-                        municipality_name = row.get('municipality', '').strip()
-                        
-                        if municipality_name:
-                            # Handle special case for Balanga/Balanga City
-                            if municipality_name.lower() == 'balanga':
-                                municipality_name = 'Balanga City'
-                            
-                            if municipality_name.lower() != admin_municipality_name.lower():
-                                invalid_municipalities.append(f"Row {row_num}: '{municipality_name}'")
-                    
-                    if invalid_municipalities:
-                        messages.error(request, f"You can only upload harvest records for your assigned municipality ({admin_municipality_name}). Please remove the following rows with different municipalities:")
-                        for invalid_muni in invalid_municipalities[:10]:  # Show first 10
-                            messages.error(request, invalid_muni)
-                        if len(invalid_municipalities) > 10:
-                            messages.error(request, f"... and {len(invalid_municipalities) - 10} more rows.")
-                        
-                        context = get_admin_context(request)
-                        context.update({
-                            'municipalities': municipalities, 
-                            'form': VerifiedHarvestRecordForm(user=request.user),
-                            'admin_municipality_id': admin_municipality_id,
-                            'is_overall_admin': False
-                        })
-                        return render(request, 'admin_panel/verifyharvest_add.html', context)
-                
-                reader = csv.DictReader(io.StringIO(decoded_file))
-                
-                # Track commodity-municipality pairs for selective retraining
-                csv_commodity_municipality_pairs = []
-                
-                print(f"Pre-caching lookup data for {sum(1 for _ in csv.DictReader(io.StringIO(decoded_file)))} rows...")
-                
-                commodity_cache = {}
-                for commodity in CommodityType.objects.all():
-                    commodity_cache[commodity.name.lower()] = commodity
-                
-                municipality_cache = {}
-                for municipality in MunicipalityName.objects.all():
-                    municipality_cache[municipality.municipality.lower()] = municipality
-                
-                barangay_cache = {}
-                for barangay in BarangayName.objects.select_related('municipality_id').all():
-                    muni_key = barangay.municipality_id.municipality.lower()
-                    if muni_key not in barangay_cache:
-                        barangay_cache[muni_key] = {}
-                    barangay_cache[muni_key][barangay.barangay.lower()] = barangay
-                
-                print("Lookup data cached. Processing CSV rows...")
-                
-                records_to_create = []
-                admin_logs_to_create = []
-                
-                reader = csv.DictReader(io.StringIO(decoded_file))
-                
-                for row_num, row in enumerate(reader, start=2):
-                    try:
-                        row = {k.strip(): v.strip() for k, v in row.items()}
-                        
-                        # Validate required fields
-                        if not row.get("harvest_date"):
-                            error_details.append(f"Row {row_num}: Harvest date is required")
-                            error_count += 1
-                            continue
-                            
-                        if not row.get("commodity"):
-                            error_details.append(f"Row {row_num}: Commodity is required")
-                            error_count += 1
-                            continue
-                            
-                        # Municipality validation based on admin type
-                        if has_municipality_column:
-                            if not row.get("municipality"):
-                                error_details.append(f"Row {row_num}: Municipality is required when municipality column is present")
-                                error_count += 1
-                                continue
-                        elif not is_overall_admin:
-                            # For non-overall admins without municipality column, use their assigned municipality
-                            pass 
-                        
-                        if not row.get("total_weight_kg"):
-                            error_details.append(f"Row {row_num}: Total weight is required")
-                            error_count += 1
-                            continue
-                        
-                        # Validate and parse harvest date with multiple formats
-                        harvest_date = None
-                        date_formats = ["%Y-%m-%d", "%d/%m/%Y", "%m/%d/%Y"]
-                        
-                        for date_format in date_formats:
-                            try:
-                                harvest_date = datetime.strptime(row["harvest_date"], date_format).date()
-                                break
-                            except ValueError:
-                                continue
-                        
-                        if harvest_date is None:
-                            error_details.append(f"Row {row_num}: Invalid harvest date format. Use YYYY-MM-DD or DD/MM/YYYY format")
-                            error_count += 1
-                            continue
-                        
-                        # Validate harvest date cant ve in the future
-                        if harvest_date > date.today():
-                            error_details.append(f"Row {row_num}: Harvest date ({harvest_date}) cannot be in the future")
-                            error_count += 1
-                            continue
-                        
-                        try:
-                            total_weight_kg = float(row["total_weight_kg"])
-                            if total_weight_kg <= 0:
-                                raise ValueError("Weight must be positive")
-                        except (ValueError, TypeError):
-                            error_details.append(f"Row {row_num}: Invalid total weight - must be a positive number")
-                            error_count += 1
-                            continue
-                        
-                        commodity_name = row['commodity'].strip()
-                        commodity_obj = commodity_cache.get(commodity_name.lower())
-                        if not commodity_obj:
-                            error_details.append(f"Row {row_num}: Commodity '{commodity_name}' does not exist in database")
-                            error_count += 1
-                            continue
-                        
-                        if has_municipality_column:
-                            municipality_name = row['municipality'].strip()
-                            
-                            # Handle special case for Balanga/Balanga City
-                            if municipality_name.lower() == 'balanga':
-                                municipality_name = 'Balanga City'
-                            
-                            municipality = municipality_cache.get(municipality_name.lower())
-                            if not municipality:
-                                error_details.append(f"Row {row_num}: Municipality '{municipality_name}' does not exist in database")
-                                error_count += 1
-                                continue
-                        else:
-                            municipality = admin_info.municipality_incharge
-                        
-                        barangay_name = row.get("barangay", "").strip()
-                        barangay = None
-                        if barangay_name:
-                            muni_barangays = barangay_cache.get(municipality.municipality.lower(), {})
-                            barangay = muni_barangays.get(barangay_name.lower())
-                            if not barangay:
-                                error_details.append(f"Row {row_num}: Barangay '{barangay_name}' not found in '{municipality.municipality}'. Record will be created without barangay")
-                        
-                        verified_harvest_record = VerifiedHarvestRecord(
-                            harvest_date=harvest_date,
-                            commodity_id=commodity_obj,
-                            total_weight_kg=total_weight_kg,
-                            municipality=municipality,
-                            barangay=barangay,
-                            remarks=row.get("remarks", ""),
-                            date_verified=timezone.now(),
-                            verified_by=admin_info,
-                            prev_record=None,
-                        )
-                        records_to_create.append(verified_harvest_record)
-                        
-                        pair = {'commodity_id': commodity_obj.commodity_id, 'municipality_id': municipality.municipality_id}
-                        if pair not in csv_commodity_municipality_pairs:
-                            csv_commodity_municipality_pairs.append(pair)
-                        
-                        if len(records_to_create) >= 500:  
-                            with transaction.atomic():
-                                created_records = VerifiedHarvestRecord.objects.bulk_create(records_to_create)
-                                created_count += len(created_records)
-                                
-                                for record in created_records:
-                                    admin_logs_to_create.append(AdminUserManagement(
-                                        admin_id=admin_info,
-                                        action=f"Created Verified Harvest Record ID {record.id} via CSV upload - {record.commodity_id.name} ({record.total_weight_kg}kg) from {record.municipality.municipality}",
-                                        content_type=ContentType.objects.get_for_model(VerifiedHarvestRecord),
-                                        object_id=record.id
-                                    ))
-                                
-                                if admin_logs_to_create:
-                                    AdminUserManagement.objects.bulk_create(admin_logs_to_create)
-                                    admin_logs_to_create.clear()
-                                
-                                records_to_create.clear()
-                                print(f"Processed batch: {created_count} records created so far...")
-                        
-                    except Exception as e:
-                        error_details.append(f"Row {row_num}: Unexpected error - {str(e)}")
-                        error_count += 1
-                        continue
-                
-                if records_to_create:
-                    with transaction.atomic():
-                        created_records = VerifiedHarvestRecord.objects.bulk_create(records_to_create)
-                        created_count += len(created_records)
-                        
-                        # Create admin logs for final batch
-                        for record in created_records:
-                            admin_logs_to_create.append(AdminUserManagement(
-                                admin_id=admin_info,
-                                action=f"Created Verified Harvest Record ID {record.id} via CSV upload - {record.commodity_id.name} ({record.total_weight_kg}kg) from {record.municipality.municipality}",
-                                content_type=ContentType.objects.get_for_model(VerifiedHarvestRecord),
-                                object_id=record.id
-                            ))
-                        
-                        # Bulk create final admin logs
-                        if admin_logs_to_create:
-                            AdminUserManagement.objects.bulk_create(admin_logs_to_create)
-                
-                print(f"CSV processing completed: {created_count} records created, {error_count} errors")
-                
-                if created_count > 0:
-                    messages.success(request, f'Successfully created {created_count} harvest record{"s" if created_count > 1 else ""} from CSV upload.')
-                    
-                    if hasattr(locals(), 'csv_commodity_municipality_pairs') and csv_commodity_municipality_pairs:
-                        try:
-                            retrain_selective_models_task.delay(csv_commodity_municipality_pairs)
-                            
-                            affected_commodities = list(set([CommodityType.objects.get(commodity_id=pair['commodity_id']).name for pair in csv_commodity_municipality_pairs]))
-                            affected_municipalities = list(set([MunicipalityName.objects.get(municipality_id=pair['municipality_id']).municipality for pair in csv_commodity_municipality_pairs]))
-                            
-                            if len(affected_commodities) <= 3 and len(affected_municipalities) <= 3:
-                                commodities_str = ", ".join(affected_commodities)
-                                municipalities_str = ", ".join(affected_municipalities) 
-                                messages.info(request, f'Forecast models for {commodities_str} in {municipalities_str} and Overall are being updated in the background.')
-                            else:
-                                messages.info(request, f'Forecast models for {len(affected_commodities)} commodities in {len(affected_municipalities)} municipalities and Overall are being updated in the background.')
-                        except Exception as e:
-                            messages.warning(request, f'Records created successfully, but selective forecast regeneration failed: {str(e)}. Full retraining initiated.')
-                            retrain_and_generate_forecasts_task.delay()
-                    else:
-                        try:
-                            retrain_and_generate_forecasts_task.delay()
-                            messages.info(request, 'Model retraining and forecast generation has been initiated in the background.')
-                        except Exception as e:
-                            messages.warning(request, f'Records created successfully, but forecast regeneration failed: {str(e)}')
-                
-                if error_count > 0:
-                    messages.error(request, f"Failed to process {error_count} row{'s' if error_count > 1 else ''} due to errors:")
-                    for error_detail in error_details[:10]: 
-                        messages.error(request, error_detail)
-                    if len(error_details) > 10:
-                        messages.error(request, f"... and {len(error_details) - 10} more errors.")
-                        
-                if created_count == 0 and error_count == 0:
-                    messages.warning(request, "No data was processed from the CSV file.")
-                    
+                report_csv_import(request, summary)
+
         except Exception as e:
             if "decode" in str(e).lower() or "encoding" in str(e).lower():
                 messages.error(request, f"Error reading CSV file: The file contains characters that cannot be read properly. Please save your CSV file using UTF-8 encoding or try a different file format. Error details: {str(e)}")
@@ -2681,7 +2250,8 @@ def admin_add_verifyharvestrec(request):
             'municipalities': municipalities, 
             'form': VerifiedHarvestRecordForm(user=request.user),
             'admin_municipality_id': admin_municipality_id,
-            'is_overall_admin': admin_municipality_id == 14
+            'is_overall_admin': admin_municipality_id == 14,
+            'import_task_id': import_task_id,
         })
         return render(request, 'admin_panel/verifyharvest_add.html', context)
 
@@ -2753,12 +2323,51 @@ def admin_add_verifyharvestrec(request):
     return render(request, 'admin_panel/verifyharvest_add.html', context)
 
 
+def admin_harvestverified_queryset(request):
+    """Verified harvest records listed (and exported) by admin_harvestverified: the admin's scope, filtered and sorted by request.GET."""
+    principal = get_principal(request)
+    is_superuser = principal.is_superuser
+    is_pk14 = principal.is_pk14
+    municipality_filter = request.GET.get('municipality')
+    barangay_filter = request.GET.get('barangay')
+    commodity_filter = request.GET.get('commodity')
+    date_from = request.GET.get('date_from')
+    date_to = request.GET.get('date_to')
+    sort_by = request.GET.get('sort', 'date_verified')
+    order = request.GET.get('order', 'desc')
+
+    records = VerifiedHarvestRecord.objects.select_related('commodity_id', 'municipality', 'barangay', 'verified_by__userinfo_id')
+    
+    if municipality_filter:
+        records = records.filter(municipality_id=municipality_filter)
+    elif not (is_superuser or is_pk14):
+        records = records.filter(municipality=principal.municipality)
+    if barangay_filter:
+        records = records.filter(barangay_id=barangay_filter)
+    if commodity_filter:
+        records = records.filter(commodity_id=commodity_filter)
+    if date_from:
+        records = records.filter(harvest_date__gte=date_from)
+    if date_to:
+        records = records.filter(harvest_date__lte=date_to)
+    
+    sort_fields = {
+        'harvest_date': 'harvest_date',
+        'date_verified': 'date_verified',
+    }
+    
+    if sort_by in sort_fields:
+        order_prefix = '-' if order == 'desc' else ''
+        return records.order_by(f"{order_prefix}{sort_fields[sort_by]}")
+    return records.order_by('-date_verified')
+
+
 @login_required
 @admin_or_agriculturist_required
 def admin_harvestverified(request):
     user = request.user
-    userinfo = UserInformation.objects.get(auth_user=user)
-    admin_info = AdminInformation.objects.get(userinfo_id=userinfo)
+    userinfo = request.principal.user_info
+    admin_info = request.principal.admin_info
     is_superuser = user.is_superuser
     is_pk14 = admin_info.municipality_incharge.pk == 14
     
@@ -2819,8 +2428,9 @@ def admin_harvestverified(request):
                         try:
                             retrain_selective_models_task.delay(delete_commodity_municipality_pairs)
                             
-                            affected_commodities = list(set([CommodityType.objects.get(commodity_id=pair['commodity_id']).name for pair in delete_commodity_municipality_pairs]))
-                            affected_municipalities = list(set([MunicipalityName.objects.get(municipality_id=pair['municipality_id']).municipality for pair in delete_commodity_municipality_pairs]))
+                            ref = reference_data.get()
+                            affected_commodities = list(set([ref.commodity_name(pair['commodity_id']) for pair in delete_commodity_municipality_pairs]))
+                            affected_municipalities = list(set([ref.municipality_name(pair['municipality_id']) for pair in delete_commodity_municipality_pairs]))
                             
                             if len(affected_commodities) <= 3 and len(affected_municipalities) <= 3:
                                 commodities_str = ", ".join(affected_commodities)
@@ -2854,31 +2464,7 @@ def admin_harvestverified(request):
     
     commodities = CommodityType.objects.exclude(pk=1).order_by('name')
     
-    records = VerifiedHarvestRecord.objects.select_related('commodity_id', 'municipality', 'barangay', 'verified_by__userinfo_id')
-    
-    if municipality_filter:
-        records = records.filter(municipality_id=municipality_filter)
-    elif not (is_superuser or is_pk14):
-        records = records.filter(municipality=admin_info.municipality_incharge)
-    if barangay_filter:
-        records = records.filter(barangay_id=barangay_filter)
-    if commodity_filter:
-        records = records.filter(commodity_id=commodity_filter)
-    if date_from:
-        records = records.filter(harvest_date__gte=date_from)
-    if date_to:
-        records = records.filter(harvest_date__lte=date_to)
-    
-    sort_fields = {
-        'harvest_date': 'harvest_date',
-        'date_verified': 'date_verified',
-    }
-    
-    if sort_by in sort_fields:
-        order_prefix = '-' if order == 'desc' else ''
-        records = records.order_by(f"{order_prefix}{sort_fields[sort_by]}")
-    else:
-        records = records.order_by('-date_verified')  
+    records = admin_harvestverified_queryset(request)
     
     # Pagination
     paginator = Paginator(records, 10) 
@@ -2927,8 +2513,8 @@ def admin_harvestverified_view(request, record_id):
         record = get_object_or_404(VerifiedHarvestRecord, pk=record_id)
         
         try:
-            current_user_info = request.user.userinformation
-            current_admin_info = AdminInformation.objects.get(userinfo_id=current_user_info)
+            current_user_info = request.principal.user_info
+            current_admin_info = request.principal.admin_info
             current_municipality_assigned = current_admin_info.municipality_incharge
             is_superuser = request.user.is_superuser
             is_pk14 = current_municipality_assigned.pk == 14
@@ -2962,8 +2548,8 @@ def admin_harvestverified_edit(request, record_id):
         record = get_object_or_404(VerifiedHarvestRecord, pk=record_id)
         
         try:
-            current_user_info = request.user.userinformation
-            current_admin_info = AdminInformation.objects.get(userinfo_id=current_user_info)
+            current_user_info = request.principal.user_info
+            current_admin_info = request.principal.admin_info
             current_municipality_assigned = current_admin_info.municipality_incharge
             is_superuser = request.user.is_superuser
             is_pk14 = current_municipality_assigned.pk == 14
@@ -2998,7 +2584,7 @@ def admin_harvestverified_edit(request, record_id):
                 })
                 return render(request, 'admin_panel/admin_harvestverified_edit.html', context)
             
-            admin_info = AdminInformation.objects.get(userinfo_id=request.user.userinformation)
+            admin_info = request.principal.admin_info
             
             original_data = {
                 'harvest_date': record.harvest_date,
@@ -3092,9 +2678,9 @@ def admin_account_detail(request, account_id):
     - Agriculturist: Full access to their own account only, blocked from viewing others
     """
     try:
-        current_user_info = request.user.userinformation
-        current_account = AccountsInformation.objects.get(userinfo_id=current_user_info)
-        current_admin_info = AdminInformation.objects.filter(userinfo_id=current_user_info).first()
+        current_user_info = request.principal.user_info
+        current_account = request.principal.account_info
+        current_admin_info = request.principal.admin_info if request.principal.admin_id else None
         current_municipality_assigned = current_admin_info.municipality_incharge if current_admin_info else None
         is_superuser = request.user.is_superuser
         is_pk14 = current_municipality_assigned.pk == 14 if current_municipality_assigned else False
@@ -3355,282 +2941,128 @@ def admin_account_detail(request, account_id):
         print("Error: Account not found in admin_account_detail")
         return redirect('administrator:show_allaccounts')
     
+# URL name of an admin list page -> function rebuilding the queryset it exports from a request
+# (its GET filters and the admin's scope), so a PDF can be rendered elsewhere from plain parameters
+EXPORT_QUERYSETS = {
+    'verify_accounts': verify_accounts_queryset,
+    'show_allaccounts': show_allaccounts_queryset,
+    'admin_commodity_list': admin_commodity_list_queryset,
+    'admin_verifyplantrec': admin_verifyplantrec_queryset,
+    'admin_verifyharvestrec': admin_verifyharvestrec_queryset,
+    'admin_harvestverified': admin_harvestverified_queryset,
+}
+
+
+def pdf_report(request, generator, queryset, filename):
+    """
+    Admin PDF export of queryset by the named generate_*_pdf function. ReportLab tables of
+    thousands of rows take too long for a request, so the PDF is rendered by a Celery worker and
+    stored; the same export by the same admin is served from storage until the records change.
+    The worker gets the list page and its filters and rebuilds the queryset itself.
+    """
+    page = getattr(getattr(request, 'resolver_match', None), 'url_name', None)
+    if not PDF_AVAILABLE or page not in EXPORT_QUERYSETS:
+        return globals()[generator](queryset, filename, request)
+
+    from dashboard.reports import report_response
+
+    params = request.GET.copy()
+    params.pop('page', None)
+    payload = {
+        'generator': generator,
+        'page': page,
+        'params': params.urlencode(),
+        'user_id': request.user.pk,
+        'municipality_id': get_principal(request).municipality_id,
+        'filename': filename,
+    }
+    return report_response(
+        request, 'admin', payload, report_version(), f"{filename}.pdf",
+        'administrator', 'admin_login/layout.html', extra_context=get_admin_context(request),
+    )
+
+
+def render_admin_report(payload):
+    """PDF bytes of an admin export; runs in the render_report_task worker."""
+    from types import SimpleNamespace
+    from django.http import QueryDict
+
+    # the queryset builders and generators only read the filters and the admin's scope from the request
+    request = SimpleNamespace(user=AuthUser.objects.get(pk=payload['user_id']), GET=QueryDict(payload['params']))
+    queryset = EXPORT_QUERYSETS[payload['page']](request)
+    response = globals()[payload['generator']](queryset, payload['filename'], request)
+    return response.content
+
+
+@login_required
+@admin_or_agriculturist_required
+def admin_report_status(request, kind, key):
+    from dashboard.reports import report_status
+
+    if kind != 'admin':
+        return JsonResponse({'error': 'Unknown report'}, status=404)
+    return JsonResponse(report_status(kind, key, request.GET.get('task_id')))
+
+
+@login_required
+@admin_or_agriculturist_required
+def admin_report_download(request, kind, key):
+    from dashboard.reports import report_file_response
+
+    if kind != 'admin':
+        return JsonResponse({'error': 'Unknown report'}, status=404)
+    return report_file_response(kind, key, request.GET.get('filename') or 'report.pdf')
+
 def export_commodity_records_csv(commodities, filename, format_type='csv', request=None):
     """Export commodity records to CSV or PDF format"""
     if format_type == 'csv':
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = f'attachment; filename="{filename}.csv"'
-        
-        writer = csv.writer(response)
-        writer.writerow([
-            'name', 'average_weight_per_unit_kg', 'seasonal_months', 'years_to_mature', 'years_to_bearfruit'
-        ])
-        
-        for commodity in commodities:
-            seasonal_months = ";".join([month.name for month in commodity.seasonal_months.all()])
-            writer.writerow([
-                commodity.name,
-                commodity.average_weight_per_unit_kg,
-                seasonal_months,
-                commodity.years_to_mature or '',
-                commodity.years_to_bearfruit or ''
-            ])
-        
-        return response
+        return stream_csv(filename, commodity_rows(commodities))
     elif format_type == 'pdf':
-        return generate_commodity_records_pdf(commodities, filename, request)
+        return pdf_report(request, 'generate_commodity_records_pdf', commodities, filename)
 
 def export_commodity_summary_csv(commodities, filename, format_type='csv', request=None):
     """Export commodity summary to CSV or PDF format"""
     if format_type == 'csv':
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = f'attachment; filename="{filename}.csv"'
-        
-        seasonal_summary = {}
-        maturity_summary = {}
-        
-        for commodity in commodities:
-            seasons = [month.name for month in commodity.seasonal_months.all()]
-            season_key = ", ".join(seasons) if seasons else "No seasons specified"
-            
-            if season_key not in seasonal_summary:
-                seasonal_summary[season_key] = {'count': 0, 'avg_weight': 0, 'commodities': []}
-            
-            seasonal_summary[season_key]['count'] += 1
-            seasonal_summary[season_key]['avg_weight'] += float(commodity.average_weight_per_unit_kg)
-            seasonal_summary[season_key]['commodities'].append(commodity.name)
-            
-            maturity = commodity.years_to_mature or 0
-            maturity_key = f"{maturity} years" if maturity > 0 else "Not specified"
-            
-            if maturity_key not in maturity_summary:
-                maturity_summary[maturity_key] = {'count': 0, 'commodities': []}
-            
-            maturity_summary[maturity_key]['count'] += 1
-            maturity_summary[maturity_key]['commodities'].append(commodity.name)
-        
-        writer = csv.writer(response)
-        
-        writer.writerow(['Seasonal Summary'])
-        writer.writerow(['Seasonal Period', 'Number of Commodities', 'Average Weight (kg)', 'Commodities'])
-        for season, data in seasonal_summary.items():
-            avg_weight = data['avg_weight'] / data['count'] if data['count'] > 0 else 0
-            commodities_list = ", ".join(data['commodities'][:5])  # Show first 5
-            if len(data['commodities']) > 5:
-                commodities_list += f" and {len(data['commodities']) - 5} more"
-            writer.writerow([season, data['count'], f"{avg_weight:.2f}", commodities_list])
-        
-        writer.writerow([])  
-        
-        writer.writerow(['Maturity Summary'])
-        writer.writerow(['Years to Mature', 'Number of Commodities', 'Commodities'])
-        for maturity, data in maturity_summary.items():
-            commodities_list = ", ".join(data['commodities'][:5])
-            if len(data['commodities']) > 5:
-                commodities_list += f" and {len(data['commodities']) - 5} more"
-            writer.writerow([maturity, data['count'], commodities_list])
-        
-        return response
+        return stream_csv(filename, commodity_summary_rows(commodities))
     elif format_type == 'pdf':
-        return generate_commodity_summary_pdf(commodities, filename, request)
+        return pdf_report(request, 'generate_commodity_summary_pdf', commodities, filename)
 
 def export_harvest_records_csv(records, filename, format_type='csv', request=None):
     """Export harvest records to CSV or PDF format"""
     if format_type == 'csv':
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = f'attachment; filename="{filename}.csv"'
-        
-        writer = csv.writer(response)
-        writer.writerow([
-            'Date Created', 'Farmer Name', 'Commodity', 'Harvest Date', 
-            'Total Weight (kg)', 'Estimated Hectare', 'Location', 'Status', 'Verified By', 'Date Verified'
-        ])
-        
-        for record in records:
-            estimated_hectare = 0
-            if record.transaction.location_type == 'farm_land' and record.transaction.farm_land:
-                estimated_hectare = record.transaction.farm_land.estimated_area or 0
-            
-            weight_kg = convert_to_kg(record.total_weight, record.unit.unit_abrv)
-            
-            writer.writerow([
-                record.transaction.transaction_date.strftime('%Y-%m-%d %H:%M'),
-                f"{record.transaction.account_id.userinfo_id.lastname}, {record.transaction.account_id.userinfo_id.firstname}",
-                record.commodity_id.name,
-                record.harvest_date.strftime('%Y-%m-%d'),
-                f"{weight_kg:.2f}",
-                f"{estimated_hectare:.2f}",
-                record.transaction.get_location_display(),
-                record.record_status.acc_status if record.record_status else 'N/A',
-                f"{record.verified_by.userinfo_id.lastname}, {record.verified_by.userinfo_id.firstname}" if record.verified_by else 'Not Verified',
-                record.date_verified.strftime('%Y-%m-%d %H:%M') if record.date_verified else 'Not Verified'
-            ])
-        
-        return response
+        return stream_csv(filename, harvest_record_rows(records))
     elif format_type == 'pdf':
-        return generate_harvest_records_pdf(records, filename, request)
+        return pdf_report(request, 'generate_harvest_records_pdf', records, filename)
 
 def export_harvest_records_summary_csv(records, filename, format_type='csv', request=None):
     """Export harvest records summary to CSV or PDF format"""
     if format_type == 'csv':
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = f'attachment; filename="{filename}.csv"'
-        
-        summary_data = {}
-        for record in records:
-            commodity = record.commodity_id.name
-            location = record.transaction.get_location_display()
-            key = f"{commodity} - {location}"
-            
-            if key not in summary_data:
-                summary_data[key] = {
-                    'commodity': commodity,
-                    'location': location,
-                    'total_records': 0,
-                    'total_weight': 0,
-                    'total_hectare': 0,
-                    'verified_count': 0,
-                    'pending_count': 0
-                }
-            
-            summary_data[key]['total_records'] += 1
-            
-            weight_kg = convert_to_kg(record.total_weight, record.unit.unit_abrv)
-            summary_data[key]['total_weight'] += weight_kg
-            
-            if record.transaction.location_type == 'farm_land' and record.transaction.farm_land:
-                summary_data[key]['total_hectare'] += record.transaction.farm_land.estimated_area or 0
-            
-            if record.record_status and record.record_status.acc_status == 'Verified':
-                summary_data[key]['verified_count'] += 1
-            else:
-                summary_data[key]['pending_count'] += 1
-        
-        writer = csv.writer(response)
-        writer.writerow([
-            'Commodity', 'Location', 'Total Records', 'Total Weight (kg)', 'Total Estimated Hectare',
-            'Verified Records', 'Pending Records'
-        ])
-        
-        for data in summary_data.values():
-            writer.writerow([
-                data['commodity'],
-                data['location'],
-                data['total_records'],
-                f"{data['total_weight']:.2f}",
-                f"{data['total_hectare']:.2f}",
-                data['verified_count'],
-                data['pending_count']
-            ])
-        
-        return response
+        return stream_csv(filename, harvest_summary_rows(records))
     elif format_type == 'pdf':
-        return generate_harvest_records_summary_pdf(records, filename, request)
+        return pdf_report(request, 'generate_harvest_records_summary_pdf', records, filename)
 
 def export_plant_records_csv(records, filename, format_type='csv', request=None):
     """Export plant records to CSV or PDF format"""
     if format_type == 'csv':
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = f'attachment; filename="{filename}.csv"'
-        
-        writer = csv.writer(response)
-        writer.writerow([
-            'Date Created', 'Farmer Name', 'Commodity', 'Plant Date', 
-            'Min Expected (kg)', 'Max Expected (kg)', 'Estimated Hectare', 'Location', 'Status', 'Verified By', 'Date Verified'
-        ])
-        
-        for record in records:
-            estimated_hectare = 0
-            if record.transaction.location_type == 'farm_land' and record.transaction.farm_land:
-                estimated_hectare = record.transaction.farm_land.estimated_area or 0
-            
-            writer.writerow([
-                record.transaction.transaction_date.strftime('%Y-%m-%d %H:%M'),
-                f"{record.transaction.account_id.userinfo_id.lastname}, {record.transaction.account_id.userinfo_id.firstname}",
-                record.commodity_id.name,
-                record.plant_date.strftime('%Y-%m-%d'),
-                record.min_expected_harvest,
-                record.max_expected_harvest,
-                f"{estimated_hectare:.2f}",
-                record.transaction.get_location_display(),
-                record.record_status.acc_status if record.record_status else 'N/A',
-                f"{record.verified_by.userinfo_id.lastname}, {record.verified_by.userinfo_id.firstname}" if record.verified_by else 'Not Verified',
-                record.date_verified.strftime('%Y-%m-%d %H:%M') if record.date_verified else 'Not Verified'
-            ])
-        
-        return response
+        return stream_csv(filename, plant_record_rows(records))
     elif format_type == 'pdf':
-        return generate_plant_records_pdf(records, filename, request)
+        return pdf_report(request, 'generate_plant_records_pdf', records, filename)
 
 def export_plant_records_summary_csv(records, filename, format_type='csv', request=None):
     """Export plant records summary to CSV or PDF format"""
     if format_type == 'csv':
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = f'attachment; filename="{filename}.csv"'
-        
-        summary_data = {}
-        for record in records:
-            commodity = record.commodity_id.name
-            location = record.transaction.get_location_display()
-            key = f"{commodity} - {location}"
-            
-            if key not in summary_data:
-                summary_data[key] = {
-                    'commodity': commodity,
-                    'location': location,
-                    'total_records': 0,
-                    'total_expected_min': 0,
-                    'total_expected_max': 0,
-                    'total_hectare': 0,
-                    'verified_count': 0,
-                    'pending_count': 0
-                }
-            
-            summary_data[key]['total_records'] += 1
-            summary_data[key]['total_expected_min'] += float(record.min_expected_harvest)
-            summary_data[key]['total_expected_max'] += float(record.max_expected_harvest)
-            
-            if record.transaction.location_type == 'farm_land' and record.transaction.farm_land:
-                summary_data[key]['total_hectare'] += record.transaction.farm_land.estimated_area or 0
-            
-            if record.record_status and record.record_status.acc_status == 'Verified':
-                summary_data[key]['verified_count'] += 1
-            else:
-                summary_data[key]['pending_count'] += 1
-        
-        writer = csv.writer(response)
-        writer.writerow([
-            'Commodity', 'Location', 'Total Records', 'Total Min Expected (kg)', 'Total Max Expected (kg)', 'Total Estimated Hectare',
-            'Verified Records', 'Pending Records'
-        ])
-        
-        for data in summary_data.values():
-            writer.writerow([
-                data['commodity'],
-                data['location'],
-                data['total_records'],
-                f"{data['total_expected_min']:.2f}",
-                f"{data['total_expected_max']:.2f}",
-                f"{data['total_hectare']:.2f}",
-                data['verified_count'],
-                data['pending_count']
-            ])
-        
-        return response
+        return stream_csv(filename, plant_summary_rows(records))
     elif format_type == 'pdf':
-        return generate_plant_records_summary_pdf(records, filename, request)
+        return pdf_report(request, 'generate_plant_records_summary_pdf', records, filename)
 
 def export_accounts_csv(accounts, filename, format_type='csv', request=None):
     """Export accounts to CSV or PDF format"""
     if format_type == 'csv':
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = f'attachment; filename="{filename}.csv"'
-        
         assigned_municipality = None
         if request and request.user.is_authenticated:
             try:
-                user_info = UserInformation.objects.get(auth_user=request.user)
-                admin_info = AdminInformation.objects.get(userinfo_id=user_info)
+                user_info = get_principal(request).user_info
+                admin_info = get_principal(request).admin_info
                 municipality_assigned = admin_info.municipality_incharge
                 is_superuser = request.user.is_superuser
                 is_pk14 = municipality_assigned.pk == 14
@@ -3640,193 +3072,30 @@ def export_accounts_csv(accounts, filename, format_type='csv', request=None):
             except (UserInformation.DoesNotExist, AdminInformation.DoesNotExist):
                 pass
         
-        writer = csv.writer(response)
-        writer.writerow([
-            'Account ID', 'Full Name', 'Email', 'Contact Number', 'Municipality', 'Barangay',
-            'Account Type', 'Status', 'Registration Date', 'Verified Date', 'Verified By',
-            'Records in Assigned Municipality', 'Farmland Area in Municipality (ha)'
-        ])
-        
-        for account in accounts:
-            # Format contact number as string and handle empty values
-            contact_number = account.userinfo_id.contact_number
-            if contact_number:
-                contact_number_str = str(contact_number)
-            else:
-                contact_number_str = "Not provided"
-            
-            records_count = 0
-            total_farmland_area = 0
-            
-            if assigned_municipality:
-                records_count = RecordTransaction.objects.filter(
-                    account_id=account
-                ).filter(
-                    Q(farm_land__municipality=assigned_municipality) |
-                    Q(manual_municipality=assigned_municipality)
-                ).count()
-                
-                farmlands = FarmLand.objects.filter(
-                    userinfo_id=account.userinfo_id,
-                    municipality=assigned_municipality
-                )
-                total_farmland_area = sum(f.estimated_area or 0 for f in farmlands)
-            else:
-                records_count = RecordTransaction.objects.filter(account_id=account).count()
-                farmlands = FarmLand.objects.filter(userinfo_id=account.userinfo_id)
-                total_farmland_area = sum(f.estimated_area or 0 for f in farmlands)
-                
-            writer.writerow([
-                account.account_id,
-                f"{account.userinfo_id.lastname}, {account.userinfo_id.firstname} {account.userinfo_id.middlename}".strip(),
-                account.userinfo_id.user_email,
-                contact_number_str,
-                account.userinfo_id.municipality_id.municipality,
-                account.userinfo_id.barangay_id.barangay,
-                account.account_type_id.account_type,
-                account.acc_status_id.acc_status,
-                account.account_register_date.strftime('%Y-%m-%d %H:%M') if account.account_register_date else 'N/A',
-                account.account_verified_date.strftime('%Y-%m-%d %H:%M') if account.account_verified_date else 'Not Verified',
-                f"{account.account_verified_by.userinfo_id.lastname}, {account.account_verified_by.userinfo_id.firstname}" if account.account_verified_by else 'Not Verified',
-                records_count,
-                f"{total_farmland_area:.2f}"
-            ])
-        
-        return response
+        return stream_csv(filename, account_rows(accounts, assigned_municipality))
     elif format_type == 'pdf':
-        return generate_accounts_pdf(accounts, filename, request)
+        return pdf_report(request, 'generate_accounts_pdf', accounts, filename)
 
 def export_accounts_summary_csv(accounts, filename, format_type='csv', request=None):
     """Export accounts summary to CSV or PDF format"""
     if format_type == 'csv':
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = f'attachment; filename="{filename}.csv"'
-        
-        # Group by municipality and status for summary
-        summary_data = {}
-        for account in accounts:
-            municipality = account.userinfo_id.municipality_id.municipality
-            status = account.acc_status_id.acc_status
-            account_type = account.account_type_id.account_type
-            key = f"{municipality} - {account_type}"
-            
-            if key not in summary_data:
-                summary_data[key] = {
-                    'municipality': municipality,
-                    'account_type': account_type,
-                    'total_accounts': 0,
-                    'verified_count': 0,
-                    'pending_count': 0,
-                    'rejected_count': 0,
-                    'other_count': 0
-                }
-            
-            summary_data[key]['total_accounts'] += 1
-            
-            if status == 'Verified':
-                summary_data[key]['verified_count'] += 1
-            elif status == 'Pending':
-                summary_data[key]['pending_count'] += 1
-            elif status == 'Rejected':
-                summary_data[key]['rejected_count'] += 1
-            else:
-                summary_data[key]['other_count'] += 1
-        
-        writer = csv.writer(response)
-        writer.writerow([
-            'Municipality', 'Account Type', 'Total Accounts', 'Verified', 'Pending', 'Rejected', 'Other'
-        ])
-        
-        for data in summary_data.values():
-            writer.writerow([
-                data['municipality'],
-                data['account_type'],
-                data['total_accounts'],
-                data['verified_count'],
-                data['pending_count'],
-                data['rejected_count'],
-                data['other_count']
-            ])
-        
-        return response
+        return stream_csv(filename, account_summary_rows(accounts))
     elif format_type == 'pdf':
-        return generate_accounts_summary_pdf(accounts, filename, request)
+        return pdf_report(request, 'generate_accounts_summary_pdf', accounts, filename)
 
 def export_verified_harvest_records_csv(records, filename, format_type='csv', request=None):
     """Export verified harvest records to CSV or PDF format"""
     if format_type == 'csv':
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = f'attachment; filename="{filename}.csv"'
-        
-        writer = csv.writer(response)
-        writer.writerow([
-            'Record ID', 'Commodity', 'Harvest Date', 'Total Weight (kg)',
-            'Municipality', 'Barangay', 'Date Verified', 'Verified By', 'Remarks'
-        ])
-        
-        for record in records:
-            writer.writerow([
-                record.id,
-                record.commodity_id.name,
-                record.harvest_date.strftime('%Y-%m-%d'),
-                record.total_weight_kg,
-                record.municipality.municipality if record.municipality else 'N/A',
-                record.barangay.barangay if record.barangay else 'N/A',
-                record.date_verified.strftime('%Y-%m-%d %H:%M'),
-                f"{record.verified_by.userinfo_id.lastname}, {record.verified_by.userinfo_id.firstname}" if record.verified_by else 'N/A',
-                record.remarks or 'No remarks'
-            ])
-        
-        return response
+        return stream_csv(filename, verified_harvest_rows(records))
     elif format_type == 'pdf':
-        return generate_verified_harvest_records_pdf(records, filename, request)
+        return pdf_report(request, 'generate_verified_harvest_records_pdf', records, filename)
 
 def export_verified_harvest_records_summary_csv(records, filename, format_type='csv', request=None):
     """Export verified harvest records summary to CSV or PDF format grouped by commodity, municipality, and month/year"""
     if format_type == 'csv':
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = f'attachment; filename="{filename}.csv"'
-        
-        # Group by commodity, municipality, and month/year for summary
-        summary_data = {}
-        for record in records:
-            commodity = record.commodity_id.name
-            municipality = record.municipality.municipality if record.municipality else 'Unknown'
-            # Format date as YYYY-MM-01 (first day of the month/year)
-            month_year = record.harvest_date.strftime('%Y-%m-01')
-            key = f"{commodity} - {municipality} - {month_year}"
-            
-            if key not in summary_data:
-                summary_data[key] = {
-                    'harvest_date': month_year,
-                    'commodity': commodity,
-                    'municipality': municipality,
-                    'total_weight': 0,
-                    'total_records': 0
-                }
-            
-            summary_data[key]['total_records'] += 1
-            summary_data[key]['total_weight'] += float(record.total_weight_kg)
-        
-        writer = csv.writer(response)
-        writer.writerow([
-            'harvest_date', 'commodity', 'municipality', 'total_weight_kg'
-        ])
-        
-        # Sort by harvest_date, then commodity, then municipality
-        sorted_data = sorted(summary_data.values(), key=lambda x: (x['harvest_date'], x['commodity'], x['municipality']))
-        
-        for data in sorted_data:
-            writer.writerow([
-                data['harvest_date'],
-                data['commodity'],
-                data['municipality'],
-                f"{data['total_weight']:.2f}"
-            ])
-        
-        return response
+        return stream_csv(filename, verified_harvest_summary_rows(records))
     elif format_type == 'pdf':
-        return generate_verified_harvest_records_summary_pdf(records, filename, request)
+        return pdf_report(request, 'generate_verified_harvest_records_summary_pdf', records, filename)
 
 def generate_harvest_records_pdf(records, filename, request=None):
     """Generate PDF for harvest records"""
@@ -3864,8 +3133,8 @@ def generate_harvest_records_pdf(records, filename, request=None):
     
     if request and request.user.is_authenticated:
         try:
-            user_info = UserInformation.objects.get(auth_user=request.user)
-            admin_info = AdminInformation.objects.get(userinfo_id=user_info)
+            user_info = get_principal(request).user_info
+            admin_info = get_principal(request).admin_info
             municipality_assigned = admin_info.municipality_incharge
             is_superuser = request.user.is_superuser
             is_pk14 = municipality_assigned.pk == 14
@@ -3994,8 +3263,8 @@ def generate_harvest_records_summary_pdf(records, filename, request=None):
     else:
         if request and request.user.is_authenticated:
             try:
-                user_info = UserInformation.objects.get(auth_user=request.user)
-                admin_info = AdminInformation.objects.get(userinfo_id=user_info)
+                user_info = get_principal(request).user_info
+                admin_info = get_principal(request).admin_info
                 municipality_assigned = admin_info.municipality_incharge
                 is_superuser = request.user.is_superuser
                 is_pk14 = municipality_assigned.pk == 14
@@ -4119,8 +3388,8 @@ def generate_plant_records_pdf(records, filename, request=None):
     
     elif request and request.user.is_authenticated:
         try:
-            user_info = UserInformation.objects.get(auth_user=request.user)
-            admin_info = AdminInformation.objects.get(userinfo_id=user_info)
+            user_info = get_principal(request).user_info
+            admin_info = get_principal(request).admin_info
             municipality_assigned = admin_info.municipality_incharge
             is_superuser = request.user.is_superuser
             is_pk14 = municipality_assigned.pk == 14
@@ -4358,8 +3627,8 @@ def generate_accounts_pdf(accounts, filename, request=None):
     assigned_municipality = None
     if request and request.user.is_authenticated:
         try:
-            user_info = UserInformation.objects.get(auth_user=request.user)
-            admin_info = AdminInformation.objects.get(userinfo_id=user_info)
+            user_info = get_principal(request).user_info
+            admin_info = get_principal(request).admin_info
             municipality_assigned = admin_info.municipality_incharge
             is_superuser = request.user.is_superuser
             is_pk14 = municipality_assigned.pk == 14
@@ -4387,10 +3656,8 @@ def generate_accounts_pdf(accounts, filename, request=None):
         
         if assigned_municipality:
             records_count = RecordTransaction.objects.filter(
-                account_id=account
-            ).filter(
-                Q(farm_land__municipality=assigned_municipality) |
-                Q(manual_municipality=assigned_municipality)
+                account_id=account,
+                effective_municipality=assigned_municipality
             ).count()
             
             farmlands = FarmLand.objects.filter(
@@ -4851,8 +4118,9 @@ def generate_commodity_records_pdf(commodities, filename, request=None):
     
     data = [['Name', 'Avg Weight (kg)', 'Seasonal Months', 'Years to Mature', 'Years to Bear Fruit']]
     
+    ref = reference_data.get()
     for commodity in commodities:
-        seasonal_months = ", ".join([month.name for month in commodity.seasonal_months.all()])
+        seasonal_months = ", ".join(ref.seasonal_month_names(commodity.pk))
         data.append([
             commodity.name,
             f"{commodity.average_weight_per_unit_kg:.3f}",
@@ -4924,9 +4192,10 @@ def generate_commodity_summary_pdf(commodities, filename, request=None):
     seasonal_summary = {}
     maturity_summary = {}
     
+    ref = reference_data.get()
     for commodity in commodities:
         # Group by seasonal months
-        seasons = [month.name for month in commodity.seasonal_months.all()]
+        seasons = ref.seasonal_month_names(commodity.pk)
         season_key = ", ".join(seasons) if seasons else "No seasons specified"
         
         if season_key not in seasonal_summary:
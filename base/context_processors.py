@@ -1,17 +1,15 @@
-from .models import AccountsInformation
 from django.utils import timezone
+from .principal import get_principal
 
 def user_role_id(request):
     user_role_id = None
     current_account_id = None
     account_id = request.session.get('account_id')
     if request.user.is_authenticated and account_id:
-        try:
-            accinfo = AccountsInformation.objects.get(account_id=account_id)
-            user_role_id = accinfo.account_type_id.account_type_id
-            current_account_id = accinfo.account_id
-        except AccountsInformation.DoesNotExist:
-            pass
+        principal = get_principal(request)
+        if principal.account_id is not None:
+            user_role_id = principal.account_type_id
+            current_account_id = principal.account_id
     return {
         'user_role_id': user_role_id,
         'current_account_id': current_account_id
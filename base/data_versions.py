@@ -0,0 +1,33 @@
+import uuid
+from django.utils import timezone
+
+
+def data_version(name):
+    """Current token of a DataVersion (one primary key lookup; created on first use)."""
+    from .models import DataVersion
+
+    version, _ = DataVersion.objects.get_or_create(pk=name, defaults={'token': uuid.uuid4().hex})
+    return version.token
+
+
+def bump_data_version(name):
+    """
+    Gives a DataVersion a new random token. Tokens are never reused, so nothing keyed by an
+    older token can be mistaken for current, in this process or any other.
+    """
+    from .models import DataVersion
+
+    token = uuid.uuid4().hex
+    if not DataVersion.objects.filter(pk=name).update(token=token, changed_at=timezone.now()):
+        DataVersion.objects.get_or_create(pk=name, defaults={'token': token})
+    return token
+
+
+def bump_data_versions(names):
+    """
+    bump_data_version for several names with one UPDATE. Names without a row yet are left alone:
+    nothing can be keyed by their token before data_version creates it.
+    """
+    from .models import DataVersion
+
+    DataVersion.objects.filter(pk__in=list(names)).update(token=uuid.uuid4().hex, changed_at=timezone.now())
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+from base.models import RecordTransaction
+
+
+class Command(BaseCommand):
+    help = 'Recompute effective_municipality / effective_barangay of every record transaction'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--account', type=int, help='Only recompute the transactions of this account id')
+
+    def handle(self, *args, **options):
+        queryset = RecordTransaction.objects.all()
+        if options['account']:
+            queryset = queryset.filter(account_id=options['account'])
+
+        updated = RecordTransaction.sync_effective_locations(queryset)
+        missing = queryset.filter(effective_municipality__isnull=True).count()
+
+        self.stdout.write(self.style.SUCCESS(f"Updated {updated} record transactions"))
+        if missing:
+            self.stdout.write(self.style.WARNING(f"{missing} transactions have no farm land or manual municipality"))
+        # run: python manage.py backfill_effective_location
@@ -1,10 +1,9 @@
-from django.core.management.base import BaseCommand
-from django.utils import timezone
-from dashboard.models import Notification
+from django.core.management.base import BaseCommand, CommandError
+from base.notifications import DELIVERY_BATCH_SIZE, deliver_due_notifications, due_notifications
 
 
 class Command(BaseCommand):
-    help = 'Process scheduled notifications that are due for delivery'
+    help = 'Process scheduled notifications that are due for delivery (also run every 5 minutes by Celery beat)'
 
     def add_arguments(self, parser):
         parser.add_argument(
@@ -12,46 +11,28 @@ class Command(BaseCommand):
             action='store_true',
             help='Show what notifications would be processed without actually processing them'
         )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=DELIVERY_BATCH_SIZE,
+            help='Notifications claimed and delivered per UPDATE'
+        )
 
     def handle(self, *args, **options):
-        current_time = timezone.now()
-         
-        due_notifications = Notification.objects.filter(
-            scheduled_for__lte=current_time,
-            is_read=False,  
-            notification_type="fruit_recommendation"
-        )
-        
         if options['dry_run']:
-            self.stdout.write(f"DRY RUN: Found {due_notifications.count()} notifications due for processing")
-            for notification in due_notifications:
-                self.stdout.write(
-                    f"Would process: {notification.account.userinfo_id.firstname} "
-                    f"{notification.account.userinfo_id.lastname} - {notification.message[:50]}..."
-                )
+            due = due_notifications().values_list('account__userinfo_id__firstname', 'account__userinfo_id__lastname', 'message')
+            self.stdout.write(f"DRY RUN: Found {due.count()} notifications due for processing")
+            for firstname, lastname, message in due.iterator():
+                self.stdout.write(f"Would process: {firstname} {lastname} - {message[:50]}...")
             return
-        
-        processed_count = 0
-        for notification in due_notifications:
-            try:
 
-                notification.created_at = current_time
-                notification.save()
-                
-                processed_count += 1
-                self.stdout.write(
-                    f"Processed notification for {notification.account.userinfo_id.firstname} "
-                    f"{notification.account.userinfo_id.lastname}"
-                )
-            except Exception as e:
-                self.stdout.write(
-                    self.style.ERROR(
-                        f"Error processing notification {notification.id}: {e}"
-                    )
-                )
-        
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size must be at least 1")
+
+        processed_count = deliver_due_notifications(options['batch_size'])
+
         self.stdout.write(
             self.style.SUCCESS(
                 f"Successfully processed {processed_count} scheduled notifications"
             )
-        )
\ No newline at end of file
+        )
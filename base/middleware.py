@@ -0,0 +1,16 @@
+from django.utils.functional import SimpleLazyObject
+from .principal import resolve_principal
+
+
+class PrincipalMiddleware:
+    """
+    Sets request.principal (see base.principal.Principal). Lazy, so requests that never look
+    at it pay nothing; those that do resolve it at most once.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.principal = SimpleLazyObject(lambda: resolve_principal(request))
+        return self.get_response(request)
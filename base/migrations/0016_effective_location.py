@@ -0,0 +1,59 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:01
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import F, OuterRef, Q, Subquery
+
+
+def backfill_effective_location(apps, schema_editor):
+    """Same rules as RecordTransaction.sync_effective_locations, on the historical models."""
+    RecordTransaction = apps.get_model('base', 'RecordTransaction')
+    FarmLand = apps.get_model('base', 'FarmLand')
+    from_farm_land = Q(farm_land__isnull=False) & (Q(location_type='farm_land') | Q(manual_municipality__isnull=True))
+    farm_land = FarmLand.objects.filter(pk=OuterRef('farm_land'))
+
+    RecordTransaction.objects.exclude(from_farm_land).update(
+        effective_municipality=F('manual_municipality'),
+        effective_barangay=F('manual_barangay'),
+    )
+    RecordTransaction.objects.filter(from_farm_land).update(
+        effective_municipality=Subquery(farm_land.values('municipality')[:1]),
+        effective_barangay=Subquery(farm_land.values('barangay')[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0015_alter_userinformation_religion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recordtransaction',
+            name='effective_barangay',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='effective_transactions', to='base.barangayname'),
+        ),
+        migrations.AddField(
+            model_name='recordtransaction',
+            name='effective_municipality',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='effective_transactions', to='base.municipalityname'),
+        ),
+        migrations.RunPython(backfill_effective_location, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='initharvestrecord',
+            index=models.Index(fields=['record_status', 'transaction'], name='harvestrec_status_trans_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='initplantrecord',
+            index=models.Index(fields=['record_status', 'transaction'], name='plantrec_status_trans_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recordtransaction',
+            index=models.Index(fields=['effective_municipality', 'transaction_date'], name='rectrans_eff_muni_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recordtransaction',
+            index=models.Index(fields=['account_id', 'effective_municipality'], name='rectrans_acct_eff_muni_idx'),
+        ),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models import F, OuterRef, Q, Subquery
 from django.conf import settings
 from django.utils import timezone
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager
@@ -152,6 +153,13 @@ class FarmLand(models.Model):
     municipality = models.ForeignKey(MunicipalityName, on_delete=models.CASCADE)
     barangay = models.ForeignKey(BarangayName,on_delete=models.CASCADE)
     estimated_area = models.FloatField(null=True,blank=True)
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        # Records located at this farm land follow it when it moves
+        RecordTransaction.objects.filter(farm_land=self).filter(
+            Q(location_type='farm_land') | Q(manual_municipality__isnull=True)
+        ).update(effective_municipality=self.municipality_id, effective_barangay=self.barangay_id)
     
     def __str__(self):
         if self.estimated_area:
@@ -216,6 +224,45 @@ class RecordTransaction (models.Model):
     farm_land = models.ForeignKey(FarmLand, null=True, blank=True, on_delete=models.SET_NULL)
     manual_municipality = models.ForeignKey(MunicipalityName, null=True, blank=True, on_delete=models.SET_NULL)
     manual_barangay = models.ForeignKey(BarangayName, null=True, blank=True, on_delete=models.SET_NULL)
+    # where the record actually is (farm land's location or the manual one), kept in sync on save
+    # so municipality-scoped lists can filter one indexed column instead of OR-ing two joins
+    effective_municipality = models.ForeignKey(MunicipalityName, null=True, blank=True, on_delete=models.SET_NULL, related_name='effective_transactions', editable=False)
+    effective_barangay = models.ForeignKey(BarangayName, null=True, blank=True, on_delete=models.SET_NULL, related_name='effective_transactions', editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['effective_municipality', 'transaction_date'], name='rectrans_eff_muni_date_idx'),
+            models.Index(fields=['account_id', 'effective_municipality'], name='rectrans_acct_eff_muni_idx'),
+        ]
+
+    def resolve_effective_location(self):
+        """(municipality_id, barangay_id) of the farm land for farm land records, else of the manual location."""
+        if self.farm_land_id and (self.location_type == 'farm_land' or not self.manual_municipality_id):
+            return self.farm_land.municipality_id, self.farm_land.barangay_id
+        return self.manual_municipality_id, self.manual_barangay_id
+
+    def save(self, *args, **kwargs):
+        self.effective_municipality_id, self.effective_barangay_id = self.resolve_effective_location()
+        if kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = set(kwargs['update_fields']) | {'effective_municipality', 'effective_barangay'}
+        super().save(*args, **kwargs)
+
+    @classmethod
+    def sync_effective_locations(cls, queryset=None):
+        """Recomputes the effective location of many transactions with two UPDATE statements."""
+        queryset = cls.objects.all() if queryset is None else queryset
+        from_farm_land = Q(farm_land__isnull=False) & (Q(location_type='farm_land') | Q(manual_municipality__isnull=True))
+        farm_land = FarmLand.objects.filter(pk=OuterRef('farm_land'))
+
+        updated = queryset.exclude(from_farm_land).update(
+            effective_municipality=F('manual_municipality'),
+            effective_barangay=F('manual_barangay'),
+        )
+        updated += queryset.filter(from_farm_land).update(
+            effective_municipality=Subquery(farm_land.values('municipality')[:1]),
+            effective_barangay=Subquery(farm_land.values('barangay')[:1]),
+        )
+        return updated
     
     def get_location_display(self):
         if self.location_type == 'farm_land' and self.farm_land:
@@ -241,6 +288,11 @@ class initPlantRecord(models.Model):
     verified_by = models.ForeignKey(AdminInformation, on_delete=models.CASCADE, null=True, blank=True)
     date_verified = models.DateTimeField(default=timezone.now, null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['record_status', 'transaction'], name='plantrec_status_trans_idx'),
+        ]
+
 class initHarvestRecord(models.Model):
     harvest_id = models.BigAutoField(primary_key=True)
     transaction = models.ForeignKey(RecordTransaction, on_delete=models.CASCADE)
@@ -254,3 +306,18 @@ class initHarvestRecord(models.Model):
     remarks = models.TextField(blank=True)
     verified_by = models.ForeignKey(AdminInformation, on_delete=models.CASCADE, null=True, blank=True)
     date_verified = models.DateTimeField(default=timezone.now, null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['record_status', 'transaction'], name='harvestrec_status_trans_idx'),
+        ]
+
+class DataVersion(models.Model):
+    # Version tokens shared by every process (web workers and Celery); caches and stored files
+    # keyed by one are rebuilt everywhere as soon as any process bumps it (see base/data_versions.py)
+    name = models.CharField(max_length=50, primary_key=True)
+    token = models.CharField(max_length=32)
+    changed_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name}: {self.token}"
@@ -0,0 +1,54 @@
+from django.db import transaction
+from django.utils import timezone
+
+# Scheduled notifications that are re-dated on delivery so they show up as new in the panel
+SCHEDULED_NOTIFICATION_TYPES = ('fruit_recommendation',)
+DELIVERY_BATCH_SIZE = 500
+
+
+def due_notifications(now=None):
+    """Scheduled notifications whose time has come and that haven't been delivered yet."""
+    from dashboard.models import Notification
+
+    return Notification.objects.filter(
+        scheduled_for__lte=now or timezone.now(),
+        delivered_at__isnull=True,
+        notification_type__in=SCHEDULED_NOTIFICATION_TYPES,
+    )
+
+
+def deliver_notification_batch(now=None, batch_size=DELIVERY_BATCH_SIZE):
+    """
+    Claims up to batch_size due notifications and delivers them with a single UPDATE.
+    Rows locked by another worker are skipped rather than waited on, so several workers
+    can drain the queue at once without delivering anything twice. Returns the number delivered.
+    """
+    from dashboard.context_processors import invalidate_notification_summary
+    from dashboard.models import Notification
+
+    now = now or timezone.now()
+    with transaction.atomic():
+        claimed = list(
+            due_notifications(now).order_by('scheduled_for', 'id')
+            .select_for_update(skip_locked=True)
+            .values_list('id', 'account_id')[:batch_size]
+        )
+        if claimed:
+            Notification.objects.filter(id__in=[notification_id for notification_id, _ in claimed]).update(delivered_at=now, created_at=now)
+    if claimed:
+        # re-dated, so the navbar panels of these accounts have to be rebuilt
+        invalidate_notification_summary(*{account_id for _, account_id in claimed})
+    return len(claimed)
+
+
+def deliver_due_notifications(batch_size=DELIVERY_BATCH_SIZE):
+    """Delivers every due notification, one committed batch at a time. Returns the number delivered."""
+    if batch_size < 1:
+        raise ValueError("batch_size must be at least 1")
+    now = timezone.now()
+    delivered = 0
+    while True:
+        count = deliver_notification_batch(now, batch_size)
+        delivered += count
+        if count < batch_size:
+            return delivered
@@ -0,0 +1,118 @@
+from django.db.models import OuterRef, Subquery
+from django.utils.functional import cached_property
+
+ADMIN_ROLES = ('administrator', 'agriculturist')
+
+
+def resolve_identity(user):
+    """
+    Scalar identity facts of an authenticated user, read in one query (the profile, with its first
+    account and admin assignment as subqueries on their userinfo_id indexes).
+    """
+    from .models import AccountsInformation, AdminInformation, UserInformation
+
+    accounts = AccountsInformation.objects.filter(userinfo_id=OuterRef('pk')).order_by('pk')
+    admins = AdminInformation.objects.filter(userinfo_id=OuterRef('pk')).order_by('pk')
+    profile = UserInformation.objects.filter(auth_user=user).annotate(
+        account_pk=Subquery(accounts.values('account_id')[:1]),
+        account_type_pk=Subquery(accounts.values('account_type_id')[:1]),
+        account_type_name=Subquery(accounts.values('account_type_id__account_type')[:1]),
+        admin_pk=Subquery(admins.values('admin_id')[:1]),
+        admin_municipality_id=Subquery(admins.values('municipality_incharge')[:1]),
+    ).values('userinfo_id', 'firstname', 'account_pk', 'account_type_pk', 'account_type_name', 'admin_pk', 'admin_municipality_id').first()
+    identity = {
+        'user_id': user.pk,
+        'userinfo_id': None,
+        'firstname': None,
+        'account_id': None,
+        'account_type_id': None,
+        'role': None,
+        'admin_id': None,
+        'municipality_id': None,
+    }
+    if profile and (profile['account_pk'] is not None or profile['admin_pk'] is not None):
+        identity.update({
+            'userinfo_id': profile['userinfo_id'],
+            'firstname': profile['firstname'] if profile['account_pk'] is not None else None,
+            'account_id': profile['account_pk'],
+            'account_type_id': profile['account_type_pk'],
+            'role': profile['account_type_name'].lower() if profile['account_type_name'] else None,
+            'admin_id': profile['admin_pk'],
+            'municipality_id': profile['admin_municipality_id'],
+        })
+    return identity
+
+
+class Principal:
+    """
+    Who is making the request: the user's profile, account type and (for admins and
+    agriculturists) assigned municipality. The ids and flags are read from the database once per
+    request, so a demotion or reassignment applies on every worker at once; the model instances
+    are only loaded, with their related rows, when a view actually needs them.
+    """
+
+    def __init__(self, user, identity):
+        self.user = user
+        self.__dict__.update(identity)
+
+    @property
+    def is_superuser(self):
+        return self.user.is_superuser
+
+    @property
+    def is_pk14(self):
+        """Assigned to "Overall" (all of Bataan)."""
+        return self.municipality_id == 14
+
+    @property
+    def is_admin(self):
+        """May use the administrator panel: an administrator or agriculturist account, or a superuser with an account."""
+        return self.account_id is not None and (self.role in ADMIN_ROLES or self.is_superuser)
+
+    @cached_property
+    def account_info(self):
+        from .models import AccountsInformation
+
+        if self.account_id is None:
+            raise AccountsInformation.DoesNotExist("No account for this user")
+        return AccountsInformation.objects.select_related('userinfo_id', 'account_type_id').get(pk=self.account_id)
+
+    @cached_property
+    def admin_info(self):
+        from .models import AdminInformation
+
+        if self.admin_id is None:
+            raise AdminInformation.DoesNotExist("No admin information for this user")
+        return AdminInformation.objects.select_related('userinfo_id', 'municipality_incharge').get(pk=self.admin_id)
+
+    @cached_property
+    def user_info(self):
+        from .models import UserInformation
+
+        if self.admin_id is not None:
+            return self.admin_info.userinfo_id
+        if self.account_id is not None:
+            return self.account_info.userinfo_id
+        raise UserInformation.DoesNotExist("No profile for this user")
+
+    @property
+    def municipality(self):
+        return self.admin_info.municipality_incharge
+
+
+def resolve_principal(request):
+    """Principal of request.user, or None when nobody is logged in."""
+    user = request.user
+    if not user.is_authenticated:
+        return None
+    return Principal(user, resolve_identity(user))
+
+
+def get_principal(request):
+    """
+    request.principal (falsy when nobody is logged in), resolving it for requests that didn't
+    go through PrincipalMiddleware, e.g. the stand-in request of a background PDF render.
+    """
+    if not hasattr(request, 'principal'):
+        request.principal = resolve_principal(request)
+    return request.principal
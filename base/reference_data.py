@@ -0,0 +1,117 @@
+import hashlib
+import json
+import threading
+from types import MappingProxyType
+from django.utils.functional import cached_property
+
+REFERENCE_DATA_VERSION = 'reference_data'
+
+
+class ReferenceData:
+    """
+    Immutable snapshot of the lookup tables: municipalities, barangays, months, units and
+    commodities (with their seasonal months), keyed by pk and by lower-cased name.
+
+    The model instances are shared by every request of the process, so they may be used for
+    reads and as foreign key values but must never be modified, saved or deleted.
+    """
+
+    def __init__(self, version):
+        from .models import BarangayName, CommodityType, Month, MunicipalityName, UnitMeasurement
+
+        self.version = version
+        municipalities = list(MunicipalityName.objects.all())
+        months = list(Month.objects.all())
+        units = list(UnitMeasurement.objects.all())
+        commodities = list(CommodityType.objects.prefetch_related('seasonal_months').order_by('name'))
+        barangays = list(BarangayName.objects.order_by('barangay'))
+
+        self.municipalities = MappingProxyType({m.municipality_id: m for m in municipalities})
+        self.municipalities_by_name = MappingProxyType({m.municipality.lower(): m for m in municipalities})
+        for barangay in barangays:
+            barangay.municipality_id = self.municipalities[barangay.municipality_id_id]
+        self.barangays = MappingProxyType({b.barangay_id: b for b in barangays})
+        by_municipality = {}
+        for barangay in barangays:
+            by_municipality.setdefault(barangay.municipality_id_id, {})[barangay.barangay.lower()] = barangay
+        self.barangays_by_municipality = MappingProxyType({pk: MappingProxyType(names) for pk, names in by_municipality.items()})
+
+        self.months = MappingProxyType({m.month_id: m for m in months})
+        self.months_by_number = MappingProxyType({m.number: m for m in months})
+        self.months_by_name = MappingProxyType({m.name.lower(): m for m in months})
+        self.units = MappingProxyType({u.unit_id: u for u in units})
+        self.units_by_abrv = MappingProxyType({u.unit_abrv.lower(): u for u in units})
+
+        self.commodities = MappingProxyType({c.commodity_id: c for c in commodities})
+        self.commodities_by_name = MappingProxyType({c.name.lower(): c for c in commodities})
+        # months in calendar order; read these instead of commodity.seasonal_months.all()
+        self.seasonal_months = MappingProxyType({
+            c.commodity_id: tuple(sorted(c.seasonal_months.all(), key=lambda month: month.number)) for c in commodities
+        })
+
+    @cached_property
+    def barangay_index(self):
+        """
+        Barangays of every municipality as served to the registration and record forms:
+        'rows' maps municipality pk to [{'id', 'barangay'}, ...] in barangay pk order, 'body' is
+        the same mapping as compact JSON and 'digest' a short hash of that body.
+        """
+        rows = {pk: [] for pk in sorted(self.municipalities)}
+        for pk in sorted(self.barangays):
+            barangay = self.barangays[pk]
+            rows[barangay.municipality_id_id].append({'id': pk, 'barangay': barangay.barangay})
+        body = json.dumps(rows, separators=(',', ':')).encode()
+        return {
+            'rows': MappingProxyType(rows),
+            'body': body,
+            'digest': hashlib.sha256(body).hexdigest()[:16],
+        }
+
+    def commodity_name(self, pk, default=None):
+        commodity = self.commodities.get(int(pk))
+        return commodity.name if commodity else default
+
+    def municipality_name(self, pk, default=None):
+        municipality = self.municipalities.get(int(pk))
+        return municipality.municipality if municipality else default
+
+    def seasonal_month_names(self, commodity_id):
+        return [month.name for month in self.seasonal_months.get(int(commodity_id), ())]
+
+
+class ReferenceDataRegistry:
+    """
+    Process-wide ReferenceData, loaded once and reused until invalidate() is called from any
+    process. The version is a DataVersion token in the database (see base.data_versions), so
+    checking it is one primary key lookup per use and a bump reaches every web worker and Celery.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._snapshot = None
+
+    def version(self):
+        from .data_versions import data_version
+
+        return data_version(REFERENCE_DATA_VERSION)
+
+    def get(self):
+        version = self.version()
+        snapshot = self._snapshot
+        if snapshot is None or snapshot.version != version:
+            with self._lock:
+                snapshot = self._snapshot
+                if snapshot is None or snapshot.version != version:
+                    snapshot = self._snapshot = ReferenceData(version)
+        return snapshot
+
+    def invalidate(self):
+        """Lookup table edits (admin commodity pages, setup commands) must be seen by every process."""
+        from .data_versions import bump_data_version
+
+        bump_data_version(REFERENCE_DATA_VERSION)
+        with self._lock:
+            self._snapshot = None
+
+
+reference_data = ReferenceDataRegistry()
@@ -0,0 +1,24 @@
+from django.db.models import F
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from .models import BarangayName, CommodityType, FarmLand, Month, MunicipalityName, RecordTransaction, UnitMeasurement
+from .reference_data import reference_data
+
+
+@receiver(pre_delete, sender=FarmLand)
+def fall_back_to_manual_location(sender, instance, **kwargs):
+    """farm_land is SET_NULL on delete, so records of a deleted farm land keep only their manual location."""
+    RecordTransaction.objects.filter(farm_land=instance).update(
+        effective_municipality=F('manual_municipality'),
+        effective_barangay=F('manual_barangay'),
+    )
+
+
+def refresh_reference_data(sender, **kwargs):
+    reference_data.invalidate()
+
+
+for model in (MunicipalityName, BarangayName, Month, UnitMeasurement, CommodityType):
+    post_save.connect(refresh_reference_data, sender=model, dispatch_uid=f"reference_data_save_{model.__name__}")
+    post_delete.connect(refresh_reference_data, sender=model, dispatch_uid=f"reference_data_delete_{model.__name__}")
+m2m_changed.connect(refresh_reference_data, sender=CommodityType.seasonal_months.through, dispatch_uid="reference_data_seasonal_months")
@@ -0,0 +1,53 @@
+from celery import shared_task
+from .models import AccountsInformation, FarmLand
+
+
+def get_farmland_municipality_ids(account):
+    """Distinct municipalities of an account's farmland records."""
+    return list(FarmLand.objects.filter(userinfo_id=account.userinfo_id_id).values_list('municipality_id', flat=True).distinct())
+
+
+@shared_task
+def schedule_account_fruit_recommendations_task(account_id):
+    """
+    Generates this month's fruit recommendation notifications for one account's farmland
+    municipalities. Queued from the home page so the page itself never waits on the
+    recommendation pipeline (forecast queries and the Gemini call).
+    """
+    from .views import schedule_monthly_fruit_recommendations
+
+    try:
+        account = AccountsInformation.objects.select_related('userinfo_id').get(pk=account_id)
+    except AccountsInformation.DoesNotExist:
+        print(f"Account {account_id} no longer exists, skipping fruit recommendations")
+        return 0
+
+    scheduled_count = 0
+    municipality_ids = get_farmland_municipality_ids(account)
+    for municipality_id in municipality_ids:
+        if schedule_monthly_fruit_recommendations(account, municipality_id):
+            scheduled_count += 1
+    print(f"✅ Scheduled {scheduled_count}/{len(municipality_ids)} fruit recommendation notifications for account {account_id}")
+    return scheduled_count
+
+
+@shared_task
+def schedule_all_fruit_recommendations_task():
+    """Monthly batch (Celery beat): queues every account that has farmland records."""
+    account_ids = AccountsInformation.objects.filter(userinfo_id__farmland__isnull=False).values_list('account_id', flat=True).distinct()
+    queued = 0
+    for account_id in account_ids:
+        schedule_account_fruit_recommendations_task.delay(account_id)
+        queued += 1
+    print(f"Queued fruit recommendations for {queued} accounts")
+    return queued
+
+
+@shared_task
+def deliver_scheduled_notifications_task():
+    """Periodic (Celery beat): delivers scheduled notifications that have come due."""
+    from .notifications import deliver_due_notifications
+
+    delivered = deliver_due_notifications()
+    print(f"Delivered {delivered} scheduled notifications")
+    return delivered
@@ -0,0 +1,17 @@
+from django import template
+from django.templatetags.static import static
+from django.urls import reverse
+from django.utils.html import format_html
+from base.reference_data import reference_data
+
+register = template.Library()
+
+@register.simple_tag
+def barangay_index_script():
+    """Loads js/barangays.js (fetchBarangays) pointed at the current barangay index."""
+    digest = reference_data.get().barangay_index['digest']
+    return format_html(
+        '<script src="{}" data-index-url="{}"></script>',
+        static('js/barangays.js'),
+        reverse('base:barangay_index', args=[digest]),
+    )
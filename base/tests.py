@@ -87,3 +87,479 @@ class FruitRecommendationNotificationTest(TestCase):
         
         self.assertEqual(notifications.count(), 1, "Duplicate notifications were created")
 
+
+
+class LowSupplyScreeningTest(TestCase):
+
+    def setUp(self):
+        from datetime import date
+        from decimal import Decimal
+        from dashboard.models import ForecastBatch, ForecastResult, LongTermForecast
+
+        self.municipality = MunicipalityName.objects.create(municipality="Balanga")
+        months = {number: Month.objects.create(name=date(2025, number, 1).strftime('%B'), number=number) for number in range(1, 13)}
+        self.batch = ForecastBatch.objects.create(notes="test")
+
+        # Mango matures in 6 months (July 2025), Lanzones in 1 year by default (Jan 2026), Durian in 3 years (Jan 2028)
+        # pk=1 is the excluded "Other" commodity
+        CommodityType.objects.create(commodity_id=1, name="Other", average_weight_per_unit_kg=1)
+        self.mango = CommodityType.objects.create(commodity_id=2, name="Mango", average_weight_per_unit_kg=0.25, years_to_mature=Decimal('0.50'))
+        self.lanzones = CommodityType.objects.create(commodity_id=3, name="Lanzones", average_weight_per_unit_kg=0.05)
+        self.durian = CommodityType.objects.create(commodity_id=4, name="Durian", average_weight_per_unit_kg=2, years_to_mature=Decimal('3.00'))
+        self.rambutan = CommodityType.objects.create(commodity_id=5, name="Rambutan", average_weight_per_unit_kg=0.05, years_to_mature=Decimal('0.50'))
+
+        amounts = {self.mango: 10.0, self.lanzones: 8000.0, self.durian: 400.0, self.rambutan: 9000.0}
+        for commodity, amount in amounts.items():
+            for year in (2025, 2026):
+                for number, month in months.items():
+                    ForecastResult.objects.create(
+                        batch=self.batch, commodity=commodity, forecast_month=month, forecast_year=year,
+                        municipality=self.municipality, forecasted_amount_kg=amount,
+                    )
+        LongTermForecast.objects.create(
+            commodity=self.durian, municipality=self.municipality, forecast_year=2028, forecast_month=1,
+            forecasted_amount_kg=5.0, batch=self.batch,
+        )
+
+    def test_low_supply_commodities_are_screened_in_constant_queries(self):
+        """Short maturities come from ForecastResult and long ones from LongTermForecast, in three queries"""
+        from datetime import datetime
+        from .utils import get_low_supply_commodities
+
+        with self.assertNumQueries(3):
+            low_supply = get_low_supply_commodities(datetime(2025, 1, 1), self.batch, self.municipality.pk)
+
+        self.assertEqual([item['name'] for item in low_supply], ["Mango", "Durian"])
+        self.assertEqual(low_supply[0]['predicted_month'], "July")
+        self.assertEqual((low_supply[1]['predicted_year'], low_supply[1]['forecasted_amount']), (2028, 5.0))
+
+    def test_recommendation_response_is_cached_per_batch(self):
+        """The same low-supply set is only sent to the LLM once per forecast batch"""
+        import json
+        from dashboard.models import ForecastBatch, ForecastResult, RecommendationResponseCache
+        from .utils import get_alternative_recommendations
+
+        class StubClient:
+            calls = 0
+
+            def generate(self, prompt):
+                StubClient.calls += 1
+                return "```json" + json.dumps({
+                    "Mango": {"reason": "Low supply", "land_recommendations": {"Loam Soil": "Good"}},
+                    "Durian": {"reason": "Low supply", "land_recommendations": {}},
+                }) + "```"
+
+        for _ in range(2):
+            recommendations = get_alternative_recommendations(1, 2025, self.municipality.pk, llm_client=StubClient())
+        self.assertEqual(StubClient.calls, 1)
+        self.assertEqual([rec['commodity_name'] for rec in recommendations['short_term']], ["Mango"])
+        self.assertEqual([rec['commodity_name'] for rec in recommendations['long_term']], ["Durian"])
+
+        # A new forecast batch invalidates the cached response
+        newer_batch = ForecastBatch.objects.create(notes="newer")
+        ForecastResult.objects.update(batch=newer_batch)
+        get_alternative_recommendations(1, 2025, self.municipality.pk, llm_client=StubClient())
+        self.assertEqual(StubClient.calls, 2)
+        self.assertEqual(RecommendationResponseCache.objects.get().batch, newer_batch)
+
+
+class FarmerAccountMixin:
+    """One farmer account with a farmland in "Test Municipality"."""
+
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        municipality = MunicipalityName.objects.create(municipality="Test Municipality")
+        barangay = BarangayName.objects.create(barangay="Test Barangay", municipality_id=municipality)
+        self.user_info = UserInformation.objects.create(
+            auth_user=AuthUser.objects.create(email="farmer@example.com"),
+            lastname="Test", firstname="User", sex="Male", contact_number="1234567890",
+            user_email="farmer@example.com", birthdate="1990-01-01",
+            emergency_contact_person="Emergency Contact", emergency_contact_number="0987654321",
+            address_details="Test Address", barangay_id=barangay, municipality_id=municipality,
+            religion="Catholic", civil_status="Single",
+        )
+        self.account = AccountsInformation.objects.create(
+            account_register_date=timezone.now(),
+            account_type_id=AccountType.objects.create(account_type="Farmer"),
+            acc_status_id=AccountStatus.objects.create(acc_status="Active"),
+            userinfo_id=self.user_info,
+        )
+        FarmLand.objects.create(farmland_name="Test Farm", userinfo_id=self.user_info, municipality=municipality, barangay=barangay)
+        self.municipality = municipality
+
+
+class FruitRecommendationQueueTest(FarmerAccountMixin, TestCase):
+
+    def test_recommendations_are_queued_once_per_month(self):
+        """The home page queues the background task instead of generating recommendations itself"""
+        from unittest import mock
+        from .views import queue_monthly_fruit_recommendations
+
+        with mock.patch('base.views.schedule_account_fruit_recommendations_task') as task:
+            self.assertTrue(queue_monthly_fruit_recommendations(self.account))
+            self.assertFalse(queue_monthly_fruit_recommendations(self.account))
+        task.delay.assert_called_once_with(self.account.pk)
+
+    def test_existing_notification_skips_queueing(self):
+        from unittest import mock
+        from .views import queue_monthly_fruit_recommendations
+
+        Notification.objects.create(
+            account=self.account, message="Recommendations", notification_type="fruit_recommendation",
+            municipality=self.municipality, recommendation_month=timezone.now().date().replace(day=1),
+        )
+        with mock.patch('base.views.schedule_account_fruit_recommendations_task') as task:
+            with self.assertNumQueries(1):
+                self.assertFalse(queue_monthly_fruit_recommendations(self.account))
+        task.delay.assert_not_called()
+
+    def test_task_without_forecasts_schedules_nothing(self):
+        from .tasks import schedule_account_fruit_recommendations_task
+
+        self.assertEqual(schedule_account_fruit_recommendations_task(self.account.pk), 0)
+        self.assertFalse(Notification.objects.filter(account=self.account).exists())
+
+
+class NotificationDeliveryTest(FarmerAccountMixin, TestCase):
+
+    def schedule(self, scheduled_for, **kwargs):
+        return Notification.objects.create(
+            account=self.account, message="Recommendations", notification_type="fruit_recommendation",
+            scheduled_for=scheduled_for, created_at=timezone.now() - relativedelta(months=1), **kwargs,
+        )
+
+    def test_due_notifications_are_delivered_in_batches_once(self):
+        from .notifications import deliver_due_notifications
+
+        now = timezone.now()
+        due = [self.schedule(now - relativedelta(minutes=i)) for i in range(5)]
+        future = self.schedule(now + relativedelta(days=1))
+        Notification.objects.create(account=self.account, message="Reminder", notification_type="harvest_reminder", scheduled_for=now)
+
+        # two full batches and a last, short one: a SELECT ... FOR UPDATE and an UPDATE each,
+        # plus one UPDATE of the accounts' notification summary versions
+        with self.assertNumQueries(3 * 2 + 3 * 2 + 3):
+            self.assertEqual(deliver_due_notifications(batch_size=2), 5)
+        for notification in Notification.objects.filter(pk__in=[n.pk for n in due]):
+            self.assertIsNotNone(notification.delivered_at)
+            self.assertEqual(notification.created_at, notification.delivered_at)
+        future.refresh_from_db()
+        self.assertIsNone(future.delivered_at)
+        self.assertEqual(deliver_due_notifications(), 0)
+
+    def test_command_delivers_due_notifications(self):
+        from io import StringIO
+        from django.core.management import call_command
+
+        self.schedule(timezone.now())
+        out = StringIO()
+        call_command('process_scheduled_notifications', '--dry-run', stdout=out)
+        self.assertIn("Would process: User Test", out.getvalue())
+        call_command('process_scheduled_notifications', stdout=out)
+        self.assertIn("Successfully processed 1 scheduled notifications", out.getvalue())
+        self.assertFalse(Notification.objects.filter(delivered_at__isnull=True).exists())
+
+    def test_batch_size_must_be_positive(self):
+        from django.core.management import CommandError, call_command
+        from .notifications import deliver_due_notifications
+
+        self.schedule(timezone.now())
+        with self.assertRaises(ValueError):
+            deliver_due_notifications(batch_size=0)
+        with self.assertRaises(CommandError):
+            call_command('process_scheduled_notifications', '--batch-size', '0')
+        self.assertTrue(Notification.objects.filter(delivered_at__isnull=True).exists())
+
+
+class NotificationSummaryTest(FarmerAccountMixin, TestCase):
+
+    def notify(self, scheduled_for=None, **kwargs):
+        return Notification.objects.create(account=self.account, message="Hello", scheduled_for=scheduled_for or timezone.now(), **kwargs)
+
+    def test_summary_is_cached_until_notifications_change(self):
+        from dashboard.context_processors import get_notification_summary
+
+        first = self.notify()
+        self.notify()
+        self.assertEqual(get_notification_summary(self.account.pk)['unread_count'], 2)
+        # only the account's version lookup
+        with self.assertNumQueries(1):
+            get_notification_summary(self.account.pk)
+
+        first.is_read = True
+        first.save()
+        with self.assertNumQueries(3):
+            self.assertEqual(get_notification_summary(self.account.pk)['unread_count'], 1)
+        self.notify()
+        summary = get_notification_summary(self.account.pk)
+        self.assertEqual(summary['unread_count'], 2)
+        self.assertEqual(len(summary['notifications']), 3)
+
+    def test_summary_expires_when_the_next_notification_comes_due(self):
+        from unittest import mock
+        from dashboard.context_processors import get_notification_summary, timezone as summary_timezone
+
+        self.notify(timezone.now() + relativedelta(seconds=60))
+        self.assertEqual(get_notification_summary(self.account.pk)['unread_count'], 0)
+        with mock.patch.object(summary_timezone, 'now', return_value=timezone.now() + relativedelta(seconds=61)):
+            self.assertEqual(get_notification_summary(self.account.pk)['unread_count'], 1)
+
+    def test_invalidation_from_another_process_refreshes_the_summary(self):
+        from dashboard.context_processors import get_notification_summary, notification_summary_key
+        from .data_versions import bump_data_versions
+
+        notification = self.notify()
+        self.assertEqual(get_notification_summary(self.account.pk)['unread_count'], 1)
+        # queryset updates send no signals; the bump stands in for a Celery worker's invalidate_notification_summary
+        Notification.objects.filter(pk=notification.pk).update(is_read=True)
+        self.assertEqual(get_notification_summary(self.account.pk)['unread_count'], 1)
+        bump_data_versions([notification_summary_key(self.account.pk)])
+        self.assertEqual(get_notification_summary(self.account.pk)['unread_count'], 0)
+
+    def test_delivery_refreshes_the_summary(self):
+        from dashboard.context_processors import get_notification_summary
+        from .notifications import deliver_due_notifications
+
+        notification = self.notify(notification_type="fruit_recommendation", created_at=timezone.now() - relativedelta(months=1))
+        self.notify()
+        self.assertEqual(get_notification_summary(self.account.pk)['notifications'][0].pk, notification.pk + 1)
+        deliver_due_notifications()
+        self.assertEqual(get_notification_summary(self.account.pk)['notifications'][0].pk, notification.pk)
+
+    def test_context_is_only_queried_when_used(self):
+        from types import SimpleNamespace
+        from dashboard.context_processors import unread_notifications
+
+        self.notify()
+        request = SimpleNamespace(user=SimpleNamespace(is_authenticated=True), session={'account_id': self.account.pk})
+        with self.assertNumQueries(0):
+            context = unread_notifications(request)
+        # the version lookup, which inserts the account's version row on first use, then the summary
+        with self.assertNumQueries(1 + 3 + 2):
+            self.assertTrue(context['unread_count'] > 0)
+            self.assertEqual([n.message for n in context['notifications']], ["Hello"])
+
+
+class PrincipalTest(FarmerAccountMixin, TestCase):
+
+    def setUp(self):
+        from types import SimpleNamespace
+        super().setUp()
+        self.admin_type = AccountType.objects.create(account_type="Administrator")
+        self.overall = MunicipalityName.objects.create(municipality_id=14, municipality="Overall")
+        self.request = SimpleNamespace(user=self.user_info.auth_user, session={})
+
+    def make_admin(self, municipality):
+        self.account.account_type_id = self.admin_type
+        self.account.save()
+        return AdminInformation.objects.create(userinfo_id=self.user_info, municipality_incharge=municipality)
+
+    def test_principal_is_resolved_from_the_database_each_request(self):
+        from .principal import resolve_principal
+
+        admin_info = self.make_admin(self.municipality)
+        with self.assertNumQueries(1):
+            principal = resolve_principal(self.request)
+            self.assertTrue(principal.is_admin)
+            self.assertEqual(principal.firstname, "User")
+        self.assertEqual((principal.role, principal.admin_id, principal.is_pk14), ("administrator", admin_info.pk, False))
+        # one query for the admin, its profile and municipality together
+        with self.assertNumQueries(1):
+            self.assertEqual(principal.admin_info.municipality_incharge.municipality, "Test Municipality")
+            self.assertEqual(principal.user_info.pk, self.user_info.pk)
+
+        # queryset updates send no signals; nothing needs invalidating
+        AdminInformation.objects.filter(pk=admin_info.pk).update(municipality_incharge=self.overall)
+        self.assertTrue(resolve_principal(self.request).is_pk14)
+        farmer_type = AccountType.objects.get(account_type="Farmer")
+        AccountsInformation.objects.filter(pk=self.account.pk).update(account_type_id=farmer_type)
+        self.assertFalse(resolve_principal(self.request).is_admin)
+
+    def test_user_without_a_profile_has_an_empty_principal(self):
+        from .principal import resolve_principal
+
+        self.request.user = AuthUser.objects.create(email="nobody@example.com")
+        principal = resolve_principal(self.request)
+        self.assertEqual((principal.account_id, principal.admin_id, principal.userinfo_id), (None, None, None))
+        self.assertFalse(principal.is_admin)
+
+    def test_admin_decorator_uses_the_request_principal(self):
+        from administrator.decorators import admin_or_agriculturist_required
+        from .principal import resolve_principal
+
+        view = admin_or_agriculturist_required(lambda request: "ok")
+        self.request.user = self.user_info.auth_user
+        self.request.principal = resolve_principal(self.request)
+        self.assertEqual(view(self.request).status_code, 403)
+
+        self.make_admin(self.municipality)
+        del self.request.principal
+        self.assertEqual(view(self.request), "ok")
+        with self.assertNumQueries(0):
+            self.assertEqual(view(self.request), "ok")
+
+
+class ReferenceDataTest(TestCase):
+
+    def setUp(self):
+        self.jan = Month.objects.create(name="January", number=1)
+        self.mar = Month.objects.create(name="March", number=3)
+        self.municipality = MunicipalityName.objects.create(municipality="Balanga City")
+        BarangayName.objects.create(barangay="Tuyo", municipality_id=self.municipality)
+        UnitMeasurement.objects.create(unit_abrv="kg", unit_full="kilogram")
+        self.mango = CommodityType.objects.create(name="Mango", average_weight_per_unit_kg=0.3)
+        self.mango.seasonal_months.set([self.mar, self.jan])
+
+    def test_snapshot_is_loaded_once_until_invalidated(self):
+        from .reference_data import reference_data
+
+        # the version lookup and the six lookup tables
+        with self.assertNumQueries(7):
+            ref = reference_data.get()
+        with self.assertNumQueries(1):
+            self.assertIs(reference_data.get(), ref)
+        with self.assertNumQueries(0):
+            self.assertEqual(ref.commodities_by_name["mango"].pk, self.mango.pk)
+            self.assertEqual(ref.seasonal_month_names(self.mango.pk), ["January", "March"])
+            self.assertEqual(ref.barangays_by_municipality[self.municipality.pk]["tuyo"].municipality_id.municipality, "Balanga City")
+            self.assertEqual(ref.units_by_abrv["kg"].unit_full, "kilogram")
+            self.assertEqual(ref.months_by_number[3].name, "March")
+        with self.assertRaises(TypeError):
+            ref.commodities[0] = self.mango
+
+        self.mango.seasonal_months.remove(self.jan)
+        self.assertEqual(reference_data.get().seasonal_month_names(self.mango.pk), ["March"])
+        CommodityType.objects.create(name="Banana", average_weight_per_unit_kg=0.2)
+        self.assertIn("banana", reference_data.get().commodities_by_name)
+
+    def test_version_is_shared_through_the_database(self):
+        from django.core.cache import cache
+        from .data_versions import bump_data_version
+        from .reference_data import REFERENCE_DATA_VERSION, reference_data
+
+        ref = reference_data.get()
+        cache.clear()
+        self.assertIs(reference_data.get(), ref)
+        # another process's invalidate(): this process's snapshot is left in place but no longer current
+        bump_data_version(REFERENCE_DATA_VERSION)
+        self.assertIsNot(reference_data.get(), ref)
+
+
+class BarangayIndexTest(TestCase):
+
+    def setUp(self):
+        self.balanga = MunicipalityName.objects.create(municipality="Balanga City")
+        self.orani = MunicipalityName.objects.create(municipality="Orani")
+        self.tuyo = BarangayName.objects.create(barangay="Tuyo", municipality_id=self.balanga)
+        self.bagong = BarangayName.objects.create(barangay="Bagong Silang", municipality_id=self.balanga)
+
+    def test_index_is_served_under_its_content_hash(self):
+        from django.urls import reverse
+        from .reference_data import reference_data
+
+        index = reference_data.get().barangay_index
+        response = self.client.get(reverse('base:barangay_index', args=[index['digest']]))
+        self.assertEqual(response['Cache-Control'], 'public, max-age=31536000, immutable')
+        self.assertEqual(response.json(), {
+            str(self.balanga.pk): [{'id': self.tuyo.pk, 'barangay': 'Tuyo'}, {'id': self.bagong.pk, 'barangay': 'Bagong Silang'}],
+            str(self.orani.pk): [],
+        })
+
+        stale = self.client.get(reverse('base:barangay_index', args=['0' * 16]))
+        self.assertRedirects(stale, reverse('base:barangay_index', args=[index['digest']]))
+        self.assertEqual(stale['Cache-Control'], 'no-cache')
+
+    def test_an_edit_from_another_process_changes_the_served_digest(self):
+        from django.urls import reverse
+        from .data_versions import bump_data_version
+        from .reference_data import REFERENCE_DATA_VERSION, reference_data
+
+        old = reference_data.get().barangay_index['digest']
+        # bulk_create sends no signals; the bump stands in for another process's invalidate()
+        BarangayName.objects.bulk_create([BarangayName(barangay="Pantalan", municipality_id=self.orani)])
+        bump_data_version(REFERENCE_DATA_VERSION)
+        new = reference_data.get().barangay_index['digest']
+        self.assertNotEqual(new, old)
+        response = self.client.get(reverse('base:barangay_index', args=[old]))
+        self.assertRedirects(response, reverse('base:barangay_index', args=[new]))
+        self.assertNotIn('immutable', response['Cache-Control'])
+        self.assertIn("Pantalan", self.client.get(reverse('base:barangay_index', args=[new])).content.decode())
+
+    def test_get_barangays_answers_from_the_index(self):
+        from django.urls import reverse
+
+        url = reverse('base:get_barangays', args=[self.balanga.pk])
+        response = self.client.get(url)
+        self.assertEqual([b['barangay'] for b in response.json()], ['Tuyo', 'Bagong Silang'])
+        # only the reference data version lookup
+        with self.assertNumQueries(1):
+            cached = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(cached.status_code, 304)
+        self.assertEqual(self.client.get(reverse('base:get_barangays', args=[999])).json(), [])
+
+    def test_forms_load_the_index_script(self):
+        from django.template import Context, Template
+        from .reference_data import reference_data
+
+        html = Template("{% load barangay_tags %}{% barangay_index_script %}").render(Context())
+        self.assertIn('js/barangays.js', html)
+        self.assertIn(f'data-index-url="/barangays/{reference_data.get().barangay_index["digest"]}.json"', html)
+
+
+class EffectiveLocationTest(TestCase):
+
+    def setUp(self):
+        self.muni_a = MunicipalityName.objects.create(municipality="Municipality A")
+        self.muni_b = MunicipalityName.objects.create(municipality="Municipality B")
+        self.brgy_a = BarangayName.objects.create(barangay="Barangay A", municipality_id=self.muni_a)
+        self.brgy_b = BarangayName.objects.create(barangay="Barangay B", municipality_id=self.muni_b)
+        user_info = UserInformation.objects.create(
+            auth_user=AuthUser.objects.create(email="location@example.com"),
+            lastname="Test", firstname="User", sex="Male", contact_number="1234567890",
+            user_email="location@example.com", birthdate="1990-01-01",
+            emergency_contact_person="Emergency Contact", emergency_contact_number="0987654321",
+            address_details="Test Address", barangay_id=self.brgy_a, municipality_id=self.muni_a,
+            religion="Catholic", civil_status="Single",
+        )
+        self.account = AccountsInformation.objects.create(
+            account_register_date=timezone.now(),
+            account_type_id=AccountType.objects.create(account_type="Farmer"),
+            acc_status_id=AccountStatus.objects.create(acc_status="Active"),
+            userinfo_id=user_info,
+        )
+        self.farmland = FarmLand.objects.create(farmland_name="Test Farm", userinfo_id=user_info, municipality=self.muni_a, barangay=self.brgy_a)
+
+    def test_save_sets_effective_location(self):
+        manual = RecordTransaction.objects.create(account_id=self.account, location_type='manual', manual_municipality=self.muni_b, manual_barangay=self.brgy_b)
+        farm = RecordTransaction.objects.create(account_id=self.account, location_type='farm_land', farm_land=self.farmland)
+
+        self.assertEqual(manual.effective_municipality_id, self.muni_b.pk)
+        self.assertEqual(farm.effective_municipality_id, self.muni_a.pk)
+        self.assertEqual(RecordTransaction.objects.filter(effective_municipality=self.muni_a).count(), 1)
+
+    def test_farm_land_changes_follow_through(self):
+        trans = RecordTransaction.objects.create(account_id=self.account, location_type='farm_land', farm_land=self.farmland, manual_municipality=self.muni_b, manual_barangay=self.brgy_b)
+
+        self.farmland.municipality, self.farmland.barangay = self.muni_b, self.brgy_b
+        self.farmland.save()
+        trans.refresh_from_db()
+        self.assertEqual((trans.effective_municipality_id, trans.effective_barangay_id), (self.muni_b.pk, self.brgy_b.pk))
+
+        self.farmland.municipality, self.farmland.barangay = self.muni_a, self.brgy_a
+        self.farmland.save()
+        self.farmland.delete()
+        trans.refresh_from_db()
+        # falls back to the manual location once the farm land is gone
+        self.assertEqual(trans.effective_municipality_id, self.muni_b.pk)
+
+    def test_sync_effective_locations(self):
+        manual = RecordTransaction.objects.create(account_id=self.account, location_type='manual', manual_municipality=self.muni_b, manual_barangay=self.brgy_b)
+        farm = RecordTransaction.objects.create(account_id=self.account, location_type='farm_land', farm_land=self.farmland)
+        RecordTransaction.objects.update(effective_municipality=None, effective_barangay=None)
+
+        self.assertEqual(RecordTransaction.sync_effective_locations(), 2)
+        manual.refresh_from_db()
+        farm.refresh_from_db()
+        self.assertEqual(manual.effective_municipality_id, self.muni_b.pk)
+        self.assertEqual((farm.effective_municipality_id, farm.effective_barangay_id), (self.muni_a.pk, self.brgy_a.pk))
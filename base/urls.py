@@ -10,6 +10,7 @@ urlpatterns = [
 
     path('', home, name='home'),
     path('get-barangays/<int:municipality_id>/', views.get_barangays, name='get_barangays'),
+    path('barangays/<slug:digest>.json', views.barangay_index, name='barangay_index'),
     path('register/email/', views.register_email, name='register_email'),
     path('register/email/verify/', views.register_verify_code, name='register_verify_code'),
     path('register/step1/', views.register_step1, name='register_step1'),
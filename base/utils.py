@@ -2,8 +2,8 @@
 import google.generativeai as genai
 from datetime import timedelta, datetime
 from django.utils import timezone
-from .models import CommodityType, ForecastResult, ForecastBatch, Month, MunicipalityName
-import json, calendar, os, joblib
+from .models import CommodityType, ForecastResult, ForecastBatch, LongTermForecast, Month, MunicipalityName, RecommendationResponseCache
+import json, calendar, hashlib, os, joblib
 from django.db import models
 try:
     import numpy as np
@@ -20,21 +20,156 @@ from io import BytesIO
 
 genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
 
-def get_alternative_recommendations(selected_month=None, selected_year=None, selected_municipality_id=None):
+DB_FORECAST_HORIZON_MONTHS = 12  # months ahead of the base date covered by ForecastResult rows
+
+
+def get_low_supply_commodities(base_date, batch, municipality_id):
+    """
+    Commodities whose forecast at their maturity date (base date + years_to_mature) is below the
+    municipality's low-supply threshold: the first quartile of the per-commodity forecast totals
+    from the base year on (the median when there are fewer than 4 commodities).
+
+    Maturity dates within 12 months of the base date use the batch's ForecastResult rows, later ones
+    the LongTermForecast table. Uses a fixed number of queries regardless of the number of commodities.
+    """
+    commodities = pd.DataFrame(list(
+        CommodityType.objects.exclude(pk=1).values('commodity_id', 'name', 'years_to_mature')
+    ))
+    print(f"🌾 Found {len(commodities)} commodities to analyze")
+    if commodities.empty:
+        return []
+
+    forecasts = pd.DataFrame(list(ForecastResult.objects.filter(
+        batch=batch,
+        forecast_year__gte=base_date.year,
+        municipality=municipality_id
+    ).values('commodity_id', 'forecast_year', 'forecast_month__number', 'forecasted_amount_kg')))
+
+    if forecasts.empty:
+        print("❌ No forecasted values found for the selected municipality.")
+        return []
+    forecasts = forecasts.rename(columns={'forecast_month__number': 'forecast_month'})
+
+    # --- DYNAMIC THRESHOLD CALCULATION FOR A SPECIFIC MUNICIPALITY ---
+    forecasted_values = forecasts.groupby('commodity_id')['forecasted_amount_kg'].sum().to_numpy()
+    print(f"📈 Found {len(forecasted_values)} commodity forecasts for municipality {municipality_id}")
+
+    # Handle cases with insufficient data for a quartile calculation
+    if len(forecasted_values) < 4:
+        low_supply_threshold = np.median(forecasted_values)
+        print(f"⚠️ Using median threshold due to insufficient data points: {low_supply_threshold}")
+    else:
+        low_supply_threshold = np.quantile(forecasted_values, 0.25)
+
+    print(f"📊 Calculated Low Supply Threshold (Q1) for Municipality {municipality_id}: {low_supply_threshold}")
+    print(f"📋 Forecasted values range: min={forecasted_values.min()}, max={forecasted_values.max()}, count={len(forecasted_values)}")
+
+    # --- MATURITY DATE OF EVERY COMMODITY ---
+    commodities['position'] = range(len(commodities))
+    years = commodities['years_to_mature'].where(commodities['years_to_mature'].notna(), 1)
+    commodities['years_to_mature'] = years
+    future_dates = pd.Timestamp(base_date) + pd.to_timedelta(years.astype(float) * 365.25, unit='D')
+    commodities['forecast_year'] = future_dates.dt.year
+    commodities['forecast_month'] = future_dates.dt.month
+    months_difference = (commodities['forecast_year'] - base_date.year) * 12 + (commodities['forecast_month'] - base_date.month)
+    in_db_horizon = months_difference.between(0, DB_FORECAST_HORIZON_MONTHS).to_numpy()
+
+    keys = ['commodity_id', 'forecast_year', 'forecast_month']
+    short_term = commodities[in_db_horizon].merge(
+        forecasts.groupby(keys, as_index=False)['forecasted_amount_kg'].sum(), on=keys, how='left'
+    )
+    # No stored forecast within the horizon means no expected supply
+    short_term['forecasted_amount_kg'] = short_term['forecasted_amount_kg'].fillna(0)
+
+    long_term = commodities[~in_db_horizon]
+    if not long_term.empty:
+        # Beyond the stored 12 months: use the long-term predictions written at training time
+        long_term_values = pd.DataFrame(list(LongTermForecast.objects.filter(
+            municipality=municipality_id,
+            commodity_id__in=long_term['commodity_id'].tolist(),
+            forecast_year__in=sorted(set(long_term['forecast_year'].tolist())),
+        ).values('commodity_id', 'forecast_year', 'forecast_month', 'forecasted_amount_kg')), columns=keys + ['forecasted_amount_kg'])
+        long_term = long_term.merge(long_term_values, on=keys, how='left')
+        for name in long_term.loc[long_term['forecasted_amount_kg'].isna(), 'name']:
+            print(f"⚠️ No long-term forecast found for {name}")
+        long_term = long_term.dropna(subset=['forecasted_amount_kg'])
+
+    screened = pd.concat([short_term, long_term], ignore_index=True).sort_values('position')
+    low_supply = screened[screened['forecasted_amount_kg'].to_numpy() < low_supply_threshold]
+    print(f"📊 Checked {len(commodities)} commodities, found {len(low_supply)} with low supply")
+
+    return [
+        {
+            'name': row['name'],
+            'years_to_mature': row['years_to_mature'],
+            'predicted_month': calendar.month_name[int(row['forecast_month'])],
+            'predicted_year': int(row['forecast_year']),
+            'forecasted_amount': float(row['forecasted_amount_kg']),
+        }
+        for row in low_supply.to_dict('records')
+    ]
+
+
+LLM_TIMEOUT_SECONDS = 30
+RECOMMENDATION_PROMPT_VERSION = 1  # bump when the prompt changes so cached responses are not reused
+
+
+class GeminiClient:
+    """Default LLM client for recommendations."""
+    model_name = 'gemini-2.0-flash'
+
+    def generate(self, prompt):
+        print("🔧 Initializing Gemini model...")
+        model = genai.GenerativeModel(self.model_name)
+        print("📡 Making API request...")
+        response = model.generate_content(prompt)
+        print("✅ Received response from Gemini API")
+        return response.text if response else None
+
+
+def recommendation_cache_key(low_supply_commodities, batch):
+    """Hash of everything that goes into the prompt, plus the forecast batch it was computed from."""
+    normalized = sorted(
+        (item['name'], item['predicted_month'], int(item['predicted_year']))
+        for item in low_supply_commodities
+    )
+    payload = json.dumps({
+        'version': RECOMMENDATION_PROMPT_VERSION,
+        'batch': batch.batch_id,
+        'commodities': normalized,
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def get_cached_recommendation_text(cache_key, batch):
+    """Cached response text for this key if it is from the given batch and younger than the TTL."""
+    ttl = getattr(settings, 'RECOMMENDATION_CACHE_TTL_SECONDS', 7 * 24 * 60 * 60)
+    return RecommendationResponseCache.objects.filter(
+        cache_key=cache_key,
+        batch=batch,
+        created_at__gte=timezone.now() - timedelta(seconds=ttl)
+    ).values_list('response_text', flat=True).first()
+
+
+def save_recommendation_text(cache_key, batch, response_text):
+    """Stores a parsed-OK response, dropping entries of older forecast batches."""
+    RecommendationResponseCache.objects.exclude(batch=batch).delete()
+    RecommendationResponseCache.objects.update_or_create(
+        cache_key=cache_key,
+        defaults={'batch': batch, 'response_text': response_text, 'created_at': timezone.now()}
+    )
+
+
+def get_alternative_recommendations(selected_month=None, selected_year=None, selected_municipality_id=None, llm_client=None):
     """
     Generates alternative fruit recommendations based on future low-supply trends.
     Combines multiple prompts into a single API call for efficiency.
+
+    Responses are cached per (low-supply set, forecast batch) in RecommendationResponseCache.
+    llm_client is any object with generate(prompt) -> text; defaults to GeminiClient.
     """
     print(f"🔍 Starting recommendations for month={selected_month}, year={selected_year}, municipality={selected_municipality_id}")
     
-    # Check if Gemini API key is configured
-    api_key = os.getenv("GEMINI_API_KEY")
-    if not api_key:
-        print("❌ GEMINI_API_KEY environment variable not set")
-        return {'short_term': [], 'long_term': []}
-    else:
-        print(f"🔑 API key configured (length: {len(api_key)} chars)")
-    
     # low_supply_threshold = 100000  # in kg
     if selected_month and selected_year:
         base_date = datetime(int(selected_year), int(selected_month), 1)
@@ -43,11 +178,6 @@ def get_alternative_recommendations(selected_month=None, selected_year=None, sel
 
     print(f"📅 Using base date: {base_date}")
 
-    all_commodities = CommodityType.objects.exclude(pk=1)
-    print(f"🌾 Found {all_commodities.count()} commodities to analyze")
-    
-    low_supply_commodities = []
-
     try:
         latest_batch = ForecastBatch.objects.latest('generated_at')
         print(f"📊 Using forecast batch: {latest_batch.batch_id} (generated at {latest_batch.generated_at})")
@@ -60,103 +190,7 @@ def get_alternative_recommendations(selected_month=None, selected_year=None, sel
 
     print(f"🏙️ Using municipality ID: {selected_municipality_id}")
 
-    # --- DYNAMIC THRESHOLD CALCULATION FOR A SPECIFIC MUNICIPALITY ---
-    
-    # 1. Get all forecasted amounts for all commodities for the given municipality
-    amounts_per_commodity = ForecastResult.objects.filter(
-        batch=latest_batch,
-        forecast_year__gte=base_date.year,
-        municipality=selected_municipality_id
-    ).values('commodity').annotate(total_kg=models.Sum('forecasted_amount_kg'))
-    
-    print(f"📈 Found {amounts_per_commodity.count()} commodity forecasts for municipality {selected_municipality_id}")
-    
-    forecasted_values = [item['total_kg'] for item in amounts_per_commodity]
-
-    if not forecasted_values:
-        print("❌ No forecasted values found for the selected municipality.")
-        return {'short_term': [], 'long_term': []}
-    
-    # Handle cases with insufficient data for a quartile calculation
-    if len(forecasted_values) < 4:
-        low_supply_threshold = np.median(forecasted_values) if forecasted_values else 0
-        print(f"⚠️ Using median threshold due to insufficient data points: {low_supply_threshold}")
-    else:
-        low_supply_threshold = np.quantile(forecasted_values, 0.25)
-    
-    print(f"📊 Calculated Low Supply Threshold (Q1) for Municipality {selected_municipality_id}: {low_supply_threshold}")
-    print(f"📋 Forecasted values range: min={min(forecasted_values)}, max={max(forecasted_values)}, count={len(forecasted_values)}")
-     
-    # --- END OF DYNAMIC THRESHOLD LOGIC ---
-    
-    # Step 2: Collect commodities with a forecasted supply below the threshold
-    commodities_checked = 0
-    for commodity in all_commodities:
-        commodities_checked += 1
-        years_to_mature = commodity.years_to_mature if commodity.years_to_mature is not None else 1
-        future_date = base_date + timedelta(days=float(years_to_mature) * 365.25)
-        
-        predicted_month_num = future_date.month
-        predicted_year = future_date.year
-
-        # Check if the needed forecast date is within the stored database horizon (12 months)
-        months_difference = (predicted_year - base_date.year) * 12 + (predicted_month_num - base_date.month)
-        db_forecast_horizon = 12
-        
-        if months_difference <= db_forecast_horizon and months_difference >= 0:
-            total_forecasted_kg = ForecastResult.objects.filter(
-                batch=latest_batch,
-                commodity=commodity,
-                forecast_month__number=predicted_month_num,
-                forecast_year=predicted_year,
-                municipality=selected_municipality_id
-            ).aggregate(total=models.Sum('forecasted_amount_kg'))['total']
-            
-            total_forecasted_kg = total_forecasted_kg if total_forecasted_kg is not None else 0
-            print(f"🔍 {commodity.name}: DB forecast = {total_forecasted_kg} kg (threshold: {low_supply_threshold})")
-            
-        else:
-            try:
-                # Load the appropriate Prophet model for the specific municipality
-
-                model_filename = f"prophet_{commodity.commodity_id}_{selected_municipality_id}.joblib"
-                bucket_path = f"prophet_models/{model_filename}"
-
-                # Check if the model file exists in the Spaces bucket
-                if not default_storage.exists(bucket_path):
-                    forecast_data = None
-                    print(f"⚠️ No trained model found for {commodity.name}")
-                else:
-                    # Open the file from the bucket and load it with joblib
-                    with default_storage.open(bucket_path, 'rb') as f:
-                        m = joblib.load(f)
-
-                    # Create a future dataframe for the specific date
-                    future_df = pd.DataFrame({'ds': [future_date]})
-                    
-                    # Predict the amount
-                    forecasted_amount_series = m.predict(future_df)['yhat']
-                    
-                    # Extract the single value
-                    total_forecasted_kg = forecasted_amount_series.iloc[0] if not forecasted_amount_series.empty else 0
-                    print(f"🔮 {commodity.name}: Prophet forecast = {total_forecasted_kg} kg")
-                
-            except Exception as e:
-                print(f"❌ Error generating on-demand forecast for {commodity.name} in Municipality {selected_municipality_id}: {e}")
-                continue
-            
-        # If the forecasted amount is low, add it to our list
-        if total_forecasted_kg is not None and total_forecasted_kg < low_supply_threshold:
-            low_supply_commodities.append({
-                'name': commodity.name,
-                'years_to_mature': years_to_mature,
-                'predicted_month': calendar.month_name[predicted_month_num],
-                'predicted_year': predicted_year,
-                'forecasted_amount': total_forecasted_kg 
-            })
-            print(f"✅ {commodity.name} added to low-supply list (forecast: {total_forecasted_kg} < threshold: {low_supply_threshold})")
-
-    print(f"📊 Checked {commodities_checked} commodities, found {len(low_supply_commodities)} with low supply")
+    low_supply_commodities = get_low_supply_commodities(base_date, latest_batch, selected_municipality_id)
 
     if not low_supply_commodities:
         print("💭 No low-supply commodities found, returning empty recommendations")
@@ -212,66 +246,47 @@ def get_alternative_recommendations(selected_month=None, selected_year=None, sel
         """
     )
     
-    # Step 3: Make a single API call with timeout handling
+    # Step 3: Reuse the response for the same low-supply set, otherwise make a single API call
+    cache_key = recommendation_cache_key(low_supply_commodities, latest_batch)
+    raw_text = get_cached_recommendation_text(cache_key, latest_batch)
+    if raw_text is not None:
+        print(f"♻️ Using cached Gemini response ({cache_key[:12]}) for {len(low_supply_commodities)} commodities")
+        return build_final_recommendations(low_supply_commodities, json.loads(raw_text))
+
+    if llm_client is None:
+        if not os.getenv("GEMINI_API_KEY"):
+            print("❌ GEMINI_API_KEY environment variable not set")
+            return {'short_term': [], 'long_term': []}
+        llm_client = GeminiClient()
+
     print(f"🚀 Starting Gemini API call for {len(low_supply_commodities)} commodities")
     print(f"📝 Prompt length: {len(full_prompt)} characters")
-    
-    # Test basic network connectivity
-    try:
-        import urllib.request
-        print("🌐 Testing network connectivity...")
-        urllib.request.urlopen('https://google.com', timeout=5)
-        print("✅ Network connectivity confirmed")
-    except Exception as network_error:
-        print(f"❌ Network connectivity issue: {network_error}")
-        print("💡 This might explain the API timeouts")
-    
+
     try:
-        import signal
         import concurrent.futures
-        
-        def api_call_with_timeout():
-            try:
-                print("🔧 Initializing Gemini model...")
-                model = genai.GenerativeModel('gemini-2.0-flash')
-                print("📡 Making API request...")
-                response = model.generate_content(full_prompt)
-                print("✅ Received response from Gemini API")
-                return response
-            except Exception as api_error:
-                print(f"❌ API call failed with error: {type(api_error).__name__}: {api_error}")
-                raise api_error
-        
+
         # Use ThreadPoolExecutor with timeout to prevent hanging
         with concurrent.futures.ThreadPoolExecutor() as executor:
-            future = executor.submit(api_call_with_timeout)
+            future = executor.submit(llm_client.generate, full_prompt)
             try:
-                # Increase timeout to 30 seconds for better reliability
-                print("⏱️ Waiting for API response (30s timeout)...")
-                response = future.result(timeout=30)
+                print(f"⏱️ Waiting for API response ({LLM_TIMEOUT_SECONDS}s timeout)...")
+                response_text = future.result(timeout=LLM_TIMEOUT_SECONDS)
             except concurrent.futures.TimeoutError:
-                print("⏰ Gemini API call timed out after 30 seconds")
+                print(f"⏰ Gemini API call timed out after {LLM_TIMEOUT_SECONDS} seconds")
                 print("💡 Try reducing the number of commodities or checking API performance")
                 return {'short_term': [], 'long_term': []}
             except Exception as future_error:
                 print(f"💥 Future execution failed: {type(future_error).__name__}: {future_error}")
                 return {'short_term': [], 'long_term': []}
-        
-        if not response:
-            print("❌ Received None response from Gemini API")
-            return {'short_term': [], 'long_term': []}
-            
-        if not hasattr(response, 'text') or not response.text:
+
+        if not response_text:
             print("❌ Empty or invalid response text from Gemini API")
-            print(f"📊 Response object: {type(response)}")
-            if hasattr(response, '__dict__'):
-                print(f"📋 Response attributes: {list(response.__dict__.keys())}")
             return {'short_term': [], 'long_term': []}
-        
-        print(f"📄 Received response text length: {len(response.text)} characters")
-        raw_text = response.text.replace("```json", "").replace("```", "").strip()
+
+        print(f"📄 Received response text length: {len(response_text)} characters")
+        raw_text = response_text.replace("```json", "").replace("```", "").strip()
         print(f"🧹 Cleaned response text length: {len(raw_text)} characters")
-        
+
         try:
             full_recommendations = json.loads(raw_text)
             print(f"✅ Successfully parsed JSON with {len(full_recommendations)} items")
@@ -280,94 +295,44 @@ def get_alternative_recommendations(selected_month=None, selected_year=None, sel
             print(f"📄 Raw response (first 500 chars): {raw_text[:500]}...")
             print(f"📄 Raw response (last 200 chars): ...{raw_text[-200:]}")
             return {'short_term': [], 'long_term': []}
-        
-        final_recommendations = {
-            'short_term': [],
-            'long_term': []
-        }
-        
-        # Parse the single JSON response and categorize recommendations
-        for commodity in low_supply_commodities:
-            commodity_name = commodity['name']
-            if commodity_name in full_recommendations:
-                rec_data = full_recommendations[commodity_name]
-                is_long_term = commodity['years_to_mature'] >= 1
-                
-                new_rec = {
-                    'commodity_name': commodity_name,
-                    'reason': rec_data.get('reason', 'Reason not provided.'),
-                    'estimated_maturity': f"{commodity['years_to_mature']} years" if is_long_term else f"{int(commodity['years_to_mature'] * 12)} months",
-                    'land_recommendations': rec_data.get('land_recommendations', {}),
-                    'forecasted_amount': commodity.get('forecasted_amount', 0),  # Include for sorting
-                    'predicted_month': commodity.get('predicted_month', 'Unknown'),
-                    'predicted_year': commodity.get('predicted_year', 'Unknown')
-                }
-                
-                if is_long_term:
-                    final_recommendations['long_term'].append(new_rec)
-                else:
-                    final_recommendations['short_term'].append(new_rec)
-                    
-        return final_recommendations
-
-    except ImportError:
-        print("❌ concurrent.futures not available, falling back to basic call")
-        # Fallback for environments without concurrent.futures
-        try:
-            print("🔧 Fallback: Initializing Gemini model...")
-            model = genai.GenerativeModel('gemini-2.0-flash')
-            print("📡 Fallback: Making direct API request...")
-            response = model.generate_content(full_prompt)
-            print("✅ Fallback: Received response from Gemini API")
-            
-            if not response:
-                print("❌ Fallback: Received None response")
-                return {'short_term': [], 'long_term': []}
-                
-            if not hasattr(response, 'text') or not response.text:
-                print("❌ Fallback: Empty or invalid response text")
-                return {'short_term': [], 'long_term': []}
-            
-            print(f"📄 Fallback: Response text length: {len(response.text)} characters")
-            raw_text = response.text.replace("```json", "").replace("```", "").strip()
-            full_recommendations = json.loads(raw_text)
-            print(f"✅ Fallback: Successfully parsed JSON with {len(full_recommendations)} items")
-            
-            final_recommendations = {'short_term': [], 'long_term': []}
-            
-            for commodity in low_supply_commodities:
-                commodity_name = commodity['name']
-                if commodity_name in full_recommendations:
-                    rec_data = full_recommendations[commodity_name]
-                    is_long_term = commodity['years_to_mature'] >= 1
-                    
-                    new_rec = {
-                        'commodity_name': commodity_name,
-                        'reason': rec_data.get('reason', 'Reason not provided.'),
-                        'estimated_maturity': f"{commodity['years_to_mature']} years" if is_long_term else f"{int(commodity['years_to_mature'] * 12)} months",
-                        'land_recommendations': rec_data.get('land_recommendations', {}),
-                        'forecasted_amount': commodity.get('forecasted_amount', 0), 
-                        'predicted_month': commodity.get('predicted_month', 'Unknown'),
-                        'predicted_year': commodity.get('predicted_year', 'Unknown')
-                    }
-                    
-                    if is_long_term:
-                        final_recommendations['long_term'].append(new_rec)
-                    else:
-                        final_recommendations['short_term'].append(new_rec)
-                        
-            return final_recommendations
-            
-        except Exception as fallback_error:
-            print(f"💥 Fallback API call also failed: {type(fallback_error).__name__}: {fallback_error}")
-            print(f"📋 Fallback error details: {str(fallback_error)}")
-            import traceback
-            print(f"📚 Fallback traceback: {traceback.format_exc()}")
-            return {'short_term': [], 'long_term': []}
-            
+
+        save_recommendation_text(cache_key, latest_batch, raw_text)
+        return build_final_recommendations(low_supply_commodities, full_recommendations)
+
     except Exception as e:
         print(f"💥 Unexpected error getting Gemini recommendations: {type(e).__name__}: {e}")
         print(f"📋 Error details: {str(e)}")
         import traceback
         print(f"📚 Full traceback: {traceback.format_exc()}")
         return {'short_term': [], 'long_term': []}
+
+
+def build_final_recommendations(low_supply_commodities, full_recommendations):
+    """Categorizes the parsed Gemini recommendations into short-term and long-term fruits."""
+    final_recommendations = {
+        'short_term': [],
+        'long_term': []
+    }
+
+    for commodity in low_supply_commodities:
+        commodity_name = commodity['name']
+        if commodity_name in full_recommendations:
+            rec_data = full_recommendations[commodity_name]
+            is_long_term = commodity['years_to_mature'] >= 1
+
+            new_rec = {
+                'commodity_name': commodity_name,
+                'reason': rec_data.get('reason', 'Reason not provided.'),
+                'estimated_maturity': f"{commodity['years_to_mature']} years" if is_long_term else f"{int(commodity['years_to_mature'] * 12)} months",
+                'land_recommendations': rec_data.get('land_recommendations', {}),
+                'forecasted_amount': commodity.get('forecasted_amount', 0),  # Include for sorting
+                'predicted_month': commodity.get('predicted_month', 'Unknown'),
+                'predicted_year': commodity.get('predicted_year', 'Unknown')
+            }
+
+            if is_long_term:
+                final_recommendations['long_term'].append(new_rec)
+            else:
+                final_recommendations['short_term'].append(new_rec)
+
+    return final_recommendations
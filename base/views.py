@@ -9,7 +9,7 @@ from datetime import date, timedelta
 from decimal import Decimal
 from django.utils import timezone
 from django.utils.timezone import now
-from django.views.decorators.http import require_POST
+from django.views.decorators.http import require_POST, condition
 from django.urls import reverse
 from django.http import HttpResponseForbidden
 from django.core.mail import send_mail, EmailMessage
@@ -25,7 +25,10 @@ from .models import *
 from dashboard.models import *
 from .forms import RegistrationForm, EditUserInformation, HarvestRecordCreate, PlantRecordCreate, RecordTransactionCreate, FarmlandRecordCreate
 from .utils import get_alternative_recommendations
+from .tasks import schedule_account_fruit_recommendations_task
+from .reference_data import reference_data
 from django.core.files.storage import default_storage
+from django.core.cache import cache
 
 def format_number(value):
     """Format a number with commas and 2 decimal places"""
@@ -50,38 +53,38 @@ def schedule_monthly_fruit_recommendations(account, municipality_id, farmland_na
         farmland_name: Name of the farmland (if recommendation is for a specific farmland)
         is_residential: True if this is for the user's residential municipality
     """
+    location_type = "residential" if is_residential else "farmland"
     try:
         current_time = timezone.now()
         if current_time.day > 1:
             target_month = current_time + relativedelta(seconds=2)
         else:
             target_month = current_time
-            
-        recommendations = get_alternative_recommendations(
-            selected_month=target_month.month,
-            selected_year=target_month.year,
-            selected_municipality_id=municipality_id
-        )
+        recommendation_month = target_month.date().replace(day=1)
         
         municipality = MunicipalityName.objects.get(pk=municipality_id)
         
-        location_type = "residential" if is_residential else "farmland"
         location_identifier = farmland_name if farmland_name else location_type
         
+        # Checked before generating recommendations, using the (account, type, month) index
         existing_notification = Notification.objects.filter(
             account=account,
             notification_type="fruit_recommendation",
-            scheduled_for__month=target_month.month,
-            scheduled_for__year=target_month.year,
-            message__icontains=municipality.municipality
-        ).filter(
+            recommendation_month=recommendation_month,
+            municipality=municipality,
             message__icontains=location_identifier
-        ).first()
+        ).exists()
         
         if existing_notification:
             print(f"Notification already exists for {municipality.municipality} ({location_type}) in {target_month.strftime('%B %Y')} - skipping duplicate")
             return False
         
+        recommendations = get_alternative_recommendations(
+            selected_month=target_month.month,
+            selected_year=target_month.year,
+            selected_municipality_id=municipality_id
+        )
+        
         all_recommendations = recommendations.get('short_term', []) + recommendations.get('long_term', [])
         
         if all_recommendations:
@@ -117,6 +120,8 @@ def schedule_monthly_fruit_recommendations(account, municipality_id, farmland_na
                 notification_type="fruit_recommendation",
                 scheduled_for=scheduled_datetime,
                 redirect_url=reverse('base:home'),
+                municipality=municipality,
+                recommendation_month=recommendation_month,
             )
             return True
         else:
@@ -191,6 +196,33 @@ def schedule_immediate_fruit_recommendations(account, municipality_id, farmland_
         return False
 
 
+def queue_monthly_fruit_recommendations(account, now=None):
+    """
+    Queues schedule_account_fruit_recommendations_task unless this month's recommendations
+    already exist or were queued recently. Costs one indexed query when there is nothing to do.
+    """
+    now = now or timezone.now()
+    recommendation_month = now.date().replace(day=1)
+    already_scheduled = Notification.objects.filter(
+        account=account,
+        notification_type="fruit_recommendation",
+        recommendation_month=recommendation_month
+    ).exists()
+    if already_scheduled or not FarmLand.objects.filter(userinfo_id=account.userinfo_id_id).exists():
+        return False
+
+    # Accounts without low-supply recommendations get no notification, so don't requeue them on every page load
+    if not cache.add(f"fruit-recommendations-queued:{account.pk}:{recommendation_month:%Y-%m}", True, 6 * 60 * 60):
+        return False
+    try:
+        schedule_account_fruit_recommendations_task.delay(account.pk)
+        print(f"📅 Queued fruit recommendations for account {account.pk} ({recommendation_month:%B %Y})")
+        return True
+    except Exception as e:
+        print(f"Could not queue fruit recommendations for account {account.pk}: {e}")
+        return False
+
+
 def home(request):
     print("🔥 DEBUG: Home view called!")  
 
@@ -206,33 +238,9 @@ def home(request):
             now = timezone.now()
             current_year = now.year
 
-            # Check if user has farmland records and get distinct municipalities
-            user_farmlands = FarmLand.objects.filter(userinfo_id=userinfo)
-            if user_farmlands.exists():
-                print(f"🌾 Found {user_farmlands.count()} farmland records for user")
-                # Get distinct municipality IDs from user's farmlands
-                distinct_municipality_ids = user_farmlands.values_list('municipality_id', flat=True).distinct()
-                print(f"🗺️ User has farmlands in {len(distinct_municipality_ids)} distinct municipalities")
-                
-                # Schedule fruit recommendation notifications for each municipality
-                scheduled_count = 0
-                for municipality_id in distinct_municipality_ids:
-                    municipality_name = user_farmlands.filter(municipality_id=municipality_id).first().municipality.municipality
-                    print(f"📅 Attempting to schedule notifications for {municipality_name} (ID: {municipality_id})")
-                    success = schedule_monthly_fruit_recommendations(accinfo, municipality_id)
-                    if success:
-                        scheduled_count += 1
-                
-                print(f"✅ Successfully scheduled {scheduled_count}/{len(distinct_municipality_ids)} notifications")
-                
-                current_notifications = Notification.objects.filter(
-                    account=accinfo,
-                    notification_type="fruit_recommendation"
-                ).count()
-                print(f"📢 Total fruit recommendation notifications for this user: {current_notifications}")
-
-            else : 
-                print("No farmland records found for user; skipping fruit recommendation scheduling.")
+            # Fruit recommendations are generated in the background (base.tasks); here we only
+            # queue them once per month for users with farmland records
+            queue_monthly_fruit_recommendations(accinfo, now)
             
             year_range = range(current_year - 1, current_year + 3) 
             municipalities = MunicipalityName.objects.exclude(pk=14)
@@ -1177,36 +1185,29 @@ def login_success(request):
     else:
         return redirect('base:home')
 
-def get_barangays(request, municipality_id):
-    if municipality_id == 9:
-        print("\n" + "🏘️"*30)
-        print("🔍 BARANGAY FETCH DEBUG - ORANI (pk=9)")
-        print("🏘️"*30)
-    
-    try:
-        # Get municipality info
-        municipality = MunicipalityName.objects.get(pk=municipality_id)
-        print(f"🏘️ Municipality: {municipality.municipality} (ID: {municipality_id})")
-        
-        # Get barangays
-        barangays = BarangayName.objects.filter(municipality_id=municipality_id).values('barangay_id', 'barangay')
-        barangay_list = [{'id': b['barangay_id'], 'barangay': b['barangay']} for b in barangays]
-        
-        print(f"🏠 Found {len(barangay_list)} barangays for {municipality.municipality}:")
-        for barangay in barangay_list:
-            print(f"   🔸 {barangay['barangay']} (ID: {barangay['id']})")
-            
-        if municipality_id == 9:
-            print("🏘️"*30)
-            
-        return JsonResponse(barangay_list, safe=False)
-        
-    except MunicipalityName.DoesNotExist:
-        print(f"❌ Municipality with ID {municipality_id} does not exist!")
-        return JsonResponse([], safe=False)
-    except Exception as e:
-        print(f"❌ Error fetching barangays for municipality {municipality_id}: {str(e)}")
-        return JsonResponse([], safe=False)
+def barangay_index(request, digest):
+    """
+    Barangays of every municipality in one JSON file. The URL carries the content hash, so
+    browsers keep it for a year and an edited barangay list is fetched under a new URL.
+    The digest is recomputed from a snapshot checked against the database version on every
+    request; only a URL matching it is marked immutable, any other is redirected without caching.
+    """
+    index = reference_data.get().barangay_index
+    if digest != index['digest']:
+        response = redirect('base:barangay_index', digest=index['digest'])
+        response['Cache-Control'] = 'no-cache'
+        return response
+    response = HttpResponse(index['body'], content_type='application/json')
+    response['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
+
+@condition(etag_func=lambda request, municipality_id=None: reference_data.get().barangay_index['digest'])
+def get_barangays(request, municipality_id=None):
+    """Barangays of one municipality ([] for an unknown one); the forms use barangay_index instead."""
+    barangays = reference_data.get().barangay_index['rows'].get(municipality_id, [])
+    response = JsonResponse(barangays, safe=False)
+    response['Cache-Control'] = 'public, no-cache'
+    return response
 
 def register_email(request):
     email_error = None
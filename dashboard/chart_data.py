@@ -0,0 +1,184 @@
+import hashlib, logging
+from datetime import datetime
+import pandas as pd
+from django.db.models import Max, Sum
+from dashboard.geo import geo_registry
+from base.models import CommodityType
+from dashboard.models import ForecastBatch, ForecastResult
+from dashboard.utils import get_latest_forecasts_by_combination, get_monthly_harvest_frame, harvest_rollup_version
+
+logger = logging.getLogger(__name__)
+
+
+def latest_forecast_time(request=None, *args, **kwargs):
+    """generated_at of the newest ForecastBatch; every chart on the forecast pages changes with it."""
+    return ForecastBatch.objects.aggregate(latest=Max('generated_at'))['latest']
+
+
+def forecast_data_etag(request, *args, **kwargs):
+    """Changes with a new batch and with the query string (ETags are compared per URL anyway)."""
+    latest = latest_forecast_time()
+    payload = f"{latest.isoformat() if latest else 'none'}|{request.GET.urlencode()}"
+    return hashlib.md5(payload.encode('utf-8')).hexdigest()
+
+
+def forecast_series_etag(request, *args, **kwargs):
+    """
+    The series charts also plot the harvest history, which a verification or import changes
+    without a new batch, so this one changes with the harvest rollup as well.
+    """
+    latest = latest_forecast_time()
+    payload = f"{latest.isoformat() if latest else 'none'}|{harvest_rollup_version()}|{request.GET.urlencode()}"
+    return hashlib.md5(payload.encode('utf-8')).hexdigest()
+
+
+def build_forecast_series(commodity_id, municipality_id):
+    """
+    Aligned Chart.js arrays (historical and forecast values per month label) plus the future
+    forecast rows of one series. None when the series has no forecasts.
+    """
+    # Monthly totals come from the harvest rollup ("Overall" sums every municipality)
+    hist_df = get_monthly_harvest_frame(commodity_id, municipality_id)
+        
+    base_forecast_qs = ForecastResult.objects.filter(
+        commodity_id=commodity_id,
+        municipality_id=municipality_id
+    )
+    forecast_results = get_latest_forecasts_by_combination(base_forecast_qs).select_related('forecast_month').order_by('forecast_year', 'forecast_month__number')
+    
+    if not forecast_results.exists():
+        forecast_data = None
+        logger.debug(f"No forecast results for commodity {commodity_id}, municipality {municipality_id}")
+    else:
+        df = hist_df
+        
+        forecast_dates = []
+        forecast_values_list = []
+        
+        for result in forecast_results:
+            forecast_date = datetime(result.forecast_year, result.forecast_month.number, 1)
+            forecast_dates.append(forecast_date)
+            forecast_values_list.append(float(result.forecasted_amount_kg))
+        
+        current_year = datetime.now().year
+        
+        earliest_historical = df['ds'].min() if not df.empty else datetime(current_year - 1, 1, 1)
+        timeline_start = min(earliest_historical, datetime(current_year - 1, 1, 1))
+        
+        timeline_end = datetime(current_year + 1, 12, 31)
+        
+        all_dates = pd.date_range(start=timeline_start, end=timeline_end, freq='MS')
+        
+        hist_dict = dict(zip(df['ds'], df['y'])) if not df.empty else {}
+        forecast_dict = dict(zip(forecast_dates, forecast_values_list))
+        
+        # Build aligned arrays for Chart.js
+        all_labels = [d.strftime('%b %Y') for d in all_dates]
+        hist_values = [float(hist_dict.get(d, 0)) if d in hist_dict else None for d in all_dates]
+        forecast_values = [float(forecast_dict.get(d, 0)) if d in forecast_dict else None for d in all_dates]
+        
+        # Combined data for CSV/table (only forecasts from January 2025 onwards)
+        future_forecast_data = []
+        
+        for result in forecast_results:
+            forecast_date = datetime(result.forecast_year, result.forecast_month.number, 1)
+            if forecast_date >= datetime(2025, 1, 1):
+                future_forecast_data.append([
+                    forecast_date.strftime('%b %Y'),
+                    round(float(result.forecasted_amount_kg), 2),
+                    result.forecast_month.number,
+                    result.forecast_year
+                ])
+
+        forecast_data = {
+            'all_labels': all_labels,
+            'hist_values': hist_values,
+            'forecast_values': forecast_values,
+            'combined': future_forecast_data,
+        }
+
+    return forecast_data
+
+
+def build_choropleth_data(commodity_id, month, year):
+    """{municipality_id: forecasted kg} of one commodity and month for the map."""
+    # MunicipalityName ID -> list of OBJECTIDs, parsed and joined once per process
+    muni_id_to_objectids = geo_registry.municipality_objectids()
+
+    choropleth_data = {}
+
+    if commodity_id and month and year:
+        try:
+            base_forecast_results = ForecastResult.objects.filter(
+                commodity_id=commodity_id,
+                forecast_month__number=month,
+                forecast_year=year
+            ).exclude(municipality_id=14).select_related('municipality') 
+            forecast_results = get_latest_forecasts_by_combination(base_forecast_results)
+            
+            if forecast_results.exists():
+                # Populate the choropleth data - use individual records (should be unique per municipality)
+                for result in forecast_results:
+                    muni_id = result.municipality_id
+                    total_kg = result.forecasted_amount_kg
+                    choropleth_data[str(muni_id)] = round(float(total_kg or 0), 2)
+            else:
+                # If no specific data, try to get "Overall" forecast and distribute it
+                overall_forecast_qs = ForecastResult.objects.filter(
+                    commodity_id=commodity_id,
+                    forecast_month__number=month,
+                    forecast_year=year,
+                    municipality_id=14  # "Overall" municipality
+                )
+                overall_forecast = get_latest_forecasts_by_combination(overall_forecast_qs).first()
+                
+                if overall_forecast:
+                    logger.debug(f"Distributing the Overall forecast of commodity {commodity_id} for {month}/{year}")
+                    # Distribute overall forecast among all municipalities equally
+                    num_munis = len(muni_id_to_objectids)
+                    if num_munis > 0:
+                        avg_per_muni = overall_forecast.forecasted_amount_kg / num_munis
+                        for muni_id in muni_id_to_objectids.keys():
+                            choropleth_data[str(muni_id)] = round(float(avg_per_muni), 2)
+                else:
+                    logger.debug(f"No forecast data available for commodity {commodity_id}, {month}/{year}")
+                
+        except Exception as e:
+            logger.warning(f"Error fetching choropleth data: {e}")
+            choropleth_data = {}
+
+    return choropleth_data
+
+
+def build_commodity_summary(month, year, municipality_id="14"):
+    """
+    Forecasted kg per commodity for one month ("14" sums every municipality), largest first,
+    and the top-10 bar chart data (None when there is nothing to show).
+    """
+    forecast_qs = ForecastResult.objects.filter(
+        forecast_month__number=month,
+        forecast_year=year,
+        forecast_year__gte=2025,
+        commodity__in=CommodityType.objects.exclude(pk=1),
+    )
+    if str(municipality_id) != "14":
+        forecast_qs = forecast_qs.filter(municipality__municipality_id=municipality_id)
+    forecast_qs = get_latest_forecasts_by_combination(forecast_qs)
+
+    # one grouped query instead of one aggregate per commodity
+    totals = forecast_qs.values('commodity__name').annotate(total_kg=Sum('forecasted_amount_kg')).order_by()
+    sorted_summary = sorted(
+        [(row['commodity__name'], round(row['total_kg'], 2)) for row in totals if row['total_kg'] and round(row['total_kg'], 2) > 0],
+        key=lambda x: x[1],
+        reverse=True
+    )
+
+    forecast_summary = [
+        {'commodity': k, 'forecasted_kg': v} for k, v in sorted_summary
+    ]
+    top_10_summary = sorted_summary[:10]
+    forecast_summary_chart = {
+        'labels': [item[0] for item in top_10_summary],
+        'values': [item[1] for item in top_10_summary]
+    } if top_10_summary else None
+    return forecast_summary, forecast_summary_chart
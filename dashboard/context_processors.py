@@ -1,19 +1,62 @@
+from django.core.cache import cache
+from django.db.models import Count, Min, Q
 from django.utils import timezone
+from django.utils.functional import SimpleLazyObject
 from dashboard.models import Notification
 
+LATEST_NOTIFICATIONS = 10
+NOTIFICATION_SUMMARY_TIMEOUT = 10 * 60
+
+
+def notification_summary_key(account_id):
+    return f"notification_summary:{account_id}"
+
+
+def invalidate_notification_summary(*account_ids):
+    """
+    Called when an account's notifications are created, read or delivered. Bumps the account's
+    DataVersion, so the cached summary is rebuilt in every process (web workers and Celery alike).
+    """
+    from base.data_versions import bump_data_versions
+
+    bump_data_versions([notification_summary_key(account_id) for account_id in account_ids])
+
+
+def get_notification_summary(account_id):
+    """
+    Latest visible notifications and the unread badge count of an account, cached per account
+    version: a hit costs the one primary key lookup of the version. A summary also expires when
+    the account's next scheduled notification comes due.
+    """
+    from base.data_versions import data_version
+
+    key = f"{notification_summary_key(account_id)}:{data_version(notification_summary_key(account_id))}"
+    now = timezone.now()
+    cached = cache.get(key)
+    if cached is not None and (cached['next_due'] is None or now < cached['next_due']):
+        return cached['summary']
+    account_notifications = Notification.objects.filter(account_id=account_id)
+    counts = account_notifications.aggregate(
+        unread_count=Count('pk', filter=Q(is_read=False, scheduled_for__lte=now)),
+        next_due=Min('scheduled_for', filter=Q(scheduled_for__gt=now)),
+    )
+    summary = {
+        'notifications': list(account_notifications.filter(scheduled_for__lte=now).order_by('-created_at')[:LATEST_NOTIFICATIONS]),
+        'unread_count': counts['unread_count'],
+    }
+    cache.set(key, {'summary': summary, 'next_due': counts['next_due']}, NOTIFICATION_SUMMARY_TIMEOUT)
+    return summary
+
+
 def unread_notifications(request):
     if not request.user.is_authenticated:
         return {}
     account_id = request.session.get('account_id')
     if not account_id:
         return {}
-    notifications_qs = Notification.objects.filter(
-        account__account_id=account_id,
-        scheduled_for__lte=timezone.now()
-    ).order_by('-created_at')
-    notifications = notifications_qs[:10]
-    unread_count = notifications_qs.filter(is_read=False).count()
+    # Lazy, so pages that don't show the notification panel (AJAX fragments, the admin pages) don't touch the cache or the database
+    summary = SimpleLazyObject(lambda: get_notification_summary(account_id))
     return {
-        'notifications': notifications,
-        'unread_count': unread_count,
-    }
\ No newline at end of file
+        'notifications': SimpleLazyObject(lambda: summary['notifications']),
+        'unread_count': SimpleLazyObject(lambda: summary['unread_count']),
+    }
@@ -0,0 +1,100 @@
+import hashlib, json, os, threading
+from django.conf import settings
+
+MUNICIPALITY_GEOJSON = os.path.join('geojson', 'BATAAN_MUNICIPALITY.geojson')
+# properties the choropleth actually reads; the rest of the census attributes are dropped
+KEPT_PROPERTIES = ('OBJECTID', 'MUNICIPALI')
+COORDINATE_DECIMALS = 5  # ~1 m, far below what the map can show at province zoom
+
+
+def _round_coordinates(coordinates):
+    if coordinates and isinstance(coordinates[0], (int, float)):
+        return [round(value, COORDINATE_DECIMALS) for value in coordinates]
+    return [_round_coordinates(part) for part in coordinates]
+
+
+class GeoJSONRegistry:
+    """
+    Process-wide cache of the municipality GeoJSON. The file is parsed once per mtime, and the
+    join with MunicipalityName (by upper-cased name) is computed once until invalidate() is
+    called, so the forecast page does no file I/O or parsing per view.
+
+    The same join is baked into a compact artifact (trimmed properties, rounded coordinates,
+    a municipality_id on every feature) that the map fetches with an ETag.
+    """
+
+    def __init__(self, path=None):
+        self._path = path
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._geojson = None
+        self._joined = None
+
+    @property
+    def path(self):
+        return self._path or os.path.join(settings.BASE_DIR, 'static', MUNICIPALITY_GEOJSON)
+
+    def geojson(self):
+        """Parsed GeoJSON, re-read only when the file's mtime changes."""
+        mtime = os.stat(self.path).st_mtime
+        with self._lock:
+            if self._geojson is None or mtime != self._mtime:
+                with open(self.path, encoding='utf-8') as f:
+                    self._geojson = json.load(f)
+                self._mtime = mtime
+                self._joined = None
+            return self._geojson
+
+    def _join(self):
+        from base.models import MunicipalityName
+
+        geojson = self.geojson()
+        with self._lock:
+            if self._joined is not None:
+                return self._joined
+
+        name_to_objectids = {}
+        for feature in geojson['features']:
+            name = feature['properties']['MUNICIPALI'].strip().upper()
+            name_to_objectids.setdefault(name, []).append(feature['properties']['OBJECTID'])
+
+        municipality_ids_by_name = {
+            name.strip().upper(): pk for pk, name in MunicipalityName.objects.values_list('municipality_id', 'municipality')
+        }
+        muni_id_to_objectids = {
+            pk: name_to_objectids.get(name, []) for name, pk in municipality_ids_by_name.items()
+        }
+
+        features = []
+        for feature in geojson['features']:
+            properties = {key: feature['properties'].get(key) for key in KEPT_PROPERTIES}
+            properties['municipality_id'] = municipality_ids_by_name.get(properties['MUNICIPALI'].strip().upper())
+            geometry = dict(feature['geometry'], coordinates=_round_coordinates(feature['geometry']['coordinates']))
+            features.append({'type': 'Feature', 'properties': properties, 'geometry': geometry})
+        body = json.dumps({'type': 'FeatureCollection', 'features': features}, separators=(',', ':')).encode('utf-8')
+
+        joined = {
+            'muni_id_to_objectids': muni_id_to_objectids,
+            'body': body,
+            'etag': '"%s"' % hashlib.md5(body).hexdigest(),
+        }
+        with self._lock:
+            self._joined = joined
+        return joined
+
+    def municipality_objectids(self):
+        """{MunicipalityName pk: [OBJECTID, ...]} of the features with the same name."""
+        return self._join()['muni_id_to_objectids']
+
+    def artifact(self):
+        """(body bytes, etag) of the pre-joined GeoJSON served to the map."""
+        joined = self._join()
+        return joined['body'], joined['etag']
+
+    def invalidate(self):
+        """Drops the municipality join (the parsed file itself is revalidated by mtime)."""
+        with self._lock:
+            self._joined = None
+
+
+geo_registry = GeoJSONRegistry()
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+from dashboard.utils import rebuild_harvest_rollup
+
+
+class Command(BaseCommand):
+    help = 'Recompute the monthly harvest rollup table from every verified harvest record'
+
+    def handle(self, *args, **options):
+        cells = rebuild_harvest_rollup()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {cells} monthly harvest rollup cells"))
+        # run: python manage.py rebuild_harvest_rollup
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:40
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0015_alter_userinformation_religion'),
+        ('dashboard', '0014_remove_verifiedharvestrecord_weight_per_unit_kg'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ForecastSeriesFingerprint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('row_count', models.IntegerField()),
+                ('first_month', models.DateField()),
+                ('last_month', models.DateField()),
+                ('data_hash', models.CharField(max_length=64)),
+                ('trained_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('batch', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='dashboard.forecastbatch')),
+                ('commodity', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='base.commoditytype')),
+                ('municipality', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='base.municipalityname')),
+            ],
+            options={
+                'unique_together': {('commodity', 'municipality')},
+            },
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:48
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0015_alter_userinformation_religion'),
+        ('dashboard', '0015_forecastseriesfingerprint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LongTermForecast',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('forecast_year', models.IntegerField()),
+                ('forecast_month', models.IntegerField()),
+                ('forecasted_amount_kg', models.FloatField()),
+                ('batch', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='dashboard.forecastbatch')),
+                ('commodity', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='base.commoditytype')),
+                ('municipality', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='base.municipalityname')),
+            ],
+            options={
+                'unique_together': {('commodity', 'municipality', 'forecast_year', 'forecast_month')},
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0015_alter_userinformation_religion'),
+        ('dashboard', '0017_recommendationresponsecache'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notification',
+            name='municipality',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='base.municipalityname'),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='recommendation_month',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['account', 'notification_type', 'recommendation_month'], name='notif_acct_type_month_idx'),
+        ),
+    ]
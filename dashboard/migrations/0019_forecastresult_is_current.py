@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:58
+
+from django.db import migrations, models
+
+
+def mark_latest_forecasts_current(apps, schema_editor):
+    """Flags the newest row of every (commodity, municipality, month, year), by batch generation time."""
+    ForecastResult = apps.get_model('dashboard', 'ForecastResult')
+    rows = ForecastResult.objects.order_by(
+        'commodity_id', 'municipality_id', 'forecast_month_id', 'forecast_year',
+        models.F('batch__generated_at').desc(nulls_last=True), '-forecast_id',
+    ).values_list('forecast_id', 'commodity_id', 'municipality_id', 'forecast_month_id', 'forecast_year')
+
+    current_ids = []
+    previous_key = None
+    for forecast_id, *key in rows.iterator(chunk_size=2000):
+        if key != previous_key:
+            current_ids.append(forecast_id)
+            previous_key = key
+    for start in range(0, len(current_ids), 2000):
+        ForecastResult.objects.filter(forecast_id__in=current_ids[start:start + 2000]).update(is_current=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0015_alter_userinformation_religion'),
+        ('dashboard', '0018_notification_recommendation_month'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='forecastresult',
+            name='is_current',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.RunPython(mark_latest_forecasts_current, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='forecastresult',
+            constraint=models.UniqueConstraint(condition=models.Q(('is_current', True)), fields=('commodity', 'municipality', 'forecast_month', 'forecast_year'), name='unique_current_forecast'),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:07
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import ExtractMonth, ExtractYear
+
+
+def build_harvest_rollup(apps, schema_editor):
+    """Same aggregation as dashboard.utils.rebuild_harvest_rollup, on the historical models."""
+    VerifiedHarvestRecord = apps.get_model('dashboard', 'VerifiedHarvestRecord')
+    MonthlyHarvestRollup = apps.get_model('dashboard', 'MonthlyHarvestRollup')
+    grouped = VerifiedHarvestRecord.objects.annotate(
+        year=ExtractYear('harvest_date'), month=ExtractMonth('harvest_date'),
+    ).values('year', 'month', 'commodity_id', 'municipality_id').annotate(
+        total_weight_kg=Sum('total_weight_kg'), record_count=Count('pk'),
+    ).order_by()
+    MonthlyHarvestRollup.objects.bulk_create([MonthlyHarvestRollup(**row) for row in grouped], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0016_effective_location'),
+        ('dashboard', '0019_forecastresult_is_current'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MonthlyHarvestRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.IntegerField()),
+                ('month', models.IntegerField()),
+                ('total_weight_kg', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('record_count', models.IntegerField(default=0)),
+                ('commodity', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='base.commoditytype')),
+                ('municipality', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='base.municipalityname')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['commodity', 'municipality', 'year', 'month'], name='harvest_rollup_series_idx')],
+                'unique_together': {('year', 'month', 'commodity', 'municipality')},
+            },
+        ),
+        migrations.RunPython(build_harvest_rollup, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:35
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def mark_due_notifications_delivered(apps, schema_editor):
+    # Already visible to their accounts; without this the first delivery run would re-date them all
+    Notification = apps.get_model('dashboard', 'Notification')
+    Notification.objects.filter(scheduled_for__lte=timezone.now()).update(delivered_at=models.F('created_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0016_effective_location'),
+        ('dashboard', '0020_monthlyharvestrollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notification',
+            name='delivered_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['scheduled_for', 'delivered_at'], name='notif_sched_delivered_idx'),
+        ),
+        migrations.RunPython(mark_due_notifications_delivered, migrations.RunPython.noop),
+    ]
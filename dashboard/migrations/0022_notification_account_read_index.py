@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0016_effective_location'),
+        ('dashboard', '0021_notification_delivered_at'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['account', 'is_read', 'scheduled_for'], name='notif_acct_read_sched_idx'),
+        ),
+    ]
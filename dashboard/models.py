@@ -63,8 +63,20 @@ class Notification(models.Model):
     created_at = models.DateTimeField(default=timezone.now)
     notification_type = models.CharField(max_length=50, default="general")
     scheduled_for = models.DateTimeField(null=True, blank=True)
+    # set by base.notifications.deliver_due_notifications once a scheduled notification is delivered
+    delivered_at = models.DateTimeField(null=True, blank=True)
     linked_plant_record = models.ForeignKey('base.initPlantRecord', on_delete=models.SET_NULL, null=True, blank=True)
     redirect_url = models.URLField(blank=True, null=True)
+    # set on fruit recommendations: which municipality and month (1st day) they were generated for
+    municipality = models.ForeignKey('base.MunicipalityName', on_delete=models.SET_NULL, null=True, blank=True)
+    recommendation_month = models.DateField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['account', 'notification_type', 'recommendation_month'], name='notif_acct_type_month_idx'),
+            models.Index(fields=['scheduled_for', 'delivered_at'], name='notif_sched_delivered_idx'),
+            models.Index(fields=['account', 'is_read', 'scheduled_for'], name='notif_acct_read_sched_idx'),
+        ]
 
     def __str__(self):
         return f"Notif for {self.account.userinfo_id.firstname} {self.account.userinfo_id.lastname} - {self.message[:30]}"
@@ -92,10 +104,85 @@ class ForecastResult(models.Model):
     # seasonal_boost_applied = models.BooleanField(default=False)
     source_data_last_updated = models.DateTimeField(auto_now_add=True)
     notes = models.TextField(blank=True, null=True)
+    # the newest forecast of its (commodity, municipality, month, year), maintained by dashboard.utils.save_current_forecasts
+    is_current = models.BooleanField(default=False)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['commodity', 'municipality', 'forecast_month', 'forecast_year'],
+                condition=models.Q(is_current=True),
+                name='unique_current_forecast',
+            ),
+        ]
 
     def __str__(self):
         return f"{self.commodity.name} - {self.forecast_month}/{self.forecast_year} in {self.municipality.municipality}"
 
+class ForecastSeriesFingerprint(models.Model):
+    # content fingerprint of the monthly training frame a Prophet model was last fitted on,
+    # used to skip refitting series whose data did not change
+    commodity = models.ForeignKey('base.CommodityType', on_delete=models.CASCADE)
+    municipality = models.ForeignKey('base.MunicipalityName', on_delete=models.CASCADE)
+    row_count = models.IntegerField()
+    first_month = models.DateField()
+    last_month = models.DateField()
+    data_hash = models.CharField(max_length=64)
+    batch = models.ForeignKey(ForecastBatch, on_delete=models.SET_NULL, null=True, blank=True)
+    trained_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        unique_together = ('commodity', 'municipality')
+
+    def __str__(self):
+        return f"{self.commodity_id}/{self.municipality_id}: {self.row_count} months {self.first_month} to {self.last_month}"
+
+class LongTermForecast(models.Model):
+    # monthly Prophet predictions up to FORECAST_HORIZON_YEARS ahead, written at training time
+    # so recommendations for long-maturity fruits don't have to load models and predict per request
+    commodity = models.ForeignKey('base.CommodityType', on_delete=models.CASCADE)
+    municipality = models.ForeignKey('base.MunicipalityName', on_delete=models.CASCADE)
+    forecast_year = models.IntegerField()
+    forecast_month = models.IntegerField()
+    forecasted_amount_kg = models.FloatField()
+    batch = models.ForeignKey(ForecastBatch, on_delete=models.SET_NULL, null=True, blank=True)
+
+    class Meta:
+        unique_together = ('commodity', 'municipality', 'forecast_year', 'forecast_month')
+
+    def __str__(self):
+        return f"{self.commodity_id}/{self.municipality_id}: {self.forecast_month}/{self.forecast_year} = {self.forecasted_amount_kg} kg"
+
+class RecommendationResponseCache(models.Model):
+    # Gemini response text for one set of low-supply commodities, reused until the TTL passes
+    # or a new forecast batch is generated
+    cache_key = models.CharField(max_length=64, unique=True)
+    batch = models.ForeignKey(ForecastBatch, on_delete=models.CASCADE)
+    response_text = models.TextField()
+    created_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"Recommendation cache {self.cache_key[:12]} for batch {self.batch_id}"
+
+class MonthlyHarvestRollup(models.Model):
+    # verified harvest totals per (year, month, commodity, municipality), kept up to date by the
+    # VerifiedHarvestRecord signals so charts and training read a few hundred rows instead of every record
+    year = models.IntegerField()
+    month = models.IntegerField()
+    commodity = models.ForeignKey('base.CommodityType', on_delete=models.CASCADE)
+    municipality = models.ForeignKey('base.MunicipalityName', on_delete=models.CASCADE, null=True, blank=True)
+    total_weight_kg = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    record_count = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('year', 'month', 'commodity', 'municipality')
+        indexes = [
+            models.Index(fields=['commodity', 'municipality', 'year', 'month'], name='harvest_rollup_series_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.commodity_id}/{self.municipality_id}: {self.month}/{self.year} = {self.total_weight_kg} kg ({self.record_count} records)"
+
 # only model left unchanged
 
 
@@ -0,0 +1,89 @@
+import hashlib, json
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.http import FileResponse, Http404
+from django.shortcuts import render
+from django.urls import reverse
+from django.utils.http import urlencode
+from django.utils.module_loading import import_string
+
+# kind -> dotted path of `renderer(payload) -> pdf bytes`, imported lazily in the worker
+REPORT_RENDERERS = {
+    'forecast': 'dashboard.views.render_forecast_report',
+    'admin': 'administrator.views.render_admin_report',
+}
+REPORT_TASK_TIMEOUT = 10 * 60
+
+
+def report_key(kind, payload, version):
+    """Same report, same filters, same data version -> same key, so a rendered file is reused."""
+    raw = json.dumps([kind, payload, version], sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+def report_path(kind, key):
+    return f"reports/{kind}/{key}.pdf"
+
+
+def request_report(kind, payload, version, key_payload=None):
+    """
+    (key, task_id) of a PDF report. task_id is None when the report is already rendered;
+    otherwise a render_report_task is queued, unless one for the same key is still running.
+    key_payload, when given, is hashed instead of payload.
+    """
+    from .tasks import render_report_task
+
+    key = report_key(kind, payload if key_payload is None else key_payload, version)
+    if default_storage.exists(report_path(kind, key)):
+        return key, None
+    task_id = cache.get(f"report_task:{key}")
+    if task_id is None:
+        task_id = render_report_task.delay(kind, payload, key).id
+        cache.set(f"report_task:{key}", task_id, REPORT_TASK_TIMEOUT)
+    return key, task_id
+
+
+def render_report(kind, payload, key):
+    """Renders a report and stores it under its key (run by render_report_task)."""
+    path = report_path(kind, key)
+    if default_storage.exists(path):
+        return path
+    pdf = import_string(REPORT_RENDERERS[kind])(payload)
+    return default_storage.save(path, ContentFile(pdf))
+
+
+def report_status(kind, key, task_id=None):
+    from celery.result import AsyncResult
+
+    if default_storage.exists(report_path(kind, key)):
+        return {'state': 'ready'}
+    if task_id:
+        result = AsyncResult(task_id)
+        if result.state == 'FAILURE':
+            return {'state': 'failed', 'error': str(result.info)}
+    return {'state': 'pending'}
+
+
+def report_file_response(kind, key, filename):
+    path = report_path(kind, key)
+    if not default_storage.exists(path):
+        raise Http404("Report not found")
+    return FileResponse(default_storage.open(path, 'rb'), as_attachment=True, filename=filename, content_type='application/pdf')
+
+
+def report_response(request, kind, payload, version, filename, url_namespace, layout, key_payload=None, extra_context=None):
+    """
+    The PDF itself when it is already rendered, otherwise a page that polls the report's
+    status and starts the download once the worker has stored it.
+    """
+    key, task_id = request_report(kind, payload, version, key_payload)
+    if task_id is None:
+        return report_file_response(kind, key, filename)
+    return render(request, 'reports/report_pending.html', {
+        **(extra_context or {}),
+        'layout': layout,
+        'filename': filename,
+        'status_url': f"{reverse(f'{url_namespace}:report_status', args=[kind, key])}?{urlencode({'task_id': task_id})}",
+        'download_url': f"{reverse(f'{url_namespace}:report_download', args=[kind, key])}?{urlencode({'filename': filename})}",
+    })
@@ -0,0 +1,46 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from base.models import MunicipalityName
+from .geo import geo_registry
+from .context_processors import invalidate_notification_summary
+from .models import Notification, VerifiedHarvestRecord
+from .utils import harvest_rollup_cell, record_refresh_is_batched, refresh_harvest_rollup
+
+
+@receiver(pre_save, sender=VerifiedHarvestRecord)
+def remember_rollup_cell(sender, instance, **kwargs):
+    """An edit can move a record to another month, commodity or municipality; the old cell needs a refresh too."""
+    instance._previous_rollup_cell = None
+    if instance.pk:
+        previous = sender.objects.filter(pk=instance.pk).values('harvest_date', 'commodity_id', 'municipality_id').first()
+        if previous:
+            harvest_date = previous['harvest_date']
+            instance._previous_rollup_cell = (harvest_date.year, harvest_date.month, previous['commodity_id'], previous['municipality_id'])
+
+
+@receiver(post_save, sender=VerifiedHarvestRecord)
+def update_rollup_on_save(sender, instance, **kwargs):
+    cells = {harvest_rollup_cell(instance)}
+    if getattr(instance, '_previous_rollup_cell', None):
+        cells.add(instance._previous_rollup_cell)
+    refresh_harvest_rollup(cells)
+
+
+@receiver(post_delete, sender=VerifiedHarvestRecord)
+def update_rollup_on_delete(sender, instance, **kwargs):
+    if record_refresh_is_batched():
+        return
+    refresh_harvest_rollup({harvest_rollup_cell(instance)})
+
+
+@receiver(post_save, sender=MunicipalityName)
+@receiver(post_delete, sender=MunicipalityName)
+def refresh_municipality_geojson(sender, **kwargs):
+    """The choropleth joins GeoJSON features to municipalities by name."""
+    geo_registry.invalidate()
+
+
+@receiver(post_save, sender=Notification)
+@receiver(post_delete, sender=Notification)
+def refresh_notification_summary(sender, instance, **kwargs):
+    invalidate_notification_summary(instance.account_id)
@@ -0,0 +1,11 @@
+from celery import shared_task
+
+
+@shared_task
+def render_report_task(kind, payload, key):
+    """Renders a PDF report outside the request/response cycle and stores it in default_storage."""
+    from .reports import render_report
+
+    path = render_report(kind, payload, key)
+    print(f"Rendered {kind} report to {path}")
+    return path
@@ -1,3 +1,313 @@
+from datetime import date
 from django.test import TestCase
+from base.models import CommodityType, MunicipalityName, Month
+from .models import ForecastBatch, ForecastResult
+from .utils import get_latest_forecasts_by_combination, make_batch_current, save_current_forecasts
 
-# Create your tests here.
+
+class CurrentForecastTest(TestCase):
+
+    def setUp(self):
+        self.months = {number: Month.objects.create(name=date(2025, number, 1).strftime('%B'), number=number) for number in (1, 2)}
+        self.commodity = CommodityType.objects.create(name="Mango", average_weight_per_unit_kg=0.25)
+        self.municipality = MunicipalityName.objects.create(municipality="Balanga")
+
+    def forecasts(self, batch, amounts):
+        return [
+            ForecastResult(batch=batch, commodity=self.commodity, municipality=self.municipality,
+                           forecast_month=self.months[number], forecast_year=2025, forecasted_amount_kg=amount)
+            for number, amount in amounts.items()
+        ]
+
+    def test_newer_forecast_replaces_only_its_combination(self):
+        old_batch = ForecastBatch.objects.create(notes="old")
+        save_current_forecasts(self.forecasts(old_batch, {1: 10.0, 2: 20.0}))
+        new_batch = ForecastBatch.objects.create(notes="new")
+        save_current_forecasts(self.forecasts(new_batch, {2: 25.0}))
+
+        current = get_latest_forecasts_by_combination(ForecastResult.objects.all()).order_by('forecast_month__number')
+        self.assertEqual([(f.batch_id, f.forecasted_amount_kg) for f in current], [(old_batch.pk, 10.0), (new_batch.pk, 25.0)])
+        self.assertEqual(ForecastResult.objects.count(), 3)
+
+    def test_batch_written_directly_can_be_made_current(self):
+        old_batch = ForecastBatch.objects.create(notes="old")
+        save_current_forecasts(self.forecasts(old_batch, {1: 10.0}))
+        new_batch = ForecastBatch.objects.create(notes="new")
+        ForecastResult.objects.bulk_create(self.forecasts(new_batch, {1: 15.0}))
+
+        self.assertEqual(make_batch_current(new_batch), 1)
+        self.assertEqual(ForecastResult.objects.get(is_current=True).batch, new_batch)
+
+
+class HarvestRecordsMixin:
+
+    def setUp(self):
+        self.mango = CommodityType.objects.create(commodity_id=2, name="Mango", average_weight_per_unit_kg=0.25)
+        self.balanga = MunicipalityName.objects.create(municipality_id=1, municipality="Balanga")
+        self.orani = MunicipalityName.objects.create(municipality_id=2, municipality="Orani")
+
+    def harvest(self, harvest_date, weight, municipality):
+        from .models import VerifiedHarvestRecord
+        return VerifiedHarvestRecord.objects.create(harvest_date=harvest_date, commodity_id=self.mango, total_weight_kg=weight, municipality=municipality)
+
+    def cells(self):
+        from .models import MonthlyHarvestRollup
+        return {
+            (row.year, row.month, row.municipality_id): (float(row.total_weight_kg), row.record_count)
+            for row in MonthlyHarvestRollup.objects.all()
+        }
+
+
+class HarvestRollupTest(HarvestRecordsMixin, TestCase):
+
+    def test_rollup_follows_creates_edits_and_deletes(self):
+        first = self.harvest(date(2025, 1, 5), 10, self.balanga)
+        self.harvest(date(2025, 1, 20), 5, self.balanga)
+        self.harvest(date(2025, 2, 1), 7, self.orani)
+        self.assertEqual(self.cells(), {(2025, 1, 1): (15.0, 2), (2025, 2, 2): (7.0, 1)})
+
+        first.harvest_date, first.municipality = date(2025, 2, 10), self.orani
+        first.save()
+        self.assertEqual(self.cells(), {(2025, 1, 1): (5.0, 1), (2025, 2, 2): (17.0, 2)})
+
+        first.delete()
+        self.assertEqual(self.cells(), {(2025, 1, 1): (5.0, 1), (2025, 2, 2): (7.0, 1)})
+
+    def test_bulk_import_refresh_and_rebuild(self):
+        from .models import MonthlyHarvestRollup, VerifiedHarvestRecord
+        from .utils import harvest_rollup_cell, rebuild_harvest_rollup, refresh_harvest_rollup
+
+        created = VerifiedHarvestRecord.objects.bulk_create([
+            VerifiedHarvestRecord(harvest_date=date(2025, month, 1), commodity_id=self.mango, total_weight_kg=month, municipality=self.balanga)
+            for month in (3, 3, 4)
+        ])
+        self.assertEqual(self.cells(), {})
+        with self.assertNumQueries(5):  # aggregate + savepoint, delete, upsert, release
+            refresh_harvest_rollup({harvest_rollup_cell(record) for record in created})
+        self.assertEqual(self.cells(), {(2025, 3, 1): (6.0, 2), (2025, 4, 1): (4.0, 1)})
+
+        MonthlyHarvestRollup.objects.all().delete()
+        self.assertEqual(rebuild_harvest_rollup(), 2)
+        self.assertEqual(self.cells(), {(2025, 3, 1): (6.0, 2), (2025, 4, 1): (4.0, 1)})
+
+    def test_monthly_frames_for_charts_and_training(self):
+        from administrator.forecasting import load_monthly_records
+        from .utils import get_monthly_harvest_frame
+
+        self.harvest(date(2025, 1, 5), 10, self.balanga)
+        self.harvest(date(2025, 1, 9), 2, self.orani)
+        self.harvest(date(2025, 3, 5), 4, self.balanga)
+
+        overall = get_monthly_harvest_frame(self.mango.pk, 14)
+        self.assertEqual([d.strftime('%Y-%m') for d in overall['ds']], ['2025-01', '2025-03'])
+        self.assertEqual([float(y) for y in overall['y']], [12.0, 4.0])
+        self.assertEqual([float(y) for y in get_monthly_harvest_frame(self.mango.pk, self.orani.pk)['y']], [2.0])
+        self.assertTrue(get_monthly_harvest_frame(self.mango.pk, 99).empty)
+
+        records = load_monthly_records([self.mango.pk], [self.balanga.pk])
+        self.assertEqual(list(records['harvest_date']), [date(2025, 1, 1), date(2025, 3, 1)])
+        self.assertEqual(list(records.columns), ['harvest_date', 'total_weight_kg', 'commodity_id', 'municipality_id'])
+
+
+class SeriesEligibilityTest(HarvestRecordsMixin, TestCase):
+
+    def test_series_stats_for_every_municipality_at_once(self):
+        from .utils import get_eligible_series, get_series_stats
+
+        self.harvest(date(2025, 1, 5), 10, self.balanga)
+        self.harvest(date(2025, 1, 25), 1, self.balanga)
+        self.harvest(date(2025, 3, 5), 4, self.balanga)
+        self.harvest(date(2025, 3, 9), 2, self.orani)
+
+        with self.assertNumQueries(2):
+            stats = get_series_stats([self.mango.pk])
+        self.assertEqual(stats[(self.mango.pk, self.balanga.pk)], {
+            'months': 2, 'records': 3, 'first_month': date(2025, 1, 1), 'last_month': date(2025, 3, 1),
+        })
+        self.assertEqual(stats[(self.mango.pk, self.orani.pk)]['months'], 1)
+        # Overall counts March once even though two municipalities harvested then
+        self.assertEqual(stats[(self.mango.pk, 14)]['months'], 2)
+        self.assertEqual(stats[(self.mango.pk, 14)]['records'], 4)
+
+        self.assertEqual(get_eligible_series([self.mango.pk]), {(self.mango.pk, self.balanga.pk), (self.mango.pk, 14)})
+        self.assertEqual(get_eligible_series([self.mango.pk], include_overall=False), {(self.mango.pk, self.balanga.pk)})
+
+
+class GeoJSONRegistryTest(TestCase):
+
+    def setUp(self):
+        import json, os, tempfile
+        from .geo import GeoJSONRegistry
+
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.path = os.path.join(self.tmpdir.name, 'municipalities.geojson')
+        features = [
+            {'type': 'Feature', 'properties': {'OBJECTID': 3, 'MUNICIPALI': 'BALANGA', 'TOTPOP2010': 1},
+             'geometry': {'type': 'Polygon', 'coordinates': [[[120.5412345678, 14.6712345678], [120.6, 14.7], [120.5412345678, 14.6712345678]]]}},
+            {'type': 'Feature', 'properties': {'OBJECTID': 9, 'MUNICIPALI': 'ORANI', 'TOTPOP2010': 2},
+             'geometry': {'type': 'Polygon', 'coordinates': [[[120.5, 14.8], [120.6, 14.9], [120.5, 14.8]]]}},
+        ]
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump({'type': 'FeatureCollection', 'features': features}, f)
+        self.balanga = MunicipalityName.objects.create(municipality="Balanga")
+        self.registry = GeoJSONRegistry(self.path)
+
+    def test_join_is_computed_once(self):
+        self.assertEqual(self.registry.municipality_objectids(), {self.balanga.pk: [3]})
+        with self.assertNumQueries(0):
+            self.registry.municipality_objectids()
+
+        self.registry.invalidate()
+        orani = MunicipalityName.objects.create(municipality="Orani")
+        self.assertEqual(self.registry.municipality_objectids()[orani.pk], [9])
+
+    def test_artifact_is_trimmed_and_joined(self):
+        import json
+
+        body, etag = self.registry.artifact()
+        features = json.loads(body)['features']
+        self.assertEqual(features[0]['properties'], {'OBJECTID': 3, 'MUNICIPALI': 'BALANGA', 'municipality_id': self.balanga.pk})
+        self.assertEqual(features[0]['geometry']['coordinates'][0][0], [120.54123, 14.67123])
+        self.assertIsNone(features[1]['properties']['municipality_id'])
+        self.assertEqual(self.registry.artifact()[1], etag)
+
+    def test_endpoint_honours_etag(self):
+        from unittest import mock
+        from django.urls import reverse
+
+        with mock.patch('dashboard.views.geo_registry', self.registry):
+            url = reverse('dashboard:municipality_geojson')
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response['ETag'], self.registry.artifact()[1])
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+
+class ForecastChartDataTest(TestCase):
+
+    def setUp(self):
+        self.months = {number: Month.objects.create(name=date(2025, number, 1).strftime('%B'), number=number) for number in (1, 2)}
+        CommodityType.objects.create(commodity_id=1, name="Other", average_weight_per_unit_kg=1)
+        self.commodity = CommodityType.objects.create(commodity_id=2, name="Mango", average_weight_per_unit_kg=0.25)
+        self.municipality = MunicipalityName.objects.create(municipality_id=1, municipality="Balanga")
+        MunicipalityName.objects.create(municipality_id=14, municipality="Overall")
+        self.batch = ForecastBatch.objects.create()
+        save_current_forecasts([
+            ForecastResult(batch=self.batch, commodity=self.commodity, municipality=self.municipality,
+                           forecast_month=self.months[1], forecast_year=2025, forecasted_amount_kg=120.5),
+        ])
+
+    def test_map_data_is_revalidated_against_the_latest_batch(self):
+        from django.urls import reverse
+
+        url = reverse('dashboard:forecast_map_data') + '?mapcommodity_id=2&filter_month=1&filter_year=2025'
+        response = self.client.get(url)
+        self.assertEqual(response.json(), {'map': {'1': 120.5}})
+        self.assertIn('Last-Modified', response)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+        ForecastBatch.objects.create()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 200)
+
+    def test_series_and_summary_endpoints(self):
+        from django.urls import reverse
+
+        series = self.client.get(reverse('dashboard:forecast_series_data') + '?commodity_id=2&municipality_id=1').json()['series']
+        self.assertIn('Jan 2025', series['all_labels'])
+        self.assertEqual(series['combined'], [['Jan 2025', 120.5, 1, 2025]])
+
+        summary = self.client.get(reverse('dashboard:forecast_bycommodity_data') + '?filter_month=1&filter_year=2025').json()
+        self.assertEqual(summary['summary'], [{'commodity': "Mango", 'forecasted_kg': 120.5}])
+        self.assertEqual(self.client.get(reverse('dashboard:forecast_series_data')).status_code, 400)
+
+    def test_series_data_is_revalidated_against_the_harvest_history(self):
+        from django.urls import reverse
+        from .models import VerifiedHarvestRecord
+
+        url = reverse('dashboard:forecast_series_data') + '?commodity_id=2&municipality_id=1'
+        response = self.client.get(url)
+        self.assertNotIn('Last-Modified', response)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+        # a verified harvest changes the plotted history without a new batch
+        VerifiedHarvestRecord.objects.create(harvest_date=date(2024, 12, 5), commodity_id=self.commodity, total_weight_kg=10, municipality=self.municipality)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Dec 2024', response.json()['series']['all_labels'])
+
+    def test_forecast_page_still_renders(self):
+        from django.urls import reverse
+
+        response = self.client.get(reverse('dashboard:forecast') + '?commodity_id=2&municipality_id=1&mapcommodity_id=2&filter_month=1&filter_year=2025')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['choropleth_data'], '{"1": 120.5}')
+
+        response = self.client.get(reverse('dashboard:forecast_bycommodity') + '?filter_month=1&filter_year=2025')
+        self.assertEqual(response.context['forecast_summary_chart'], {'labels': ["Mango"], 'values': [120.5]})
+
+
+class ForecastReportTest(ForecastChartDataTest):
+
+    def setUp(self):
+        import tempfile
+        from unittest import mock
+        from django.core.cache import cache
+        from django.core.files.storage import FileSystemStorage
+        super().setUp()
+        cache.clear()
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        patcher = mock.patch('dashboard.reports.default_storage', FileSystemStorage(location=self.tmpdir.name))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch('dashboard.tasks.render_report_task.delay', side_effect=lambda *args: mock.Mock(id=f"task-{len(self.queued)}"))
+        self.delay = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @property
+    def queued(self):
+        return self.delay.call_args_list
+
+    def test_harvest_history_changes_invalidate_stored_reports(self):
+        from datetime import date
+        from django.urls import reverse
+        from .models import VerifiedHarvestRecord
+
+        url = reverse('dashboard:forecast_pdf') + '?pdf_type=by_commodity&filter_month=1&filter_year=2025'
+        self.client.get(url)
+        VerifiedHarvestRecord.objects.create(harvest_date=date(2024, 1, 5), commodity_id=self.commodity, total_weight_kg=10, municipality=self.municipality)
+        self.client.get(url)
+        self.assertEqual(len(self.queued), 2)
+        self.assertNotEqual(self.queued[0].args[2], self.queued[1].args[2])
+
+    def test_report_is_rendered_once_and_then_served_from_storage(self):
+        from django.urls import reverse
+        from .reports import render_report
+
+        url = reverse('dashboard:forecast_pdf') + '?pdf_type=by_commodity&filter_month=1&filter_year=2025'
+        response = self.client.get(url)
+        self.assertTemplateUsed(response, 'reports/report_pending.html')
+        self.client.get(url)
+        self.assertEqual(len(self.queued), 1)
+
+        kind, payload, key = self.queued[0].args
+        render_report(kind, payload, key)
+        status = self.client.get(reverse('dashboard:report_status', args=[kind, key])).json()
+        self.assertEqual(status, {'state': 'ready'})
+
+        response = self.client.get(url)
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertIn('forecast-by-commodity_all-of-bataan_2025-1.pdf', response['Content-Disposition'])
+        self.assertTrue(b"".join(response.streaming_content).startswith(b'%PDF'))
+        self.assertEqual(len(self.queued), 1)
+
+    def test_new_forecast_batch_changes_the_report_key(self):
+        from django.urls import reverse
+
+        url = reverse('dashboard:forecast_pdf') + '?pdf_type=by_commodity&filter_month=1&filter_year=2025'
+        self.client.get(url)
+        ForecastBatch.objects.create()
+        self.client.get(url)
+        self.assertEqual(len(self.queued), 2)
+        self.assertNotEqual(self.queued[0].args[2], self.queued[1].args[2])
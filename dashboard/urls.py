@@ -10,8 +10,14 @@ urlpatterns = [
     path('forecast/', forecast, name="forecast"),
     path('forecast/download_csv/', views.forecast_csv, name='forecast_csv'),
     path('forecast/download_pdf/', views.forecast_pdf, name='forecast_pdf'),
+    path('reports/<slug:kind>/<slug:key>/status/', views.report_status, name='report_status'),
+    path('reports/<slug:kind>/<slug:key>/download/', views.report_download, name='report_download'),
     path('forecast/bycommodity/', views.forecast_bycommodity, name='forecast_bycommodity'),
+    path('forecast/data/', views.forecast_series_data, name='forecast_series_data'),
+    path('forecast/map-data/', views.forecast_map_data, name='forecast_map_data'),
+    path('forecast/bycommodity/data/', views.forecast_bycommodity_data, name='forecast_bycommodity_data'),
     path('monitor/', monitor, name="monitor"),
+    path('geo/municipalities.json', views.municipality_geojson, name='municipality_geojson'),
     path('notifications/', notifications, name='notifications'),
     path('mark-notification-read/', views.mark_notification_read, name='mark_notification_read'),
 ]
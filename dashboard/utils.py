@@ -1,6 +1,9 @@
+import threading
+from contextlib import contextmanager
 from datetime import datetime
 from django.utils import timezone
-from django.db.models import OuterRef, Subquery, Max
+from django.db import transaction
+from django.db.models import Q, Max
 from base.models import CommodityType, UnitMeasurement, Month
 
 
@@ -9,6 +12,9 @@ def get_latest_forecasts_by_combination(base_queryset):
     Get the latest forecast for each commodity-municipality-month-year combination
     regardless of batch. This ensures that selective retraining doesn't hide
     forecasts from older batches.
+
+    The latest forecast is flagged with is_current when it is saved (see save_current_forecasts),
+    so this is a plain indexed filter.
     
     Args:
         base_queryset: Base ForecastResult queryset with initial filters
@@ -16,21 +22,241 @@ def get_latest_forecasts_by_combination(base_queryset):
     Returns:
         Queryset with only the latest forecast for each combination
     """
+    return base_queryset.filter(is_current=True)
+
+
+def combinations_filter(combinations):
+    """Q matching ForecastResult rows of the given (commodity_id, municipality_id, forecast_year, forecast_month_id) keys."""
+    months_by_series_year = {}
+    for commodity_id, municipality_id, forecast_year, forecast_month_id in combinations:
+        months_by_series_year.setdefault((commodity_id, municipality_id, forecast_year), set()).add(forecast_month_id)
+
+    key_filter = Q(pk__in=[])
+    for (commodity_id, municipality_id, forecast_year), month_ids in months_by_series_year.items():
+        key_filter |= Q(commodity_id=commodity_id, municipality_id=municipality_id,
+                        forecast_year=forecast_year, forecast_month_id__in=month_ids)
+    return key_filter
+
+
+def save_current_forecasts(results, batch_size=500):
+    """
+    Inserts unsaved ForecastResult objects as the current forecast of their combination,
+    un-flagging the rows they replace in the same transaction. If results contain the same
+    combination twice, the last one wins. Returns the number of rows written.
+    """
     from dashboard.models import ForecastResult
-    
-    # Get the latest batch generation date for each unique combination
-    latest_batch_for_combination = ForecastResult.objects.filter(
-        commodity=OuterRef('commodity'),
-        municipality=OuterRef('municipality'),
-        forecast_month=OuterRef('forecast_month'),
-        forecast_year=OuterRef('forecast_year')
-    ).order_by('-batch__generated_at').values('batch__generated_at')[:1]
-    
-    # Filter base queryset to only include records with the latest batch date for each combination
-    return base_queryset.filter(
-        batch__generated_at=Subquery(latest_batch_for_combination)
-    )
 
+    latest = {}
+    for result in results:
+        latest[(result.commodity_id, result.municipality_id, result.forecast_year, result.forecast_month_id)] = result
+    if not latest:
+        return 0
+
+    with transaction.atomic():
+        ForecastResult.objects.filter(combinations_filter(latest), is_current=True).update(is_current=False)
+        for result in latest.values():
+            result.is_current = True
+        # superseded duplicates are still stored, just not as current
+        ForecastResult.objects.bulk_create(results, batch_size=batch_size)
+    return len(results)
+
+
+def make_batch_current(batch):
+    """Flags every forecast of a batch written without save_current_forecasts as current."""
+    from dashboard.models import ForecastResult
+
+    combinations = set(ForecastResult.objects.filter(batch=batch).values_list(
+        'commodity_id', 'municipality_id', 'forecast_year', 'forecast_month_id'))
+    if not combinations:
+        return 0
+    with transaction.atomic():
+        ForecastResult.objects.filter(combinations_filter(combinations), is_current=True).exclude(batch=batch).update(is_current=False)
+        return ForecastResult.objects.filter(batch=batch).update(is_current=True)
+
+
+
+def harvest_rollup_cell(record):
+    """(year, month, commodity_id, municipality_id) rollup cell a VerifiedHarvestRecord counts towards."""
+    harvest_date = record.harvest_date
+    if isinstance(harvest_date, str):
+        harvest_date = datetime.strptime(harvest_date, '%Y-%m-%d').date()
+    return harvest_date.year, harvest_date.month, record.commodity_id_id, record.municipality_id
+
+
+def _rollup_cells_filter(cells, date_field='harvest_date', commodity_field='commodity_id', municipality_field='municipality'):
+    cells_filter = Q(pk__in=[])
+    for year, month, commodity_id, municipality_id in cells:
+        start = datetime(year, month, 1).date()
+        end = datetime(year + month // 12, month % 12 + 1, 1).date()
+        cell = Q(**{f'{date_field}__gte': start, f'{date_field}__lt': end, commodity_field: commodity_id})
+        if municipality_id is None:
+            cell &= Q(**{f'{municipality_field}__isnull': True})
+        else:
+            cell &= Q(**{municipality_field: municipality_id})
+        cells_filter |= cell
+    return cells_filter
+
+
+def _aggregate_harvest_rollup(records):
+    """Unsaved MonthlyHarvestRollup rows for a VerifiedHarvestRecord queryset, from one grouped query."""
+    from django.db.models import Count, Sum
+    from django.db.models.functions import ExtractMonth, ExtractYear
+    from dashboard.models import MonthlyHarvestRollup
+
+    grouped = records.annotate(
+        year=ExtractYear('harvest_date'), month=ExtractMonth('harvest_date'),
+    ).values('year', 'month', 'commodity_id', 'municipality_id').annotate(
+        total_weight_kg=Sum('total_weight_kg'), record_count=Count('pk'),
+    ).order_by()
+    return [
+        MonthlyHarvestRollup(
+            year=row['year'], month=row['month'], commodity_id=row['commodity_id'], municipality_id=row['municipality_id'],
+            total_weight_kg=row['total_weight_kg'], record_count=row['record_count'],
+        )
+        for row in grouped
+    ]
+
+
+def refresh_harvest_rollup(cells):
+    """
+    Recomputes the given rollup cells from VerifiedHarvestRecord (one grouped query for all of
+    them), so creates, edits, deletes and bulk imports can all call it with the cells they touched.
+    Returns the number of non-empty cells written.
+    """
+    from dashboard.models import MonthlyHarvestRollup, VerifiedHarvestRecord
+
+    cells = {cell for cell in cells if cell[2] is not None}
+    if not cells:
+        return 0
+
+    rows = _aggregate_harvest_rollup(VerifiedHarvestRecord.objects.filter(_rollup_cells_filter(cells)))
+    rollup_filter = Q(pk__in=[])
+    for year, month, commodity_id, municipality_id in cells:
+        rollup_filter |= Q(year=year, month=month, commodity_id=commodity_id, municipality_id=municipality_id)
+
+    with transaction.atomic():
+        MonthlyHarvestRollup.objects.filter(rollup_filter).delete()
+        # a concurrent refresh of the same cell may have inserted it again in the meantime
+        MonthlyHarvestRollup.objects.bulk_create(
+            rows, update_conflicts=True,
+            unique_fields=['year', 'month', 'commodity', 'municipality'],
+            update_fields=['total_weight_kg', 'record_count'],
+        )
+    return len(rows)
+
+
+_batched_refresh = threading.local()
+
+
+@contextmanager
+def batched_record_refresh():
+    """
+    Inside, the per-row rollup and dashboard stats receivers of record saves and deletes do
+    nothing; the caller refreshes the rollup cells it touched and the stats once for the batch.
+    """
+    previous = getattr(_batched_refresh, 'active', False)
+    _batched_refresh.active = True
+    try:
+        yield
+    finally:
+        _batched_refresh.active = previous
+
+
+def record_refresh_is_batched():
+    return getattr(_batched_refresh, 'active', False)
+
+
+def rebuild_harvest_rollup():
+    """Recomputes the whole rollup table from VerifiedHarvestRecord. Returns the number of cells."""
+    from dashboard.models import MonthlyHarvestRollup, VerifiedHarvestRecord
+
+    rows = _aggregate_harvest_rollup(VerifiedHarvestRecord.objects.all())
+    with transaction.atomic():
+        MonthlyHarvestRollup.objects.all().delete()
+        MonthlyHarvestRollup.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
+
+
+def harvest_rollup_version():
+    """
+    Changes whenever any rollup cell does: refreshes delete and re-insert the cells they touch,
+    so every refresh either raises the highest pk or lowers the row count.
+    """
+    from django.db.models import Count
+    from dashboard.models import MonthlyHarvestRollup
+
+    rollup = MonthlyHarvestRollup.objects.aggregate(last=Max('pk'), cells=Count('pk'))
+    return f"{rollup['last']}:{rollup['cells']}"
+
+
+def get_monthly_harvest_frame(commodity_id, municipality_id=None):
+    """
+    Monthly ds/y frame of verified harvests for one commodity, read from the rollup table.
+    municipality_id None (or the Overall pk 14) sums every municipality.
+    """
+    import pandas as pd
+    from django.db.models import Sum
+    from dashboard.models import MonthlyHarvestRollup
+
+    rollup = MonthlyHarvestRollup.objects.filter(commodity_id=commodity_id)
+    if municipality_id is not None and str(municipality_id) != '14':
+        rollup = rollup.filter(municipality_id=municipality_id)
+    rows = rollup.values('year', 'month').annotate(y=Sum('total_weight_kg')).order_by('year', 'month')
+
+    df = pd.DataFrame(list(rows), columns=['year', 'month', 'y'])
+    df['ds'] = pd.to_datetime(dict(year=df['year'], month=df['month'], day=1)) if not df.empty else pd.Series(dtype='datetime64[ns]')
+    return df[['ds', 'y']]
+
+
+MIN_SERIES_MONTHS = 2  # Prophet needs at least two monthly points
+
+
+def _month_from_index(index):
+    return datetime(index // 12, index % 12 + 1, 1).date()
+
+
+def get_series_stats(commodity_ids=None, municipality_ids=None, include_overall=True):
+    """
+    Per-series statistics from the harvest rollup, for every (commodity, municipality) at once:
+    {(commodity_id, municipality_id): {'months', 'records', 'first_month', 'last_month'}}.
+    Overall (pk 14) series count the distinct months over the included municipalities.
+    Two grouped queries regardless of the number of series.
+    """
+    from django.db.models import Count, F, Max, Min, Sum
+    from dashboard.models import MonthlyHarvestRollup
+
+    rollup = MonthlyHarvestRollup.objects.filter(municipality__isnull=False).exclude(municipality_id=14)
+    if commodity_ids is not None:
+        rollup = rollup.filter(commodity_id__in=list(commodity_ids))
+    if municipality_ids is not None:
+        rollup = rollup.filter(municipality_id__in=list(municipality_ids))
+    month_index = F('year') * 12 + F('month') - 1
+    aggregates = {'records': Sum('record_count'), 'first_month': Min(month_index), 'last_month': Max(month_index)}
+
+    grouped = [
+        ((row.pop('commodity_id'), row.pop('municipality_id')), row)
+        for row in rollup.values('commodity_id', 'municipality_id').annotate(months=Count('pk'), **aggregates).order_by()
+    ]
+    if include_overall:
+        grouped += [
+            ((row.pop('commodity_id'), 14), row)
+            for row in rollup.values('commodity_id').annotate(months=Count(month_index, distinct=True), **aggregates).order_by()
+        ]
+
+    stats = {}
+    for key, row in grouped:
+        row['first_month'] = _month_from_index(row['first_month'])
+        row['last_month'] = _month_from_index(row['last_month'])
+        stats[key] = row
+    return stats
+
+
+def get_eligible_series(commodity_ids=None, municipality_ids=None, include_overall=True, min_months=MIN_SERIES_MONTHS):
+    """(commodity_id, municipality_id) keys with enough months of data to train and chart."""
+    return {
+        key for key, stats in get_series_stats(commodity_ids, municipality_ids, include_overall).items()
+        if stats['months'] >= min_months
+    }
 
 # GENERATING THESIS2 COMMODITY TYPE MODEL
 
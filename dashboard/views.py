@@ -11,7 +11,7 @@ from dateutil.relativedelta import relativedelta
 from decimal import Decimal
 from django.utils import timezone
 from django.utils.timezone import now
-from django.views.decorators.http import require_POST
+from django.views.decorators.http import condition, require_POST
 from django.urls import reverse
 from django.http import HttpResponseForbidden
 from django.db.models import Sum, Avg, Max, Count, Q
@@ -43,7 +43,10 @@ from django.conf import settings
 from django.core.files.storage import default_storage
 from base.models import *
 from dashboard.models import *
-from dashboard.utils import get_latest_forecasts_by_combination
+from dashboard.chart_data import build_choropleth_data, build_commodity_summary, build_forecast_series, forecast_data_etag, forecast_series_etag, latest_forecast_time
+from dashboard.geo import geo_registry
+from base.reference_data import reference_data
+from dashboard.utils import get_eligible_series, get_latest_forecasts_by_combination, harvest_rollup_version
 
 def format_number(value):
     """Format a number with commas and 2 decimal places"""
@@ -80,7 +83,7 @@ def schedule_harvest_notification(plant_record):
     expected_harvest_date = plant_date + timedelta(days=float(years_to_mature) * 365.25)
 
     # Adjust to nearest in-season month (if any)
-    in_season_months = list(commodity.seasonal_months.values_list('number', flat=True))
+    in_season_months = [month.number for month in reference_data.get().seasonal_months.get(commodity.pk, ())]
     if in_season_months:
         # Find the next in-season month after expected_harvest_date
         month = expected_harvest_date.month
@@ -202,16 +205,8 @@ def forecast(request):
         selected_municipality_obj = MunicipalityName.objects.get(pk=selected_municipality_id)
     
     
-    municipality_qs = VerifiedHarvestRecord.objects.filter(commodity_id=selected_commodity_id)
-    municipality_months = {}
-    for muni_id in all_municipalities.values_list('municipality_id', flat=True):
-        muni_records = municipality_qs.filter(municipality_id=muni_id)
-        months = muni_records.values_list('harvest_date', flat=True)
-        month_set = set((d.year, d.month) for d in months if d)
-        if len(month_set) >= 2:
-            municipality_months[muni_id] = True
-
-    municipalities = all_municipalities.filter(municipality_id__in=municipality_months.keys())
+    eligible_series = get_eligible_series([selected_commodity_id], include_overall=False)
+    municipalities = all_municipalities.filter(municipality_id__in=[muni_id for _, muni_id in eligible_series])
 
     now_dt = datetime.now()
     current_year = now_dt.year
@@ -233,95 +228,7 @@ def forecast(request):
     # Get historical data
     print(type(selected_commodity_id), " : ", selected_commodity_id, type(selected_municipality_id), ':', selected_municipality_id)
 
-    if selected_municipality_id == "14" or selected_municipality_id == 14:
-        qs = VerifiedHarvestRecord.objects.filter(
-            commodity_id=selected_commodity_id,
-        ).values('harvest_date', 'total_weight_kg').order_by('harvest_date')
-        print("Overall selected, not filtering by municipality.", qs)
-    else:
-        qs = VerifiedHarvestRecord.objects.filter(
-            commodity_id=selected_commodity_id,
-            municipality_id=selected_municipality_id
-        ).values('harvest_date', 'total_weight_kg').order_by('harvest_date')
-        print("Filtered by municipality:", selected_municipality_id, qs)
-        
-    base_forecast_qs = ForecastResult.objects.filter(
-        commodity_id=selected_commodity_id,
-        municipality_id=selected_municipality_id
-    )
-    forecast_results = get_latest_forecasts_by_combination(base_forecast_qs).order_by('forecast_year', 'forecast_month__number')
-    
-    if not forecast_results.exists():
-        forecast_data = None
-        print("No forecast results found in database.")
-    else:
-        print(f"Found {forecast_results.count()} forecast results in database")
-        
-        df = pd.DataFrame()
-        if qs.exists():
-            df = pd.DataFrame(list(qs))
-            df = df.rename(columns={'harvest_date': 'ds', 'total_weight_kg': 'y'})
-            df['ds'] = pd.to_datetime(df['ds'])
-            df['ds'] = df['ds'].dt.to_period('M').dt.to_timestamp()
-            df = df.groupby('ds', as_index=False)['y'].sum()
-            print(f"Historical data: {len(df)} records, date range: {df['ds'].min()} to {df['ds'].max()}")
-        else:
-            print("No historical data available, but forecast data exists - showing forecasts only")
-        
-        forecast_dates = []
-        forecast_values_list = []
-        
-        for result in forecast_results:
-            forecast_date = datetime(result.forecast_year, result.forecast_month.number, 1)
-            forecast_dates.append(forecast_date)
-            forecast_values_list.append(float(result.forecasted_amount_kg))
-        
-        current_year = datetime.now().year
-        
-        earliest_historical = df['ds'].min() if not df.empty else datetime(current_year - 1, 1, 1)
-        timeline_start = min(earliest_historical, datetime(current_year - 1, 1, 1))
-        
-        timeline_end = datetime(current_year + 1, 12, 31)
-        
-        all_dates = pd.date_range(start=timeline_start, end=timeline_end, freq='MS')
-        
-        hist_dict = dict(zip(df['ds'], df['y'])) if not df.empty else {}
-        forecast_dict = dict(zip(forecast_dates, forecast_values_list))
-        
-        # Build aligned arrays for Chart.js
-        all_labels = [d.strftime('%b %Y') for d in all_dates]
-        hist_values = [float(hist_dict.get(d, 0)) if d in hist_dict else None for d in all_dates]
-        forecast_values = [float(forecast_dict.get(d, 0)) if d in forecast_dict else None for d in all_dates]
-        
-        # Combined data for CSV/table (only forecasts from January 2025 onwards)
-        future_forecast_data = []
-        
-        for result in forecast_results:
-            forecast_date = datetime(result.forecast_year, result.forecast_month.number, 1)
-            if forecast_date >= datetime(2025, 1, 1):
-                future_forecast_data.append([
-                    forecast_date.strftime('%b %Y'),
-                    round(float(result.forecasted_amount_kg), 2),
-                    result.forecast_month.number,
-                    result.forecast_year
-                ])
-
-        forecast_data = {
-            'all_labels': json.dumps(all_labels),
-            'hist_values': json.dumps(hist_values),
-            'forecast_values': json.dumps(forecast_values),
-            'combined': future_forecast_data,
-        }
-
-        print("Historical data points:", sum(1 for v in hist_values if v is not None))
-        print("Forecast data points:", sum(1 for v in forecast_values if v is not None))
-        print("Overlapping timeline created with", len(all_labels), "labels")
-            
-            
-    now = datetime.now()
-    current_year = now.year
-    current_month = now.month
-    months = Month.objects.order_by('number')
+    forecast_data = build_forecast_series(selected_commodity_id, selected_municipality_id)
     
     if not filter_month:
         filter_month = "1" 
@@ -329,13 +236,6 @@ def forecast(request):
         filter_year = "2025"  
         
     print(filter_month, filter_year)
-    
-    available_years = list(
-        ForecastResult.objects.filter(forecast_year__gte=2025).order_by('forecast_year')
-        .values_list('forecast_year', flat=True).distinct()
-    )
-    if not available_years:
-        available_years = [2025] 
             
     forecast_value_for_selected_month = None
     if forecast_data and filter_month and filter_year:
@@ -349,75 +249,12 @@ def forecast(request):
     # CHOROPLETH 2D MAP DATA
     
     map_commodity_id = selected_mapcommodity_id or selected_commodity_id
-    map_month = filter_month 
-    map_year = filter_year   
-    
-    print(f"Map parameters - Commodity: {map_commodity_id}, Month: {map_month}, Year: {map_year}")
+    print(f"Map parameters - Commodity: {map_commodity_id}, Month: {filter_month}, Year: {filter_year}")
+    choropleth_data = build_choropleth_data(map_commodity_id, filter_month, filter_year)
 
-    geojson_path = os.path.join('static', 'geojson', 'BATAAN_MUNICIPALITY.geojson')
-    with open(geojson_path, encoding='utf-8') as f:
-        geojson_data = json.load(f)
-
-    # Build mapping: GeoJSON name -> list of OBJECTIDs
-    geojson_name_to_objectids = {}
-    for feature in geojson_data['features']:
-        name = feature['properties']['MUNICIPALI'].strip().upper()
-        objectid = feature['properties']['OBJECTID']
-        geojson_name_to_objectids.setdefault(name, []).append(objectid)
-
-    # Build mapping: MunicipalityName ID -> list of OBJECTIDs
-    muni_id_to_objectids = {}
-    for muni in MunicipalityName.objects.all():
-        name_key = muni.municipality.strip().upper()
-        objectids = geojson_name_to_objectids.get(name_key, [])
-        muni_id_to_objectids[muni.municipality_id] = objectids
-
-    choropleth_data = {}
-
-    if map_commodity_id and map_month and map_year:
-        try:
-            base_forecast_results = ForecastResult.objects.filter(
-                commodity_id=map_commodity_id,
-                forecast_month__number=map_month,
-                forecast_year=map_year
-            ).exclude(municipality_id=14).select_related('municipality') 
-            forecast_results = get_latest_forecasts_by_combination(base_forecast_results)
-            
-            print(f"Map commodity: {selected_mapcommodity_obj}")
-            print(f"Forecast results for {map_month}/{map_year}: {forecast_results}")
-            
-            if forecast_results.exists():
-                # Populate the choropleth data - use individual records (should be unique per municipality)
-                for result in forecast_results:
-                    muni_id = result.municipality_id
-                    total_kg = result.forecasted_amount_kg
-                    choropleth_data[str(muni_id)] = round(float(total_kg or 0), 2)
-            else:
-                # If no specific data, try to get "Overall" forecast and distribute it
-                overall_forecast_qs = ForecastResult.objects.filter(
-                    commodity_id=map_commodity_id,
-                    forecast_month__number=map_month,
-                    forecast_year=map_year,
-                    municipality_id=14  # "Overall" municipality
-                )
-                overall_forecast = get_latest_forecasts_by_combination(overall_forecast_qs).first()
-                
-                if overall_forecast:
-                    print(f"Using overall forecast: {overall_forecast.forecasted_amount_kg} kg")
-                    # Distribute overall forecast among all municipalities equally
-                    num_munis = len(muni_id_to_objectids)
-                    if num_munis > 0:
-                        avg_per_muni = overall_forecast.forecasted_amount_kg / num_munis
-                        for muni_id in muni_id_to_objectids.keys():
-                            choropleth_data[str(muni_id)] = round(float(avg_per_muni), 2)
-                else:
-                    print(f"No forecast data available for commodity {map_commodity_id}, {map_month}/{map_year}")
-                
-        except Exception as e:
-            print(f"Error fetching choropleth data: {e}")
-            choropleth_data = {}
+    if forecast_data:
+        forecast_data = dict(forecast_data, **{key: json.dumps(forecast_data[key]) for key in ('all_labels', 'hist_values', 'forecast_values')})
 
-    print("Choropleth Data:", choropleth_data)  # Debug print
     context = { 
         'forecast_data': forecast_data,
         'forecast_combined_json': json.dumps(forecast_data['combined']) if forecast_data else '[]',
@@ -434,6 +271,7 @@ def forecast(request):
         'available_years': available_years,
         'months': months,
         'choropleth_data' : json.dumps(choropleth_data),
+        'geojson_version': geo_registry.artifact()[1].strip('"')[:12],
     }
     if request.user.is_authenticated and userinfo:
         context['account_id'] = account_id
@@ -442,6 +280,58 @@ def forecast(request):
     return render(request, 'forecasting/forecast.html', context)
 
 
+@condition(etag_func=lambda request: geo_registry.artifact()[1])
+def municipality_geojson(request):
+    """Pre-joined municipality boundaries for the choropleth; the URL is versioned by the ETag so browsers can keep it."""
+    body, _ = geo_registry.artifact()
+    response = HttpResponse(body, content_type='application/geo+json')
+    response['Cache-Control'] = 'public, max-age=86400'
+    return response
+
+
+def _chart_data_params(request, *names):
+    """Integer query parameters of the chart-data endpoints, None for a missing or malformed one."""
+    values = []
+    for name in names:
+        value = request.GET.get(name, '')
+        values.append(int(value) if value.isdigit() else None)
+    return values
+
+
+def _chart_data_response(data):
+    response = JsonResponse(data)
+    # stored by browsers and proxies, but revalidated against the endpoint's ETag every time
+    response['Cache-Control'] = 'public, no-cache'
+    return response
+
+
+# no Last-Modified: a history change has no timestamp, and If-Modified-Since alone would answer 304
+@condition(etag_func=forecast_series_etag)
+def forecast_series_data(request):
+    """Historical and forecast chart arrays of the forecast page for ?commodity_id=&municipality_id= as JSON."""
+    commodity_id, municipality_id = _chart_data_params(request, 'commodity_id', 'municipality_id')
+    if commodity_id is None:
+        return JsonResponse({'error': 'commodity_id is required'}, status=400)
+    return _chart_data_response({'series': build_forecast_series(commodity_id, municipality_id or 14)})
+
+
+@condition(etag_func=forecast_data_etag, last_modified_func=latest_forecast_time)
+def forecast_map_data(request):
+    """Choropleth values for ?mapcommodity_id=&filter_month=&filter_year= as JSON."""
+    commodity_id, month, year = _chart_data_params(request, 'mapcommodity_id', 'filter_month', 'filter_year')
+    if None in (commodity_id, month, year):
+        return JsonResponse({'error': 'mapcommodity_id, filter_month and filter_year are required'}, status=400)
+    return _chart_data_response({'map': build_choropleth_data(commodity_id, month, year)})
+
+
+@condition(etag_func=forecast_data_etag, last_modified_func=latest_forecast_time)
+def forecast_bycommodity_data(request):
+    """Per-commodity forecast summary for ?filter_month=&filter_year=&municipality_id= as JSON."""
+    month, year, municipality_id = _chart_data_params(request, 'filter_month', 'filter_year', 'municipality_id')
+    forecast_summary, forecast_summary_chart = build_commodity_summary(month or 1, year or 2025, municipality_id or 14)
+    return _chart_data_response({'summary': forecast_summary, 'chart': forecast_summary_chart})
+
+
 def forecast_bycommodity(request):
     account_id = None
     userinfo_id = None
@@ -475,48 +365,8 @@ def forecast_bycommodity(request):
     if not available_years:
         available_years = [2025]  
     
-    forecast_summary = None
-    forecast_summary_chart = None
-
-    forecast_qs = ForecastResult.objects.filter(
-        forecast_month__number=filter_month,
-        forecast_year=filter_year,
-        forecast_year__gte=2025 
-    )
-    if int(filter_month) == 1 and int(filter_year) < 2025:
-        forecast_qs = ForecastResult.objects.none()  
-    if selected_municipality_id != "14":
-        forecast_qs = forecast_qs.filter(municipality__municipality_id=selected_municipality_id)
-  
-    if forecast_qs.exists():
-        forecast_qs = get_latest_forecasts_by_combination(forecast_qs)
-    else:
-        forecast_qs = ForecastResult.objects.none()
-
-    summary_dict = {}
-    for commodity in commodity_types:
-        total = forecast_qs.filter(commodity=commodity).aggregate(
-            total_kg=Sum('forecasted_amount_kg')
-        )['total_kg']
-        summary_dict[commodity.name] = round(total, 2) if total else 0
-
-    # Sort by descending forecast values and filter out zero values
-    sorted_summary = sorted(
-        [(k, v) for k, v in summary_dict.items() if v > 0], 
-        key=lambda x: x[1], 
-        reverse=True
-    )
-    
-    forecast_summary = [
-        {'commodity': k, 'forecasted_kg': v} for k, v in sorted_summary
-    ]
-    
-    top_10_summary = sorted_summary[:10]
-    forecast_summary_chart = {
-        'labels': [item[0] for item in top_10_summary],
-        'values': [item[1] for item in top_10_summary]
-    } if top_10_summary else None
-    print("Forecast results count:", forecast_qs.count())
+    forecast_summary, forecast_summary_chart = build_commodity_summary(filter_month, filter_year, selected_municipality_id)
+    print("Forecast summary commodities:", len(forecast_summary))
 
     context = {
         'user_firstname': userinfo.firstname if userinfo else None,
@@ -639,14 +489,18 @@ def forecast_csv(request):
     return response
 
 
-def forecast_pdf(request):
-    commodity_id = request.GET.get('commodity_id')
-    municipality_id = request.GET.get('municipality_id')
-    forecast_combined_raw = request.GET.get('forecast_combined')
-    pdf_type = request.GET.get('pdf_type')
+FORECAST_PDF_PARAMS = ('commodity_id', 'municipality_id', 'forecast_combined', 'pdf_type', 'filter_month', 'filter_year')
+
+
+def forecast_report_context(payload):
+    """(template name, context, filename) of a forecast PDF for the given request parameters."""
+    commodity_id = payload.get('commodity_id')
+    municipality_id = payload.get('municipality_id')
+    forecast_combined_raw = payload.get('forecast_combined')
+    pdf_type = payload.get('pdf_type')
     
-    filter_month = request.GET.get('filter_month')
-    filter_year = request.GET.get('filter_year')
+    filter_month = payload.get('filter_month')
+    filter_year = payload.get('filter_year')
     
     if pdf_type == 'by_commodity':
         municipality_name = "All of Bataan"
@@ -715,16 +569,49 @@ def forecast_pdf(request):
         template_name = 'forecasting/forecast_pdf_template.html'
 
     filename = filename.replace(" ", "-")
+    return template_name, context, filename
 
-    template = get_template(template_name)
-    html_content = template.render(context)
-    
-    pdf = HTML(string=html_content, base_url=request.build_absolute_uri('/')).write_pdf()
 
-    response = HttpResponse(pdf, content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+def render_forecast_report(payload):
+    """PDF bytes of a forecast report; runs in the render_report_task worker."""
+    template_name, context, filename = forecast_report_context(payload)
+    html_content = get_template(template_name).render(context)
+    return HTML(string=html_content, base_url=payload.get('base_url')).write_pdf()
 
-    return response
+
+def forecast_pdf(request):
+    """
+    WeasyPrint takes seconds per report, so rendering is done by a Celery worker and the
+    stored file is reused until a new forecast batch is generated or the harvest history the
+    charts show changes.
+    """
+    from dashboard.reports import report_response
+
+    payload = {param: request.GET.get(param) for param in FORECAST_PDF_PARAMS}
+    _, _, filename = forecast_report_context(payload)
+    payload['base_url'] = request.build_absolute_uri('/')
+    latest = latest_forecast_time()
+    version = f"{latest.isoformat() if latest else 'none'}|{harvest_rollup_version()}"
+    return report_response(
+        request, 'forecast', payload, version, filename,
+        'dashboard', 'forecasting/layout.html',
+    )
+
+
+def report_status(request, kind, key):
+    from dashboard.reports import report_status as get_report_status
+
+    if kind != 'forecast':
+        return JsonResponse({'error': 'Unknown report'}, status=404)
+    return JsonResponse(get_report_status(kind, key, request.GET.get('task_id')))
+
+
+def report_download(request, kind, key):
+    from dashboard.reports import report_file_response
+
+    if kind != 'forecast':
+        return JsonResponse({'error': 'Unknown report'}, status=404)
+    return report_file_response(kind, key, request.GET.get('filename') or 'forecast.pdf')
 
 
 
@@ -750,7 +637,7 @@ def monitor(request):
         if userinfo_id:
             userinfo = UserInformation.objects.get(pk=userinfo_id)
 
-    available_years = VerifiedHarvestRecord.objects.annotate(year=ExtractYear('harvest_date')).values_list('year', flat=True).distinct().order_by('year')
+    available_years = MonthlyHarvestRollup.objects.values_list('year', flat=True).distinct().order_by('year')
     if not available_years: 
         available_years = VerifiedPlantRecord.objects.annotate(year=ExtractYear('plant_date')).values_list('year', flat=True).distinct().order_by('year')
     
@@ -777,12 +664,12 @@ def monitor(request):
     selected_commodity = request.GET.get('commodity', 'all')
     selected_municipality_name = 'All Municipalities'
 
-    # Base QuerySets
-    harvest_records = VerifiedHarvestRecord.objects.all()
+    # Base QuerySets (harvests are read from the monthly rollup, not the raw records)
+    harvest_records = MonthlyHarvestRollup.objects.all()
     plant_records = VerifiedPlantRecord.objects.all()
 
     # Apply year filter to all datasets
-    harvest_records = harvest_records.filter(harvest_date__year=selected_year)
+    harvest_records = harvest_records.filter(year=selected_year)
     plant_records = plant_records.filter(plant_date__year=selected_year)
 
     # If no data for selected year, try to find the most recent year with data
@@ -790,7 +677,7 @@ def monitor(request):
         if available_years_list:
             # Use the most recent year with data
             selected_year = max(available_years_list)
-            harvest_records = VerifiedHarvestRecord.objects.filter(harvest_date__year=selected_year)
+            harvest_records = MonthlyHarvestRollup.objects.filter(year=selected_year)
             plant_records = VerifiedPlantRecord.objects.filter(plant_date__year=selected_year)
     
     harvest_records_muni_commodity_filtered = harvest_records
@@ -802,7 +689,7 @@ def monitor(request):
         selected_municipality_name = MunicipalityName.objects.get(pk=selected_municipality).municipality
     
     if selected_commodity != 'all' and selected_commodity.isdigit():
-        harvest_records_muni_commodity_filtered = harvest_records_muni_commodity_filtered.filter(commodity_id=selected_commodity)
+        harvest_records_muni_commodity_filtered = harvest_records_muni_commodity_filtered.filter(commodity=selected_commodity)
         plant_records_muni_commodity_filtered = plant_records_muni_commodity_filtered.filter(commodity_id=selected_commodity)
     
     harvest_records_muni_only = harvest_records
@@ -811,20 +698,20 @@ def monitor(request):
     
     harvest_records_commodity_only = harvest_records
     if selected_commodity != 'all' and selected_commodity.isdigit():
-        harvest_records_commodity_only = harvest_records.filter(commodity_id=selected_commodity)
+        harvest_records_commodity_only = harvest_records.filter(commodity=selected_commodity)
     
     total_plantings = plant_records_muni_commodity_filtered.aggregate(total=Count('id'))['total'] or 0
-    total_harvests = harvest_records_muni_commodity_filtered.aggregate(total=Count('id'))['total'] or 0
-    most_abundant_fruit = harvest_records_muni_commodity_filtered.values('commodity_id__name').annotate(total_weight=Sum('total_weight_kg')).order_by('-total_weight').first()
-    most_abundant_fruit = most_abundant_fruit['commodity_id__name'] if most_abundant_fruit else None
+    total_harvests = harvest_records_muni_commodity_filtered.aggregate(total=Sum('record_count'))['total'] or 0
+    most_abundant_fruit = harvest_records_muni_commodity_filtered.values('commodity__name').annotate(total_weight=Sum('total_weight_kg')).order_by('-total_weight').first()
+    most_abundant_fruit = most_abundant_fruit['commodity__name'] if most_abundant_fruit else None
     total_users = AccountsInformation.objects.filter(account_type_id=1).count()
 
-    monthly_harvest_data = harvest_records_muni_commodity_filtered.annotate(month=TruncMonth('harvest_date')).values('month').annotate(total_weight=Sum('total_weight_kg')).order_by('month')
-    monthly_labels = [data['month'].strftime('%b %Y') for data in monthly_harvest_data]
+    monthly_harvest_data = harvest_records_muni_commodity_filtered.values('year', 'month').annotate(total_weight=Sum('total_weight_kg')).order_by('year', 'month')
+    monthly_labels = [date(data['year'], data['month'], 1).strftime('%b %Y') for data in monthly_harvest_data]
     monthly_values = [float(data['total_weight']) for data in monthly_harvest_data]
     
-    harvest_by_commodity = harvest_records_muni_only.values('commodity_id__name').annotate(total_weight=Sum('total_weight_kg')).order_by('-total_weight')[:10]  # Limit to top 10
-    commodity_labels = [data['commodity_id__name'] for data in harvest_by_commodity]
+    harvest_by_commodity = harvest_records_muni_only.values('commodity__name').annotate(total_weight=Sum('total_weight_kg')).order_by('-total_weight')[:10]  # Limit to top 10
+    commodity_labels = [data['commodity__name'] for data in harvest_by_commodity]
     commodity_values = [float(data['total_weight']) for data in harvest_by_commodity]
 
     harvest_by_municipality = harvest_records_commodity_only.values('municipality__municipality').annotate(total_weight=Sum('total_weight_kg')).order_by('-total_weight')
@@ -54,6 +54,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'base.middleware.PrincipalMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -213,4 +214,29 @@ CELERY_RESULT_BACKEND = 'redis://localhost:6379/0' # Backend to store task resul
 CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
-CELERY_TIMEZONE = 'Asia/Manila' # Set to your timezone
\ No newline at end of file
+CELERY_TIMEZONE = 'Asia/Manila' # Set to your timezone
+
+# Number of processes used to fit Prophet series in parallel during a full retrain.
+FORECAST_TRAINING_WORKERS = int(os.environ.get('FORECAST_TRAINING_WORKERS', os.cpu_count() or 1))
+
+# Per-process cache of loaded Prophet models (see administrator/model_registry.py).
+PROPHET_MODEL_CACHE_SIZE = int(os.environ.get('PROPHET_MODEL_CACHE_SIZE', 32))
+# Seconds a cached model is trusted before its storage mtime is checked again.
+PROPHET_MODEL_CACHE_REVALIDATE_SECONDS = int(os.environ.get('PROPHET_MODEL_CACHE_REVALIDATE_SECONDS', 300))
+# Minimum years of long-term predictions stored for recommendations (extended to the longest years_to_mature).
+FORECAST_HORIZON_YEARS = int(os.environ.get('FORECAST_HORIZON_YEARS', 5))
+# How long a Gemini recommendation response is reused for the same low-supply set (a new forecast batch always invalidates it).
+RECOMMENDATION_CACHE_TTL_SECONDS = int(os.environ.get('RECOMMENDATION_CACHE_TTL_SECONDS', 7 * 24 * 60 * 60))
+
+# Periodic tasks (run with: celery -A fruitcast beat)
+from celery.schedules import crontab
+CELERY_BEAT_SCHEDULE = {
+    'monthly-fruit-recommendations': {
+        'task': 'base.tasks.schedule_all_fruit_recommendations_task',
+        'schedule': crontab(day_of_month=1, hour=6, minute=0),
+    },
+    'deliver-scheduled-notifications': {
+        'task': 'base.tasks.deliver_scheduled_notifications_task',
+        'schedule': crontab(minute='*/5'),
+    },
+}
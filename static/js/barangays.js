@@ -0,0 +1,30 @@
+// Barangay dropdowns: fetchBarangays(municipalityId) resolves to [{id, barangay}, ...].
+// The index of every municipality is downloaded once per page (and cached by the browser,
+// its URL changes whenever the barangay list does), so changing municipality needs no request.
+(function () {
+    const indexUrl = document.currentScript.dataset.indexUrl;
+    let index = null;
+
+    function loadIndex() {
+        if (!index) {
+            index = fetch(indexUrl)
+                .then(response => {
+                    if (!response.ok) {
+                        throw new Error(`HTTP error! status: ${response.status}`);
+                    }
+                    return response.json();
+                })
+                .catch(error => {
+                    index = null;
+                    throw error;
+                });
+        }
+        return index;
+    }
+
+    window.fetchBarangays = function (municipalityId) {
+        return loadIndex().then(barangays => barangays[municipalityId] || []);
+    };
+
+    loadIndex().catch(error => console.error('Error loading barangays:', error));
+})();